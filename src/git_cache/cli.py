@@ -14,23 +14,58 @@ Copyright:
 # -----------------------------------------------------------------------------
 # Module Import
 # -----------------------------------------------------------------------------
-import logging
 import os
 import sys
+from typing import List, Optional
 
-import coloredlogs
-
-from .git_cache_command import git_cache
-from .git_command import handle_git_command
 from .global_settings import GITCACHE_LOGFORMAT, GITCACHE_LOGLEVEL
-from .invocation_log import invocation_context
+from .passthrough import exec_real_git
+
+# -----------------------------------------------------------------------------
+# Constants
+# -----------------------------------------------------------------------------
+GIT_NAMES = ["git", "git.exe"]
 
 
 # -----------------------------------------------------------------------------
 # Main
 # -----------------------------------------------------------------------------
+def get_git_args(argv: List[str]) -> Optional[List[str]]:
+    """Get the arguments to git if called as git wrapper.
+
+    Args:
+        argv (list): The command line arguments including the program name.
+
+    Return:
+        Returns the arguments to git or None if called as :code:`gitcache`.
+    """
+    if os.path.basename(argv[0]) in GIT_NAMES:
+        # Called as "git ..."
+        return argv[1:]
+    if len(argv) > 1 and os.path.basename(argv[1]) in GIT_NAMES:
+        # Called as "gitcache git ..."
+        return argv[2:]
+    return None
+
+
 def main_cli() -> None:
     """The main entry point of the gitcache command."""
+    git_args = get_git_args(sys.argv)
+    if git_args is not None:
+        # Does not return if the command is not handled by gitcache
+        exec_real_git(git_args)
+
+    # The modules are imported only after the fast path was not taken
+    # pylint: disable=import-outside-toplevel
+    import logging
+
+    import coloredlogs
+
+    from .database_storage import log_snapshot_statistics
+    from .git_cache_command import git_cache
+    from .git_command import handle_git_command
+    from .invocation_log import invocation_context
+
     log_level_styles = {
         "debug": {"color": "cyan"},
         "info": {"color": "green"},
@@ -44,23 +79,15 @@ def main_cli() -> None:
     logger.debug("Python executable: %s", sys.executable)
     logger.debug("Called as %s", sys.argv)
 
-    # If using an interpreter we add it as the first argument of the "called_as" array.
-    called_as_base = []
-    if not getattr(sys, "frozen", False):
-        called_as_base.append(sys.executable)
-
-    git_names = ["git", "git.exe"]
     with invocation_context() as context:
         try:
-            if os.path.basename(sys.argv[0]) in git_names:
-                # Called as "git ..."
-                handle_git_command(called_as_base + sys.argv[0:1], sys.argv[1:])
-            elif len(sys.argv) > 1 and os.path.basename(sys.argv[1]) in git_names:
-                # Called as "gitcache git ..."
-                handle_git_command(called_as_base + sys.argv[0:2], sys.argv[2:])
+            if git_args is not None:
+                handle_git_command(git_args)
             else:
                 sys.exit(0 if git_cache() else 1)
         except SystemExit as exit_error:
             if context is not None:
                 context.set_exit_code(exit_error.code)
             raise
+        finally:
+            log_snapshot_statistics()
@@ -23,6 +23,7 @@ import time
 
 from .helpers import rmtree, subprocess_env
 from .invocation_log import is_detail_log_enabled, log_subprocess
+from .parallel_output import is_output_multiplexed
 
 if platform.system().lower().startswith("win"):
     # pylint: disable=import-error
@@ -47,7 +48,7 @@ STDERR_DISABLE_PATTERNS = ["Permission denied (publickey).".encode()]
 # -----------------------------------------------------------------------------
 # Exported Functions
 # -----------------------------------------------------------------------------
-# pylint: disable=too-many-arguments,too-many-positional-arguments
+# pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
 def call_command_retry(
     command,
     num_retries,
@@ -57,6 +58,7 @@ def call_command_retry(
     output_timeout=None,
     remove_dir=None,
     abort_on_pattern=None,
+    max_output_size=None,
 ):
     """Call the given command with automatic retries on error.
 
@@ -78,6 +80,9 @@ def call_command_retry(
         abort_on_pattern (str):  If given, the given pattern is search in stdout and
                                  stderr of a failed call. If found, this call returns
                                  with the return code -3000.
+        max_output_size (int):   If given, only the tail of this size of stdout resp.
+                                 stderr is kept. Lines containing the abort pattern
+                                 are kept in any case.
 
     Returns:
         The tuple (return_code, stdout_buffer, stderr_buffer) with the return code
@@ -90,6 +95,10 @@ def call_command_retry(
     else:
         command_str = " ".join(command)
 
+    keep_patterns = [abort_on_pattern] if abort_on_pattern else []
+    if ON_WINDOWS:
+        keep_patterns += STDERR_DISABLE_PATTERNS
+
     stderr_capture = True
     LOG.debug("Retry to execute command '%s' up to %d times.", command_str, num_retries)
     for retry in range(num_retries + 1):
@@ -100,6 +109,8 @@ def call_command_retry(
             command_timeout=command_timeout,
             output_timeout=output_timeout,
             stderr_capture=stderr_capture,
+            max_output_size=max_output_size,
+            keep_patterns=keep_patterns,
         )
         if return_code == 0:
             break
@@ -191,10 +202,13 @@ def simple_call_command(cmd, shell=False, cwd=None):
         cwd (str):    The working directory. If not specified, the current
                       working directory is used.
 
+    If the output is multiplexed by parallel threads, the output of the command
+    is forwarded line by line instead of writing directly to the terminal.
+
     Return:
         Returns the return code of the command.
     """
-    if is_detail_log_enabled():
+    if is_detail_log_enabled() or is_output_multiplexed():
         start_time = time.time()
         try:
             return_code, stdout_buffer, stderr_buffer = call_command(cmd, cwd=cwd, shell=shell)
@@ -202,8 +216,9 @@ def simple_call_command(cmd, shell=False, cwd=None):
             return_code = 127
             stdout_buffer = b""
             stderr_buffer = b""
-        duration_ms = int((time.time() - start_time) * 1000)
-        log_subprocess(cmd, return_code, duration_ms, cwd, stdout_buffer, stderr_buffer)
+        if is_detail_log_enabled():
+            duration_ms = int((time.time() - start_time) * 1000)
+            log_subprocess(cmd, return_code, duration_ms, cwd, stdout_buffer, stderr_buffer)
         return return_code
 
     try:
@@ -220,7 +235,7 @@ def simple_call_command(cmd, shell=False, cwd=None):
     return process.poll()
 
 
-def getstatusoutput(cmd, shell=False, cwd=None):
+def getstatusoutput(cmd, shell=False, cwd=None, env=None):
     """Call the given command like the good old commands.getstatusoutput.
 
     Executes the command and capture the stdout. The stderr is ignored by
@@ -232,6 +247,7 @@ def getstatusoutput(cmd, shell=False, cwd=None):
                       Only use this option if absolutely necessary!
         cwd (str):    The working directory. If not specified, the current
                       working directory is used.
+        env (dict):   Additional environment variables.
 
     Return:
         Returns the tuple (return_code, output). If the command was not found
@@ -240,7 +256,12 @@ def getstatusoutput(cmd, shell=False, cwd=None):
     try:
         # pylint: disable=subprocess-run-check
         result = subprocess.run(
-            cmd, shell=shell, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=subprocess_env()
+            cmd,
+            shell=shell,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=dict(subprocess_env(), **(env or {})),
         )
     except FileNotFoundError:
         return (127, "")
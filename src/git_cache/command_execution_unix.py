@@ -2,6 +2,20 @@
 """
 Module for command execution function call_command() on linux etc.
 
+The output of the command is read using a :mod:`selectors` based event loop.
+The exit of the command is signalled by a file descriptor as well, so that
+the loop wakes up as soon as the command exits even if a background process
+started by the command still holds its output open. On Linux a pidfd is
+used, on other systems a self-pipe written by a :code:`SIGCHLD` handler. As
+signal handlers can only be installed by the main thread, other threads poll
+the exit status in short intervals.
+
+The outputs of the command are PTYs if they are forwarded to a terminal, so
+that git shows its progress information and colors as if it was called
+directly. Otherwise, plain pipes are used and the forwarded output is flushed
+at most every :code:`FLUSH_INTERVAL` seconds. As the output timeout relies on
+the progress information, stderr is always a PTY if an output timeout is given.
+
 Copyright:
     2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
 
@@ -19,12 +33,15 @@ import errno
 import logging
 import os
 import pty
-import select
+import selectors
+import signal
 import subprocess
 import sys
+import threading
 import time
 
 from .helpers import subprocess_env
+from .output_capture import OutputCapture
 
 # -----------------------------------------------------------------------------
 # Logger
@@ -32,11 +49,141 @@ from .helpers import subprocess_env
 LOG = logging.getLogger(__name__)
 
 
+# -----------------------------------------------------------------------------
+# Constants
+# -----------------------------------------------------------------------------
+# Interval to poll the exit status if no exit notification is available
+EXIT_POLL_INTERVAL = 0.05
+
+# Time to wait for remaining output after the command exited
+DRAIN_TIMEOUT = 0.05
+
+# Maximum delay of forwarding the output to a non-interactive stream
+FLUSH_INTERVAL = 0.1
+
+# Range of the adaptive size of a single read of the command output
+MIN_READ_SIZE = 4096
+MAX_READ_SIZE = 65536
+
+
+# -----------------------------------------------------------------------------
+# Class Definitions
+# -----------------------------------------------------------------------------
+class ExitNotifier:
+    """File descriptor becoming readable when a child process exits.
+
+    Attributes:
+        fileno (int): The file descriptor to wait for or None if no notification
+                      is available and the exit status must be polled.
+    """
+
+    def __init__(self, pid):
+        """Construct a new exit notifier.
+
+        Args:
+            pid (int): The process ID of the child process.
+        """
+        self.fileno = None
+        self._pipe = None
+        self._previous_handler = None
+
+        if hasattr(os, "pidfd_open"):
+            try:
+                self.fileno = os.pidfd_open(pid)
+                return
+            except OSError:
+                # Kernel older than 5.3
+                pass
+
+        if threading.current_thread() is threading.main_thread():
+            self._pipe = os.pipe()
+            for pipe_fd in self._pipe:
+                os.set_blocking(pipe_fd, False)
+            self._previous_handler = signal.signal(signal.SIGCHLD, self._on_sigchld)
+            self.fileno = self._pipe[0]
+
+    def _on_sigchld(self, signum, frame):
+        """Handle the SIGCHLD signal by writing to the self-pipe."""
+        try:
+            os.write(self._pipe[1], b"\0")
+        except OSError:
+            # Pipe full, i.e., already notified
+            pass
+        if callable(self._previous_handler):
+            self._previous_handler(signum, frame)
+
+    def acknowledge(self):
+        """Acknowledge a notification.
+
+        Signals of other child processes (e.g., of other threads) trigger the
+        self-pipe as well, so the pipe is emptied to wait for the next signal.
+        """
+        if self._pipe is not None:
+            try:
+                while os.read(self._pipe[0], 64):
+                    pass
+            except OSError:
+                pass
+
+    def close(self):
+        """Close the file descriptors and restore the previous signal handler."""
+        if self._pipe is not None:
+            signal.signal(signal.SIGCHLD, self._previous_handler)
+            for pipe_fd in self._pipe:
+                os.close(pipe_fd)
+        elif self.fileno is not None:
+            os.close(self.fileno)
+        self.fileno = None
+        self._pipe = None
+
+
+# -----------------------------------------------------------------------------
+# Function Definitions
+# -----------------------------------------------------------------------------
+def is_terminal(stream):
+    """Check whether the given stream is connected to a terminal.
+
+    Args:
+        stream (obj): The stream, e.g., sys.stdout.
+
+    Return:
+        Returns True if the stream is a terminal.
+    """
+    try:
+        return stream.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+def open_output(use_pty):
+    """Open the output of a command.
+
+    Args:
+        use_pty (bool): True to use a PTY, False to use a pipe.
+
+    Return:
+        Returns the tuple (read_fd, write_fd).
+    """
+    if use_pty:
+        return pty.openpty()
+    return os.pipe()
+
+
 # -----------------------------------------------------------------------------
 # Exported Functions
 # -----------------------------------------------------------------------------
 # pylint: disable=too-many-locals,too-many-statements,too-many-arguments,too-many-positional-arguments,too-many-branches
-def call_command(command, cwd=None, shell=False, command_timeout=None, output_timeout=None, stderr_capture=True):
+def call_command(
+    command,
+    cwd=None,
+    shell=False,
+    command_timeout=None,
+    output_timeout=None,
+    stderr_capture=True,
+    max_output_size=None,
+    keep_patterns=None,
+    use_pty=None,
+):
     """Call the given command with optional timeouts.
 
     This function calls the given command and applies a timeout on the whole
@@ -59,6 +206,15 @@ def call_command(command, cwd=None, shell=False, command_timeout=None, output_ti
         command_timeout (float): The timeout of the whole command execution in seconds.
         output_timeout (float):  The timeout of stdout/stderr outputs.
         stderr_capture (bool):   Flag indicating stderr should be captured.
+        max_output_size (int):   If given, only the tail of this size of stdout resp.
+                                 stderr is returned, see
+                                 :class:`git_cache.output_capture.OutputCapture`.
+        keep_patterns (list):    Byte patterns of lines to return even if they are
+                                 not part of the tail.
+        use_pty (bool):          If True, stdout/stderr of the command are PTYs, if
+                                 False pipes. If None, a PTY is used for each stream
+                                 that is forwarded to a terminal and for stderr if an
+                                 output timeout is given.
 
     Returns:
         The tuple (return_code, stdout_buffer, stderr_buffer) with the return code
@@ -81,12 +237,63 @@ def call_command(command, cwd=None, shell=False, command_timeout=None, output_ti
         stderr_capture,
     )
 
-    stdout_r, stdout_w = pty.openpty()
-    stderr_r, stderr_w = pty.openpty()
+    # git shows progress information on stderr only if it is a terminal, which
+    # is required to detect stalled commands by the output timeout
+    stdout_interactive = is_terminal(sys.stdout)
+    stderr_interactive = is_terminal(sys.stderr)
+    stdout_r, stdout_w = open_output(stdout_interactive if use_pty is None else use_pty)
+    if stderr_capture:
+        stderr_r, stderr_w = open_output(stderr_interactive or bool(output_timeout) if use_pty is None else use_pty)
+    else:
+        stderr_r, stderr_w = None, None
 
     return_code = -1
-    stdout_buffer = b""
-    stderr_buffer = b""
+    captures = {stdout_r: OutputCapture(max_output_size, keep_patterns)}
+    streams = {stdout_r: sys.stdout}
+    read_sizes = {stdout_r: MIN_READ_SIZE}
+    interactive = {stdout_r: stdout_interactive}
+    if stderr_r is not None:
+        captures[stderr_r] = OutputCapture(max_output_size, keep_patterns)
+        streams[stderr_r] = sys.stderr
+        read_sizes[stderr_r] = MIN_READ_SIZE
+        interactive[stderr_r] = stderr_interactive
+    unflushed = set()
+
+    def read_buffer(read_fd):
+        """Read and forward the available output. Returns False on the end of the output."""
+        read_size = read_sizes[read_fd]
+        try:
+            buffer = os.read(read_fd, read_size)
+        except BlockingIOError:
+            raise
+        except OSError as exception:
+            # EIO signals the end of the output of a PTY
+            if exception.errno != errno.EIO:
+                raise
+            buffer = b""
+        if not buffer:
+            return False
+
+        # Adapt the read size to the rate of the output
+        if len(buffer) == read_size:
+            read_sizes[read_fd] = min(read_size * 2, MAX_READ_SIZE)
+        elif len(buffer) < read_size // 4:
+            read_sizes[read_fd] = max(read_size // 2, MIN_READ_SIZE)
+
+        captures[read_fd].append(buffer)
+        streams[read_fd].buffer.write(buffer)
+        if interactive[read_fd]:
+            streams[read_fd].buffer.flush()
+        else:
+            unflushed.add(read_fd)
+        return True
+
+    def flush_outputs():
+        """Flush the output forwarded to non-interactive streams."""
+        for read_fd in unflushed:
+            streams[read_fd].buffer.flush()
+        unflushed.clear()
+
     try:
         with subprocess.Popen(
             command,
@@ -94,82 +301,99 @@ def call_command(command, cwd=None, shell=False, command_timeout=None, output_ti
             cwd=cwd,
             shell=shell,
             stdout=stdout_w,
-            stderr=stderr_w if stderr_capture else None,
+            stderr=stderr_w,
             env=subprocess_env(),
         ) as proc:
             os.close(stdout_w)
-            os.close(stderr_w)
+            if stderr_w is not None:
+                os.close(stderr_w)
 
-            output_start_time = time.time()
-            command_start_time = output_start_time
             command_timeout_occured = False
             output_timeout_occured = False
-            buffer_size = 1024
+            notifier = ExitNotifier(proc.pid)
+            selector = selectors.DefaultSelector()
+            try:
+                for read_fd in (stdout_r, stderr_r):
+                    if read_fd is not None:
+                        selector.register(read_fd, selectors.EVENT_READ)
+                if notifier.fileno is not None:
+                    selector.register(notifier.fileno, selectors.EVENT_READ)
 
-            def read_buffer(read_fd, output_stream):
-                buffer = b""
-                try:
-                    buffer = os.read(read_fd, buffer_size)
-                except OSError as exception:
-                    if exception.errno != errno.EIO:
-                        raise
-                else:
-                    output_stream.buffer.write(buffer)
-                    output_stream.buffer.flush()
-                return buffer
-
-            while proc.poll() is None:
-                # Since the select call can't detect whether the process exited, we use a
-                # small timeout on the select call (one second) and check afterwards for
-                # a timeout on the stdout/stderr streams
-                streams_ready = select.select([stdout_r, stderr_r], [], [], 1.0)[0]
-                if streams_ready:
-                    if stdout_r in streams_ready:
-                        stdout_buffer += read_buffer(stdout_r, sys.stdout)
-                    if stderr_r in streams_ready:
-                        stderr_buffer += read_buffer(stderr_r, sys.stderr)
-                    output_start_time = time.time()
-
-                elif proc.poll() is None:
-                    if output_timeout and ((time.time() - output_start_time) >= output_timeout):
-                        LOG.debug(
-                            "No stdout/stderr output received within %d seconds!", (time.time() - output_start_time)
-                        )
-                        output_timeout_occured = True
-                        proc.kill()
-                        break
-
-                    if command_timeout and ((time.time() - command_start_time) >= command_timeout):
-                        LOG.debug("Timeout occured after %d seconds!", (time.time() - command_start_time))
-                        command_timeout_occured = True
-                        proc.kill()
-                        break
+                now = time.monotonic()
+                command_deadline = now + command_timeout if command_timeout else None
+                output_deadline = now + output_timeout if output_timeout else None
+                drain_deadline = None
+                flush_deadline = None
+                open_fds = {read_fd for read_fd in (stdout_r, stderr_r) if read_fd is not None}
+
+                while True:
+                    now = time.monotonic()
+                    if flush_deadline is not None and now >= flush_deadline:
+                        flush_outputs()
+                        flush_deadline = None
+
+                    if drain_deadline is None and proc.poll() is not None:
+                        # The command exited. Read the remaining output until the
+                        # outputs are closed, but do not wait for background processes
+                        # keeping them open.
+                        drain_deadline = now + DRAIN_TIMEOUT
+                        if notifier.fileno is not None:
+                            selector.unregister(notifier.fileno)
+                        notifier.close()
+
+                    if drain_deadline is not None:
+                        if not open_fds or now >= drain_deadline:
+                            break
+                        deadlines = [drain_deadline]
+                    else:
+                        if output_deadline is not None and now >= output_deadline:
+                            LOG.debug("No stdout/stderr output received within %d seconds!", output_timeout)
+                            output_timeout_occured = True
+                            proc.kill()
+                            break
+
+                        if command_deadline is not None and now >= command_deadline:
+                            LOG.debug("Timeout occured after %d seconds!", command_timeout)
+                            command_timeout_occured = True
+                            proc.kill()
+                            break
+
+                        deadlines = [deadline for deadline in (command_deadline, output_deadline) if deadline]
+                        if notifier.fileno is None:
+                            deadlines.append(now + EXIT_POLL_INTERVAL)
+
+                    if flush_deadline is not None:
+                        deadlines.append(flush_deadline)
+                    timeout = max(0.0, min(deadlines) - now) if deadlines else None
+                    for key, _ in selector.select(timeout):
+                        if key.fd == notifier.fileno:
+                            notifier.acknowledge()
+                        elif read_buffer(key.fd):
+                            if output_timeout:
+                                output_deadline = time.monotonic() + output_timeout
+                        else:
+                            selector.unregister(key.fd)
+                            open_fds.discard(key.fd)
+
+                    if unflushed and flush_deadline is None:
+                        flush_deadline = time.monotonic() + FLUSH_INTERVAL
+            finally:
+                selector.close()
+                notifier.close()
 
             # To cleanup any pending resources
             proc.wait()
 
-            # Drain any remaining data in case select did miss it
-            def _drain_fd(read_fd, output_stream):
-                buffer = b""
-                while True:
-                    try:
-                        chunk = os.read(read_fd, buffer_size)
-                    except OSError as exception:
-                        if exception.errno != errno.EIO:
-                            raise
-                        break
-                    if not chunk:
-                        break
-                    buffer += chunk
-                    output_stream.buffer.write(chunk)
-                    output_stream.buffer.flush()
-                return buffer
-
-            stdout_buffer += _drain_fd(stdout_r, sys.stdout)
-            stderr_buffer += _drain_fd(stderr_r, sys.stderr)
-
-            os.close(stdout_r)
-            os.close(stderr_r)
+            # Read any remaining data without blocking on outputs held open by
+            # background processes
+            for read_fd in open_fds:
+                os.set_blocking(read_fd, False)
+                try:
+                    while read_buffer(read_fd):
+                        pass
+                except BlockingIOError:
+                    pass
+
             sys.stdout.buffer.flush()
             if stderr_capture:
                 sys.stderr.buffer.flush()
@@ -183,7 +407,16 @@ def call_command(command, cwd=None, shell=False, command_timeout=None, output_ti
             LOG.debug("Command '%s' finished with return code %d.", command_str, return_code)
     except FileNotFoundError:
         return_code = 127
+        for write_fd in (stdout_w, stderr_w):
+            if write_fd is not None:
+                os.close(write_fd)
+    finally:
+        for read_fd in (stdout_r, stderr_r):
+            if read_fd is not None:
+                os.close(read_fd)
 
+    stdout_buffer = captures[stdout_r].getvalue()
+    stderr_buffer = captures[stderr_r].getvalue() if stderr_r is not None else b""
     return (return_code, stdout_buffer, stderr_buffer)
 
 
@@ -23,6 +23,7 @@ from queue import Empty, Queue
 from threading import Thread
 
 from .helpers import subprocess_env
+from .output_capture import OutputCapture
 
 # -----------------------------------------------------------------------------
 # Logger
@@ -34,7 +35,16 @@ LOG = logging.getLogger(__name__)
 # Exported Functions
 # -----------------------------------------------------------------------------
 # pylint: disable=too-many-locals,too-many-statements,too-many-arguments,too-many-positional-arguments
-def call_command(command, cwd=None, shell=False, command_timeout=None, output_timeout=None, stderr_capture=True):
+def call_command(
+    command,
+    cwd=None,
+    shell=False,
+    command_timeout=None,
+    output_timeout=None,
+    stderr_capture=True,
+    max_output_size=None,
+    keep_patterns=None,
+):
     """Call the given command with optional timeouts.
 
     This function calls the given command and applies a timeout on the whole
@@ -57,6 +67,11 @@ def call_command(command, cwd=None, shell=False, command_timeout=None, output_ti
         command_timeout (float): The timeout of the whole command execution in seconds.
         output_timeout (float):  The timeout of stdout/stderr outputs.
         stderr_capture (bool):   Flag indicating stderr should be captured.
+        max_output_size (int):   If given, only the tail of this size of stdout resp.
+                                 stderr is returned, see
+                                 :class:`git_cache.output_capture.OutputCapture`.
+        keep_patterns (list):    Byte patterns of lines to return even if they are
+                                 not part of the tail.
 
     Returns:
         The tuple (return_code, stdout_buffer, stderr_buffer) with the return code
@@ -75,8 +90,8 @@ def call_command(command, cwd=None, shell=False, command_timeout=None, output_ti
     )
 
     return_code = -1
-    stdout_buffer = b""
-    stderr_buffer = b""
+    stdout_capture = OutputCapture(max_output_size, keep_patterns)
+    stderr_capture_buffer = OutputCapture(max_output_size, keep_patterns)
 
     stdout_queue = Queue()
     stderr_queue = Queue()
@@ -96,30 +111,27 @@ def call_command(command, cwd=None, shell=False, command_timeout=None, output_ti
 
     def dequeue_output(queue):
         """Read all pending data from the queue and return it."""
-        output = b""
+        output = []
         finished = False
         while not finished:
             try:
-                buffer = queue.get_nowait()
-                output += buffer
+                output.append(queue.get_nowait())
             except Empty:
                 finished = True
-        return output
+        return b"".join(output)
 
     def fill_buffers():
         """Handle stdout/stderr outputs."""
-        nonlocal stdout_buffer, stderr_buffer
-
         stdout_output = dequeue_output(stdout_queue)
         stderr_output = dequeue_output(stderr_queue)
 
         if stdout_output:
-            stdout_buffer += stdout_output
+            stdout_capture.append(stdout_output)
             sys.stdout.buffer.write(stdout_output)
             sys.stdout.buffer.flush()
 
         if stderr_output:
-            stderr_buffer += stderr_output
+            stderr_capture_buffer.append(stderr_output)
             sys.stderr.buffer.write(stderr_output)
             sys.stderr.buffer.flush()
 
@@ -144,7 +156,7 @@ def call_command(command, cwd=None, shell=False, command_timeout=None, output_ti
             command_start_time = output_start_time
             command_timeout_occured = False
             output_timeout_occured = False
-            buffer_size = 1024
+            buffer_size = 65536
 
             stdout_thread = Thread(target=enqueue_output, args=(proc, proc.stdout, stdout_queue))
             stdout_thread.start()
@@ -194,7 +206,7 @@ def call_command(command, cwd=None, shell=False, command_timeout=None, output_ti
     except FileNotFoundError:
         return_code = 127
 
-    return (return_code, stdout_buffer, stderr_buffer)
+    return (return_code, stdout_capture.getvalue(), stderr_capture_buffer.getvalue())
 
 
 # -----------------------------------------------------------------------------
@@ -2,6 +2,24 @@
 """
 Handler for the git cleanup command.
 
+The cleanup first removes all mirrors that were not updated within the time
+given by :code:`MirrorHandling/CleanupAfter`. Then the least recently used
+mirrors are evicted until the disk space used by all mirrors is at most
+:code:`MirrorHandling/MaxCacheSize` and the free disk space of the cache is at
+least :code:`MirrorHandling/MinFreeSpace`. The disk space used by each mirror
+is taken from the database, where it is updated after each modification of the
+mirror. Mirrors with an upstream URL matching :code:`MirrorHandling/PinnedRegex`
+are never removed.
+
+The cleanup is planned from a single snapshot of the database, so that its
+run time grows linearly with the number of mirrors. Before the mirrors are
+removed, the snapshot is reconciled with the mirrors directory: Directories of
+mirrors without a database entry, e.g., left over by an interrupted clone, are
+removed, and database entries of mirrors whose directory is missing are dropped.
+
+Removed mirrors are moved into the trash, see :mod:`git_cache.trash`, which is
+emptied at the start and at the end of the cleanup.
+
 Copyright:
     2020 by Clemens Rabe <clemens.rabe@clemensrabe.de>
 
@@ -16,9 +34,20 @@ Copyright:
 # Module Import
 # -----------------------------------------------------------------------------
 import logging
+import os
+import re
+import shutil
+import time
+from typing import Any, Dict, Iterable, List, Set, Tuple
 
+import portalocker
+
+from ..config import get_config
 from ..database import Database
-from ..git_mirror import GitMirror
+from ..git_mirror import STAGING_DIR_NAME, GitMirror
+from ..global_settings import GITCACHE_DIR
+from ..helpers import format_size, get_disk_usage
+from ..trash import empty_trash, get_trash_entries, move_to_trash
 
 # -----------------------------------------------------------------------------
 # Logger
@@ -26,24 +55,278 @@ from ..git_mirror import GitMirror
 LOG = logging.getLogger(__name__)
 
 
+# -----------------------------------------------------------------------------
+# Constants
+# -----------------------------------------------------------------------------
+# Entries of a directory that identify it as a mirror directory
+MIRROR_MARKERS = ("git", "lfs")
+
+
 # -----------------------------------------------------------------------------
 # Function Definitions
 # -----------------------------------------------------------------------------
-def git_cleanup() -> int:
+def get_last_access_time(entry: Dict[str, Any]) -> float:
+    """Get the time a mirror was last used.
+
+    Args:
+        entry (map): The database entry of the mirror.
+
+    Return:
+        Returns the last-access-time or, for entries created by older versions,
+        the last-update-time.
+    """
+    return entry.get("last-access-time", entry.get("last-update-time", 0.0))
+
+
+def plan_eviction(
+    candidates: Dict[str, Dict[str, Any]], total_size: int, max_size: int, min_free: int, free_space: int
+) -> List[str]:
+    """Select the least recently used mirrors to evict.
+
+    Args:
+        candidates (map): The database entries of the mirrors that can be evicted.
+        total_size (int): The disk space used by all mirrors.
+        max_size (int):   The maximum disk space used by all mirrors or 0.
+        min_free (int):   The minimum free disk space or 0.
+        free_space (int): The current free disk space.
+
+    Return:
+        Returns the paths of the mirrors to evict in the order of eviction.
+    """
+    evict = []
+    for path in sorted(candidates, key=lambda path: (get_last_access_time(candidates[path]), path)):
+        if not ((max_size and total_size > max_size) or (min_free and free_space < min_free)):
+            break
+        size = candidates[path].get("disk-usage", 0)
+        evict.append(path)
+        total_size -= size
+        free_space += size
+    return evict
+
+
+def scandir(path: str) -> List[os.DirEntry]:
+    """Get the entries of a directory.
+
+    Args:
+        path (str): The directory.
+
+    Return:
+        Returns the entries of the directory or an empty list if it can't be read.
+    """
+    try:
+        with os.scandir(path) as iterator:
+            return list(iterator)
+    except OSError:
+        return []
+
+
+def find_orphans(mirrors_dir: str, paths: Iterable[str]) -> List[str]:
+    """Find the mirror directories without a database entry.
+
+    A directory is considered as a mirror directory if it contains a 'git' or
+    'lfs' directory. The directories of the known mirrors are not entered. The
+    staging directories of clones are orphaned as well unless the clone is
+    still running, which is checked by :func:`remove_orphan`.
+
+    Args:
+        mirrors_dir (str): The directory containing all mirrors.
+        paths (list):      The paths of all mirrors in the database.
+
+    Return:
+        Returns the sorted paths of the orphaned mirror directories.
+    """
+    known = set(paths)
+    ancestors: Set[str] = set()
+    for path in known:
+        parent = os.path.dirname(path)
+        while len(parent) > len(mirrors_dir) and parent not in ancestors:
+            ancestors.add(parent)
+            parent = os.path.dirname(parent)
+
+    orphans: List[str] = []
+    pending = [mirrors_dir]
+    while pending:
+        for item in scandir(pending.pop()):
+            if item.name == STAGING_DIR_NAME:
+                orphans.extend(entry.path for entry in scandir(item.path) if entry.is_dir(follow_symlinks=False))
+                continue
+            if item.name == ".lock" or item.path in known or not item.is_dir(follow_symlinks=False):
+                continue
+            if item.path not in ancestors and any(
+                os.path.isdir(os.path.join(item.path, marker)) for marker in MIRROR_MARKERS
+            ):
+                orphans.append(item.path)
+            else:
+                pending.append(item.path)
+    return sorted(orphans)
+
+
+def find_missing(entries: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Find the database entries of mirrors whose git directory does not exist.
+
+    Args:
+        entries (map): The database entries of all mirrors.
+
+    Return:
+        Returns the sorted paths of the missing mirrors.
+    """
+    return sorted(path for path in entries if not os.path.isdir(os.path.join(path, "git")))
+
+
+def remove_orphan(path: str, database: Database) -> bool:
+    """Remove an orphaned mirror directory.
+
+    The directory is only removed if the mirror is not locked, e.g., by a
+    running clone, and if it was not added to the database in the meantime.
+
+    Args:
+        path (str):     The path of the orphaned mirror directory or staging
+                        directory.
+        database (obj): The database to use.
+
+    Return:
+        Returns True if the directory was removed.
+    """
+    parent = os.path.dirname(path)
+    if os.path.basename(parent) == STAGING_DIR_NAME:
+        lockfile = GitMirror.get_lockfile(os.path.join(os.path.dirname(parent), os.path.basename(path)))
+    else:
+        lockfile = GitMirror.get_lockfile(path)
+    try:
+        os.makedirs(os.path.dirname(lockfile), exist_ok=True)
+        with portalocker.Lock(lockfile, timeout=0, fail_when_locked=True):
+            if database.get(path) is not None:
+                return False
+            move_to_trash(path)
+    except (OSError, portalocker.exceptions.LockException) as exception:
+        LOG.debug("Skipping orphaned directory %s: %s", path, exception)
+        return False
+    return not os.path.exists(path)
+
+
+def reconcile(entries: Dict[str, Dict[str, Any]], database: Database, dry_run: bool) -> Tuple[int, int]:
+    """Reconcile the database snapshot with the mirrors directory.
+
+    Orphaned mirror directories are removed and the database entries of
+    missing mirrors are dropped from the given snapshot and the database.
+
+    Args:
+        entries (map):  The database entries of all mirrors. Entries of missing
+                        mirrors are removed from this map.
+        database (obj): The database to use.
+        dry_run (bool): If set to True, nothing is removed.
+
+    Return:
+        Returns the number of removed orphaned directories and the disk space
+        reclaimed by removing them.
+    """
+    mirrors_dir = os.path.join(GITCACHE_DIR, "mirrors")
+    if not os.path.isdir(mirrors_dir):
+        return 0, 0
+
+    num_removed = 0
+    reclaimed = 0
+    for path in find_orphans(mirrors_dir, entries):
+        size = get_disk_usage(path)
+        if dry_run:
+            LOG.info("Would remove orphaned directory %s (%s).", path, format_size(size))
+        elif remove_orphan(path, database):
+            LOG.info("Removed orphaned directory %s (%s).", path, format_size(size))
+        else:
+            continue
+        num_removed += 1
+        reclaimed += size
+
+    for path in find_missing(entries):
+        if dry_run:
+            LOG.info("Would remove database entry of missing mirror %s.", path)
+        elif GitMirror(url=entries[path]["url"], path=path, database=database).delete():
+            LOG.info("Removed database entry of missing mirror %s.", path)
+        else:
+            continue
+        del entries[path]
+    return num_removed, reclaimed
+
+
+def format_time(timestamp: float) -> str:
+    """Format a timestamp for the log output.
+
+    Args:
+        timestamp (float): The timestamp.
+
+    Return:
+        Returns the local date and time.
+    """
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))
+
+
+# pylint: disable=too-many-locals,too-many-branches,too-many-statements
+def git_cleanup(dry_run: bool = False) -> int:
     """Handle a git cleanup command.
 
+    Args:
+        dry_run (bool): If set to True, the mirrors that would be removed are
+                        shown but not removed.
+
     Return:
         Returns 0 on success, otherwise 1.
     """
-    LOG.info("Starting cleanup of mirrors.")
+    LOG.info("Starting %scleanup of mirrors.", "dry-run of the " if dry_run else "")
     database = Database()
-    num_removed = 0
-    for path in sorted(database.get_all().keys()):
-        mirror = GitMirror(path=path, database=database)
-        if mirror.cleanup():
-            LOG.info("Removed mirror %s.", path)
+    database.compact()
+    config = get_config()
+    pinned_re = re.compile(config.get("MirrorHandling", "PinnedRegex"))
+    entries = dict(database.get_all())
+    if not dry_run:
+        empty_trash()
+    num_removed, reclaimed = reconcile(entries, database, dry_run)
+
+    # Determine the disk usage of mirrors created by older versions once
+    disk_usages = {path: get_disk_usage(path) for path in sorted(entries) if "disk-usage" not in entries[path]}
+    database.save_disk_usages(disk_usages)
+    for path, size in disk_usages.items():
+        entries[path] = dict(entries[path], **{"disk-usage": size})
+
+    remaining = {}
+    for path in sorted(entries):
+        size = entries[path].get("disk-usage", 0)
+        if pinned_re.match(entries[path]["url"]):
+            LOG.debug("Mirror %s is pinned.", path)
+        elif GitMirror(url=entries[path]["url"], path=path, database=database).cleanup(dry_run):
+            LOG.info("%s outdated mirror %s (%s).", "Would remove" if dry_run else "Removed", path, format_size(size))
+            num_removed += 1
+            reclaimed += size
+            continue
+        remaining[path] = entries[path]
+
+    max_size = config.get("MirrorHandling", "MaxCacheSize")
+    min_free = config.get("MirrorHandling", "MinFreeSpace")
+    if max_size or min_free:
+        total_size = sum(entry.get("disk-usage", 0) for entry in remaining.values())
+        # The removed mirrors are still in the trash
+        free_space = shutil.disk_usage(GITCACHE_DIR).free + reclaimed
+        candidates = {path: entry for path, entry in remaining.items() if not pinned_re.match(entry["url"])}
+        for path in plan_eviction(candidates, total_size, max_size, min_free, free_space):
+            size = candidates[path].get("disk-usage", 0)
+            last_access = format_time(get_last_access_time(candidates[path]))
+            if dry_run:
+                LOG.info("Would evict mirror %s (%s, last used %s).", path, format_size(size), last_access)
+            elif GitMirror(url=candidates[path]["url"], path=path, database=database).delete():
+                LOG.info("Evicted mirror %s (%s, last used %s).", path, format_size(size), last_access)
+            else:
+                continue
             num_removed += 1
-    LOG.info("Removed %d mirrors.", num_removed)
+            reclaimed += size
+
+    if dry_run:
+        LOG.info("Would remove %d mirrors reclaiming %s.", num_removed, format_size(reclaimed))
+        if get_trash_entries():
+            LOG.info("Would empty the trash containing %d directories.", len(get_trash_entries()))
+    else:
+        LOG.info("Removed %d mirrors reclaiming %s.", num_removed, format_size(reclaimed))
+        num_trashed = empty_trash()
+        if num_trashed:
+            LOG.info("Removed %d directories from the trash.", num_trashed)
     return 0
 
 
@@ -17,7 +17,6 @@ Copyright:
 # -----------------------------------------------------------------------------
 import logging
 import os
-from typing import List
 
 from ..command_execution import simple_call_command
 from ..git_mirror import GitMirror
@@ -34,11 +33,13 @@ LOG = logging.getLogger(__name__)
 # -----------------------------------------------------------------------------
 # Function Definitions
 # -----------------------------------------------------------------------------
-def git_clone(called_as: List[str], git_options: GitOptions) -> int:
+def git_clone(git_options: GitOptions) -> int:
     """Handle a git clone command.
 
+    The submodules of a recursive clone are initialized by a nested
+    'git submodule update' command executed within the current process.
+
     Args:
-        called_as (list):      The arguments used for the command call.
         git_options (obj):     The GitOptions object.
 
     Return:
@@ -64,12 +65,14 @@ def git_clone(called_as: List[str], git_options: GitOptions) -> int:
                         target_dir = git_options.command_args[1]
                     else:
                         target_dir = os.path.basename(mirror.url).replace(".git", "")
-                    command = called_as + git_options.global_options
-                    command += ["-C", target_dir]
+                    command = git_options.global_options + ["-C", target_dir]
                     command += ["submodule", "update", "--init", "--recursive"]
                     if "--remote-submodules" in git_options.command_options:
                         command += ["--remote"]
-                    retval = simple_call_command(command)
+                    # pylint: disable=import-outside-toplevel,cyclic-import
+                    from ..git_command import call_git_command
+
+                    retval = call_git_command(GitOptions(command))
 
             return retval
 
@@ -17,11 +17,11 @@ Copyright:
 # -----------------------------------------------------------------------------
 import logging
 
-from ..command_execution import getstatusoutput, pretty_call_command_retry, simple_call_command
-from ..config import Config
+from ..command_execution import pretty_call_command_retry, simple_call_command
+from ..config import get_config
 from ..database import Database
 from ..git_mirror import GitMirror
-from .helpers import get_mirror_url, use_mirror_for_remote_url
+from .helpers import get_mirror_url, get_remote_url, use_mirror_for_remote_url
 
 # -----------------------------------------------------------------------------
 # Logger
@@ -43,7 +43,7 @@ def git_fetch(git_options):
         Returns 0 on success, otherwise the return code of the last failed
         command.
     """
-    config = Config()
+    config = get_config()
     real_git = config.get("System", "RealGit")
 
     remote_url = None
@@ -69,9 +69,8 @@ def git_fetch(git_options):
                         remote_candidate = arg
                         break
 
-            command = git_options.get_real_git_with_options() + ["remote", "get-url", remote_candidate]
-            retval, output = getstatusoutput(command)
-            if retval == 0 and output:
+            output = get_remote_url(git_options, remote_candidate)
+            if output:
                 if use_mirror_for_remote_url(output):
                     if GitMirror.get_mirror_path(output) is not None:
                         remote_url = output
@@ -82,8 +81,10 @@ def git_fetch(git_options):
     if remote_url:
         database = Database()
         mirror = GitMirror(url=remote_url, database=database)
-        mirror.update()
-        database.increment_counter(mirror.path, "updates")
+        with database.transaction():
+            mirror.update()
+            database.increment_counter(mirror.path, "updates")
+            database.save_access_time(mirror.path)
         config = mirror.config
         action = f"Fetch from mirror {mirror.path}"
         new_args = [x if x != remote_url else mirror.git_dir for x in git_options.all_args]
@@ -116,6 +117,7 @@ def git_fetch(git_options):
             num_retries=1,
             command_timeout=config.get("Update", "CommandTimeout"),
             output_timeout=config.get("Update", "OutputTimeout"),
+            max_output_size=config.get("Command", "MaxCapturedOutput"),
         )
         if return_code == 0:
             return return_code
@@ -136,6 +138,7 @@ def git_fetch(git_options):
         num_retries=config.get("Update", "Retries"),
         command_timeout=config.get("Update", "CommandTimeout"),
         output_timeout=config.get("Update", "OutputTimeout"),
+        max_output_size=config.get("Command", "MaxCapturedOutput"),
     )
 
     return return_code
@@ -16,10 +16,12 @@ Copyright:
 # Module Import
 # -----------------------------------------------------------------------------
 import logging
+import os
 import re
 
 from ..command_execution import getstatusoutput
-from ..config import Config
+from ..config import get_config
+from ..git_config import GitConfig, GitConfigError, get_repository_config
 from ..global_settings import GITCACHE_DIR
 
 # -----------------------------------------------------------------------------
@@ -31,23 +33,71 @@ LOG = logging.getLogger(__name__)
 # -----------------------------------------------------------------------------
 # Function Definitions
 # -----------------------------------------------------------------------------
-def get_pull_url(git_options):
-    """Get the pull url of the remote origin.
+def get_remote_url(git_options, remote="origin", push=False):
+    """Get the url of a remote.
+
+    The url is read from the git configuration files directly. Only if the
+    configuration can't be handled by the native reader, the real git command
+    is called.
 
     Args:
         git_options (obj): The GitOptions object.
+        remote (str):      The name of the remote.
+        push (bool):       Get the push url instead of the pull url.
 
     Return:
-        Returns the pull url or None on error.
+        Returns the url or None on error.
+    """
+    try:
+        config = get_repository_config(git_options)
+        return config.get_remote_url(remote, push) if config else None
+    except GitConfigError as exception:
+        LOG.debug("Falling back to git remote get-url: %s", exception)
+
+    command = git_options.get_real_git_with_options()
+    command += ["remote", "get-url"] + (["--push"] if push else []) + [remote]
+    retval, url = getstatusoutput(command)
+    if retval == 0:
+        return url
+    return None
+
+
+def get_config_value(git_options, key):
+    """Get a value of the git configuration of a repository.
+
+    Args:
+        git_options (obj): The GitOptions object.
+        key (str):         The configuration key, e.g., 'submodule.fetchJobs'.
+
+    Return:
+        Returns the last value of the key or None if it is not set.
     """
+    try:
+        config = get_repository_config(git_options)
+        return config.get(key) if config else None
+    except GitConfigError as exception:
+        LOG.debug("Falling back to git config: %s", exception)
+
     command = git_options.get_real_git_with_options()
-    command += ["remote", "get-url", "origin"]
-    retval, pull_url = getstatusoutput(command)
+    command += ["config", "--get", key]
+    retval, value = getstatusoutput(command)
     if retval == 0:
-        return pull_url
+        return value
     return None
 
 
+def get_pull_url(git_options):
+    """Get the pull url of the remote origin.
+
+    Args:
+        git_options (obj): The GitOptions object.
+
+    Return:
+        Returns the pull url or None on error.
+    """
+    return get_remote_url(git_options)
+
+
 def get_mirror_url(git_options):
     """Derive the mirror URL of a repository.
 
@@ -60,10 +110,8 @@ def get_mirror_url(git_options):
     """
     pull_url = get_pull_url(git_options)
     if pull_url and (pull_url.startswith(GITCACHE_DIR) or pull_url.startswith(f"file://{GITCACHE_DIR}")):
-        command = git_options.get_real_git_with_options()
-        command += ["remote", "get-url", "--push", "origin"]
-        retval, push_url = getstatusoutput(command)
-        if retval == 0:
+        push_url = get_remote_url(git_options, push=True)
+        if push_url is not None:
             return push_url
         LOG.warning("Can't get push URL of the repository!")
     else:
@@ -72,6 +120,50 @@ def get_mirror_url(git_options):
     return None
 
 
+def get_submodules(git_options):
+    """Get the submodules listed in the .gitmodules file.
+
+    Args:
+        git_options (obj): The GitOptions object.
+
+    Return:
+        Returns the list of the name, url and path of each submodule or None
+        if the .gitmodules file can't be read. The path is None if it is not
+        specified.
+    """
+    try:
+        config = GitConfig()
+        if not config.read_file(os.path.join(git_options.get_run_path(), ".gitmodules"), includes=False):
+            return None
+        return config.get_submodules()
+    except GitConfigError as exception:
+        LOG.debug("Falling back to git config: %s", exception)
+
+    command = git_options.get_real_git_with_options()
+    command += ["config", "-f", ".gitmodules", "-l"]
+    retval, output = getstatusoutput(command)
+    if retval != 0:
+        return None
+
+    submodules = []
+    all_keys = [line.split("=")[0] for line in output.split() if "=" in line]
+    tgt_url_keys = [key for key in all_keys if key.startswith("submodule") and key.endswith(".url")]
+    for tgt_url_key in tgt_url_keys:
+        command = git_options.get_real_git_with_options()
+        command += ["config", "-f", ".gitmodules", "--get", tgt_url_key]
+        retval, tgt_url = getstatusoutput(command)
+        if retval != 0:
+            continue
+
+        tgt_path_key = tgt_url_key.replace(".url", ".path")
+        command = git_options.get_real_git_with_options()
+        command += ["config", "-f", ".gitmodules", "--get", tgt_path_key]
+        retval, tgt_path = getstatusoutput(command)
+        submodules.append((tgt_url_key[10:-4], tgt_url, tgt_path if retval == 0 else None))
+
+    return submodules
+
+
 def get_current_ref(git_options):
     """Get the current ref of a repository.
 
@@ -98,7 +190,7 @@ def use_mirror_for_remote_url(remote_url):
     Return:
         Returns True if the remote URL should be mirrored.
     """
-    config = Config()
+    config = get_config()
     include_re = re.compile(config.get("UrlPatterns", "IncludeRegex"))
     exclude_re = re.compile(config.get("UrlPatterns", "ExcludeRegex"))
     included = include_re.match(remote_url) is not None
@@ -18,7 +18,7 @@ Copyright:
 import logging
 
 from ..command_execution import simple_call_command
-from ..config import Config
+from ..config import get_config
 from ..database import Database
 from ..git_mirror import GitMirror
 from ..git_options import GitOptions
@@ -49,7 +49,7 @@ def git_ls_remote(git_options: GitOptions) -> int:
         command.
     """
     assert git_options.command is not None, "Internal error: git command is NOT ls-remote!"
-    config = Config()
+    config = get_config()
     repository = None
     mirror_url = None
 
@@ -67,6 +67,7 @@ def git_ls_remote(git_options: GitOptions) -> int:
         database = Database()
         mirror = GitMirror(url=mirror_url, database=database)
         mirror.update()
+        database.save_access_time(mirror.path)
         new_args = git_options.global_options
         new_args += [git_options.command]
         new_args += git_options.command_options
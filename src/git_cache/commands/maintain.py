@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Handler for the maintenance of the mirrors.
+
+The maintenance is executed by a detached :code:`gitcache --maintain` process
+started after mirror updates, see :mod:`git_cache.maintenance`. It maintains
+all mirrors for which :meth:`git_cache.git_mirror.GitMirror.is_maintenance_due`
+returns True. Mirrors that become due while the maintenance is running are
+maintained by the same process afterwards, unless they were already
+maintained by it.
+
+Copyright:
+    2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of gitcache (https://github.com/seeraven/gitcache)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import logging
+import os
+from typing import List, Set
+
+import portalocker
+
+from ..database import Database
+from ..git_mirror import GitMirror
+from ..global_settings import GITCACHE_MAINTENANCE_LOCK
+
+# -----------------------------------------------------------------------------
+# Logger
+# -----------------------------------------------------------------------------
+LOG = logging.getLogger(__name__)
+
+
+# -----------------------------------------------------------------------------
+# Function Definitions
+# -----------------------------------------------------------------------------
+def get_due_mirrors(database: Database, seen: Set[str]) -> List[str]:
+    """Get the mirrors that should be maintained.
+
+    Args:
+        database (obj): The database to use.
+        seen (set):     The paths of the mirrors already maintained by this process.
+
+    Return:
+        Returns the paths of the mirrors to maintain.
+    """
+    return [
+        path
+        for path in sorted(database.get_all())
+        if path not in seen and GitMirror(path=path, database=database).is_maintenance_due()
+    ]
+
+
+def git_maintain_mirrors() -> int:
+    """Maintain all mirrors that are due.
+
+    Only one process maintains the mirrors at a time. If the mirrors are
+    already maintained by another process, this function returns immediately.
+
+    Return:
+        Returns 0 on success, otherwise 1.
+    """
+    failed = []
+    try:
+        os.makedirs(os.path.dirname(GITCACHE_MAINTENANCE_LOCK), exist_ok=True)
+        with portalocker.Lock(GITCACHE_MAINTENANCE_LOCK, timeout=0, fail_when_locked=True):
+            database = Database()
+            seen: Set[str] = set()
+            paths = get_due_mirrors(database, seen)
+            while paths:
+                for path in paths:
+                    if not GitMirror(path=path, database=database).maintain():
+                        failed.append(path)
+                seen.update(paths)
+                paths = get_due_mirrors(database, seen)
+    except portalocker.exceptions.LockException:
+        LOG.debug("Mirrors are maintained by another process.")
+    return 1 if failed else 0
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
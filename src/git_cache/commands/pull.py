@@ -18,7 +18,7 @@ Copyright:
 import logging
 
 from ..command_execution import pretty_call_command_retry
-from ..config import Config
+from ..config import get_config
 from ..database import Database
 from ..git_mirror import GitMirror
 from ..git_options import GitOptions
@@ -45,7 +45,7 @@ def git_pull(git_options: GitOptions) -> int:
         command.
     """
     action = "Update"
-    config = Config()
+    config = get_config()
 
     repository = "origin"
     refs = []
@@ -57,19 +57,21 @@ def git_pull(git_options: GitOptions) -> int:
     if mirror_url and repository == "origin":
         database = Database()
         mirror = GitMirror(url=mirror_url, database=database)
-        mirror.update()
-        database.increment_counter(mirror.path, "updates")
-
-        # The mirror.update() updates the LFS data of the default ref of
-        # the mirror repository, which should be 'master' or 'main'. If we
-        # are currently on a different branch, we want to update that branch
-        # as well.
-        if not refs:
-            refs.append(get_current_ref(git_options))
-        default_ref = mirror.get_default_ref()
-        for ref in refs:
-            if ref and ref != default_ref:
-                mirror.fetch_lfs(ref)
+        with database.transaction():
+            mirror.update()
+            database.increment_counter(mirror.path, "updates")
+            database.save_access_time(mirror.path)
+
+            # The mirror.update() updates the LFS data of the default ref of
+            # the mirror repository, which should be 'master' or 'main'. If we
+            # are currently on a different branch, we want to update that branch
+            # as well.
+            if not refs:
+                refs.append(get_current_ref(git_options))
+            default_ref = mirror.get_default_ref()
+            for ref in refs:
+                if ref and ref != default_ref:
+                    mirror.fetch_lfs(ref)
 
         config = mirror.config
         action = f"Update from mirror {mirror.path}"
@@ -81,6 +83,7 @@ def git_pull(git_options: GitOptions) -> int:
         num_retries=config.get("Update", "Retries"),
         command_timeout=config.get("Update", "CommandTimeout"),
         output_timeout=config.get("Update", "OutputTimeout"),
+        max_output_size=config.get("Command", "MaxCapturedOutput"),
     )
 
     return return_code
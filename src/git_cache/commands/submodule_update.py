@@ -15,14 +15,30 @@ Copyright:
 # -----------------------------------------------------------------------------
 # Module Import
 # -----------------------------------------------------------------------------
+import functools
 import logging
 import os
 import re
-from typing import List
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
 
-from ..command_execution import call_command_retry, getstatusoutput, simple_call_command
+from ..command_execution import call_command_retry, simple_call_command
+from ..config import environment_overrides, get_config
+from ..database import Database
+from ..git_mirror import GitMirror
 from ..git_options import GitOptions
-from .helpers import get_mirror_url, get_pull_url, resolve_submodule_url
+from ..parallel_output import output_prefix, run_in_order
+from .helpers import (
+    get_config_value,
+    get_mirror_url,
+    get_pull_url,
+    get_submodules,
+    resolve_submodule_url,
+    use_mirror_for_remote_url,
+)
+from .update_all import UpdateResult, update_mirrors_parallel
 
 # -----------------------------------------------------------------------------
 # Logger
@@ -30,22 +46,234 @@ from .helpers import get_mirror_url, get_pull_url, resolve_submodule_url
 LOG = logging.getLogger(__name__)
 
 
+# -----------------------------------------------------------------------------
+# Class Definitions
+# -----------------------------------------------------------------------------
+class Submodule(NamedTuple):
+    """A submodule to update.
+
+    Attributes:
+        url (str):      The resolved url of the submodule.
+        path (str):     The path of the submodule relative to the superproject.
+        abs_path (str): The path of the submodule including the run path.
+    """
+
+    url: str
+    path: str
+    abs_path: str
+
+
+# pylint: disable=too-many-instance-attributes
+class SubmoduleUpdater:
+    """Update the submodules of a repository one by one."""
+
+    def __init__(self, git_options: GitOptions, has_init: bool, has_recursive: bool, has_remote: bool) -> None:
+        """Construct a new updater.
+
+        Args:
+            git_options (obj):    The GitOptions object.
+            has_init (bool):      The option '--init' was given.
+            has_recursive (bool): The option '--recursive' was given.
+            has_remote (bool):    The option '--remote' was given.
+        """
+        self.git_options = git_options
+        self.has_init = has_init
+        self.has_recursive = has_recursive
+        self.has_remote = has_remote
+        self.jobs_options: List[str] = []
+        # Like git, only one checkout of the superproject is performed at a time
+        self.checkout_lock = threading.Lock()
+
+    def checkout(self, submodule: Submodule) -> Optional[str]:
+        """Ensure the checked out submodule is on the desired commit.
+
+        Args:
+            submodule (obj): The submodule.
+
+        Return:
+            Returns the commit that could not be fetched or None.
+        """
+        command = self.git_options.get_real_git_with_options()
+        command += ["submodule", "update"]
+        if self.has_remote:
+            command += ["--remote"]
+        command += ["--", submodule.path]
+        with self.checkout_lock:
+            _, stdout_buffer, stderr_buffer = call_command_retry(command, 0)
+
+        # Check for an error message containing a failed fetch of a commit
+        failed_hash = None
+        if stdout_buffer and b"fetching of that commit failed" in stdout_buffer:
+            hashes = re.findall(r"([0-9a-fA-F]{40})", stdout_buffer.decode())
+            if hashes:
+                failed_hash = hashes[0]
+        if stderr_buffer and b"fetching of that commit failed" in stderr_buffer:
+            hashes = re.findall(r"([0-9a-fA-F]{40})", stderr_buffer.decode())
+            if hashes:
+                failed_hash = hashes[0]
+        return failed_hash
+
+    def update(self, submodule: Submodule) -> None:
+        """Fetch or clone a single submodule and check out the desired commit.
+
+        Args:
+            submodule (obj): The submodule.
+        """
+        if os.path.exists(os.path.join(submodule.abs_path, ".git")):
+            # Perform a git fetch in the directory...
+            call_git_command_nested(["fetch"], cwd=submodule.abs_path)
+        else:
+            # Perform a git clone into the directory...
+            call_git_command_nested(self.git_options.global_options + ["clone", submodule.url, submodule.path])
+
+        failed_hash = self.checkout(submodule)
+        if failed_hash:
+            # Issue a manual "git fetch origin <commit>" inside the submodule
+            if call_git_command_nested(["fetch", "origin", failed_hash], cwd=submodule.abs_path) == 0:
+                if call_git_command_nested(["checkout", failed_hash], cwd=submodule.abs_path) == 0:
+                    command = self.git_options.get_real_git_with_options()
+                    command += ["submodule", "update"]
+                    if self.has_remote:
+                        command += ["--remote"]
+                    command += ["--", submodule.path]
+                    with self.checkout_lock:
+                        simple_call_command(command)
+
+        if self.has_recursive and os.path.exists(os.path.join(submodule.abs_path, ".gitmodules")):
+            command = ["submodule", "update", "--recursive"] + self.jobs_options
+            if self.has_init:
+                command.append("--init")
+            if self.has_remote:
+                command.append("--remote")
+            call_git_command_nested(command, cwd=submodule.abs_path)
+
+    def update_timed(self, submodule: Submodule) -> float:
+        """Update a single submodule and report the duration.
+
+        Args:
+            submodule (obj): The submodule.
+
+        Return:
+            Returns the duration of the update in seconds.
+        """
+        start_time = time.time()
+        with output_prefix(submodule.path):
+            try:
+                self.update(submodule)
+            except Exception:  # pylint: disable=broad-exception-caught
+                LOG.exception("Update of submodule %s failed with an exception!", submodule.path)
+            duration = time.time() - start_time
+            LOG.info("Updated submodule %s within %.1f seconds.", submodule.path, duration)
+        return duration
+
+
 # -----------------------------------------------------------------------------
 # Function Definitions
 # -----------------------------------------------------------------------------
-# pylint: disable=too-many-locals,too-many-statements,too-many-branches,too-many-nested-blocks
-def git_submodule_update(called_as: List[str], git_options: GitOptions) -> int:
+def call_git_command_nested(args: List[str], cwd: Optional[str] = None) -> int:
+    """Execute a git command using gitcache within the current process.
+
+    Args:
+        args (list): The arguments to git.
+        cwd (str):   If given, the working directory of the command.
+
+    Return:
+        Returns the return code of the command.
+    """
+    # pylint: disable=import-outside-toplevel,cyclic-import
+    from ..git_command import call_git_command
+
+    return call_git_command(GitOptions(args), cwd=cwd)
+
+
+def get_submodule_jobs(git_options: GitOptions) -> int:
+    """Get the number of submodules to update in parallel.
+
+    The number is taken from the option '-j/--jobs' or the git configuration
+    'submodule.fetchJobs'. Like git, a value of 0 selects the number of CPUs.
+
+    Args:
+        git_options (obj): The GitOptions object.
+
+    Return:
+        Returns the number of parallel jobs.
+    """
+    values = git_options.command_group_values.get("jobs")
+    value = values[-1] if values else get_config_value(git_options, "submodule.fetchJobs")
+    try:
+        jobs = int(value) if value else 1
+    except ValueError:
+        LOG.warning("Ignoring invalid number of jobs %s.", value)
+        jobs = 1
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    return max(1, jobs)
+
+
+def update_submodule_mirrors(submodules: List[Submodule], jobs: int) -> None:
+    """Update or create the mirrors of the submodules in parallel.
+
+    Args:
+        submodules (list): The submodules.
+        jobs (int):        The number of worker threads.
+    """
+    urls: Dict[str, str] = {}
+    for submodule in submodules:
+        if use_mirror_for_remote_url(submodule.url):
+            path = GitMirror.get_mirror_path(submodule.url)
+            if path:
+                urls.setdefault(path, submodule.url)
+
+    def update_mirror(path: str, database: Database) -> UpdateResult:
+        start_time = time.time()
+        success = GitMirror(url=urls[path], database=database).update()
+        return UpdateResult(path, success, time.time() - start_time)
+
+    if urls:
+        LOG.info("Updating %d mirrors of submodules using %d parallel jobs.", len(urls), jobs)
+        update_mirrors_parallel(sorted(urls), jobs, get_config().get("Update", "MaxJobsPerHost"), update_mirror)
+
+
+@contextmanager
+def fresh_mirrors(start_time: float) -> Iterator[None]:
+    """Skip the update of mirrors updated since the given time.
+
+    The update interval is extended for the commands called within the context
+    and the threads started by :func:`git_cache.parallel_output.run_in_order`,
+    so that mirrors just updated are not updated a second time. The process
+    environment is left untouched.
+
+    Args:
+        start_time (float): The time the update of the mirrors started.
+
+    Return:
+        Returns a context manager.
+    """
+    environment = {}
+    update_interval = get_config().get("MirrorHandling", "UpdateInterval")
+    if update_interval >= 0:
+        environment["GITCACHE_UPDATE_INTERVAL"] = str(max(update_interval, int(time.time() - start_time) + 1))
+    with environment_overrides(environment):
+        yield
+
+
+# pylint: disable=too-many-locals
+def git_submodule_update(git_options: GitOptions) -> int:
     """Handle a git submodule update command.
 
-    A 'git submodule update' command is replaced by calling 'git fetch' or
-    'git clone' commands for each submodule using the gitcache wrapper. Then
-    the real git command is called to fix the configuration.
+    A 'git submodule update' command is replaced by executing 'git fetch' or
+    'git clone' commands for each submodule using gitcache within the current
+    process. Then the real git command is called to fix the configuration.
 
-    If the option '--init' is given, a 'git submodule init' using the
-    gitcache wrapper is performed first.
+    If the option '--init' is given, a 'git submodule init' using gitcache is
+    performed first.
+
+    If more than one job is requested by the option '-j/--jobs' or the git
+    configuration 'submodule.fetchJobs', the mirrors of all submodules are
+    updated in parallel first. Then the submodules are fetched or cloned in
+    parallel while their output is written in the order of the submodules.
 
     Args:
-        called_as (list):      The arguments used for the command call.
         git_options (obj):     The GitOptions object.
 
     Return:
@@ -62,9 +290,8 @@ def git_submodule_update(called_as: List[str], git_options: GitOptions) -> int:
     has_recursive = "recursive" in git_options.command_group_values
     has_remote = "remote" in git_options.command_group_values
     if has_init:
-        command = called_as + git_options.global_options
-        command += ["submodule", "init"] + update_paths
-        return_value = simple_call_command(command)
+        command = git_options.global_options + ["submodule", "init"] + update_paths
+        return_value = call_git_command_nested(command)
         if return_value != 0:
             LOG.error("Initializing submodule with the command %s failed.", command)
             return return_value
@@ -76,90 +303,44 @@ def git_submodule_update(called_as: List[str], git_options: GitOptions) -> int:
         # pylint: disable=no-value-for-parameter
         update_paths = [os.path.relpath(path, os.path.join(*cd_paths)) for path in update_paths]
 
-    command = git_options.get_real_git_with_options()
-    command += ["config", "-f", ".gitmodules", "-l"]
-    retval, output = getstatusoutput(command)
-    if retval == 0:
+    submodules = get_submodules(git_options)
+    if submodules is not None:
         pull_url = get_mirror_url(git_options)
         if not pull_url:
             pull_url = get_pull_url(git_options)
 
-        all_keys = [line.split("=")[0] for line in output.split() if "=" in line]
-        tgt_url_keys = [key for key in all_keys if key.startswith("submodule") and key.endswith(".url")]
-        for tgt_url_key in tgt_url_keys:
-            command = git_options.get_real_git_with_options()
-            command += ["config", "-f", ".gitmodules", "--get", tgt_url_key]
-            retval, tgt_url = getstatusoutput(command)
-
-            if retval != 0:
-                continue
-
-            tgt_path_key = tgt_url_key.replace(".url", ".path")
-            command = git_options.get_real_git_with_options()
-            command += ["config", "-f", ".gitmodules", "--get", tgt_path_key]
-            retval, tgt_path = getstatusoutput(command)
-
-            if retval != 0:
+        selected = []
+        for _, tgt_url, tgt_path in submodules:
+            if tgt_path is None:
                 continue
 
             # Skip not specified target paths unless no path is given at all
             if update_paths and tgt_path not in update_paths:
                 continue
 
-            tgt_url = resolve_submodule_url(pull_url, tgt_url)
-
-            abs_tgt_path = os.path.join(*cd_paths, tgt_path)
-            if os.path.exists(os.path.join(abs_tgt_path, ".git")):
-                # Perform a git fetch in the directory...
-                command = called_as + ["fetch"]
-                cwd = abs_tgt_path
-            else:
-                # Perform a git clone into the directory...
-                command = called_as + git_options.global_options
-                command += ["clone", tgt_url, tgt_path]
-                cwd = None
-
-            simple_call_command(command, cwd=cwd)
-
-            # Ensure the checked out repository is on the desired commit.
-            command = git_options.get_real_git_with_options()
-            command += ["submodule", "update"]
-            if has_remote:
-                command += ["--remote"]
-            command += ["--", tgt_path]
-            _, stdout_buffer, stderr_buffer = call_command_retry(command, 0, cwd=cwd)
-
-            # Check for an error message containing a failed fetch of a commit
-            failed_hash = None
-            if stdout_buffer and b"fetching of that commit failed" in stdout_buffer:
-                hashes = re.findall(r"([0-9a-fA-F]{40})", stdout_buffer.decode())
-                if hashes:
-                    failed_hash = hashes[0]
-            if stderr_buffer and b"fetching of that commit failed" in stderr_buffer:
-                hashes = re.findall(r"([0-9a-fA-F]{40})", stderr_buffer.decode())
-                if hashes:
-                    failed_hash = hashes[0]
-
-            if failed_hash:
-                # Issue a manual "git fetch origin <commit>" inside the submodule
-                command = called_as + ["fetch", "origin", failed_hash]
-                if simple_call_command(command, cwd=abs_tgt_path) == 0:
-                    command = called_as + ["checkout", failed_hash]
-                    if simple_call_command(command, cwd=abs_tgt_path) == 0:
-                        command = git_options.get_real_git_with_options()
-                        command += ["submodule", "update"]
-                        if has_remote:
-                            command += ["--remote"]
-                        command += ["--", tgt_path]
-                        simple_call_command(command, cwd=cwd)
-
-            if has_recursive and os.path.exists(os.path.join(abs_tgt_path, ".gitmodules")):
-                command = called_as + ["submodule", "update", "--recursive"]
-                if has_init:
-                    command.append("--init")
-                if has_remote:
-                    command.append("--remote")
-                simple_call_command(command, cwd=abs_tgt_path)
+            selected.append(
+                Submodule(resolve_submodule_url(pull_url, tgt_url), tgt_path, os.path.join(*cd_paths, tgt_path))
+            )
+
+        jobs = get_submodule_jobs(git_options)
+        if jobs > 1 and len(selected) > 1:
+            updater = SubmoduleUpdater(git_options, has_init, has_recursive, has_remote)
+            if "jobs" in git_options.command_group_values:
+                updater.jobs_options = ["--jobs", str(jobs)]
+
+            start_time = time.time()
+            update_submodule_mirrors(selected, jobs)
+            with fresh_mirrors(start_time):
+                LOG.info("Updating %d submodules using %d parallel jobs.", len(selected), jobs)
+                tasks: List[Callable[[], float]] = [
+                    functools.partial(updater.update_timed, submodule) for submodule in selected
+                ]
+                run_in_order(tasks, jobs)
+            LOG.info("Update of %d submodules finished within %.1f seconds.", len(selected), time.time() - start_time)
+        else:
+            updater = SubmoduleUpdater(git_options, has_init, has_recursive, has_remote)
+            for submodule in selected:
+                updater.update(submodule)
 
     return simple_call_command(git_options.get_real_git_all_args())
 
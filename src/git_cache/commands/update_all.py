@@ -2,6 +2,15 @@
 """
 Handler for the git update-mirrors command.
 
+The mirrors can be updated in parallel by a pool of worker threads. The number
+of parallel updates of mirrors of the same upstream host is limited by the
+configuration option :code:`Update/MaxJobsPerHost`.
+
+Before the mirrors are updated, the upstream repositories are probed by a
+cheap :code:`git ls-remote` in a separate phase using the same parallelism and
+per-host limit as the updates. Mirrors whose upstream refs did not change are
+not fetched again.
+
 Copyright:
     2020 by Clemens Rabe <clemens.rabe@clemensrabe.de>
 
@@ -15,10 +24,18 @@ Copyright:
 # -----------------------------------------------------------------------------
 # Module Import
 # -----------------------------------------------------------------------------
+import contextvars
 import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
 
+from ..config import get_config
 from ..database import Database
 from ..git_mirror import GitMirror
+from ..global_settings import GITCACHE_DIR
+from ..parallel_output import multiplexed_output, output_prefix
 
 # -----------------------------------------------------------------------------
 # Logger
@@ -26,36 +43,247 @@ from ..git_mirror import GitMirror
 LOG = logging.getLogger(__name__)
 
 
+# -----------------------------------------------------------------------------
+# Class Definitions
+# -----------------------------------------------------------------------------
+class UpdateResult(NamedTuple):
+    """The result of the update of a single mirror.
+
+    Attributes:
+        path (str):       The path of the repository mirror.
+        success (bool):   True if the update was successful.
+        duration (float): The duration of the update in seconds.
+    """
+
+    path: str
+    success: bool
+    duration: float
+
+
+class UpdateScheduler:
+    """Scheduler handing out the mirrors to update while limiting the updates per host."""
+
+    def __init__(self, paths: List[str], max_jobs_per_host: int) -> None:
+        """Construct a new scheduler.
+
+        Args:
+            paths (list):            The paths of the repository mirrors to update.
+            max_jobs_per_host (int): The maximum number of parallel updates per host.
+        """
+        self.pending = list(paths)
+        self.max_jobs_per_host = max(1, max_jobs_per_host)
+        self.active: Dict[str, int] = {}
+        self.condition = threading.Condition()
+
+    def next(self) -> Optional[str]:
+        """Get the next mirror to update.
+
+        Blocks until a mirror of a host with free capacity is available.
+
+        Return:
+            Returns the path of the next mirror or None if all mirrors are handed out.
+        """
+        with self.condition:
+            while self.pending:
+                for index, path in enumerate(self.pending):
+                    host = get_host(path)
+                    if self.active.get(host, 0) < self.max_jobs_per_host:
+                        del self.pending[index]
+                        self.active[host] = self.active.get(host, 0) + 1
+                        return path
+                self.condition.wait()
+            return None
+
+    def done(self, path: str) -> None:
+        """Mark the update of a mirror as done.
+
+        Args:
+            path (str): The path of the repository mirror.
+        """
+        with self.condition:
+            self.active[get_host(path)] -= 1
+            self.condition.notify_all()
+
+
 # -----------------------------------------------------------------------------
 # Function Definitions
 # -----------------------------------------------------------------------------
-def git_update_all_mirrors() -> int:
+def get_display_name(path: str) -> str:
+    """Get the name of a mirror used to prefix its output.
+
+    Args:
+        path (str): The path of the repository mirror.
+
+    Return:
+        Returns the path relative to the mirrors directory.
+    """
+    return os.path.relpath(path, os.path.join(GITCACHE_DIR, "mirrors")).replace(os.path.sep, "/")
+
+
+def get_host(path: str) -> str:
+    """Get the upstream host of a mirror.
+
+    Args:
+        path (str): The path of the repository mirror.
+
+    Return:
+        Returns the host (including the port) of the upstream repository.
+    """
+    return get_display_name(path).split("/")[0]
+
+
+def update_mirror(path: str, database: Database, upstream_digest: Optional[str] = None) -> UpdateResult:
+    """Update a single mirror.
+
+    Args:
+        path (str):            The path of the repository mirror.
+        database (obj):        The database to use.
+        upstream_digest (str): The digest of the upstream refs determined by
+                               :func:`probe_mirrors`.
+
+    Return:
+        Returns the result of the update.
+    """
+    start_time = time.time()
+    mirror = GitMirror(path=path, database=database)
+    success = mirror.update(force=True, upstream_digest=upstream_digest)
+    return UpdateResult(path, success, time.time() - start_time)
+
+
+def update_mirrors_parallel(
+    paths: List[str],
+    jobs: int,
+    max_jobs_per_host: int,
+    update_function: Optional[Callable[[str, Database], UpdateResult]] = None,
+) -> List[UpdateResult]:
+    """Update the given mirrors in parallel.
+
+    The updates see the context variables, e.g., the environment overrides of
+    the configuration, of the calling thread.
+
+    Args:
+        paths (list):            The paths of the repository mirrors to update.
+        jobs (int):              The number of worker threads.
+        max_jobs_per_host (int): The maximum number of parallel updates per host.
+        update_function:         The function updating a single mirror. If not
+                                 given, :func:`update_mirror` is used.
+
+    Return:
+        Returns the results of the updates.
+    """
+    if update_function is None:
+        update_function = update_mirror
+    scheduler = UpdateScheduler(paths, max_jobs_per_host)
+    results: List[UpdateResult] = []
+
+    def worker() -> None:
+        # Each thread uses its own database object
+        database = Database()
+        path = scheduler.next()
+        while path is not None:
+            try:
+                with output_prefix(get_display_name(path)):
+                    results.append(update_function(path, database))
+            except Exception:  # pylint: disable=broad-exception-caught
+                LOG.exception("Update of mirror %s failed with an exception!", path)
+                results.append(UpdateResult(path, False, 0.0))
+            finally:
+                scheduler.done(path)
+            path = scheduler.next()
+
+    threads = [
+        threading.Thread(target=contextvars.copy_context().run, args=(worker,), name=f"update-{index}")
+        for index in range(min(jobs, len(paths)))
+    ]
+    with multiplexed_output():
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return results
+
+
+def probe_mirrors(paths: List[str], jobs: int, max_jobs_per_host: int) -> Dict[str, Optional[str]]:
+    """Probe the upstream repositories of the given mirrors.
+
+    Each probe is a separate :code:`git ls-remote` call. In parallel mode,
+    the number of parallel probes per host is limited like the updates.
+
+    Args:
+        paths (list):            The paths of the repository mirrors to probe.
+        jobs (int):              The number of worker threads.
+        max_jobs_per_host (int): The maximum number of parallel probes per host.
+
+    Return:
+        Returns a map of the mirror paths to the digests of their upstream
+        refs. The digest is None if the upstream repository was not probed.
+    """
+    digests: Dict[str, Optional[str]] = {}
+
+    def probe_mirror(path: str, database: Database) -> UpdateResult:
+        start_time = time.time()
+        digests[path] = GitMirror(path=path, database=database).probe_upstream()
+        return UpdateResult(path, digests[path] is not None, time.time() - start_time)
+
+    if jobs > 1 and len(paths) > 1:
+        update_mirrors_parallel(paths, jobs, max_jobs_per_host, probe_mirror)
+    else:
+        database = Database()
+        for path in paths:
+            probe_mirror(path, database)
+    return digests
+
+
+def git_update_all_mirrors(jobs: Optional[int] = None) -> int:
     """Handle a git update-mirrors command.
 
+    Args:
+        jobs (int): The number of mirrors to update in parallel. If not given,
+                    the configuration option Update/Jobs is used.
+
     Return:
         Returns 0 on success, otherwise 1.
     """
     LOG.info("Starting update of all known mirrors.")
     database = Database()
-    failed = []
-    success = []
-    for path in sorted(database.get_all().keys()):
-        mirror = GitMirror(path=path, database=database)
-        if mirror.update(force=True):
-            success.append(path)
-        else:
-            failed.append(path)
+    database.compact()
+    paths = sorted(database.get_all().keys())
+
+    config = get_config()
+    if jobs is None:
+        jobs = config.get("Update", "Jobs")
+
+    start_time = time.time()
+    digests = probe_mirrors(paths, jobs, config.get("Update", "MaxJobsPerHost"))
+    if jobs > 1 and len(paths) > 1:
+        LOG.info("Updating %d mirrors using %d parallel jobs.", len(paths), jobs)
+        results = update_mirrors_parallel(
+            paths,
+            jobs,
+            config.get("Update", "MaxJobsPerHost"),
+            lambda path, database: update_mirror(path, database, digests.get(path)),
+        )
+    else:
+        results = [update_mirror(path, database, digests.get(path)) for path in paths]
+    run_time = time.time() - start_time
+
+    success = sorted(result for result in results if result.success)
+    failed = sorted(result for result in results if not result.success)
 
     if success:
         LOG.info("Updated the following paths successfully:")
-        for path in success:
-            LOG.info("  %s", path)
+        for result in success:
+            LOG.info("  %s (%.1f seconds)", result.path, result.duration)
 
     if failed:
         LOG.error("Failed to update the following paths:")
-        for path in failed:
-            LOG.error("  %s", path)
+        for result in failed:
+            LOG.error("  %s (%.1f seconds)", result.path, result.duration)
+
+    if results:
+        LOG.info("Update of %d mirrors finished within %.1f seconds (%d failed).", len(results), run_time, len(failed))
 
+    if failed:
         return 1
 
     if not success and not failed:
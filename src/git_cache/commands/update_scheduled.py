@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Handler for the scheduled update of the mirrors.
+
+Instead of updating all mirrors, the scheduler selects the mirrors that are
+most likely to be used in a stale state. The priority of a mirror is the
+probability that its upstream repository changed since the last update divided
+by the time between two accesses of the mirror. Both are estimated from the
+history of the mirror stored in the database:
+
+  - The probability of a change is :code:`1 - exp(-age / change-interval)`,
+    where :code:`age` is the time since the last update and
+    :code:`change-interval` is the average time between two updates that
+    found the upstream repository changed. Mirrors with a probability below
+    :code:`MIN_CHANGE_PROBABILITY` are not updated.
+  - The time between two accesses is the moving average :code:`access-interval`,
+    but at least the time since the last access, so that the priority of a
+    mirror decays while it is not used. Mirrors not used within the
+    configuration option :code:`Scheduler/IdleAfter` are not updated at all.
+
+The mirrors are updated in the order of their priority until the time budget
+:code:`Scheduler/TimeBudget` or the bandwidth budget
+:code:`Scheduler/BandwidthBudget` of the cycle is used up. The bandwidth of
+an update is estimated by the moving average :code:`fetch-size` of the mirror.
+
+Copyright:
+    2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of gitcache (https://github.com/seeraven/gitcache)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from ..config import get_config
+from ..database import ACCESS_TIME_RESOLUTION, Database
+from ..helpers import format_size
+from .update_all import UpdateResult, update_mirror, update_mirrors_parallel
+
+# -----------------------------------------------------------------------------
+# Logger
+# -----------------------------------------------------------------------------
+LOG = logging.getLogger(__name__)
+
+
+# -----------------------------------------------------------------------------
+# Constants
+# -----------------------------------------------------------------------------
+# Mirrors whose upstream repository changed with a lower probability are not updated
+MIN_CHANGE_PROBABILITY = 0.5
+
+
+# -----------------------------------------------------------------------------
+# Class Definitions
+# -----------------------------------------------------------------------------
+# pylint: disable=too-few-public-methods
+class UpdateBudget:
+    """The time and bandwidth budget of a scheduler cycle.
+
+    Attributes:
+        time_budget (float):   The time in seconds new updates can be started.
+        bandwidth_budget (int): The estimated number of bytes that can be fetched or 0 if unlimited.
+        start_time (float):    The start time of the cycle.
+        used_bandwidth (float): The estimated number of bytes fetched so far.
+    """
+
+    def __init__(self, time_budget: float, bandwidth_budget: int) -> None:
+        """Construct a new UpdateBudget object.
+
+        Args:
+            time_budget (float):    The time in seconds new updates can be started.
+            bandwidth_budget (int): The estimated number of bytes that can be fetched or 0 if unlimited.
+        """
+        self.time_budget = time_budget
+        self.bandwidth_budget = bandwidth_budget
+        self.start_time = time.time()
+        self.used_bandwidth = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self, fetch_size: float) -> bool:
+        """Reserve the budget for the update of a mirror.
+
+        Args:
+            fetch_size (float): The estimated number of bytes fetched by the update.
+
+        Return:
+            Returns True if the update fits into the remaining budget.
+        """
+        with self.lock:
+            if time.time() - self.start_time >= self.time_budget:
+                return False
+            if 0 < self.bandwidth_budget < self.used_bandwidth + fetch_size:
+                return False
+            self.used_bandwidth += fetch_size
+            return True
+
+
+# -----------------------------------------------------------------------------
+# Function Definitions
+# -----------------------------------------------------------------------------
+def get_priority(entry: Dict[str, Any], now: float, idle_after: float) -> float:
+    """Get the priority of the update of a mirror.
+
+    Args:
+        entry (dict):       The database entry of the mirror.
+        now (float):        The current time.
+        idle_after (float): The time in seconds after which an unused mirror is idle.
+
+    Return:
+        Returns the priority of the update or 0.0 if the mirror should not be updated.
+    """
+    last_update_time = entry.get("last-update-time", 0.0)
+    idle_time = now - entry.get("last-access-time", last_update_time)
+    if idle_time >= idle_after:
+        return 0.0
+
+    change_interval = entry.get("change-interval")
+    if change_interval:
+        change_probability = 1.0 - math.exp(-max(0.0, now - last_update_time) / change_interval)
+    else:
+        change_probability = 1.0
+    if change_probability < MIN_CHANGE_PROBABILITY:
+        return 0.0
+
+    access_interval = max(entry.get("access-interval", idle_after), idle_time, ACCESS_TIME_RESOLUTION)
+    return change_probability / access_interval
+
+
+def plan_updates(entries: Dict[str, Dict[str, Any]], now: float, idle_after: float) -> List[str]:
+    """Get the mirrors to update in the order of their priority.
+
+    Args:
+        entries (dict):     The database entries of all mirrors.
+        now (float):        The current time.
+        idle_after (float): The time in seconds after which an unused mirror is idle.
+
+    Return:
+        Returns the paths of the mirrors to update, the most important first.
+    """
+    priorities = {path: get_priority(entry, now, idle_after) for path, entry in entries.items()}
+    return sorted((path for path, priority in priorities.items() if priority > 0.0), key=lambda path: -priorities[path])
+
+
+# pylint: disable=too-many-locals
+def git_update_scheduled(
+    jobs: Optional[int] = None,
+    dry_run: bool = False,
+    update_function: Optional[Callable[[str, Database], UpdateResult]] = None,
+) -> int:
+    """Update the mirrors selected by the scheduler within the budget of one cycle.
+
+    Args:
+        jobs (int):       The number of mirrors to update in parallel. If not given,
+                          the configuration option Update/Jobs is used.
+        dry_run (bool):   If set to True, only show the mirrors that would be updated.
+        update_function:  The function updating a single mirror. If not given,
+                          :func:`git_cache.commands.update_all.update_mirror` is used.
+
+    Return:
+        Returns 0 on success, otherwise 1.
+    """
+    config = get_config()
+    if jobs is None:
+        jobs = config.get("Update", "Jobs")
+    update = update_function or update_mirror
+
+    database = Database()
+    database.compact()
+    entries = database.get_all()
+    now = time.time()
+    idle_after = config.get("Scheduler", "IdleAfter")
+    plan = plan_updates(entries, now, idle_after)
+    LOG.info("Scheduling the update of %d of %d mirrors.", len(plan), len(entries))
+
+    if dry_run:
+        for path in plan:
+            LOG.info(
+                "  %s (priority %.3g, estimated fetch size %s)",
+                path,
+                get_priority(entries[path], now, idle_after),
+                format_size(entries[path].get("fetch-size", 0.0)),
+            )
+        return 0
+
+    budget = UpdateBudget(config.get("Scheduler", "TimeBudget"), config.get("Scheduler", "BandwidthBudget"))
+    skipped: List[str] = []
+
+    def update_within_budget(path: str, database: Database) -> UpdateResult:
+        if not budget.reserve(entries[path].get("fetch-size", 0.0)):
+            skipped.append(path)
+            return UpdateResult(path, True, 0.0)
+        return update(path, database)
+
+    if jobs > 1 and len(plan) > 1:
+        results = update_mirrors_parallel(plan, jobs, config.get("Update", "MaxJobsPerHost"), update_within_budget)
+    else:
+        results = [update_within_budget(path, database) for path in plan]
+
+    failed = sorted(result.path for result in results if not result.success)
+    LOG.info(
+        "Updated %d mirrors within %.1f seconds, %d skipped due to the budget, %d failed.",
+        len(results) - len(skipped) - len(failed),
+        time.time() - budget.start_time,
+        len(skipped),
+        len(failed),
+    )
+    for path in failed:
+        LOG.error("  Update of %s failed.", path)
+    return 1 if failed else 0
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -16,16 +16,21 @@ Copyright:
 # Module Import
 # -----------------------------------------------------------------------------
 import configparser
+import json
 import logging
 import os
 import platform
 import re
-from typing import Any, Callable, Dict, List, Optional
+import shutil
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
 import pytimeparse
 
 from .command_execution import getstatusoutput
-from .global_settings import GITCACHE_DIR
+from .global_settings import GITCACHE_DIR, GITCACHE_TOOL_CACHE
 
 # -----------------------------------------------------------------------------
 # Logger
@@ -39,6 +44,21 @@ LOG = logging.getLogger(__name__)
 ConverterType = Optional[Callable[[str], Any]]
 
 
+# -----------------------------------------------------------------------------
+# Module Variables
+# -----------------------------------------------------------------------------
+# The shared configuration and the modification time of its file
+_CONFIG: Optional["Config"] = None
+_CONFIG_MTIME: Optional[int] = None
+_CONFIG_LOCK = threading.Lock()
+
+# The content of the tool cache file once it is loaded
+_TOOL_CACHE: Optional[Dict[str, Any]] = None
+
+# The environment variables overriding the configuration in the current context
+_ENVIRONMENT: ContextVar[Optional[Dict[str, str]]] = ContextVar("gitcache_environment", default=None)
+
+
 # -----------------------------------------------------------------------------
 # Functions
 # -----------------------------------------------------------------------------
@@ -67,15 +87,112 @@ def str_to_seconds(string: str) -> int:
     return seconds
 
 
+def str_to_bytes(string: str) -> int:
+    """Convert a string like '512 KiB' or '1.5 GB' to a number of bytes.
+
+    The suffixes K, M, G and T optionally followed by B or iB are multiples
+    of 1024. Invalid strings are converted to 0.
+    """
+    match = re.fullmatch(r"\s*([0-9]*\.?[0-9]+)\s*(?:([KMGT])(?:I?B)?|B)?\s*", string.upper())
+    if match is None:
+        return 0
+    exponent = " KMGT".index(match.group(2) or " ")
+    return int(float(match.group(1)) * 1024**exponent)
+
+
+def get_mtime(filename: Optional[str]) -> Optional[int]:
+    """Get the modification time of a file in nanoseconds or None if it does not exist."""
+    if filename:
+        try:
+            return os.stat(filename).st_mtime_ns
+        except OSError:
+            pass
+    return None
+
+
+def get_tool_cache() -> Dict[str, Any]:
+    """Get the valid entries of the tool cache.
+
+    The tool cache file stores the located git and git-lfs commands across
+    processes. It is discarded if the :code:`PATH` environment variable or the
+    modification time of the configuration file changed. Each entry is only
+    valid as long as the modification time of the located command is unchanged.
+    Tools that were not found are not cached, so that they are found as soon
+    as they are installed.
+
+    Return:
+        Returns the map of tool names to the entries consisting of the path
+        of the tool, its modification time and whether it is available.
+    """
+    global _TOOL_CACHE  # pylint: disable=global-statement
+    if _TOOL_CACHE is None:
+        _TOOL_CACHE = {}
+        try:
+            with open(GITCACHE_TOOL_CACHE, "r", encoding="utf-8") as file_handle:
+                content = json.load(file_handle)
+            if content["path"] == os.getenv("PATH") and content["config_mtime"] == get_mtime(
+                os.path.join(GITCACHE_DIR, "config")
+            ):
+                _TOOL_CACHE = content["tools"]
+        except (OSError, ValueError, KeyError, TypeError):
+            LOG.debug("Ignoring tool cache %s.", GITCACHE_TOOL_CACHE)
+
+    return {
+        name: entry
+        for name, entry in _TOOL_CACHE.items()
+        if entry.get("mtime") is not None and entry.get("mtime") == get_mtime(entry.get("path"))
+    }
+
+
+def set_tool_cache(name: str, path: Optional[str], available: bool, value: Optional[str] = None) -> None:
+    """Store a located tool in the tool cache.
+
+    Args:
+        name (str):       The name of the tool.
+        path (str):       The path of the tool or None if it is not found. A
+                          tool that is not found is not stored.
+        available (bool): Whether the tool is available.
+        value (str):      An optional value determined using the tool.
+    """
+    if get_mtime(path) is None:
+        return
+
+    tools = get_tool_cache()
+    tools[name] = {"path": path, "mtime": get_mtime(path), "available": available, "value": value}
+    content = {
+        "path": os.getenv("PATH"),
+        "config_mtime": get_mtime(os.path.join(GITCACHE_DIR, "config")),
+        "tools": tools,
+    }
+
+    global _TOOL_CACHE  # pylint: disable=global-statement
+    _TOOL_CACHE = tools
+    tmp_filename = f"{GITCACHE_TOOL_CACHE}.{os.getpid()}.new"
+    try:
+        with open(tmp_filename, "w", encoding="utf-8") as file_handle:
+            json.dump(content, file_handle)
+        os.replace(tmp_filename, GITCACHE_TOOL_CACHE)
+    except OSError as exception:
+        LOG.debug("Can't write tool cache %s: %s", GITCACHE_TOOL_CACHE, exception)
+
+
 def has_git_lfs_cmd() -> bool:
     """Check whether this host has the git-lfs command available.
 
+    A missing git-lfs command is searched again on every call, so that a
+    long running process like the gitcache daemon finds it once installed.
+
     Return:
         Returns True if the git-lfs command is available.
     """
-    if not hasattr(has_git_lfs_cmd, "has_git_lfs"):
-        retval, _ = getstatusoutput(["git-lfs", "version"])
-        has_git_lfs_cmd.has_git_lfs = retval == 0  # type: ignore
+    if not getattr(has_git_lfs_cmd, "has_git_lfs", False):
+        entry = get_tool_cache().get("git-lfs")
+        if entry is None:
+            path = shutil.which("git-lfs")
+            retval = getstatusoutput(["git-lfs", "version"])[0] if path else 1
+            entry = {"available": retval == 0}
+            set_tool_cache("git-lfs", path, entry["available"])
+        has_git_lfs_cmd.has_git_lfs = entry["available"]  # type: ignore
     return has_git_lfs_cmd.has_git_lfs  # type: ignore
 
 
@@ -86,6 +203,10 @@ def find_git() -> str:
         Returns the full path to the real git command. If the command is not
         found, return the platform dependend default value and log a warning.
     """
+    entry = get_tool_cache().get("git")
+    if entry is not None:
+        return entry["path"]
+
     path = os.getenv("PATH")
     if path is not None:
         on_windows = platform.system().lower().startswith("win")
@@ -94,12 +215,63 @@ def find_git() -> str:
             candidate = os.path.join(candidate, cmd)
             if os.path.exists(candidate) and os.access(candidate, os.X_OK):
                 if not os.path.islink(candidate):
+                    set_tool_cache("git", candidate, True)
                     return candidate
 
     LOG.warning("Can't find git command! Please specify manually in the config file!")
     return "/usr/bin/git"
 
 
+def get_config() -> "Config":
+    """Get the configuration shared by all users within this process.
+
+    The configuration is loaded only once and reloaded only if the
+    configuration file is modified. The returned object must not be modified.
+    Use :meth:`Config.overlay` to add the settings of a mirror.
+
+    Within :func:`environment_overrides`, the shared configuration is layered
+    with the overriding environment variables.
+
+    Return:
+        Returns the shared configuration.
+    """
+    global _CONFIG, _CONFIG_MTIME  # pylint: disable=global-statement
+    with _CONFIG_LOCK:
+        mtime = get_mtime(os.path.join(GITCACHE_DIR, "config"))
+        if _CONFIG is None or mtime is None or mtime != _CONFIG_MTIME:
+            _CONFIG = Config()
+            _CONFIG_MTIME = get_mtime(os.path.join(GITCACHE_DIR, "config"))
+        config = _CONFIG
+
+    environment = _ENVIRONMENT.get()
+    if environment:
+        return config.with_environment(environment)
+    return config
+
+
+@contextmanager
+def environment_overrides(environment: Dict[str, str]) -> Iterator[None]:
+    """Override the environment variables of the configuration items in the current context.
+
+    The overrides apply to the configurations returned by :func:`get_config`
+    in the current thread and in threads started with a copy of the current
+    context, e.g., by :func:`git_cache.parallel_output.run_in_order`. They are
+    not visible to other threads and to executed commands.
+
+    Args:
+        environment (dict): A map of environment variable names like
+                            'GITCACHE_UPDATE_INTERVAL' to their values.
+
+    Return:
+        Returns a context manager restoring the previous overrides on exit.
+    """
+    token = _ENVIRONMENT.set(dict(_ENVIRONMENT.get() or {}, **environment))
+    try:
+        yield
+    finally:
+        _ENVIRONMENT.reset(token)
+
+
 # -----------------------------------------------------------------------------
 # Class Definition
 # -----------------------------------------------------------------------------
@@ -191,20 +363,51 @@ class ConfigItem:
 
 
 class Config:
-    """The configuration of gitcache."""
+    """The configuration of gitcache.
 
-    def __init__(self) -> None:
+    Attributes:
+        parent (obj):      The configuration this configuration is layered on or None.
+        environment (map): The environment variables overriding the
+                           environment of the process or None.
+    """
+
+    # pylint: disable=too-many-statements
+    def __init__(self, parent: Optional["Config"] = None, environment: Optional[Dict[str, str]] = None) -> None:
         """Initialize the configuration.
 
         Initialize the configuration by setting the default values and
-        loading the global configuration file.
+        loading the global configuration file. If a parent configuration is
+        given, the configuration starts empty and falls back to the values of
+        the parent.
+
+        Args:
+            parent (obj):      The configuration to layer this configuration on.
+            environment (map): The environment variables overriding the
+                               environment of the process.
         """
-        self.items: List[ConfigItem] = []
+        self.parent = parent
+        self.environment = environment
+        self.config = configparser.ConfigParser()
+        if parent is not None:
+            self.items: List[ConfigItem] = parent.items
+            self.env_keys: Dict[str, Dict[str, str]] = parent.env_keys
+            self.converters: Dict[str, Dict[str, ConverterType]] = parent.converters
+            return
+
+        self.items = []
         self.items.append(ConfigItem("System", "RealGit", find_git(), converter=str, env="GITCACHE_REAL_GIT"))
         self.items.append(ConfigItem("System", "Disable", False, converter=str_to_bool, env="GITCACHE_DISABLE"))
 
         self.items.append(ConfigItem("MirrorHandling", "UpdateInterval", "0 seconds", env="GITCACHE_UPDATE_INTERVAL"))
+        self.items.append(ConfigItem("MirrorHandling", "MaxStaleness", "0 seconds", env="GITCACHE_MAX_STALENESS"))
         self.items.append(ConfigItem("MirrorHandling", "CleanupAfter", "14 days", env="GITCACHE_CLEANUP_AFTER"))
+        self.items.append(
+            ConfigItem("MirrorHandling", "MaxCacheSize", "0", converter=str_to_bytes, env="GITCACHE_MAX_CACHE_SIZE")
+        )
+        self.items.append(
+            ConfigItem("MirrorHandling", "MinFreeSpace", "0", converter=str_to_bytes, env="GITCACHE_MIN_FREE_SPACE")
+        )
+        self.items.append(ConfigItem("MirrorHandling", "PinnedRegex", "", converter=str_to_regex))
 
         self.items.append(ConfigItem("UrlPatterns", "IncludeRegex", ".*", converter=str_to_regex))
         self.items.append(ConfigItem("UrlPatterns", "ExcludeRegex", "", converter=str_to_regex))
@@ -212,17 +415,34 @@ class Config:
         self.items.append(ConfigItem("Command", "WarnIfLockedFor", "10 seconds"))
         self.items.append(ConfigItem("Command", "CheckInterval", "2 seconds"))
         self.items.append(ConfigItem("Command", "LockTimeout", "1 hour"))
+        self.items.append(ConfigItem("Command", "MaxCapturedOutput", "1 MiB", converter=str_to_bytes))
 
         self.items.append(ConfigItem("Clone", "Retries", 3, converter=int))
         self.items.append(ConfigItem("Clone", "CommandTimeout", "1 hour"))
         self.items.append(ConfigItem("Clone", "OutputTimeout", "5 minutes"))
         self.items.append(
             ConfigItem("Clone", "CloneStyle", "Full", converter=None, env="GITCACHE_CLONE_STYLE")
-        )  # Full or PartialFirst
+        )  # Full, PartialFirst or Resumable
+        self.items.append(ConfigItem("Clone", "DeepenStep", 1000, converter=int))
 
         self.items.append(ConfigItem("Update", "Retries", 3, converter=int))
         self.items.append(ConfigItem("Update", "CommandTimeout", "1 hour"))
         self.items.append(ConfigItem("Update", "OutputTimeout", "5 minutes"))
+        self.items.append(ConfigItem("Update", "Jobs", 1, converter=int))
+        self.items.append(ConfigItem("Update", "MaxJobsPerHost", 4, converter=int))
+        self.items.append(ConfigItem("Update", "UpstreamProbe", "All", converter=None))  # All, BranchesAndTags or Off
+
+        self.items.append(ConfigItem("Scheduler", "CycleInterval", "0 seconds"))
+        self.items.append(ConfigItem("Scheduler", "TimeBudget", "10 minutes"))
+        self.items.append(ConfigItem("Scheduler", "BandwidthBudget", "0", converter=str_to_bytes))
+        self.items.append(ConfigItem("Scheduler", "IdleAfter", "7 days"))
+
+        self.items.append(ConfigItem("Webhook", "Port", 0, converter=int))
+        self.items.append(ConfigItem("Webhook", "Address", "127.0.0.1", converter=str))
+        self.items.append(ConfigItem("Webhook", "Secret", "", converter=str))
+
+        self.items.append(ConfigItem("Maintenance", "Interval", "1 hour"))
+        self.items.append(ConfigItem("Maintenance", "FullInterval", "1 week"))
 
         self.items.append(ConfigItem("GC", "Retries", 3, converter=int))
         self.items.append(ConfigItem("GC", "CommandTimeout", "1 hour"))
@@ -233,9 +453,8 @@ class Config:
         self.items.append(ConfigItem("LFS", "OutputTimeout", "5 minutes"))
         self.items.append(ConfigItem("LFS", "PerMirrorStorage", True, converter=str_to_bool))
 
-        self.config = configparser.ConfigParser()
-        self.env_keys: Dict[str, Dict[str, str]] = {}
-        self.converters: Dict[str, Dict[str, ConverterType]] = {}
+        self.env_keys = {}
+        self.converters = {}
         for item in self.items:
             item.add_to_configparser(self.config)
             item.add_to_env_keys(self.env_keys)
@@ -258,15 +477,82 @@ class Config:
         converter = self.converters.get(section.upper(), {}).get(option.upper())
 
         if env_key:
-            value = os.getenv(env_key, None)
+            value = self.getenv(env_key)
         if value is None:
-            value = self.config.get(section, option)
+            value = self.get_raw(section, option)
 
         if converter:
             value = converter(value)
 
         return value
 
+    def getenv(self, key: str) -> Optional[str]:
+        """Get the value of an environment variable overriding a configuration item.
+
+        Args:
+            key (str): The name of the environment variable.
+        Return:
+            Returns the value of the overriding environment of this
+            configuration or of its parents, otherwise the value of the
+            environment of the process. None is returned if it is not set.
+        """
+        if self.environment is not None and key in self.environment:
+            return self.environment[key]
+        if self.parent is not None:
+            return self.parent.getenv(key)
+        return os.getenv(key)
+
+    def get_environment(self) -> Dict[str, str]:
+        """Get the environment variables that override configuration items.
+
+        Return:
+            Returns a map of the names of the set environment variables to their values.
+        """
+        environment = {}
+        for keys in self.env_keys.values():
+            for key in keys.values():
+                value = self.getenv(key)
+                if value is not None:
+                    environment[key] = value
+        return environment
+
+    def with_environment(self, environment: Dict[str, str]) -> "Config":
+        """Get a new configuration with environment variables overriding this configuration.
+
+        Args:
+            environment (dict): A map of environment variable names to their values.
+        Return:
+            Returns the new configuration.
+        """
+        return Config(parent=self, environment=environment)
+
+    def get_raw(self, section: str, option: str) -> str:
+        """Get the unconverted value of the configuration files.
+
+        Args:
+            section (str): The section, e.g., 'Clone'.
+            option (str):  The option, e.g., 'Retries'.
+        Return:
+            Returns the value of this configuration or, if it is not set, of
+            the parent configuration.
+        """
+        if self.parent is not None and not self.config.has_option(section, option):
+            return self.parent.get_raw(section, option)
+        return self.config.get(section, option)
+
+    def overlay(self, filename: str) -> "Config":
+        """Get a new configuration layered on this configuration.
+
+        Args:
+            filename (str): The configuration file to load, e.g., the
+                            per-mirror configuration file.
+        Return:
+            Returns the new configuration.
+        """
+        config = Config(parent=self)
+        config.load(filename)
+        return config
+
     def load(self, filename: str) -> bool:
         """Load the configuration file.
 
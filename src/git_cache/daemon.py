@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+"""
+The gitcache daemon.
+
+The daemon is started by :code:`gitcache --serve` and listens on the unix
+socket :code:`GITCACHE_DAEMON_SOCKET` for the requests of the gitcache
+clients, see :mod:`git_cache.daemon_client`. It keeps the configuration and
+the parsed JSON database in memory, so that a request does not need to read
+them again. As SQLite connections can't be shared between threads, each
+request uses its own database object.
+
+The requests for the same mirror are serialized by an in-process queue per
+mirror instead of waiting for the mirror lock file. An update request that
+arrives while an update of the same mirror and ref is running reuses the
+result of the next successful update instead of updating the mirror again.
+The mirror lock files are still taken, as gitcache processes not using the
+daemon might access the mirrors at the same time. As the queue already
+serializes the requests of the daemon, it waits for a lock held by another
+process in a blocking call instead of polling the lock file.
+
+Each update is executed with the environment variables of the client
+overriding the configuration items, see :func:`git_cache.config.environment_overrides`.
+The output of the update is sent to the client line by line while the update
+is running.
+
+If the configuration option :code:`Scheduler/CycleInterval` is set, the daemon
+runs the scheduler of :mod:`git_cache.commands.update_scheduled` once per
+cycle. The scheduled updates use the same queues as the requests. If the
+configuration option :code:`Webhook/Port` is set, the daemon also runs the
+webhook receiver of :mod:`git_cache.webhook` and refreshes the mirrors a push
+was reported for.
+
+Copyright:
+    2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of gitcache (https://github.com/seeraven/gitcache)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import portalocker
+
+from .commands.update_all import UpdateResult
+from .commands.update_scheduled import git_update_scheduled
+from .config import environment_overrides, get_config
+from .daemon_client import set_serving
+from .database import Database
+from .git_mirror import GitMirror
+from .global_settings import GITCACHE_DAEMON_SOCKET
+from .parallel_output import PrefixedBuffer, captured_output, multiplexed_output
+from .webhook import start_webhook_server
+
+# -----------------------------------------------------------------------------
+# Logger
+# -----------------------------------------------------------------------------
+LOG = logging.getLogger(__name__)
+
+
+# -----------------------------------------------------------------------------
+# Class Definitions
+# -----------------------------------------------------------------------------
+# pylint: disable=too-few-public-methods
+class MirrorQueue:
+    """Serialization of the requests for a single mirror.
+
+    Attributes:
+        lock (obj):         The lock held while a request of the mirror is executed.
+        last_start (float): The start time of the last successful update.
+        last_ref (str):     The ref of the last successful update.
+    """
+
+    def __init__(self) -> None:
+        """Construct a new MirrorQueue object."""
+        self.lock = threading.Lock()
+        self.last_start = 0.0
+        self.last_ref: Optional[str] = None
+
+
+class OutputSender(list):
+    """Capture of the output of a request sending each line to the client immediately."""
+
+    def __init__(self, send: Callable[[Dict[str, Any]], None]) -> None:
+        """Construct a new OutputSender object.
+
+        Args:
+            send (func): The function sending a message to the client.
+        """
+        super().__init__()
+        self.send = send
+
+    def append(self, item: Tuple[PrefixedBuffer, bytes]) -> None:
+        """Send a line of output to the client.
+
+        Args:
+            item (tuple): The buffer and the data written to it.
+        """
+        buffer, data = item
+        stream_name = "stderr" if buffer is getattr(sys.stderr, "buffer", None) else "stdout"
+        self.send({"output": [stream_name, data.decode("utf-8", errors="replace")]})
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Handler of a single client connection."""
+
+    server: "GitcacheDaemon"
+
+    def handle(self) -> None:
+        """Read the request, execute it and write the response."""
+        try:
+            request = json.loads(self.rfile.readline())
+            if not isinstance(request, dict):
+                raise ValueError("Invalid request")
+        except ValueError as exception:
+            LOG.warning("Ignoring invalid request: %s", exception)
+            return
+
+        self.send(self.server.execute(request, self.send))
+
+    def send(self, message: Dict[str, Any]) -> None:
+        """Send a message to the client.
+
+        A client that disconnected does not stop the execution of the request.
+
+        Args:
+            message (dict): The message.
+        """
+        try:
+            self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+            self.wfile.flush()
+        except OSError as exception:
+            LOG.debug("Can't send to the client: %s", exception)
+
+
+# pylint: disable=too-many-ancestors
+class GitcacheDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):  # type: ignore[name-defined]
+    """The gitcache daemon serving the requests of the clients.
+
+    Attributes:
+        queues (dict): A map of the mirror paths to the queues of the mirrors.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str) -> None:
+        """Construct a new GitcacheDaemon object listening on the given socket.
+
+        Args:
+            socket_path (str): The path of the unix socket.
+        """
+        self.queues: Dict[str, MirrorQueue] = {}
+        self.queues_lock = threading.Lock()
+        super().__init__(socket_path, RequestHandler)
+
+    def get_queue(self, path: str) -> MirrorQueue:
+        """Get the queue of a mirror.
+
+        Args:
+            path (str): The path of the mirror.
+
+        Return:
+            Returns the queue of the mirror.
+        """
+        with self.queues_lock:
+            if path not in self.queues:
+                self.queues[path] = MirrorQueue()
+            return self.queues[path]
+
+    def execute(self, request: Dict[str, Any], send: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+        """Execute a request.
+
+        Args:
+            request (dict): The request.
+            send (func):    The function sending the output messages to the client.
+
+        Return:
+            Returns the response.
+        """
+        if request.get("command") != "update" or not request.get("url"):
+            LOG.warning("Ignoring unknown request %s.", request.get("command"))
+            return {"success": False, "event": None}
+
+        with captured_output(OutputSender(send)):
+            try:
+                success, event = self.update(request)
+            except Exception:  # pylint: disable=broad-exception-caught
+                LOG.exception(
+                    "Update of %s failed with an exception!", GitMirror.strip_credentials(request["url"], True)
+                )
+                success, event = False, None
+        return {"success": success, "event": event}
+
+    def update(self, request: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+        """Update a mirror using the environment of the client.
+
+        Args:
+            request (dict): The update request.
+
+        Return:
+            Returns the tuple (success, cache event).
+        """
+        environment = request.get("environment") or {}
+        if not isinstance(environment, dict):
+            raise ValueError("Invalid environment")
+        with environment_overrides({str(key): str(value) for key, value in environment.items()}):
+            return self._update(request)
+
+    def _update(self, request: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+        """Update a mirror.
+
+        Args:
+            request (dict): The update request.
+
+        Return:
+            Returns the tuple (success, cache event).
+        """
+        arrival_time = time.time()
+        path = GitMirror.get_mirror_path(request["url"])
+        if path is None:
+            return False, None
+
+        ref = request.get("ref")
+        queue = self.get_queue(path)
+        with queue.lock:
+            if queue.last_start >= arrival_time and queue.last_ref == ref:
+                LOG.info("Mirror %s was updated by a concurrent request. Reusing its result.", path)
+                return True, "hit_coalesced"
+
+            start_time = time.time()
+            mirror = GitMirror(url=request["url"], path=path, database=Database())
+            success = mirror.update(
+                ref,
+                force=bool(request.get("force")),
+                upstream_digest=request.get("upstream_digest"),
+                allow_stale=bool(request.get("allow_stale", True)),
+            )
+            if success:
+                queue.last_start = start_time
+                queue.last_ref = ref
+        return success, mirror.cache_event
+
+    def update_path(self, path: str, database: Optional[Database] = None, force: bool = True) -> UpdateResult:
+        """Update a mirror selected by the scheduler or reported by the webhook receiver.
+
+        Args:
+            path (str):     The path of the mirror.
+            database (obj): The database to use. If not given, a new database object is used.
+            force (bool):   If set to True, the mirror is updated even if the update time is not reached.
+
+        Return:
+            Returns the result of the update.
+        """
+        start_time = time.time()
+        queue = self.get_queue(path)
+        with queue.lock:
+            success = GitMirror(path=path, database=database).update(force=force, allow_stale=False)
+            if success:
+                queue.last_start = start_time
+                queue.last_ref = None
+        return UpdateResult(path, success, time.time() - start_time)
+
+    def refresh_in_background(self, path: str) -> None:
+        """Update a mirror a push was reported for without blocking the caller.
+
+        Args:
+            path (str): The path of the mirror.
+        """
+        threading.Thread(target=self.update_path, args=(path, None, False), name="refresh", daemon=True).start()
+
+
+# -----------------------------------------------------------------------------
+# Function Definitions
+# -----------------------------------------------------------------------------
+def serve() -> int:
+    """Run the gitcache daemon until it is terminated.
+
+    Return:
+        Returns 0 on success, otherwise 1.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        LOG.error("The gitcache daemon requires unix sockets that are not available on this system!")
+        return 1
+
+    os.makedirs(os.path.dirname(GITCACHE_DAEMON_SOCKET), exist_ok=True)
+    try:
+        with portalocker.Lock(GITCACHE_DAEMON_SOCKET + ".lock", timeout=0, fail_when_locked=True):
+            # Remove the socket left behind by a daemon that was killed
+            if os.path.exists(GITCACHE_DAEMON_SOCKET):
+                os.unlink(GITCACHE_DAEMON_SOCKET)
+            return _serve()
+    except portalocker.exceptions.LockException:
+        LOG.error("The gitcache daemon is already running.")
+        return 1
+
+
+def run_scheduler(server: GitcacheDaemon, cycle_interval: float, stop: threading.Event) -> None:
+    """Run the scheduled updates once per cycle until stopped.
+
+    Args:
+        server (obj):           The daemon executing the updates.
+        cycle_interval (float): The time in seconds between two cycles.
+        stop (obj):             The event stopping the scheduler.
+    """
+    while not stop.wait(cycle_interval):
+        try:
+            git_update_scheduled(update_function=server.update_path)
+        except Exception:  # pylint: disable=broad-exception-caught
+            LOG.exception("Scheduled update failed with an exception!")
+
+
+def _serve() -> int:
+    """Run the gitcache daemon on the socket GITCACHE_DAEMON_SOCKET.
+
+    Return:
+        Returns 0 on success.
+    """
+    old_umask = os.umask(0o077)
+    try:
+        server = GitcacheDaemon(GITCACHE_DAEMON_SOCKET)
+    finally:
+        os.umask(old_umask)
+
+    def shutdown(_signum, _frame):
+        threading.Thread(target=server.shutdown, name="shutdown").start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    set_serving(True)
+    LOG.info("gitcache daemon listening on %s.", GITCACHE_DAEMON_SOCKET)
+    stop_scheduler = threading.Event()
+    try:
+        with multiplexed_output():
+            cycle_interval = get_config().get("Scheduler", "CycleInterval")
+            if cycle_interval > 0:
+                LOG.info("Running the scheduled updates every %.0f seconds.", cycle_interval)
+                threading.Thread(
+                    target=run_scheduler, args=(server, cycle_interval, stop_scheduler), name="scheduler", daemon=True
+                ).start()
+            webhook_server = start_webhook_server(server.refresh_in_background)
+            try:
+                server.serve_forever()
+            finally:
+                if webhook_server is not None:
+                    webhook_server.shutdown()
+                    webhook_server.server_close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_scheduler.set()
+        set_serving(False)
+        server.server_close()
+        if os.path.exists(GITCACHE_DAEMON_SOCKET):
+            os.unlink(GITCACHE_DAEMON_SOCKET)
+    LOG.info("gitcache daemon stopped.")
+    return 0
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Client of the gitcache daemon.
+
+If a gitcache daemon started by :code:`gitcache --serve` is listening on the
+unix socket :code:`GITCACHE_DAEMON_SOCKET`, mirror updates are sent to the
+daemon instead of being executed by the current process. Each request is a
+single line containing a JSON object. The request carries the environment
+variables of the client overriding configuration items, so that the daemon
+executes the update with the settings of the client, e.g.,
+:code:`GITCACHE_UPDATE_INTERVAL`.
+
+While the request is executed, the daemon sends each line of output as a
+single line containing a JSON object with the key :code:`output` holding the
+pair of the stream name ('stdout' or 'stderr') and the output. The request is
+finished by a single line containing the JSON encoded result:
+
+  - :code:`success` is True if the mirror was updated successfully.
+  - :code:`event` is the cache event of the update, e.g., 'hit_update'.
+
+If the daemon is not running, fails to answer or sends nothing within
+:code:`Update/CommandTimeout` seconds, None is returned and the caller updates
+the mirror itself.
+
+Copyright:
+    2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of gitcache (https://github.com/seeraven/gitcache)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import json
+import logging
+import os
+import socket
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+from .config import get_config
+from .global_settings import GITCACHE_DAEMON_SOCKET
+
+# -----------------------------------------------------------------------------
+# Logger
+# -----------------------------------------------------------------------------
+LOG = logging.getLogger(__name__)
+
+
+# -----------------------------------------------------------------------------
+# Constants
+# -----------------------------------------------------------------------------
+# Timeout in seconds to connect to the daemon
+CONNECT_TIMEOUT = 2.0
+
+
+# -----------------------------------------------------------------------------
+# Module Variables
+# -----------------------------------------------------------------------------
+# Set in the daemon process to execute the requests in the process itself
+_SERVING = False
+
+
+# -----------------------------------------------------------------------------
+# Function Definitions
+# -----------------------------------------------------------------------------
+def set_serving(serving: bool) -> None:
+    """Mark the current process as the gitcache daemon.
+
+    Args:
+        serving (bool): True if the current process is the daemon.
+    """
+    global _SERVING  # pylint: disable=global-statement
+    _SERVING = serving
+
+
+def is_serving() -> bool:
+    """Check if the current process is the gitcache daemon.
+
+    Return:
+        Returns True if the current process is the daemon.
+    """
+    return _SERVING
+
+
+def is_daemon_available() -> bool:
+    """Check if requests can be sent to a gitcache daemon.
+
+    Return:
+        Returns True if this process is not the daemon and the socket of the
+        daemon exists.
+    """
+    return not _SERVING and hasattr(socket, "AF_UNIX") and os.path.exists(GITCACHE_DAEMON_SOCKET)
+
+
+def write_output(message: Dict[str, Any]) -> None:
+    """Write the output sent by the gitcache daemon to the streams of this process.
+
+    Args:
+        message (dict): The output message of the daemon.
+    """
+    stream_name, output = message["output"]
+    stream = sys.stderr if stream_name == "stderr" else sys.stdout
+    stream.write(output)
+    stream.flush()
+
+
+def send_request(request: Dict[str, Any], read_timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Send a request to the gitcache daemon and wait for the response.
+
+    The output sent by the daemon while the request is executed is written
+    to the streams of this process.
+
+    Args:
+        request (dict):       The request.
+        read_timeout (float): The maximum time in seconds to wait for the next
+                              message of the daemon. If not given, the client
+                              waits forever.
+
+    Return:
+        Returns the response or None if the daemon is not available or did
+        not answer in time.
+    """
+    if not is_daemon_available():
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:  # type: ignore[attr-defined]
+            connection.settimeout(CONNECT_TIMEOUT)
+            connection.connect(GITCACHE_DAEMON_SOCKET)
+            connection.settimeout(read_timeout if read_timeout and read_timeout > 0 else None)
+            connection.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with connection.makefile("rb") as stream:
+                while True:
+                    response = json.loads(stream.readline())
+                    if not isinstance(response, dict):
+                        raise ValueError("Invalid response")
+                    if "output" not in response:
+                        break
+                    write_output(response)
+    except socket.timeout:
+        LOG.warning("gitcache daemon did not answer within %d seconds. Executing the request standalone.", read_timeout)
+        return None
+    except (OSError, ValueError, TypeError) as exception:
+        LOG.debug("gitcache daemon is not available (%s). Executing the request standalone.", exception)
+        return None
+    return response
+
+
+def request_update(
+    url: str,
+    ref: Optional[str] = None,
+    force: bool = False,
+    allow_stale: bool = True,
+    upstream_digest: Optional[str] = None,
+) -> Optional[Tuple[bool, Optional[str]]]:
+    """Request the update of a mirror from the gitcache daemon.
+
+    The output of the update is written to the streams of this process while
+    the daemon executes the update. The environment variables overriding
+    configuration items are sent along, so that the daemon uses the settings
+    of this process.
+
+    Args:
+        url (str):             The upstream url of the mirror.
+        ref (str):             The ref to use for the fetch of the lfs data.
+        force (bool):          If set to True, the update interval is ignored.
+        allow_stale (bool):    If set to True, a stale mirror can be used.
+        upstream_digest (str): The digest of the upstream refs.
+
+    Return:
+        Returns the tuple (success, cache event) or None if the daemon is not
+        available.
+    """
+    if not is_daemon_available():
+        return None
+
+    config = get_config()
+    response = send_request(
+        {
+            "command": "update",
+            "url": url,
+            "ref": ref,
+            "force": force,
+            "allow_stale": allow_stale,
+            "upstream_digest": upstream_digest,
+            "environment": config.get_environment(),
+        },
+        read_timeout=config.get("Update", "CommandTimeout"),
+    )
+    if response is None:
+        return None
+    return bool(response.get("success")), response.get("event")
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -5,6 +5,29 @@ The gitcache database.
 The gitcache database is stored on disc and contains a map of repository paths
 to the meta information for the repositories.
 
+The database content can be stored in different backends selected by the
+global setting :code:`GITCACHE_DB_BACKEND`:
+
+  - :code:`json` (default) stores the whole database in the JSON file
+    :code:`GITCACHE_DB` that is rewritten on every modification under the
+    global lock :code:`GITCACHE_DB_LOCK`.
+  - :code:`sqlite` stores the database in the SQLite database
+    :code:`GITCACHE_DB_SQLITE` in WAL mode, see :mod:`git_cache.database_sqlite`.
+
+All modifications are expressed as a list of
+:class:`git_cache.database_storage.Operation` objects that are applied by the
+backend in a single transaction.
+
+Counter increments and access time updates can be collected using
+:meth:`Database.transaction` and are then committed at the end of the
+transaction in a single write. All other modifications, like adding and
+removing entries or saving the update time of a mirror, are never deferred,
+as other processes rely on them to coordinate the updates of the mirrors.
+
+Counter increments are not written to the database directly, but appended to
+the counter journal of the process, see :mod:`git_cache.database_journal`. The
+journals are folded into the database by :meth:`Database.compact`.
+
 Copyright:
     2020 by Clemens Rabe <clemens.rabe@clemensrabe.de>
 
@@ -18,14 +41,42 @@ Copyright:
 # -----------------------------------------------------------------------------
 # Module Import
 # -----------------------------------------------------------------------------
-import json
 import os
 import time
-from typing import Any, Dict, Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
 
-import portalocker
+from .database_journal import CounterJournal
+from .database_sqlite import SqliteStorage
+from .database_storage import COUNTERS, JsonStorage, Operation, apply_operation
+from .global_settings import GITCACHE_DB_BACKEND, GITCACHE_DIR
 
-from .global_settings import GITCACHE_DB, GITCACHE_DB_LOCK, GITCACHE_DIR
+# -----------------------------------------------------------------------------
+# Constants
+# -----------------------------------------------------------------------------
+# The last-access-time is written at most once within this number of seconds
+ACCESS_TIME_RESOLUTION = 60.0
+
+# Weight of a new sample in the moving averages of the mirror history
+HISTORY_WEIGHT = 0.3
+
+
+# -----------------------------------------------------------------------------
+# Function Definitions
+# -----------------------------------------------------------------------------
+def moving_average(average: Optional[float], sample: float) -> float:
+    """Add a sample to an exponential moving average.
+
+    Args:
+        average (float): The current average or None if there is no sample yet.
+        sample (float):  The new sample.
+
+    Return:
+        Returns the new average.
+    """
+    if average is None:
+        return float(sample)
+    return average + HISTORY_WEIGHT * (sample - average)
 
 
 # -----------------------------------------------------------------------------
@@ -39,20 +90,68 @@ class Database:
 
       - :code:`url` with the upstream URL
       - :code:`last-update-time` with the time of the last mirror update.
+      - :code:`last-access-time` with the time the mirror was last used by a
+        clone, fetch, pull or ls-remote command.
+      - :code:`disk-usage` with the disk space used by the mirror in bytes.
+      - :code:`access-interval` with the moving average of the time between two
+        accesses of the mirror in seconds.
+      - :code:`last-change-time` with the time an update of the mirror found
+        the upstream repository changed for the last time.
+      - :code:`change-interval` with the moving average of the time between two
+        changes of the upstream repository in seconds.
+      - :code:`fetch-size` with the moving average of the bytes fetched by an
+        update of the mirror.
       - :code:`mirror-updates` as a counter of the number of updates of the mirror.
       - :code:`lfs-updates` as a counter of the number of lfs-updates of the mirror.
       - :code:`clones` as a counter of the number of clones from the mirror.
       - :code:`updates` as a counter of the number of updates from the mirror.
 
     Attributes:
-        database (map): A map of repository paths to the per-repository entries.
+        database (map): A map of repository paths to the per-repository entries
+                        as returned by the last call of :meth:`get_all`.
+        storage (obj):  The storage backend.
     """
 
-    def __init__(self) -> None:
-        """Construct a new Database object."""
+    def __init__(self, backend: Optional[str] = None) -> None:
+        """Construct a new Database object.
+
+        Args:
+            backend (str): The storage backend 'json' or 'sqlite'. If not given,
+                           the global setting GITCACHE_DB_BACKEND is used.
+        """
         self.database: Dict[str, Dict[str, Any]] = {}
+        self._pending: Optional[List[Operation]] = None
         os.makedirs(GITCACHE_DIR, exist_ok=True)
 
+        if (backend or GITCACHE_DB_BACKEND) == "sqlite":
+            self.storage: Any = SqliteStorage()
+        else:
+            self.storage = JsonStorage()
+
+    @contextmanager
+    def transaction(self) -> Iterator["Database"]:
+        """Collect counter increments and access time updates and commit them at once.
+
+        Within the transaction, these modifications are visible to the getters of
+        this object, but they are written to the storage only when the outermost
+        transaction ends, even if it ends with an exception. Nested transactions
+        are merged into the outermost one.
+
+        Return:
+            Returns a context manager yielding this database object.
+        """
+        if self._pending is not None:
+            yield self
+            return
+
+        self._pending = []
+        try:
+            yield self
+        finally:
+            operations, self._pending = self._pending, None
+            if operations:
+                self.storage.apply(operations)
+
     def add(self, url: str, path: str) -> None:
         """Add a new entry to the database.
 
@@ -60,17 +159,10 @@ class Database:
             url (str):  The upstream repository URL.
             path (str): The path of the repository mirror.
         """
-        with portalocker.Lock(GITCACHE_DB_LOCK):
-            self._load()
-            self.database[path] = {
-                "url": url,
-                "last-update-time": time.time(),
-                "mirror-updates": 0,
-                "lfs-updates": 0,
-                "clones": 0,
-                "updates": 0,
-            }
-            self._save()
+        now = time.time()
+        entry: Dict[str, Any] = {"url": url, "last-update-time": now, "last-access-time": now}
+        entry.update({counter: 0 for counter in COUNTERS})
+        self._apply([Operation("add", path, entry)])
 
     def remove(self, path: str) -> None:
         """Remove an entry from the database.
@@ -78,35 +170,98 @@ class Database:
         Args:
             path (str): The path of the repository mirror.
         """
-        with portalocker.Lock(GITCACHE_DB_LOCK):
-            self._load()
-            del self.database[path]
-            self._save()
+        self._apply([Operation("remove", path, {})])
 
-    def save_update_time(self, path: str) -> None:
+    def save_update_time(self, path: str, fetched: bool = True) -> None:
         """Save the current time as the last-update-time of the mirror.
 
+        Args:
+            path (str):     The path of the repository mirror.
+            fetched (bool): If set to True, the mirror was fetched and the
+                            'mirror-updates' counter is incremented. Set it
+                            to False if the upstream repository was found
+                            unchanged.
+        """
+        self._apply([Operation("set", path, {"last-update-time": time.time()})])
+        if fetched:
+            self._apply([Operation("increment", path, {"mirror-updates": 1})], deferrable=True)
+
+    def save_access_time(self, path: str) -> None:
+        """Save the current time as the last-access-time of the mirror.
+
+        To avoid a database write for every use of a mirror, the time is only
+        saved if the stored time is older than :code:`ACCESS_TIME_RESOLUTION`.
+
         Args:
             path (str): The path of the repository mirror.
         """
-        with portalocker.Lock(GITCACHE_DB_LOCK):
-            self._load()
-            self.database[path]["last-update-time"] = time.time()
-            self.database[path]["mirror-updates"] = self.database[path]["mirror-updates"] + 1
-            self._save()
+        entry = self.get(path)
+        now = time.time()
+        if entry and now - entry.get("last-access-time", 0.0) >= ACCESS_TIME_RESOLUTION:
+            fields: Dict[str, Any] = {"last-access-time": now}
+            if "last-access-time" in entry:
+                fields["access-interval"] = moving_average(
+                    entry.get("access-interval"), now - entry["last-access-time"]
+                )
+            self._apply([Operation("set", path, fields)], deferrable=True)
+
+    def save_disk_usage(self, path: str, disk_usage: int) -> None:
+        """Save the disk space used by the mirror.
+
+        Args:
+            path (str):       The path of the repository mirror.
+            disk_usage (int): The used disk space in bytes.
+        """
+        self.save_disk_usages({path: disk_usage})
+
+    def save_disk_usages(self, disk_usages: Dict[str, int]) -> None:
+        """Save the disk space used by several mirrors in a single write.
+
+        Args:
+            disk_usages (map): A map of the paths of the repository mirrors to
+                               their used disk space in bytes.
+        """
+        if disk_usages:
+            self._apply([Operation("set", path, {"disk-usage": size}) for path, size in disk_usages.items()])
+
+    def save_fetch_result(self, path: str, changed: bool, fetched_bytes: int) -> None:
+        """Save the result of an update of the mirror in the history of the mirror.
+
+        Args:
+            path (str):          The path of the repository mirror.
+            changed (bool):      True if the upstream repository changed since the last update.
+            fetched_bytes (int): The number of bytes fetched by the update.
+        """
+        entry = self.get(path)
+        if not entry:
+            return
+
+        now = time.time()
+        fields: Dict[str, Any] = {"fetch-size": moving_average(entry.get("fetch-size"), fetched_bytes)}
+        last_change_time = entry.get("last-change-time")
+        if last_change_time is None:
+            # The first update only gives the start of the history
+            fields["last-change-time"] = now
+        elif changed:
+            fields["change-interval"] = moving_average(entry.get("change-interval"), now - last_change_time)
+            fields["last-change-time"] = now
+        elif now - last_change_time > entry.get("change-interval", 0.0):
+            # The upstream repository changes less often than estimated
+            fields["change-interval"] = moving_average(entry.get("change-interval"), now - last_change_time)
+        self._apply([Operation("set", path, fields)])
 
     def increment_counter(self, path: str, counter: str) -> None:
         """Increment a counter of a mirror.
 
+        The increment is appended to the counter journal of this process
+        without taking the database lock.
+
         Args:
             path (str):    The path of the repository mirror.
             counter (str): The counter to increment. Use one of 'mirror-updates', 'lfs-updates',
                            'clones' or 'updates'.
         """
-        with portalocker.Lock(GITCACHE_DB_LOCK):
-            self._load()
-            self.database[path][counter] = self.database[path][counter] + 1
-            self._save()
+        CounterJournal.record(path, counter)
 
     def clear_counters(self, path: str) -> None:
         """Clear all counters of a mirror.
@@ -114,26 +269,75 @@ class Database:
         Args:
             path (str):    The path of the repository mirror.
         """
-        with portalocker.Lock(GITCACHE_DB_LOCK):
-            self._load()
-            for counter in ["mirror-updates", "lfs-updates", "clones", "updates"]:
-                self.database[path][counter] = 0
-            self._save()
+        CounterJournal.clear(path)
+        self._apply([Operation("set", path, {counter: 0 for counter in COUNTERS})], deferrable=True)
+
+    def compact(self) -> None:
+        """Fold the counter journals of all finished processes into the database.
+
+        The increments are written together with the ID of the fold, so that
+        the journals of an interrupted fold are not folded a second time.
+        """
+        with CounterJournal.claim_finished(self._is_folded) as (fold_id, counters):
+            if counters:
+                fields = {"fold-id": fold_id, "pending": sorted(CounterJournal.get_fold_ids())}
+                self.storage.apply(
+                    [Operation("fold", path, dict(fields, counters=counts)) for path, counts in counters.items()]
+                )
+
+    def _is_folded(self, fold_id: str, counters: Dict[str, Dict[str, int]]) -> bool:
+        """Check if a fold of the counter journals was written to the database.
+
+        Args:
+            fold_id (str):  The ID of the fold.
+            counters (map): The map of repository paths to counter increments of the fold.
+
+        Return:
+            Returns True if the fold was written or none of its mirrors exists.
+        """
+        for path in counters:
+            entry = self.storage.load_entry(path)
+            if entry is not None:
+                return fold_id in (entry.get("journal-folds") or "").split()
+        return True
+
+    def get_statistics(self) -> Dict[str, Dict[str, Any]]:
+        """Get the whole database including the counters of all journals.
+
+        Return:
+            Returns the whole database with the counter increments of the
+            running processes applied.
+        """
+        self.compact()
+        database = dict(self.get_all())
+        for path, fields in CounterJournal.read_active().items():
+            apply_operation(database, Operation("increment", path, fields))
+        return database
 
     def get_all(self) -> Dict[str, Dict[str, Any]]:
         """Get the whole database.
 
+        The pending modifications of a transaction and the counter increments
+        of this process are included.
+
         Return:
             Returns the whole database.
         """
-        with portalocker.Lock(GITCACHE_DB_LOCK):
-            self._load()
-
+        self.database = self.storage.load()
+        overlay = list(self._pending or [])
+        overlay += [Operation("increment", path, fields) for path, fields in CounterJournal.get_counts().items()]
+        if overlay:
+            self.database = dict(self.database)
+            for operation in overlay:
+                apply_operation(self.database, operation)
         return self.database
 
     def get(self, path: str) -> Optional[Dict[str, Any]]:
         """Get the database entry for the given repository path.
 
+        Only the entry of the given path is loaded from the storage, so that
+        the time of a lookup does not grow with the number of mirrors.
+
         Args:
             path (str): The path of the repository mirror.
 
@@ -141,12 +345,17 @@ class Database:
             Returns the database entry for the given path or None if the specified
             path is not in the database.
         """
-        self.get_all()
-
-        if path in self.database:
-            return self.database[path]
-
-        return None
+        entry = self.storage.load_entry(path)
+        overlay = [operation for operation in self._pending or [] if operation.path == path]
+        counts = CounterJournal.get_counts(path).get(path)
+        if counts:
+            overlay.append(Operation("increment", path, counts))
+        if overlay:
+            database = {path: entry} if entry is not None else {}
+            for operation in overlay:
+                apply_operation(database, operation)
+            entry = database.get(path)
+        return entry
 
     def get_url_for_path(self, path: str) -> Optional[str]:
         """Get the url for the given path.
@@ -177,35 +386,21 @@ class Database:
             return time.time() - entry["last-update-time"]
         return 0.0
 
-    def _load(self) -> None:
-        """Load the database from disc."""
-        self.database = {}
-
-        if os.path.exists(GITCACHE_DB):
-            with open(GITCACHE_DB, "r", encoding="utf-8") as handle:
-                database = json.load(handle)
-                for path in database:
-                    database[path].setdefault("lfs-updates", 0)
-
-                # Internal database uses absolute paths
-                for key, entry in database.items():
-                    if not os.path.isabs(key):
-                        path = os.path.normpath(os.path.join(GITCACHE_DIR, key))
-                    else:
-                        path = key
-                    self.database[path] = entry
-
-    def _save(self) -> None:
-        """Save the database to disc."""
-        # Convert keys to relative paths
-        database = {}
-        for key, entry in self.database.items():
-            database[os.path.relpath(key, GITCACHE_DIR)] = entry
-
-        tmp_filename = GITCACHE_DB + ".new"
-        with open(tmp_filename, "w", encoding="utf-8") as handle:
-            json.dump(database, handle)
-        os.replace(tmp_filename, GITCACHE_DB)
+    def _apply(self, operations: List[Operation], deferrable: bool = False) -> None:
+        """Apply the given operations using the storage backend.
+
+        Within a transaction, deferrable operations are only collected to be
+        applied at the end of the transaction.
+
+        Args:
+            operations (list): The operations to apply.
+            deferrable (bool): Set to True for counter and access time updates
+                               that can be deferred to the end of a transaction.
+        """
+        if self._pending is not None and deferrable:
+            self._pending.extend(operations)
+        else:
+            self.storage.apply(operations)
 
 
 # -----------------------------------------------------------------------------
@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+"""
+Append-only journal of the statistics counters of the gitcache database.
+
+The counters of the database (e.g., :code:`clones`) are pure statistics. To
+avoid taking the global database lock for every increment, each process appends
+its increments to its own journal file in the directory
+:code:`GITCACHE_DB_JOURNAL`. Each increment is a single JSON line written by a
+single :code:`write` call to a file opened with :code:`O_APPEND`.
+
+A process keeps its journal file locked exclusively as long as it is running.
+The journal files of finished processes are therefore those that can be locked
+by another process. They are folded into the database by
+:meth:`git_cache.database.Database.compact` and removed afterwards.
+
+Each fold has a unique ID. Before the increments are written to the database,
+the claimed journal files are renamed to carry this ID, and the ID is written
+to the database together with the increments. If the fold is interrupted,
+e.g., as the process is killed, the next fold checks whether the ID of the
+interrupted fold is in the database and either only removes its journal files
+or folds them again, so that no increment is counted twice. On Windows, open
+files can't be renamed, so that an increment of an interrupted fold might be
+counted twice.
+
+Copyright:
+    2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of gitcache (https://github.com/seeraven/gitcache)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import IO, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import portalocker
+
+from .database_storage import ON_WINDOWS
+from .global_settings import GITCACHE_DB_JOURNAL, GITCACHE_DIR
+
+# -----------------------------------------------------------------------------
+# Logger
+# -----------------------------------------------------------------------------
+LOG = logging.getLogger(__name__)
+
+
+# -----------------------------------------------------------------------------
+# Constants
+# -----------------------------------------------------------------------------
+JOURNAL_SUFFIX = ".journal"
+FOLDING_SUFFIX = ".folding"
+_EMPTY_JOURNAL_MAX_AGE = 3600.0
+
+
+# -----------------------------------------------------------------------------
+# Type Definitions
+# -----------------------------------------------------------------------------
+Counters = Dict[str, Dict[str, int]]
+
+
+# -----------------------------------------------------------------------------
+# Functions
+# -----------------------------------------------------------------------------
+def add_counters(counters: Counters, path: str, counter: str, amount: int) -> None:
+    """Add an amount to a counter of a map of counters.
+
+    Args:
+        counters (map): The map of repository paths to counter increments.
+        path (str):     The absolute path of the repository mirror.
+        counter (str):  The name of the counter.
+        amount (int):   The amount to add.
+    """
+    entry = counters.setdefault(path, {})
+    entry[counter] = entry.get(counter, 0) + amount
+
+
+def _get_fold_id(filename: str) -> str:
+    """Get the ID of the fold from the name of a journal file being folded."""
+    return os.path.basename(filename).split(".")[1]
+
+
+def _parse_records(counters: Counters, content: bytes) -> None:
+    """Parse the records of a journal file and add them to the given counters.
+
+    Incomplete or invalid records, e.g., written by a crashed process, are
+    ignored.
+
+    Args:
+        counters (map):  The map of repository paths to counter increments.
+        content (bytes): The content of the journal file.
+    """
+    for line in content.splitlines():
+        try:
+            record = json.loads(line)
+            path = os.path.normpath(os.path.join(GITCACHE_DIR, record["path"]))
+            add_counters(counters, path, record["counter"], int(record["amount"]))
+        except (ValueError, KeyError, TypeError):
+            LOG.debug("Ignoring invalid journal record %r.", line)
+
+
+# -----------------------------------------------------------------------------
+# Class Definitions
+# -----------------------------------------------------------------------------
+class CounterJournal:
+    """The counter journal of the current process.
+
+    The journal file is shared by all users and threads within the process
+    and is created on the first record.
+
+    Attributes:
+        counts (map): The counter increments recorded by this process.
+    """
+
+    counts: Counters = {}
+    _handle: Optional[IO[bytes]] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def record(cls, path: str, counter: str, amount: int = 1) -> None:
+        """Append a counter increment to the journal.
+
+        Args:
+            path (str):    The absolute path of the repository mirror.
+            counter (str): The name of the counter.
+            amount (int):  The amount to add.
+        """
+        record = {"path": os.path.relpath(path, GITCACHE_DIR), "counter": counter, "amount": amount}
+        with cls._lock:
+            if cls._handle is None:
+                cls._handle = cls._open()
+            os.write(cls._handle.fileno(), (json.dumps(record) + "\n").encode("utf-8"))
+            add_counters(cls.counts, path, counter, amount)
+
+    @classmethod
+    def get_counts(cls, path: Optional[str] = None) -> Counters:
+        """Get a copy of the counter increments recorded by this process.
+
+        Args:
+            path (str): If given, only the counter increments of this mirror
+                        are returned.
+
+        Return:
+            Returns the map of repository paths to counter increments.
+        """
+        with cls._lock:
+            if path is not None:
+                return {path: dict(cls.counts[path])} if path in cls.counts else {}
+            return {mirror: dict(fields) for mirror, fields in cls.counts.items()}
+
+    @classmethod
+    def clear(cls, path: str) -> None:
+        """Revert all counter increments recorded by this process for a mirror.
+
+        Args:
+            path (str): The absolute path of the repository mirror.
+        """
+        for counter, amount in cls.get_counts(path).get(path, {}).items():
+            if amount:
+                cls.record(path, counter, -amount)
+
+    @classmethod
+    def read_active(cls) -> Counters:
+        """Read the journals of all other running processes.
+
+        Return:
+            Returns the map of repository paths to counter increments.
+        """
+        counters: Counters = {}
+        own_filename = cls._handle.name if cls._handle is not None else None
+        for filename in cls._journal_files():
+            if filename == own_filename:
+                continue
+            try:
+                with open(filename, "rb") as handle:
+                    _parse_records(counters, handle.read())
+            except OSError:
+                # Finished and folded concurrently or locked (Windows)
+                pass
+        return counters
+
+    @classmethod
+    @contextmanager
+    def claim_finished(cls, is_folded: Callable[[str, Counters], bool]) -> Iterator[Tuple[str, Counters]]:
+        """Claim the journals of all finished processes.
+
+        The claimed journal files are renamed to carry the ID of this fold and
+        stay locked until the context is left. They are removed if the context
+        is left without an exception.
+
+        The journal files of interrupted folds are claimed as well. They are
+        only removed if the given function reports that their fold was written
+        to the database, otherwise they become part of this fold.
+
+        Args:
+            is_folded (func): The function called with the ID of an interrupted
+                              fold and its counter increments. It returns True if
+                              the fold was written to the database.
+
+        Return:
+            Returns a context manager yielding the ID of this fold and the map
+            of repository paths to counter increments of the claimed journals.
+        """
+        fold_id = uuid.uuid4().hex
+        counters: Counters = {}
+        claimed: List[Tuple[str, IO[bytes]]] = []
+        try:
+            claimed.extend(cls._claim_interrupted(fold_id, is_folded, counters))
+            for filename in cls._journal_files():
+                handle = cls._claim(filename)
+                if handle is not None:
+                    _parse_records(counters, handle.read())
+                    claimed.append((cls._mark_folding(filename, fold_id), handle))
+            yield fold_id, counters
+            for filename, handle in claimed:
+                if ON_WINDOWS:
+                    # Files can't be removed as long as they are opened
+                    handle.close()
+                os.unlink(filename)
+            if claimed:
+                LOG.debug("Folded %d counter journals into the database.", len(claimed))
+        finally:
+            for _, handle in claimed:
+                handle.close()
+
+    @classmethod
+    def _claim_interrupted(
+        cls, fold_id: str, is_folded: Callable[[str, Counters], bool], counters: Counters
+    ) -> List[Tuple[str, IO[bytes]]]:
+        """Claim the journal files of interrupted folds.
+
+        The journal files of a fold not written to the database are renamed to
+        carry the ID of the new fold and their counter increments are added to
+        the given counters.
+
+        Args:
+            fold_id (str):    The ID of the new fold.
+            is_folded (func): The function checking if an interrupted fold was
+                              written to the database.
+            counters (map):   The map of repository paths to counter increments
+                              of the new fold.
+
+        Return:
+            Returns the claimed journal files and their opened handles.
+        """
+        interrupted: Dict[str, List[Tuple[str, IO[bytes]]]] = {}
+        for filename in cls._journal_files(FOLDING_SUFFIX):
+            handle = cls._claim(filename)
+            if handle is not None:
+                interrupted.setdefault(_get_fold_id(filename), []).append((filename, handle))
+
+        claimed: List[Tuple[str, IO[bytes]]] = []
+        for interrupted_id, journals in interrupted.items():
+            interrupted_counters: Counters = {}
+            for _, handle in journals:
+                _parse_records(interrupted_counters, handle.read())
+            if is_folded(interrupted_id, interrupted_counters):
+                claimed.extend(journals)
+                continue
+            claimed.extend((cls._mark_folding(filename, fold_id), handle) for filename, handle in journals)
+            for path, fields in interrupted_counters.items():
+                for counter, amount in fields.items():
+                    add_counters(counters, path, counter, amount)
+        return claimed
+
+    @classmethod
+    def get_fold_ids(cls) -> Set[str]:
+        """Get the IDs of all folds whose journal files still exist.
+
+        Return:
+            Returns the set of fold IDs.
+        """
+        return {_get_fold_id(filename) for filename in cls._journal_files(FOLDING_SUFFIX)}
+
+    @staticmethod
+    def _mark_folding(filename: str, fold_id: str) -> str:
+        """Rename a claimed journal file to carry the ID of the fold.
+
+        Args:
+            filename (str): The claimed journal file.
+            fold_id (str):  The ID of the fold.
+
+        Return:
+            Returns the new name of the journal file.
+        """
+        if ON_WINDOWS:
+            return filename
+        journal_id = os.path.basename(filename).split(".")[0]
+        new_filename = os.path.join(os.path.dirname(filename), f"{journal_id}.{fold_id}{FOLDING_SUFFIX}")
+        try:
+            os.rename(filename, new_filename)
+        except OSError as exception:
+            LOG.debug("Can't rename journal %s: %s", filename, exception)
+            return filename
+        return new_filename
+
+    @staticmethod
+    def _journal_files(suffix: str = JOURNAL_SUFFIX) -> List[str]:
+        """Get all journal files with the given suffix."""
+        try:
+            return sorted(
+                os.path.join(GITCACHE_DB_JOURNAL, filename)
+                for filename in os.listdir(GITCACHE_DB_JOURNAL)
+                if filename.endswith(suffix)
+            )
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _open() -> IO[bytes]:
+        """Create and lock the journal file of this process."""
+        os.makedirs(GITCACHE_DB_JOURNAL, exist_ok=True)
+        filename = os.path.join(GITCACHE_DB_JOURNAL, f"{os.getpid()}-{uuid.uuid4().hex}{JOURNAL_SUFFIX}")
+        # pylint: disable=consider-using-with
+        handle = open(filename, "ab", buffering=0)
+        # The lock can only be held shortly by a process checking the empty file
+        portalocker.lock(handle, portalocker.LOCK_EX)
+        return handle
+
+    @staticmethod
+    def _claim(filename: str) -> Optional[IO[bytes]]:
+        """Try to lock the journal file of a finished process.
+
+        Args:
+            filename (str): The journal file.
+
+        Return:
+            Returns the opened and locked journal file or None if the file is
+            still in use or was already claimed by another process.
+        """
+        try:
+            # pylint: disable=consider-using-with
+            handle = open(filename, "rb")
+        except OSError:
+            return None
+
+        try:
+            portalocker.lock(handle, portalocker.LOCK_EX | portalocker.LOCK_NB)
+            stat_result = os.fstat(handle.fileno())
+            if not ON_WINDOWS and os.stat(filename).st_ino != stat_result.st_ino:
+                raise FileNotFoundError(filename)
+        except (portalocker.exceptions.LockException, OSError):
+            handle.close()
+            return None
+
+        if stat_result.st_size == 0:
+            # A process has just created the file and is about to lock it, or
+            # it crashed before writing the first record.
+            handle.close()
+            if time.time() - stat_result.st_mtime > _EMPTY_JOURNAL_MAX_AGE:
+                os.unlink(filename)
+            return None
+
+        return handle
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite storage backend of the gitcache database.
+
+The database is stored in the file :code:`GITCACHE_DB_SQLITE` using the
+write-ahead log (WAL) journal mode. Readers therefore never block and are never
+blocked by a writer, and a writer only modifies the rows of the affected
+mirrors instead of rewriting the whole database.
+
+Each entry key of the database (e.g., :code:`last-update-time`) is stored in
+its own column of the table :code:`mirrors`. Columns for keys not known yet
+are added on demand.
+
+On the first use, the content of an existing JSON database :code:`GITCACHE_DB`
+is imported once. The JSON file itself is left untouched.
+
+Copyright:
+    2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of gitcache (https://github.com/seeraven/gitcache)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import logging
+import os
+import sqlite3
+from typing import Any, Dict, List, Optional, Set
+
+from .database_storage import JsonStorage, Operation, get_fold_changes
+from .global_settings import GITCACHE_DB, GITCACHE_DB_SQLITE, GITCACHE_DIR
+
+# -----------------------------------------------------------------------------
+# Logger
+# -----------------------------------------------------------------------------
+LOG = logging.getLogger(__name__)
+
+
+# -----------------------------------------------------------------------------
+# Constants
+# -----------------------------------------------------------------------------
+_BUSY_TIMEOUT = 60.0
+_FIELDS = {
+    "url": "TEXT",
+    "last-update-time": "REAL",
+    "last-access-time": "REAL",
+    "disk-usage": "INTEGER",
+    "access-interval": "REAL",
+    "last-change-time": "REAL",
+    "change-interval": "REAL",
+    "fetch-size": "REAL",
+    "mirror-updates": "INTEGER NOT NULL DEFAULT 0",
+    "lfs-updates": "INTEGER NOT NULL DEFAULT 0",
+    "clones": "INTEGER NOT NULL DEFAULT 0",
+    "updates": "INTEGER NOT NULL DEFAULT 0",
+    "journal-folds": "TEXT",
+}
+# The columns modified by a fold operation in addition to the existing counters
+_FOLD_FIELDS = {"journal-folds": None}
+
+
+# -----------------------------------------------------------------------------
+# Helpers
+# -----------------------------------------------------------------------------
+def _quote(name: str) -> str:
+    """Quote a column name for use in an SQL statement."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+# -----------------------------------------------------------------------------
+# Class Definitions
+# -----------------------------------------------------------------------------
+class SqliteStorage:
+    """Storage of the database in an SQLite database file."""
+
+    def __init__(self, filename: str = GITCACHE_DB_SQLITE) -> None:
+        """Construct a new storage object.
+
+        The database file is opened lazily on first access.
+
+        Args:
+            filename (str): The SQLite database file.
+        """
+        self.filename = filename
+        self._connection: Optional[sqlite3.Connection] = None
+        self._columns: Set[str] = set()
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Load the database.
+
+        Return:
+            Returns the map of absolute repository paths to the per-repository entries.
+        """
+        connection = self._connect()
+        database: Dict[str, Dict[str, Any]] = {}
+        for row in connection.execute("SELECT * FROM mirrors"):
+            entry = {key: row[key] for key in row.keys() if key != "path" and row[key] is not None}
+            database[os.path.normpath(os.path.join(GITCACHE_DIR, row["path"]))] = entry
+        return database
+
+    def load_entry(self, path: str) -> Optional[Dict[str, Any]]:
+        """Load a single entry of the database.
+
+        Args:
+            path (str): The absolute path of the repository mirror.
+
+        Return:
+            Returns the entry of the mirror or None if it is not in the database.
+        """
+        connection = self._connect()
+        row = connection.execute(
+            "SELECT * FROM mirrors WHERE path = ?", (os.path.relpath(path, GITCACHE_DIR),)
+        ).fetchone()
+        if row is None:
+            return None
+        return {key: row[key] for key in row.keys() if key != "path" and row[key] is not None}
+
+    def apply(self, operations: List[Operation]) -> None:
+        """Apply the given operations in a single write transaction.
+
+        Args:
+            operations (list): The operations to apply.
+        """
+        connection = self._connect()
+        for operation in operations:
+            self._ensure_columns(connection, operation.fields if operation.kind != "fold" else _FOLD_FIELDS)
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for operation in operations:
+                self._execute(connection, operation)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def close(self) -> None:
+        """Close the database connection."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    @staticmethod
+    def _execute(connection: sqlite3.Connection, operation: Operation) -> None:
+        """Execute a single operation within a transaction.
+
+        Args:
+            connection (obj): The database connection.
+            operation (obj):  The operation to apply.
+        """
+        path = os.path.relpath(operation.path, GITCACHE_DIR)
+        fields = list(operation.fields)
+
+        if operation.kind == "add":
+            columns = ", ".join(["path"] + [_quote(field) for field in fields])
+            placeholders = ", ".join(["?"] * (len(fields) + 1))
+            connection.execute(
+                f"INSERT OR REPLACE INTO mirrors ({columns}) VALUES ({placeholders})",
+                [path] + [operation.fields[field] for field in fields],
+            )
+        elif operation.kind == "remove":
+            connection.execute("DELETE FROM mirrors WHERE path = ?", (path,))
+        elif operation.kind == "set" and fields:
+            assignments = ", ".join(f"{_quote(field)} = ?" for field in fields)
+            connection.execute(
+                f"UPDATE mirrors SET {assignments} WHERE path = ?",
+                [operation.fields[field] for field in fields] + [path],
+            )
+        elif operation.kind == "fold":
+            row = connection.execute("SELECT * FROM mirrors WHERE path = ?", (path,)).fetchone()
+            if row is not None:
+                entry = {key: row[key] for key in row.keys() if row[key] is not None}
+                changes = get_fold_changes(entry, operation.fields)
+                assignments = ", ".join(f"{_quote(field)} = ?" for field in changes)
+                connection.execute(f"UPDATE mirrors SET {assignments} WHERE path = ?", list(changes.values()) + [path])
+        elif operation.kind == "increment" and fields:
+            assignments = ", ".join(f"{_quote(field)} = COALESCE({_quote(field)}, 0) + ?" for field in fields)
+            connection.execute(
+                f"UPDATE mirrors SET {assignments} WHERE path = ?",
+                [operation.fields[field] for field in fields] + [path],
+            )
+
+    def _ensure_columns(self, connection: sqlite3.Connection, fields: Dict[str, Any]) -> None:
+        """Add the columns for entry keys that are not known yet.
+
+        Args:
+            connection (obj): The database connection.
+            fields (map):     The fields of an operation.
+        """
+        for field in fields:
+            if field not in self._columns:
+                try:
+                    connection.execute(f"ALTER TABLE mirrors ADD COLUMN {_quote(field)} {_FIELDS.get(field, '')}")
+                except sqlite3.OperationalError as exception:
+                    # Only a column added concurrently by another process is fine
+                    if "duplicate column name" not in str(exception):
+                        raise
+                self._columns.add(field)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database connection and ensure the schema exists.
+
+        Return:
+            Returns the database connection.
+        """
+        if self._connection is not None:
+            return self._connection
+
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        connection = sqlite3.connect(self.filename, timeout=_BUSY_TIMEOUT, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            columns = ", ".join(f"{_quote(field)} {sql_type}" for field, sql_type in _FIELDS.items())
+            connection.execute(f"CREATE TABLE IF NOT EXISTS mirrors (path TEXT PRIMARY KEY, {columns})")
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._columns = {row["name"] for row in connection.execute("PRAGMA table_info(mirrors)")}
+            if connection.execute("SELECT value FROM meta WHERE key = 'json-migrated'").fetchone() is None:
+                self._migrate_json(connection)
+                connection.execute("INSERT INTO meta (key, value) VALUES ('json-migrated', '1')")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            connection.close()
+            raise
+
+        self._connection = connection
+        return connection
+
+    def _migrate_json(self, connection: sqlite3.Connection) -> None:
+        """Import the entries of an existing JSON database.
+
+        Args:
+            connection (obj): The database connection within an open transaction.
+        """
+        if not os.path.exists(GITCACHE_DB):
+            return
+
+        database = JsonStorage().load()
+        LOG.info("Migrating %d mirror entries from %s to %s.", len(database), GITCACHE_DB, self.filename)
+        for path, entry in database.items():
+            self._ensure_columns(connection, entry)
+            self._execute(connection, Operation("add", path, entry))
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Storage primitives of the gitcache database.
+
+This module contains the modification operations of the database and the
+default storage backend keeping the whole database in a single JSON file.
+
+As the JSON file is always published atomically using :code:`os.replace`, it
+can be read without taking the database lock (except on Windows, where a file
+opened by a reader can't be replaced). The parsed content is kept as an
+in-process snapshot that is reused as long as the identity (device, inode,
+modification time and size) of the file does not change.
+
+Copyright:
+    2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of gitcache (https://github.com/seeraven/gitcache)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import json
+import logging
+import os
+import platform
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import portalocker
+
+from .global_settings import GITCACHE_DB, GITCACHE_DB_LOCK, GITCACHE_DIR
+
+# -----------------------------------------------------------------------------
+# Logger
+# -----------------------------------------------------------------------------
+LOG = logging.getLogger(__name__)
+
+
+# -----------------------------------------------------------------------------
+# Constants
+# -----------------------------------------------------------------------------
+ON_WINDOWS = platform.system().lower().startswith("win")
+COUNTERS = ["mirror-updates", "lfs-updates", "clones", "updates"]
+
+
+# -----------------------------------------------------------------------------
+# Type Definitions
+# -----------------------------------------------------------------------------
+FileKey = Optional[Tuple[int, int, int, int]]
+
+
+class Operation(NamedTuple):
+    """A single modification of the database.
+
+    Attributes:
+        kind (str):    The kind of modification. One of 'add' (create or replace
+                       the entry with the given fields), 'remove' (delete the entry),
+                       'set' (set the given fields), 'increment' (add the given
+                       amounts to the given counters) or 'fold' (add the counters
+                       of a fold of the counter journals, see :func:`get_fold_changes`).
+        path (str):    The absolute path of the repository mirror.
+        fields (map):  The fields of the modification.
+    """
+
+    kind: str
+    path: str
+    fields: Dict[str, Any]
+
+
+# -----------------------------------------------------------------------------
+# Functions
+# -----------------------------------------------------------------------------
+def get_fold_changes(entry: Dict[str, Any], fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Get the fields of an entry modified by a fold of the counter journals.
+
+    The counters are incremented and the ID of the fold is added to the
+    space separated list of folds under the key 'journal-folds'. Only the IDs
+    of folds whose journal files still exist are kept in the list.
+
+    Args:
+        entry (map):  The entry of the repository mirror.
+        fields (map): The fields of the fold operation: The increments of the
+                      counters under the key 'counters', the ID of the fold
+                      under the key 'fold-id' and the IDs of all folds with
+                      existing journal files under the key 'pending'.
+
+    Return:
+        Returns the map of modified fields.
+    """
+    changes = {counter: entry.get(counter, 0) + amount for counter, amount in fields["counters"].items()}
+    folds = [fold_id for fold_id in (entry.get("journal-folds") or "").split() if fold_id in fields["pending"]]
+    changes["journal-folds"] = " ".join(folds + [fields["fold-id"]])
+    return changes
+
+
+def apply_operation(database: Dict[str, Dict[str, Any]], operation: Operation) -> None:
+    """Apply a single operation to an in-memory database map.
+
+    Operations other than 'add' on paths that are not in the database are
+    silently ignored, e.g., when a mirror was deleted concurrently. Modified
+    entries are replaced by new entry maps instead of being changed in place,
+    so the given map can be a shallow copy of a shared snapshot.
+
+    Args:
+        database (map):  The map of repository paths to the per-repository entries.
+        operation (obj): The operation to apply.
+    """
+    if operation.kind == "add":
+        database[operation.path] = dict(operation.fields)
+    elif operation.kind == "remove":
+        database.pop(operation.path, None)
+    elif operation.path in database:
+        entry = dict(database[operation.path])
+        if operation.kind == "set":
+            entry.update(operation.fields)
+        elif operation.kind == "increment":
+            for counter, amount in operation.fields.items():
+                entry[counter] = entry.get(counter, 0) + amount
+        elif operation.kind == "fold":
+            entry.update(get_fold_changes(entry, operation.fields))
+        database[operation.path] = entry
+
+
+def log_snapshot_statistics() -> None:
+    """Log how many database loads were served from the in-process snapshot."""
+    if JsonStorage.num_loads or JsonStorage.num_reuses:
+        LOG.debug(
+            "Database was parsed %d times, %d reloads were avoided by the snapshot cache.",
+            JsonStorage.num_loads,
+            JsonStorage.num_reuses,
+        )
+
+
+# -----------------------------------------------------------------------------
+# Class Definitions
+# -----------------------------------------------------------------------------
+class JsonStorage:
+    """Storage of the database as a single JSON file.
+
+    The snapshot of the parsed database is shared by all instances of this
+    class within the process. It must not be modified by the callers. It is
+    stored along with the identity of the parsed file in a single attribute,
+    so that threads always see a consistent pair.
+
+    Attributes:
+        num_loads (int):  The number of times the database file was parsed.
+        num_reuses (int): The number of loads served from the snapshot.
+    """
+
+    num_loads = 0
+    num_reuses = 0
+    _snapshot: Tuple[FileKey, Dict[str, Dict[str, Any]]] = (None, {})
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Load the database from disc or reuse the snapshot if the file is unchanged.
+
+        Return:
+            Returns the map of absolute repository paths to the per-repository entries.
+        """
+        if ON_WINDOWS:
+            with portalocker.Lock(GITCACHE_DB_LOCK):
+                return self._load()
+        return self._load()
+
+    def load_entry(self, path: str) -> Optional[Dict[str, Any]]:
+        """Load a single entry of the database.
+
+        Args:
+            path (str): The absolute path of the repository mirror.
+
+        Return:
+            Returns the entry of the mirror or None if it is not in the database.
+        """
+        return self.load().get(path)
+
+    def apply(self, operations: List[Operation]) -> None:
+        """Apply the given operations in one locked read-modify-write cycle.
+
+        Args:
+            operations (list): The operations to apply.
+        """
+        with portalocker.Lock(GITCACHE_DB_LOCK):
+            database = dict(self._load())
+            for operation in operations:
+                apply_operation(database, operation)
+            self._save(database)
+
+    @staticmethod
+    def _file_key(stat_result: os.stat_result) -> FileKey:
+        """Get the identity of a database file used to validate the snapshot."""
+        return (stat_result.st_dev, stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+
+    @classmethod
+    def _load(cls) -> Dict[str, Dict[str, Any]]:
+        """Load the database from disc without locking."""
+        snapshot_key, snapshot = cls._snapshot
+        try:
+            if snapshot_key is not None and cls._file_key(os.stat(GITCACHE_DB)) == snapshot_key:
+                cls.num_reuses += 1
+                return snapshot
+
+            with open(GITCACHE_DB, "r", encoding="utf-8") as handle:
+                # The identity of the opened file matches exactly the parsed content
+                file_key = cls._file_key(os.fstat(handle.fileno()))
+                raw_database = json.load(handle)
+        except FileNotFoundError:
+            cls._snapshot = (None, {})
+            return cls._snapshot[1]
+
+        # Internal database uses absolute paths
+        database: Dict[str, Dict[str, Any]] = {}
+        for key, entry in raw_database.items():
+            entry.setdefault("lfs-updates", 0)
+            if not os.path.isabs(key):
+                path = os.path.normpath(os.path.join(GITCACHE_DIR, key))
+            else:
+                path = key
+            database[path] = entry
+
+        cls.num_loads += 1
+        cls._snapshot = (file_key, database)
+        return database
+
+    @classmethod
+    def _save(cls, database: Dict[str, Dict[str, Any]]) -> None:
+        """Save the database to disc without locking."""
+        # Convert keys to relative paths
+        raw_database = {}
+        for key, entry in database.items():
+            raw_database[os.path.relpath(key, GITCACHE_DIR)] = entry
+
+        tmp_filename = GITCACHE_DB + ".new"
+        with open(tmp_filename, "w", encoding="utf-8") as handle:
+            json.dump(raw_database, handle)
+            handle.flush()
+            file_key = cls._file_key(os.fstat(handle.fileno()))
+        os.replace(tmp_filename, GITCACHE_DB)
+
+        # The written content becomes the new snapshot
+        cls._snapshot = (file_key, database)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
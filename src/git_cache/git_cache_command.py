@@ -23,11 +23,24 @@ import logging
 
 from .commands.cleanup import git_cleanup
 from .commands.delete import git_delete_mirror
+from .commands.maintain import git_maintain_mirrors
 from .commands.update_all import git_update_all_mirrors
-from .config import Config
+from .commands.update_scheduled import git_update_scheduled
+from .config import get_config
+from .daemon import serve
 from .database import Database
-from .global_settings import GITCACHE_DB, GITCACHE_DB_LOCK, GITCACHE_DIR
+from .git_mirror import GitMirror
+from .global_settings import (
+    GITCACHE_DB,
+    GITCACHE_DB_BACKEND,
+    GITCACHE_DB_JOURNAL,
+    GITCACHE_DB_LOCK,
+    GITCACHE_DB_SQLITE,
+    GITCACHE_DIR,
+    GITCACHE_TOOL_CACHE,
+)
 from .invocation_log import set_mode_admin
+from .trash import empty_trash
 
 # -----------------------------------------------------------------------------
 # Logger
@@ -65,7 +78,41 @@ def get_parser():
 
     parser.add_argument("--version", help="Print the version of gitcache.", action="store_true", default=False)
     parser.add_argument("-c", "--cleanup", help="Remove all outdated repositories.", action="store_true", default=False)
+    parser.add_argument(
+        "--dry-run",
+        help="Show the mirrors that would be removed by --cleanup or updated by --update-scheduled "
+        "without removing or updating them.",
+        action="store_true",
+        default=False,
+    )
     parser.add_argument("-u", "--update-all", help="Update all mirrors.", action="store_true", default=False)
+    parser.add_argument(
+        "--update-scheduled",
+        help="Update the mirrors selected by the scheduler within the budget of one cycle.",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--maintain",
+        help="Maintain the mirrors that fetched new data since their last maintenance.",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--serve",
+        help="Run the gitcache daemon executing the mirror updates of all gitcache calls.",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        metavar="JOBS",
+        type=int,
+        help="Number of mirrors to update in parallel when used with --update-all or --update-scheduled. "
+        "If not specified, the configuration option Update/Jobs is used.",
+        default=None,
+    )
     parser.add_argument(
         "-d",
         "--delete",
@@ -75,11 +122,45 @@ def get_parser():
         action="append",
         default=[],
     )
+    # Used by the detached process removing the deleted mirrors
+    parser.add_argument("--empty-trash", help=argparse.SUPPRESS, action="store_true", default=False)
+    # Used by the detached process refreshing a stale mirror
+    parser.add_argument("--refresh-mirror", help=argparse.SUPPRESS, default=None)
+    parser.add_argument("--refresh-ref", help=argparse.SUPPRESS, default=None)
     parser.add_argument("-s", "--show-statistics", help="Show the statistics.", action="store_true", default=False)
     parser.add_argument("-z", "--zero-statistics", help="Clear the statistics.", action="store_true", default=False)
     return parser
 
 
+def show_statistics() -> None:
+    """Print the statistics of all mirrors."""
+    all_records = Database().get_statistics()
+    total_mirror_updates = 0
+    total_mirror_lfs_updates = 0
+    total_clones = 0
+    total_updates = 0
+
+    for path in sorted(all_records):
+        print(f"Mirror of {all_records[path]['url']}:")
+        print(f"  Mirror Updates:       {all_records[path]['mirror-updates']}")
+        print(f"  Mirror Updates (LFS): {all_records[path]['lfs-updates']}")
+        print(f"  Clones from Mirror:   {all_records[path]['clones']}")
+        print(f"  Updates from Mirror:  {all_records[path]['updates']}")
+        print()
+        total_mirror_updates += all_records[path]["mirror-updates"]
+        total_mirror_lfs_updates += all_records[path]["lfs-updates"]
+        total_clones += all_records[path]["clones"]
+        total_updates += all_records[path]["updates"]
+
+    print("Total:")
+    print(f"  Mirror Updates:       {total_mirror_updates}")
+    print(f"  Mirror Updates (LFS): {total_mirror_lfs_updates}")
+    print(f"  Clones from Mirror:   {total_clones}")
+    print(f"  Updates from Mirror:  {total_updates}")
+    print()
+
+
+# pylint: disable=too-many-branches
 def git_cache():
     """Execute the main function if called as :code:`gitcache`.
 
@@ -95,58 +176,64 @@ def git_cache():
         print(f"gitcache v{GITCACHE_VERSION}")
         return True
 
+    if args.serve:
+        return serve() == 0
+
     if args.cleanup:
-        success = git_cleanup() == 0
+        success = git_cleanup(args.dry_run) == 0
+
+    if args.update_scheduled:
+        success = git_update_scheduled(args.jobs, args.dry_run) == 0
 
     if args.update_all:
-        success = git_update_all_mirrors() == 0
+        success = git_update_all_mirrors(args.jobs) == 0
 
     if args.delete:
         success = git_delete_mirror(args.delete) == 0
 
+    if args.maintain:
+        success = git_maintain_mirrors() == 0
+
+    if args.empty_trash:
+        empty_trash()
+
+    if args.refresh_mirror:
+        success = GitMirror(path=args.refresh_mirror).refresh(args.refresh_ref)
+
     if args.zero_statistics:
         database = Database()
-        for path in database.get_all():
-            database.clear_counters(path)
+        database.compact()
+        with database.transaction():
+            for path in database.get_all():
+                database.clear_counters(path)
         LOG.info("Statistics cleared.")
 
     if args.show_statistics:
-        all_records = Database().get_all()
-        total_mirror_updates = 0
-        total_mirror_lfs_updates = 0
-        total_clones = 0
-        total_updates = 0
-
-        for path in sorted(all_records):
-            print(f"Mirror of {all_records[path]['url']}:")
-            print(f"  Mirror Updates:       {all_records[path]['mirror-updates']}")
-            print(f"  Mirror Updates (LFS): {all_records[path]['lfs-updates']}")
-            print(f"  Clones from Mirror:   {all_records[path]['clones']}")
-            print(f"  Updates from Mirror:  {all_records[path]['updates']}")
-            print()
-            total_mirror_updates += all_records[path]["mirror-updates"]
-            total_mirror_lfs_updates += all_records[path]["lfs-updates"]
-            total_clones += all_records[path]["clones"]
-            total_updates += all_records[path]["updates"]
-
-        print("Total:")
-        print(f"  Mirror Updates:       {total_mirror_updates}")
-        print(f"  Mirror Updates (LFS): {total_mirror_lfs_updates}")
-        print(f"  Clones from Mirror:   {total_clones}")
-        print(f"  Updates from Mirror:  {total_updates}")
-        print()
-
-    elif not (args.cleanup or args.update_all or args.delete or args.zero_statistics):
+        show_statistics()
+
+    elif not (
+        args.cleanup
+        or args.update_all
+        or args.update_scheduled
+        or args.delete
+        or args.maintain
+        or args.zero_statistics
+        or args.empty_trash
+        or args.refresh_mirror
+    ):
         print("gitcache global settings:")
         print("-------------------------")
-        print(f"  GITCACHE_DIR      = {GITCACHE_DIR}")
-        print(f"  GITCACHE_DB       = {GITCACHE_DB}")
-        print(f"  GITCACHE_DB_LOCK  = {GITCACHE_DB_LOCK}")
+        print(f"  GITCACHE_DIR         = {GITCACHE_DIR}")
+        print(f"  GITCACHE_DB          = {GITCACHE_DB}")
+        print(f"  GITCACHE_DB_LOCK     = {GITCACHE_DB_LOCK}")
+        print(f"  GITCACHE_DB_BACKEND  = {GITCACHE_DB_BACKEND}")
+        print(f"  GITCACHE_DB_SQLITE   = {GITCACHE_DB_SQLITE}")
+        print(f"  GITCACHE_DB_JOURNAL  = {GITCACHE_DB_JOURNAL}")
+        print(f"  GITCACHE_TOOL_CACHE  = {GITCACHE_TOOL_CACHE}")
         print()
         print("gitcache configuration:")
         print("-----------------------")
-        config = Config()
-        print(config)
+        print(get_config())
 
     return success
 
@@ -17,7 +17,7 @@ Copyright:
 # -----------------------------------------------------------------------------
 import logging
 import sys
-from typing import List
+from typing import List, Optional
 
 from .command_execution import simple_call_command
 from .commands.checkout import git_checkout
@@ -33,9 +33,9 @@ from .commands.remote_add import git_remote_add
 from .commands.submodule_init import git_submodule_init
 from .commands.submodule_update import git_submodule_update
 from .commands.update_all import git_update_all_mirrors
-from .config import Config
+from .config import get_config
 from .git_options import GitOptions
-from .invocation_log import set_mode_disabled, set_mode_gitcache, set_mode_realgit
+from .invocation_log import nested_invocation, set_mode_disabled, set_mode_gitcache, set_mode_realgit
 
 # -----------------------------------------------------------------------------
 # Logger
@@ -54,7 +54,7 @@ def is_gitcache_disabled() -> bool:
     :code:`1`, :code:`true`, :code:`yes` and :code:`on` (case-insensitive) enable
     this behavior.
     """
-    config = Config()
+    config = get_config()
     return config.get("System", "Disable")
 
 
@@ -67,30 +67,67 @@ def call_real_git(args: List[str]) -> int:
     Return:
         Returns the return code of the call.
     """
-    config = Config()
+    config = get_config()
     return simple_call_command([config.get("System", "RealGit")] + args)
 
 
-# pylint: disable=too-many-branches,too-many-statements
-def handle_git_command(called_as: List[str], args: List[str]) -> None:
+def handle_git_command(args: List[str]) -> None:
     """Handle a git command.
 
     Args:
-        called_as (list): The arguments used for the command call.
         args (list):      The arguments to git.
     """
-    LOG.debug("handle_git_command(%s, %s) started", called_as, args)
+    LOG.debug("handle_git_command(%s) started", args)
 
     if is_gitcache_disabled():
         LOG.debug("gitcache disabled by configuration. Calling real git command.")
         set_mode_disabled()
         sys.exit(call_real_git(args))
 
-    git_options = GitOptions(args)
+    sys.exit(run_git_command(GitOptions(args)))
+
+
+def call_git_command(git_options: GitOptions, cwd: Optional[str] = None) -> int:
+    """Execute a git command using gitcache within the current process.
+
+    This is the internal API used by the command handlers to execute further
+    git commands, e.g., for each submodule, without starting a new gitcache
+    process. Exceptions are logged and reported as a failed command.
+
+    Args:
+        git_options (obj): The GitOptions object of the command.
+        cwd (str):         If given, the working directory of the command. It is
+                           passed on to git as the option '-C'.
+
+    Return:
+        Returns the return code of the command.
+    """
+    if cwd is not None:
+        git_options = GitOptions(["-C", cwd] + git_options.all_args)
+
+    LOG.debug("call_git_command(%s) started", git_options.all_args)
+    with nested_invocation():
+        try:
+            return run_git_command(git_options)
+        except Exception:  # pylint: disable=broad-exception-caught
+            LOG.exception("Command %s failed with an exception!", git_options.all_args)
+            return 1
+
+
+# pylint: disable=too-many-branches,too-many-statements,too-many-return-statements
+def run_git_command(git_options: GitOptions) -> int:
+    """Execute a git command using the handler of the command.
+
+    Args:
+        git_options (obj): The GitOptions object of the command.
+
+    Return:
+        Returns the return code of the command.
+    """
     if git_options.has_bail_out():
         LOG.debug("bail out")
         set_mode_realgit("bail_out")
-        sys.exit(call_real_git(args))
+        return call_real_git(git_options.all_args)
 
     LOG.debug(
         "Found global options %s, command '%s', command options '%s' and arguments %s.",
@@ -103,59 +140,59 @@ def handle_git_command(called_as: List[str], args: List[str]) -> None:
     command = git_options.get_command()
     if command == "cleanup":
         set_mode_gitcache(command)
-        sys.exit(git_cleanup())
+        return git_cleanup()
 
-    elif command == "update-mirrors":
+    if command == "update-mirrors":
         set_mode_gitcache(command)
-        sys.exit(git_update_all_mirrors())
+        return git_update_all_mirrors()
 
-    elif command == "delete-mirror":
+    if command == "delete-mirror":
         set_mode_gitcache(command)
-        sys.exit(git_delete_mirror(git_options.command_args))
+        return git_delete_mirror(git_options.command_args)
 
-    elif command == "ls-remote":
+    if command == "ls-remote":
         set_mode_gitcache(command)
-        sys.exit(git_ls_remote(git_options))
+        return git_ls_remote(git_options)
 
-    elif command == "checkout":
+    if command == "checkout":
         set_mode_gitcache(command)
-        sys.exit(git_checkout(git_options))
+        return git_checkout(git_options)
 
-    elif command == "clone":
+    if command == "clone":
         set_mode_gitcache(command)
-        sys.exit(git_clone(called_as, git_options))
+        return git_clone(git_options)
 
-    elif command == "lfs_fetch":
+    if command == "lfs_fetch":
         set_mode_gitcache(command)
-        sys.exit(git_lfs_fetch(git_options))
+        return git_lfs_fetch(git_options)
 
-    elif command == "lfs_pull":
+    if command == "lfs_pull":
         set_mode_gitcache(command)
-        sys.exit(git_lfs_pull(git_options))
+        return git_lfs_pull(git_options)
 
-    elif command == "pull":
+    if command == "pull":
         set_mode_gitcache(command)
-        sys.exit(git_pull(git_options))
+        return git_pull(git_options)
 
-    elif command == "fetch":
+    if command == "fetch":
         set_mode_gitcache(command)
-        sys.exit(git_fetch(git_options))
+        return git_fetch(git_options)
 
-    elif command == "submodule_init":
+    if command == "submodule_init":
         set_mode_gitcache(command)
-        sys.exit(git_submodule_init(git_options))
+        return git_submodule_init(git_options)
 
-    elif command == "submodule_update":
+    if command == "submodule_update":
         set_mode_gitcache(command)
-        sys.exit(git_submodule_update(called_as, git_options))
+        return git_submodule_update(git_options)
 
-    elif command == "remote_add":
+    if command == "remote_add":
         set_mode_gitcache(command)
-        sys.exit(git_remote_add(git_options))
+        return git_remote_add(git_options)
 
     LOG.debug("Command '%s' is not handled by gitcache. Calling the real git command.", git_options.get_command())
     set_mode_realgit("unhandled_command")
-    sys.exit(call_real_git(args))
+    return call_real_git(git_options.all_args)
 
 
 # -----------------------------------------------------------------------------
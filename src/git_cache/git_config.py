@@ -0,0 +1,717 @@
+# -*- coding: utf-8 -*-
+"""
+Native reader of git configuration files.
+
+Many git commands handled by gitcache need to know the remote URLs of the
+repository or the submodules listed in the :code:`.gitmodules` file. Instead of
+spawning :code:`git remote get-url` or :code:`git config` for each query, the
+configuration files are parsed directly. The reader follows the lookup of git:
+The system, global, repository and worktree configuration files are read in
+that order, :code:`[include]` and :code:`[includeIf]` sections are followed
+and the configuration given on the command line is applied last.
+
+Whenever the reader encounters something it can't handle reliably, e.g., a
+syntax error, an unsupported include condition or environment variables that
+change the configuration lookup, a :class:`GitConfigError` is raised and the
+caller falls back to calling the real git command.
+
+Copyright:
+    2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of gitcache (https://github.com/seeraven/gitcache)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import logging
+import os
+import platform
+import re
+from typing import Dict, List, Optional, Tuple
+
+from .command_execution import getstatusoutput
+from .config import get_tool_cache, set_tool_cache, str_to_bool
+from .git_options import GitOptions
+
+# -----------------------------------------------------------------------------
+# Logger
+# -----------------------------------------------------------------------------
+LOG = logging.getLogger(__name__)
+
+
+# -----------------------------------------------------------------------------
+# Constants
+# -----------------------------------------------------------------------------
+# Maximum depth of nested includes (same as MAX_INCLUDE_DEPTH of git)
+MAX_INCLUDE_DEPTH = 10
+
+# Environment variables changing the configuration lookup in unsupported ways
+UNSUPPORTED_ENV = ["GIT_CONFIG_PARAMETERS", "GIT_COMMON_DIR", "GIT_CEILING_DIRECTORIES"]
+
+_SECTION = re.compile(r'\[([A-Za-z0-9.-]+)(?:[ \t]+"((?:[^"\\\n]|\\.)*)")?\]')
+_NAME = re.compile(r"[A-Za-z][A-Za-z0-9-]*")
+_ESCAPES = {"n": "\n", "t": "\t", "b": "\b", "\\": "\\", '"': '"'}
+
+
+# -----------------------------------------------------------------------------
+# Exceptions
+# -----------------------------------------------------------------------------
+class GitConfigError(Exception):
+    """Raised if the configuration can't be handled by the native reader."""
+
+
+# -----------------------------------------------------------------------------
+# Function Definitions
+# -----------------------------------------------------------------------------
+def normalize_key(key: str) -> str:
+    """Normalize a configuration key like git does.
+
+    The section and the variable name are case-insensitive, the subsection
+    is case-sensitive.
+
+    Args:
+        key (str): The key, e.g., 'Remote.origin.URL'.
+
+    Return:
+        Returns the normalized key, e.g., 'remote.origin.url'.
+    """
+    section, _, rest = key.partition(".")
+    subsection, _, name = rest.rpartition(".")
+    if not section or not name:
+        raise GitConfigError(f"Invalid key {key}")
+    if subsection:
+        return f"{section.lower()}.{subsection}.{name.lower()}"
+    return f"{section.lower()}.{name.lower()}"
+
+
+def to_bool(value: Optional[str]) -> bool:
+    """Convert a configuration value to a boolean value like git does.
+
+    Args:
+        value (str): The value or None for a key without a value.
+
+    Return:
+        Returns the boolean value.
+    """
+    if value is None:
+        return True
+    if value.lower() in ["true", "yes", "on"]:
+        return True
+    if value.lower() in ["false", "no", "off", ""]:
+        return False
+    try:
+        return int(value) != 0
+    except ValueError as exception:
+        raise GitConfigError(f"Invalid boolean value {value}") from exception
+
+
+def wildmatch_to_regex(pattern: str, ignore_case: bool = False) -> "re.Pattern[str]":
+    """Convert a pattern of the include conditions into a regular expression.
+
+    Args:
+        pattern (str):      The pattern using the wildmatch syntax of git.
+        ignore_case (bool): Match case-insensitively.
+
+    Return:
+        Returns the compiled regular expression.
+    """
+    regex = ""
+    pos = 0
+    while pos < len(pattern):
+        char = pattern[pos]
+        at_start = pos == 0 or pattern[pos - 1] == "/"
+        if pattern.startswith("**/", pos) and at_start:
+            regex += "(?:.*/)?"
+            pos += 3
+            continue
+        if pattern.startswith("**", pos) and at_start and pos + 2 == len(pattern):
+            regex += ".*"
+            pos += 2
+            continue
+        if char == "*":
+            regex += "[^/]*"
+            while pos + 1 < len(pattern) and pattern[pos + 1] == "*":
+                pos += 1
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            raise GitConfigError(f"Unsupported pattern {pattern}")
+        elif char == "\\" and pos + 1 < len(pattern):
+            pos += 1
+            regex += re.escape(pattern[pos])
+        else:
+            regex += re.escape(char)
+        pos += 1
+    return re.compile(regex, re.IGNORECASE if ignore_case else 0)
+
+
+def _parse_value(text: str, pos: int, source: str) -> Tuple[str, int]:
+    """Parse the value of a configuration entry.
+
+    Args:
+        text (str):   The content of the configuration file.
+        pos (int):    The position after the equal sign.
+        source (str): The name of the configuration file.
+
+    Return:
+        Returns the tuple of the value and the position after the value.
+    """
+    value: List[str] = []
+    spaces = 0
+    quoted = False
+    while pos < len(text):
+        char = text[pos]
+        pos += 1
+        if char == "\n":
+            break
+        if not quoted and char in "#;":
+            pos = text.find("\n", pos)
+            pos = len(text) if pos < 0 else pos + 1
+            break
+        if not quoted and char.isspace():
+            if value:
+                spaces += 1
+            continue
+        if spaces:
+            value.append(" " * spaces)
+            spaces = 0
+        if char == "\\":
+            if pos < len(text) and text[pos] == "\n":
+                pos += 1
+                continue
+            if pos >= len(text) or text[pos] not in _ESCAPES:
+                raise GitConfigError(f"Invalid escape sequence in {source}")
+            value.append(_ESCAPES[text[pos]])
+            pos += 1
+        elif char == '"':
+            quoted = not quoted
+        else:
+            value.append(char)
+
+    if quoted:
+        raise GitConfigError(f"Unterminated quote in {source}")
+    return "".join(value), pos
+
+
+def parse_config(text: str, source: str) -> List[Tuple[str, Optional[str]]]:
+    """Parse the content of a configuration file.
+
+    Args:
+        text (str):   The content of the configuration file.
+        source (str): The name of the configuration file used in error messages.
+
+    Return:
+        Returns the list of the normalized keys and their values. The value
+        is None for keys without an equal sign.
+    """
+    text = text.lstrip("\ufeff").replace("\r\n", "\n")
+    entries: List[Tuple[str, Optional[str]]] = []
+    section = None
+    pos = 0
+    while pos < len(text):
+        char = text[pos]
+        if char.isspace():
+            pos += 1
+        elif char in "#;":
+            pos = text.find("\n", pos)
+            pos = len(text) if pos < 0 else pos + 1
+        elif char == "[":
+            match = _SECTION.match(text, pos)
+            if match is None or (match.group(2) is not None and "." in match.group(1)):
+                raise GitConfigError(f"Invalid section header in {source}")
+            section = match.group(1).lower()
+            if match.group(2) is not None:
+                section += "." + re.sub(r"\\(.)", r"\1", match.group(2))
+            pos = match.end()
+        else:
+            match = _NAME.match(text, pos)
+            if match is None or section is None:
+                raise GitConfigError(f"Invalid entry in {source}")
+            key = f"{section}.{match.group().lower()}"
+            pos = match.end()
+            while pos < len(text) and text[pos] in " \t":
+                pos += 1
+            if pos >= len(text) or text[pos] == "\n":
+                entries.append((key, None))
+            elif text[pos] == "=":
+                value, pos = _parse_value(text, pos + 1, source)
+                entries.append((key, value))
+            else:
+                raise GitConfigError(f"Invalid entry {key} in {source}")
+    return entries
+
+
+def get_common_dir(git_dir: str) -> str:
+    """Get the common directory of a git directory, e.g., of a worktree.
+
+    Args:
+        git_dir (str): The git directory.
+
+    Return:
+        Returns the common directory shared by all worktrees.
+    """
+    try:
+        with open(os.path.join(git_dir, "commondir"), "r", encoding="utf-8") as file_handle:
+            common_dir = file_handle.read().strip()
+    except FileNotFoundError:
+        return git_dir
+    except OSError as exception:
+        raise GitConfigError(f"Can't read commondir of {git_dir}") from exception
+    return os.path.normpath(os.path.join(git_dir, common_dir))
+
+
+def is_git_directory(path: str) -> bool:
+    """Check whether the given path is a git directory.
+
+    Args:
+        path (str): The path to check.
+
+    Return:
+        Returns True if the path contains the HEAD file, the objects and the
+        refs directory.
+    """
+    if not os.path.isfile(os.path.join(path, "HEAD")):
+        return False
+    common_dir = get_common_dir(path)
+    return os.path.isdir(os.path.join(common_dir, "objects")) and os.path.isdir(os.path.join(common_dir, "refs"))
+
+
+def read_git_file(path: str) -> str:
+    """Read the git directory from a :code:`.git` file, e.g., of a worktree or submodule.
+
+    Args:
+        path (str): The path of the :code:`.git` file.
+
+    Return:
+        Returns the git directory.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as file_handle:
+            content = file_handle.read().strip()
+    except (OSError, ValueError) as exception:
+        raise GitConfigError(f"Can't read {path}") from exception
+    if not content.startswith("gitdir: "):
+        raise GitConfigError(f"Invalid gitfile format {path}")
+    return os.path.normpath(os.path.join(os.path.dirname(path), content[8:]))
+
+
+def check_owner(path: str) -> None:
+    """Let git handle repositories of other users.
+
+    Git refuses to use repositories owned by other users unless they are
+    listed in :code:`safe.directory`.
+
+    Args:
+        path (str): The path of the worktree or git directory.
+    """
+    if hasattr(os, "geteuid") and os.stat(path).st_uid != os.geteuid():
+        raise GitConfigError(f"Repository {path} is owned by another user")
+
+
+def find_git_dir(git_options: GitOptions) -> Optional[str]:
+    """Discover the git directory like git does.
+
+    Args:
+        git_options (obj): The GitOptions object.
+
+    Return:
+        Returns the git directory or None if the path is not within a git repository.
+    """
+    run_path = git_options.get_run_path()
+    git_dir_options = git_options.get_global_group_values("git_dir")
+    git_dir = os.getenv("GIT_DIR")
+    if git_dir_options:
+        git_dir = git_dir_options[-1] or os.curdir
+    if git_dir is not None:
+        git_dir = os.path.normpath(os.path.join(run_path, git_dir))
+        if os.path.isfile(git_dir):
+            git_dir = read_git_file(git_dir)
+        return git_dir if is_git_directory(git_dir) else None
+
+    if not os.path.isdir(run_path):
+        return None
+
+    current = run_path
+    try:
+        device = os.stat(current).st_dev
+        while True:
+            dot_git = os.path.join(current, ".git")
+            if os.path.isfile(dot_git):
+                check_owner(current)
+                return read_git_file(dot_git)
+            if is_git_directory(dot_git):
+                check_owner(current)
+                return dot_git
+            if is_git_directory(current):
+                check_owner(current)
+                return current
+
+            parent = os.path.dirname(current)
+            if parent == current:
+                return None
+            if os.stat(parent).st_dev != device and not str_to_bool(os.getenv("GIT_DISCOVERY_ACROSS_FILESYSTEM", "")):
+                raise GitConfigError(f"Discovery stopped at filesystem boundary {current}")
+            current = parent
+    except OSError as exception:
+        raise GitConfigError(f"Can't discover git directory of {run_path}") from exception
+
+
+def get_system_config_file(real_git: str) -> Optional[str]:
+    """Get the system-wide configuration file of the real git command.
+
+    The location depends on how git was built. It is determined once by
+    calling git and is stored in the tool cache.
+
+    Args:
+        real_git (str): The real git command.
+
+    Return:
+        Returns the path of the system configuration file or None if it is disabled.
+    """
+    if str_to_bool(os.getenv("GIT_CONFIG_NOSYSTEM", "")):
+        return None
+    if os.getenv("GIT_CONFIG_SYSTEM") is not None:
+        return os.getenv("GIT_CONFIG_SYSTEM")
+
+    entry = get_tool_cache().get("git-system-config")
+    if entry is not None and entry["path"] == real_git:
+        return entry["value"]
+
+    retval, filename = getstatusoutput([real_git, "config", "--system", "--edit"], env={"GIT_EDITOR": "echo"})
+    if retval != 0 or not filename:
+        raise GitConfigError("Can't determine the system configuration file")
+    set_tool_cache("git-system-config", real_git, True, filename)
+    return filename
+
+
+def get_global_config_files() -> List[str]:
+    """Get the global configuration files.
+
+    Return:
+        Returns the list of the global configuration files.
+    """
+    if os.getenv("GIT_CONFIG_GLOBAL") is not None:
+        return [os.getenv("GIT_CONFIG_GLOBAL", "")]
+
+    home = os.getenv("HOME")
+    xdg_config_home = os.getenv("XDG_CONFIG_HOME") or (os.path.join(home, ".config") if home else None)
+    files = []
+    if xdg_config_home:
+        files.append(os.path.join(xdg_config_home, "git", "config"))
+    if home:
+        files.append(os.path.join(home, ".gitconfig"))
+    return files
+
+
+def get_repository_config(git_options: GitOptions) -> Optional["GitConfig"]:
+    """Read the configuration of the repository git would use for the given options.
+
+    Args:
+        git_options (obj): The GitOptions object.
+
+    Return:
+        Returns the GitConfig object or None if the path is not within a git repository.
+    """
+    if platform.system().lower().startswith("win"):
+        raise GitConfigError("The native reader is not supported on Windows")
+    for env_key in UNSUPPORTED_ENV:
+        if os.getenv(env_key):
+            raise GitConfigError(f"Unsupported environment variable {env_key}")
+    if git_options.get_global_group_values("config_env"):
+        raise GitConfigError("Unsupported option --config-env")
+
+    git_dir = find_git_dir(git_options)
+    if git_dir is None:
+        return None
+
+    config = GitConfig(git_dir)
+    system_config = get_system_config_file(git_options.get_real_git_with_options()[0])
+    for filename in ([system_config] if system_config else []) + get_global_config_files():
+        config.read_file(filename)
+
+    local_start = len(config.entries)
+    config.read_file(os.path.join(get_common_dir(git_dir), "config"))
+    if to_bool(config.get("extensions.worktreeconfig", "false")):
+        config.read_file(os.path.join(git_dir, "config.worktree"))
+    config.local_entries = config.entries[local_start:]
+
+    try:
+        for index in range(int(os.getenv("GIT_CONFIG_COUNT", "0"))):
+            config.add(os.environ[f"GIT_CONFIG_KEY_{index}"], os.environ[f"GIT_CONFIG_VALUE_{index}"])
+    except (ValueError, KeyError) as exception:
+        raise GitConfigError("Invalid GIT_CONFIG_COUNT environment") from exception
+
+    for parameter in git_options.get_global_group_values("config"):
+        if parameter is None:
+            raise GitConfigError("Missing value of option -c")
+        key, separator, value = parameter.partition("=")
+        config.add(key, value if separator else None)
+
+    return config
+
+
+# -----------------------------------------------------------------------------
+# Class Definitions
+# -----------------------------------------------------------------------------
+class GitConfig:
+    """Read-only view of git configuration files.
+
+    Attributes:
+        entries (list):       The list of the normalized keys and their values in the
+                              order they were read.
+        local_entries (list): The entries read from the repository and worktree
+                              configuration files.
+        git_dir (str):        The git directory used to evaluate conditional includes
+                              or None.
+    """
+
+    def __init__(self, git_dir: Optional[str] = None) -> None:
+        """Construct an empty configuration.
+
+        Args:
+            git_dir (str): The git directory used to evaluate conditional includes.
+        """
+        self.entries: List[Tuple[str, Optional[str]]] = []
+        self.local_entries: List[Tuple[str, Optional[str]]] = []
+        self.git_dir = git_dir
+
+    def add(self, key: str, value: Optional[str]) -> None:
+        """Add an entry given on the command line or by the environment.
+
+        Args:
+            key (str):   The key.
+            value (str): The value or None for a key without a value.
+        """
+        key = normalize_key(key)
+        if key == "include.path" or key.startswith("includeif."):
+            raise GitConfigError(f"Unsupported include {key}")
+        self.entries.append((key, value))
+
+    def read_file(self, filename: str, includes: bool = True, depth: int = 0) -> bool:
+        """Read a configuration file.
+
+        Args:
+            filename (str):  The configuration file.
+            includes (bool): Follow the include directives.
+            depth (int):     The current depth of nested includes.
+
+        Return:
+            Returns True if the file was read and False if it does not exist.
+        """
+        if depth > MAX_INCLUDE_DEPTH:
+            raise GitConfigError(f"Exceeded maximum include depth at {filename}")
+        try:
+            with open(filename, "r", encoding="utf-8") as file_handle:
+                text = file_handle.read()
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as exception:
+            raise GitConfigError(f"Can't read {filename}") from exception
+
+        for key, value in parse_config(text, filename):
+            self.entries.append((key, value))
+            if not includes or not key.endswith(".path"):
+                continue
+            if key == "include.path" or (key.startswith("includeif.") and self._match_condition(key[10:-5], filename)):
+                if value is None:
+                    raise GitConfigError(f"Missing value of {key} in {filename}")
+                path = os.path.expanduser(value)
+                self.read_file(os.path.join(os.path.dirname(filename), path), includes, depth + 1)
+        return True
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """Get the last value of a key.
+
+        Args:
+            key (str):     The key, e.g., 'remote.origin.url'.
+            default (str): The default value if the key is not set.
+
+        Return:
+            Returns the value or the default value.
+        """
+        values = self.get_all(key)
+        return values[-1] if values else default
+
+    def get_all(self, key: str) -> List[Optional[str]]:
+        """Get all values of a key.
+
+        Args:
+            key (str): The key, e.g., 'remote.origin.url'.
+
+        Return:
+            Returns the list of values in the order they were read.
+        """
+        key = normalize_key(key)
+        return [value for entry_key, value in self.entries if entry_key == key]
+
+    def get_remote_url(self, remote: str, push: bool = False) -> Optional[str]:
+        """Get the URL of a remote like :code:`git remote get-url` does.
+
+        Args:
+            remote (str): The name of the remote.
+            push (bool):  Get the push URL.
+
+        Return:
+            Returns the URL or None if the remote does not exist.
+        """
+        urls = self.get_all(f"remote.{remote}.url")
+        push_urls = self.get_all(f"remote.{remote}.pushurl")
+        if None in urls or "" in urls or None in push_urls or "" in push_urls:
+            raise GitConfigError(f"Unsupported URL of remote {remote}")
+
+        # Like git, only remotes configured in the repository are considered
+        if not any(key.startswith(f"remote.{remote}.") for key, _ in self.local_entries):
+            common_dir = get_common_dir(self.git_dir) if self.git_dir else None
+            if common_dir and (
+                os.path.exists(os.path.join(common_dir, "remotes", remote))
+                or os.path.exists(os.path.join(common_dir, "branches", remote))
+            ):
+                raise GitConfigError(f"Unsupported legacy definition of remote {remote}")
+            return None
+        if not urls and not push_urls:
+            raise GitConfigError(f"Remote {remote} has no URL")
+
+        if push:
+            if push_urls:
+                return self._rewrite_url(push_urls[0], self._get_rewrites("insteadof"))  # type: ignore
+            push_rewrites = self._get_rewrites("pushinsteadof")
+            for url in urls:
+                push_url = self._rewrite_url(url, push_rewrites)  # type: ignore
+                if push_url != url:
+                    return push_url
+
+        if not urls:
+            raise GitConfigError(f"Remote {remote} has no URL")
+        return self._rewrite_url(urls[0], self._get_rewrites("insteadof"))  # type: ignore
+
+    def get_submodules(self) -> List[Tuple[str, str, Optional[str]]]:
+        """Get the submodules of a :code:`.gitmodules` file.
+
+        Return:
+            Returns the list of the name, URL and path of each submodule in
+            the order of appearance. The path is None if it is not set.
+        """
+        names: Dict[str, None] = {}
+        for key, _ in self.entries:
+            if key.startswith("submodule.") and key.endswith(".url") and key.count(".") >= 2:
+                names[key[10:-4]] = None
+
+        submodules = []
+        for name in names:
+            values = self.get_all(f"submodule.{name}.url") + self.get_all(f"submodule.{name}.path")
+            if None in values:
+                raise GitConfigError(f"Unsupported definition of submodule {name}")
+            submodules.append((name, self.get(f"submodule.{name}.url"), self.get(f"submodule.{name}.path")))
+        return submodules  # type: ignore
+
+    def _get_rewrites(self, kind: str) -> List[Tuple[str, str]]:
+        """Get the URL rewrites of the :code:`url.<base>.insteadOf` entries.
+
+        Args:
+            kind (str): Either 'insteadof' or 'pushinsteadof'.
+
+        Return:
+            Returns the list of the prefixes and their replacements.
+        """
+        rewrites = []
+        for key, value in self.entries:
+            if key.startswith("url.") and key.endswith(f".{kind}") and key.count(".") >= 2:
+                if value is None:
+                    raise GitConfigError(f"Missing value of {key}")
+                rewrites.append((value, key[4 : -len(kind) - 1]))
+        return rewrites
+
+    @staticmethod
+    def _rewrite_url(url: str, rewrites: List[Tuple[str, str]]) -> str:
+        """Rewrite a URL using the longest matching prefix.
+
+        Args:
+            url (str):       The URL.
+            rewrites (list): The list of prefixes and their replacements.
+
+        Return:
+            Returns the rewritten URL.
+        """
+        best_prefix, best_base = "", None
+        for prefix, base in rewrites:
+            if url.startswith(prefix) and len(prefix) > len(best_prefix):
+                best_prefix, best_base = prefix, base
+        if best_base is None:
+            return url
+        return best_base + url[len(best_prefix) :]
+
+    def _match_condition(self, condition: str, filename: str) -> bool:
+        """Evaluate the condition of an :code:`includeIf` section.
+
+        Args:
+            condition (str): The condition, e.g., 'gitdir:~/work/'.
+            filename (str):  The configuration file containing the condition.
+
+        Return:
+            Returns True if the condition is met.
+        """
+        for prefix, ignore_case in [("gitdir:", False), ("gitdir/i:", True)]:
+            if condition.startswith(prefix):
+                return self._match_git_dir(condition[len(prefix) :], filename, ignore_case)
+        if condition.startswith("onbranch:"):
+            return self._match_branch(condition[9:])
+        if condition.startswith("hasconfig:"):
+            raise GitConfigError(f"Unsupported include condition {condition}")
+        return False
+
+    def _match_git_dir(self, pattern: str, filename: str, ignore_case: bool) -> bool:
+        """Match the git directory against the pattern of a gitdir condition.
+
+        Args:
+            pattern (str):      The pattern.
+            filename (str):     The configuration file containing the condition.
+            ignore_case (bool): Match case-insensitively.
+
+        Return:
+            Returns True if the git directory matches.
+        """
+        if self.git_dir is None:
+            return False
+        if pattern.startswith("~/"):
+            pattern = os.path.expanduser(pattern)
+        elif pattern.startswith("./"):
+            pattern = os.path.join(os.path.dirname(os.path.realpath(filename)), pattern[2:])
+        if not os.path.isabs(pattern):
+            pattern = "**/" + pattern
+        if pattern.endswith("/"):
+            pattern += "**"
+
+        regex = wildmatch_to_regex(pattern, ignore_case)
+        return any(regex.fullmatch(path) for path in [os.path.realpath(self.git_dir), os.path.abspath(self.git_dir)])
+
+    def _match_branch(self, pattern: str) -> bool:
+        """Match the current branch against the pattern of an onbranch condition.
+
+        Args:
+            pattern (str): The pattern.
+
+        Return:
+            Returns True if the current branch matches.
+        """
+        if self.git_dir is None:
+            return False
+        try:
+            with open(os.path.join(self.git_dir, "HEAD"), "r", encoding="utf-8") as file_handle:
+                head = file_handle.read().strip()
+        except OSError as exception:
+            raise GitConfigError(f"Can't read HEAD of {self.git_dir}") from exception
+        if not head.startswith("ref: refs/heads/"):
+            return False
+        if pattern.endswith("/"):
+            pattern += "**"
+        return wildmatch_to_regex(pattern).fullmatch(head[16:]) is not None
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -11,24 +11,32 @@ Copyright:
     that is included as part of this package.
 """
 
+# pylint: disable=too-many-lines
+
 # -----------------------------------------------------------------------------
 # Module Import
 # -----------------------------------------------------------------------------
+import hashlib
+import json
 import logging
 import os
 import posixpath
 import re
-from typing import List, Optional
+import time
+from typing import Any, Dict, List, Optional
 
 import portalocker
 
 from .command_execution import getstatusoutput, pretty_call_command_retry, simple_call_command
-from .config import Config, has_git_lfs_cmd
+from .config import Config, get_config, has_git_lfs_cmd
+from .daemon_client import is_serving, request_update
 from .database import Database
 from .git_options import GitOptions
 from .global_settings import GITCACHE_DIR
-from .helpers import rmtree, strip_credentials
+from .helpers import get_disk_usage, start_detached_gitcache, strip_credentials
 from .invocation_log import record_cache
+from .maintenance import maintain_in_background
+from .trash import move_to_trash
 
 # -----------------------------------------------------------------------------
 # Logger
@@ -36,6 +44,13 @@ from .invocation_log import record_cache
 LOG = logging.getLogger(__name__)
 
 
+# -----------------------------------------------------------------------------
+# Constants
+# -----------------------------------------------------------------------------
+# Name of the directories containing the mirrors that are being cloned
+STAGING_DIR_NAME = ".staging"
+
+
 # -----------------------------------------------------------------------------
 # Regular Expressions
 # -----------------------------------------------------------------------------
@@ -67,6 +82,7 @@ class Locker:
             ensure_dir(bool): Create the path to filename if not yet existed.
         """
         self.name = name
+        self.filename = filename
         if ensure_dir:
             os.makedirs(os.path.dirname(filename), exist_ok=True)
         self.lock = portalocker.Lock(filename)
@@ -75,7 +91,16 @@ class Locker:
         self.timeout = config.get("Command", "LockTimeout")
 
     def __enter__(self):
-        """Aquire the lock."""
+        """Aquire the lock.
+
+        Within the gitcache daemon, the requests for a mirror are already
+        serialized by the queue of the mirror, so that the lock can only be
+        held by another process. The daemon waits for it in a blocking call
+        instead of polling the lock file.
+        """
+        if is_serving():
+            return self._acquire_blocking()
+
         try:
             return self.lock.acquire(timeout=self.warn_after)
         except portalocker.exceptions.LockException:
@@ -84,12 +109,23 @@ class Locker:
         LOG.info("%s is locked. Waiting up to %d seconds.", self.name, self.timeout)
         return self.lock.acquire(timeout=self.timeout, check_interval=self.check_interval)
 
+    def _acquire_blocking(self):
+        """Aquire the lock waiting in a blocking call if it is held by another process."""
+        try:
+            return self.lock.acquire(timeout=0, fail_when_locked=True)
+        except portalocker.exceptions.LockException:
+            pass
+
+        LOG.info("%s is locked by another process. Waiting for it.", self.name)
+        self.lock = portalocker.Lock(self.filename, flags=portalocker.LockFlags.EXCLUSIVE)
+        return self.lock.acquire()
+
     def __exit__(self, type_, value, traceback):
         """Release the lock."""
         self.lock.release()
 
 
-# pylint: disable=too-many-instance-attributes
+# pylint: disable=too-many-instance-attributes,too-many-public-methods
 class GitMirror:
     """This class represents a git mirror identified by the path.
 
@@ -101,19 +137,39 @@ class GitMirror:
       - The git mirror.
       - git-lfs storage directory used if the setting LFS/PerMirrorStorage is
         set to True.
+      - The update marker recording the start time of the last successful
+        update, used to coalesce concurrent update requests.
+      - The upstream state recording the digest of the upstream refs seen by
+        the last update, used to skip updates of unchanged mirrors.
+      - The push marker whose modification time is the time of the last push
+        to the upstream repository reported by a webhook.
+      - The maintenance state recording the times of the last maintenance runs.
+
+    New mirrors are cloned into the staging directory :code:`.staging/<name>`
+    next to the mirror directory and renamed into place once they are complete.
 
     Attributes:
-       url (str):           The upstream URL.
-       path (str):          The path of the mirror.
-       git_dir (str):       The path to the git data directory.
-       git_lfs_dir (str):   The path to the git-lfs storage directory.
-       lockfile (str):      The path of the lockfile.
-       configfile (str):    The path of the per-mirror config file.
-       config (obj):        The config.Config object for this mirror created by loading
-                            the global config file and the per-mirror config file.
-       database (obj):      The database.Database to use for repository meta information.
+       url (str):              The upstream URL.
+       path (str):             The path of the mirror.
+       git_dir (str):          The path to the git data directory.
+       git_lfs_dir (str):      The path to the git-lfs storage directory.
+       lockfile (str):         The path of the lockfile.
+       refresh_lockfile (str): The path of the lockfile held by the background refresh.
+       configfile (str):       The path of the per-mirror config file.
+       update_marker (str):    The path of the update marker file.
+       upstream_state (str):   The path of the upstream state file.
+       push_marker (str):      The path of the push marker file.
+       maintenance_state (str): The path of the maintenance state file.
+       config (obj):           The config.Config object for this mirror created on first
+                               access by layering the per-mirror config file on the shared
+                               global config.
+       database (obj):         The database.Database to use for repository meta information.
+       cache_event (str):      The cache event of the last update or None.
     """
 
+    cache_event: Optional[str]
+    _config: Optional[Config]
+
     def __init__(self, url=None, path=None, database=None):
         """Construct a new GitMirror object.
 
@@ -138,18 +194,44 @@ class GitMirror:
 
         if self.path and self.url is None:
             self.url = self.database.get_url_for_path(self.path)
-        self.lockfile = os.path.join(os.path.dirname(self.path), ".lock", os.path.basename(self.path))
+        self.lockfile = self.get_lockfile(self.path)
+        self.refresh_lockfile = self.lockfile + ".refresh"
 
         self.masked_url = self.strip_credentials(self.url, True)
         self.git_dir = os.path.join(self.path, "git")
         self.git_lfs_dir = os.path.join(self.path, "lfs")
         self.configfile = os.path.join(self.path, "gitcache.config")
-        os.makedirs(self.git_lfs_dir, exist_ok=True)
+        self.update_marker = os.path.join(self.path, "last-update")
+        self.upstream_state = os.path.join(self.path, "upstream-state")
+        self.push_marker = os.path.join(self.path, "pushed")
+        self.maintenance_state = os.path.join(self.path, "maintenance-state")
+        self.cache_event = None
+        self._config = None
+
+    @property
+    def config(self) -> Config:
+        """Get the configuration of this mirror.
+
+        The per-mirror config file is only read on the first access.
 
-        self.config = Config()
-        self.config.load(self.configfile)
+        Return:
+            Returns the config.Config object for this mirror.
+        """
+        if self._config is None:
+            self._config = get_config().overlay(self.configfile)
+        return self._config
+
+    @config.setter
+    def config(self, config: Config) -> None:
+        """Set the configuration of this mirror.
 
-    def update(self, ref=None, force=False):
+        Args:
+            config (obj): The config.Config object to use.
+        """
+        self._config = config
+
+    # pylint: disable=too-many-return-statements
+    def update(self, ref=None, force=False, upstream_digest=None, allow_stale=True):
         """Update or create the mirror.
 
         If the mirror path does not exist, a bare mirror is created.
@@ -158,38 +240,140 @@ class GitMirror:
         not performed within the last n seconds.
 
         Args:
-            ref (str):    The ref to use for the fetch of the lfs data. If None,
-                          the default branch is determined and used.
-            force (bool): If set to True, the mirror is updated even if the
-                          update interval is not yet reached.
+            ref (str):             The ref to use for the fetch of the lfs data. If None,
+                                   the default branch is determined and used.
+            force (bool):          If set to True, the mirror is updated even if the
+                                   update interval is not yet reached.
+            upstream_digest (str): The digest of the upstream refs as returned by
+                                   :meth:`probe_upstream`. If not given, the upstream
+                                   repository is probed before the update.
+            allow_stale (bool):    If set to True, a mirror updated within the last
+                                   MirrorHandling/MaxStaleness seconds is used without
+                                   waiting for the update and refreshed in the background.
+
+        If another process completed an update of the mirror that started
+        after this request began waiting for the mirror lock, its result is
+        reused instead of updating the mirror again.
+
+        If the refs advertised by the upstream repository did not change since
+        the last update, the fetch is skipped and only the update time is saved.
+
+        If a gitcache daemon is running, the update is executed by the daemon.
 
         Return:
             Returns True if the mirror was updated or False if the request timed out.
         """
+        response = request_update(self.url, ref, force, allow_stale, upstream_digest)
+        if response is not None:
+            success, event = response
+            if event:
+                self._record_cache(event)
+            return success
+
+        wait_start_time = time.time()
         mirror_exists = self.database.get(self.path) is not None
+        if mirror_exists and allow_stale and not force and self._serve_stale(ref):
+            self._record_cache("hit_stale")
+            return True
+
         try:
             with Locker(f"Mirror {self.path}", self.lockfile, self.config):
-                if not mirror_exists:
-                    rmtree(self.path, ignore_errors=True)
+                if self._update_coalesced(wait_start_time, ref, mirror_exists):
+                    self._record_cache("hit_coalesced")
+                    return True
+
+                # The mirror might have been deleted while waiting for the lock
+                start_time = time.time()
+                if self.database.get(self.path) is None:
                     if self._clone(ref):
-                        record_cache("miss_create", self.path)
+                        self._write_update_marker(start_time, ref)
+                        self._record_cache("miss_create")
+                        self._schedule_maintenance()
                         return True
                     return False
 
                 if force or self._update_time_reached():
+                    digest = upstream_digest if upstream_digest is not None else self.probe_upstream()
+                    if digest is not None and digest == self._read_upstream_state().get("digest"):
+                        if not self._update_unchanged(ref):
+                            return False
+                        self._write_update_marker(start_time, ref)
+                        self._record_cache("hit_unchanged")
+                        return True
+
+                    pack_size = self._get_pack_size()
                     if self._update(ref):
-                        record_cache("hit_update", self.path)
+                        self._write_upstream_state(digest, [ref])
+                        self._write_update_marker(start_time, ref)
+                        self._save_fetch_result(digest is not None, max(0, self._get_pack_size() - pack_size))
+                        self._record_cache("hit_update")
+                        self._schedule_maintenance()
                         return True
                     return False
 
                 LOG.info("Update time of mirror %s not reached yet.", self.path)
-                record_cache("hit_skip", self.path)
+                self._record_cache("hit_skip")
         except portalocker.exceptions.LockException:
             LOG.error("Update timed out due to locked mirror.")
-            record_cache("lock_timeout", self.path)
+            self._record_cache("lock_timeout")
             return False
         return True
 
+    def refresh(self, ref=None) -> bool:
+        """Update the mirror in the background process started for a stale mirror.
+
+        Only one refresh of a mirror runs at a time. If another refresh is
+        already running, this refresh is skipped.
+
+        Args:
+            ref (str): The ref to use for the fetch of the lfs data. If None,
+                       the default branch is determined and used.
+
+        Return:
+            Returns True if the mirror was updated or the refresh was skipped.
+        """
+        try:
+            os.makedirs(os.path.dirname(self.refresh_lockfile), exist_ok=True)
+            with portalocker.Lock(self.refresh_lockfile, timeout=0, fail_when_locked=True):
+                return self.update(ref, allow_stale=False)
+        except portalocker.exceptions.LockException:
+            LOG.info("Mirror %s is already refreshed by another process.", self.path)
+        return True
+
+    def probe_upstream(self) -> Optional[str]:
+        """Get a digest of the refs advertised by the upstream repository.
+
+        The refs are listed by a single :code:`git ls-remote` of the remote
+        'origin' of the mirror using the git protocol version 2, so that the
+        original remote URL including the credentials is used. If the
+        configuration option Update/UpstreamProbe is set to 'BranchesAndTags',
+        only the branches and tags are requested from the server using
+        ref-prefix filtering. If it is set to 'Off', the upstream repository is
+        not probed. The probe never prompts for credentials.
+
+        Return:
+            Returns the digest of the advertised refs or None if probing is
+            disabled or failed.
+        """
+        probe = str(self.config.get("Update", "UpstreamProbe")).lower()
+        if probe not in ("all", "branchesandtags") or not self.url or not os.path.isdir(self.git_dir):
+            return None
+
+        command = [self.config.get("System", "RealGit"), "-c", "protocol.version=2", "ls-remote"]
+        if probe == "branchesandtags":
+            command += ["--heads", "--tags"]
+        command.append("origin")
+        try:
+            if not self._add_credentials_to_remote():
+                return None
+            return_code, refs = getstatusoutput(command, cwd=self.git_dir, env={"GIT_TERMINAL_PROMPT": "0"})
+        finally:
+            self._remove_credentials_from_remote()
+        if return_code != 0:
+            LOG.warning("Can't list the refs of the upstream repository of mirror %s.", self.path)
+            return None
+        return hashlib.sha256(refs.encode("utf-8")).hexdigest()
+
     def ensure_exists(self, ref=None) -> bool:
         """Create the mirror if it does not exist.
 
@@ -202,18 +386,25 @@ class GitMirror:
         Return:
             Returns True if the mirror exists now or False if the request timed out.
         """
+        wait_start_time = time.time()
         mirror_exists = self.database.get(self.path) is not None
         try:
             with Locker(f"Mirror {self.path}", self.lockfile, self.config):
-                if not mirror_exists:
-                    rmtree(self.path, ignore_errors=True)
+                if not mirror_exists and self._update_coalesced(wait_start_time, ref, mirror_exists):
+                    self._record_cache("hit_coalesced")
+                    return True
+
+                if self.database.get(self.path) is None:
+                    start_time = time.time()
                     if self._clone(ref):
-                        record_cache("miss_create", self.path)
+                        self._write_update_marker(start_time, ref)
+                        self._record_cache("miss_create")
+                        self._schedule_maintenance()
                         return True
                     return False
         except portalocker.exceptions.LockException:
             LOG.error("Clone timed out due to locked mirror.")
-            record_cache("lock_timeout", self.path)
+            self._record_cache("lock_timeout")
             return False
         return True
 
@@ -227,10 +418,9 @@ class GitMirror:
         Return:
             Returns True if the command was successfull, otherwise False.
         """
-        mirror_exists = self.database.get(self.path) is not None
         try:
             with Locker(f"Mirror {self.path}", self.lockfile, self.config):
-                if not mirror_exists:
+                if self.database.get(self.path) is None:
                     LOG.error("Mirror does not exist!")
                     return False
                 return self._fetch(command_args)
@@ -265,20 +455,78 @@ class GitMirror:
         LOG.warning("LFS fetch skipped as git-lfs is not available on this system!")
         return True
 
-    def cleanup(self):
+    def cleanup(self, dry_run=False):
         """Delete the mirror if it is too old.
 
+        Args:
+            dry_run (bool): If set to True, the mirror is not deleted.
+
         Return:
-            Returns True if the mirror was deleted.
+            Returns True if the mirror was deleted resp. would be deleted.
         """
         if self._cleanup_time_reached():
+            if dry_run:
+                return True
             LOG.debug("Mirror %s is too old. Removing it.", self.path)
             return self.delete()
         return False
 
+    def update_disk_usage(self) -> int:
+        """Determine the disk space used by the mirror and save it in the database.
+
+        As this walks the whole mirror, it is only called by the maintenance
+        without holding the mirror lock.
+
+        Return:
+            Returns the disk space used by the mirror in bytes.
+        """
+        disk_usage = get_disk_usage(self.path)
+        self.database.save_disk_usage(self.path, disk_usage)
+        return disk_usage
+
+    def _get_pack_size(self) -> int:
+        """Get the size of the pack files of the mirror.
+
+        Return:
+            Returns the total size of the pack files in bytes.
+        """
+        pack_dir = os.path.join(self.git_dir, "objects", "pack")
+        size = 0
+        try:
+            with os.scandir(pack_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".pack"):
+                        try:
+                            size += entry.stat().st_size
+                        except OSError:
+                            # Removed concurrently by a repack
+                            continue
+        except OSError:
+            return 0
+        return size
+
+    def _save_fetch_result(self, probed: bool, fetched_bytes: int) -> None:
+        """Save the result of an update in the history and the disk usage of the mirror.
+
+        The fetched data is estimated by the growth of the pack files, so that
+        the mirror does not have to be walked while it is locked. The disk
+        usage is determined exactly by the next maintenance or cleanup.
+
+        Args:
+            probed (bool):       True if the upstream repository was found changed by the probe.
+            fetched_bytes (int): The growth of the pack files by the update in bytes.
+        """
+        self.database.save_fetch_result(self.path, probed or fetched_bytes > 0, fetched_bytes)
+        entry = self.database.get(self.path)
+        if fetched_bytes > 0 and entry and entry.get("disk-usage") is not None:
+            self.database.save_disk_usage(self.path, entry["disk-usage"] + fetched_bytes)
+
     def delete(self):
         """Delete the mirror.
 
+        The mirror directory is only moved into the trash while the mirror is
+        locked. It is removed later, see :mod:`git_cache.trash`.
+
         Return:
             Returns True if the mirror was deleted or False if the request timed out.
         """
@@ -286,11 +534,7 @@ class GitMirror:
             with Locker(f"Mirror {self.path}", self.lockfile, self.config):
                 LOG.debug("Deleting mirror %s", self.path)
                 self.database.remove(self.path)
-                rmtree(self.path, ignore_errors=True)
-
-            # Delete again outside lock to ensure lock file and directory are removed
-            if os.path.exists(self.path):
-                rmtree(self.path, ignore_errors=False)
+                move_to_trash(self.path)
         except portalocker.exceptions.LockException:
             LOG.error("Delete timed out due to locked mirror.")
             return False
@@ -369,6 +613,21 @@ class GitMirror:
     def clone_from_mirror(self, git_options: GitOptions) -> int:
         """Clone from the mirror.
 
+        The counter and access time updates of the update of the mirror and
+        the clone are committed at once at the end.
+
+        Args:
+            git_options (obj): The GitOptions object.
+
+        Return:
+            Returns the return code of the last command.
+        """
+        with self.database.transaction():
+            return self._clone_from_mirror(git_options)
+
+    def _clone_from_mirror(self, git_options: GitOptions) -> int:
+        """Clone from the mirror within a database transaction.
+
         Args:
             git_options (obj): The GitOptions object.
 
@@ -409,6 +668,7 @@ class GitMirror:
             num_retries=self.config.get("Clone", "Retries"),
             command_timeout=self.config.get("Clone", "CommandTimeout"),
             output_timeout=self.config.get("Clone", "OutputTimeout"),
+            max_output_size=self.config.get("Command", "MaxCapturedOutput"),
             remove_dir=target_dir,
         )
 
@@ -416,6 +676,7 @@ class GitMirror:
             return return_code
 
         self.database.increment_counter(self.path, "clones")
+        self.database.save_access_time(self.path)
 
         LOG.info("Setting push URL to %s and configure LFS.", self.masked_url)
         paths = [path for path in git_options.get_global_group_values("run_path") if path is not None] + [target_dir]
@@ -435,18 +696,226 @@ class GitMirror:
                 retval = cmd_retval
         return retval
 
+    def _update_coalesced(self, wait_start_time: float, ref: Optional[str], mirror_existed: bool = True) -> bool:
+        """Check if an update was completed while waiting for the mirror lock.
+
+        If the last successful update started after the given time, its result
+        is reused. If the mirror did not exist when this request started to
+        wait and exists now, its creation is reused regardless of the time the
+        clone started. Only the LFS data of the requested ref is fetched if
+        that update used a different ref.
+
+        Args:
+            wait_start_time (float): The time this request started to wait for the lock.
+            ref (str):               The ref to use for the fetch of the lfs data.
+            mirror_existed (bool):   True if the mirror existed when this request
+                                     started to wait for the lock.
+
+        Return:
+            Returns True if the result of a concurrent update is reused.
+        """
+        marker = self._read_update_marker()
+        created = not mirror_existed and self.database.get(self.path) is not None
+        if not created and (marker is None or marker["start-time"] < wait_start_time):
+            return False
+
+        LOG.info(
+            "Mirror %s was %s by a concurrent request. Reusing its result.",
+            self.path,
+            "created" if created else "updated",
+        )
+        if ref is not None and ref != (marker.get("ref") if marker else None):
+            return self._fetch_lfs(ref)
+        return True
+
+    def _read_update_marker(self) -> Optional[Dict[str, Any]]:
+        """Read the update marker written by the last successful update.
+
+        Return:
+            Returns a map with the start time of the update under the key
+            'start-time' and the ref used for the fetch of the lfs data under
+            the key 'ref' or None if no valid marker exists.
+        """
+        try:
+            with open(self.update_marker, "r", encoding="utf-8") as handle:
+                marker = json.load(handle)
+            if isinstance(marker, dict) and isinstance(marker.get("start-time"), (int, float)):
+                return marker
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _write_update_marker(self, start_time: float, ref: Optional[str]) -> None:
+        """Record the start time of a successful update.
+
+        Args:
+            start_time (float): The time the update started.
+            ref (str):          The ref used for the fetch of the lfs data.
+        """
+        tmp_filename = self.update_marker + ".new"
+        try:
+            with open(tmp_filename, "w", encoding="utf-8") as handle:
+                json.dump({"start-time": start_time, "ref": ref}, handle)
+            os.replace(tmp_filename, self.update_marker)
+        except OSError as exception:
+            LOG.warning("Can't write update marker %s: %s", self.update_marker, exception)
+
+    def _read_upstream_state(self) -> Dict[str, Any]:
+        """Read the upstream state saved by the last update.
+
+        Return:
+            Returns a map with the digest of the upstream refs under the key
+            'digest' and the list of refs whose lfs data was fetched since
+            under the key 'lfs-refs'. An empty map is returned if no state is
+            saved.
+        """
+        try:
+            with open(self.upstream_state, "r", encoding="utf-8") as handle:
+                state = json.load(handle)
+        except (OSError, ValueError):
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def _write_upstream_state(self, digest: Optional[str], lfs_refs: List[Optional[str]]) -> None:
+        """Save the upstream state after an update.
+
+        Args:
+            digest (str):    The digest of the upstream refs. If None, the saved
+                             state is removed.
+            lfs_refs (list): The refs whose lfs data was fetched.
+        """
+        try:
+            if digest is None:
+                if os.path.exists(self.upstream_state):
+                    os.unlink(self.upstream_state)
+                return
+            tmp_filename = self.upstream_state + ".new"
+            with open(tmp_filename, "w", encoding="utf-8") as handle:
+                json.dump({"digest": digest, "lfs-refs": lfs_refs}, handle)
+            os.replace(tmp_filename, self.upstream_state)
+        except OSError as exception:
+            LOG.warning("Can't write upstream state %s: %s", self.upstream_state, exception)
+
+    def _update_unchanged(self, ref=None):
+        """Update the mirror whose upstream repository did not change.
+
+        The fetch is skipped. The lfs data is only fetched if it was not fetched
+        for the given ref since the upstream repository changed.
+
+        Args:
+            ref (str): The ref to use for the fetch of the lfs data. If None,
+                       the default branch is determined and used.
+
+        Return:
+            Returns True on success.
+        """
+        LOG.info("Upstream repository of mirror %s is unchanged. Skipping the fetch.", self.path)
+        state = self._read_upstream_state()
+        lfs_refs = state.get("lfs-refs", [])
+        if ref not in lfs_refs:
+            if not self._fetch_lfs(ref):
+                return False
+            self._write_upstream_state(state["digest"], lfs_refs + [ref])
+        self.database.save_update_time(self.path, fetched=False)
+        self.database.save_fetch_result(self.path, False, 0)
+        return True
+
+    def _serve_stale(self, ref: Optional[str]) -> bool:
+        """Check if the mirror can be used while it is refreshed in the background.
+
+        If the update time is reached, but the last update is less than
+        MirrorHandling/MaxStaleness seconds ago, the mirror is used as it is
+        and a detached process refreshing the mirror is started, unless such
+        a process is already running.
+
+        Args:
+            ref (str): The ref to use for the fetch of the lfs data by the refresh.
+
+        Return:
+            Returns True if the mirror is used without waiting for an update.
+        """
+        max_staleness = self.config.get("MirrorHandling", "MaxStaleness")
+        if max_staleness <= 0:
+            return False
+
+        time_since_last_update = self.database.get_time_since_last_update(self.path)
+        if time_since_last_update >= max_staleness or not self._update_time_reached():
+            return False
+
+        LOG.info(
+            "Using mirror %s updated %d seconds ago and refreshing it in the background.",
+            self.path,
+            time_since_last_update,
+        )
+        try:
+            os.makedirs(os.path.dirname(self.refresh_lockfile), exist_ok=True)
+            with portalocker.Lock(self.refresh_lockfile, timeout=0, fail_when_locked=True):
+                pass
+        except portalocker.exceptions.LockException:
+            LOG.debug("Mirror %s is already refreshed by another process.", self.path)
+            return True
+
+        start_detached_gitcache(["--refresh-mirror", self.path] + (["--refresh-ref", ref] if ref else []))
+        return True
+
+    def _record_cache(self, event: str) -> None:
+        """Record a cache event of this mirror.
+
+        Args:
+            event (str): The cache event, e.g., 'hit_update'.
+        """
+        self.cache_event = event
+        record_cache(event, self.path)
+
     def _update_time_reached(self):
         """Check if the update time of the mirror is reached.
 
         Return:
             Returns True if the mirror should be updated.
         """
+        pushed = self._pushed_since_update()
+        if pushed is not None:
+            return pushed
+
         update_interval = self.config.get("MirrorHandling", "UpdateInterval")
         if update_interval < 0:
             return False
 
         return self.database.get_time_since_last_update(self.path) >= update_interval
 
+    def mark_pushed(self) -> None:
+        """Record a push to the upstream repository reported by a webhook.
+
+        The modification time of the push marker is set to the current time.
+        """
+        try:
+            with open(self.push_marker, "a", encoding="utf-8"):
+                pass
+            os.utime(self.push_marker)
+        except OSError as exception:
+            LOG.warning("Can't write push marker %s: %s", self.push_marker, exception)
+
+    def _pushed_since_update(self) -> Optional[bool]:
+        """Check if the upstream repository was pushed to since the last update.
+
+        Mirrors are refreshed by the webhook events only if the webhook
+        receiver is enabled and an event for the mirror was received before.
+
+        Return:
+            Returns None if the mirror is not refreshed by webhook events,
+            otherwise True if a push was reported since the start of the last
+            successful update.
+        """
+        if self.config.get("Webhook", "Port") <= 0:
+            return None
+        try:
+            push_time = os.stat(self.push_marker).st_mtime
+        except OSError:
+            return None
+
+        marker = self._read_update_marker()
+        return marker is None or push_time >= marker["start-time"]
+
     def _cleanup_time_reached(self):
         """Check if the mirror should be removed due to inactivity.
 
@@ -458,6 +927,16 @@ class GitMirror:
     def _clone(self, ref=None):
         """Clone the mirror.
 
+        The mirror is cloned into a staging directory next to the mirror and
+        published with a single rename once the clone, the LFS fetch and the
+        removal of the credentials succeeded. Afterwards, the mirror is added
+        to the database. A failed or interrupted clone therefore never leaves
+        a partial mirror behind.
+
+        A mirror already in the database is never replaced, as other processes
+        might use it. Only a leftover directory without a database entry is
+        moved to the trash before publishing the new mirror.
+
         Args:
             ref (str): The ref to use for the fetch of the lfs data. If None,
                        the default branch is determined and used.
@@ -465,7 +944,58 @@ class GitMirror:
         Return:
             Returns True on success.
         """
-        if self.config.get("Clone", "CloneStyle").lower() == "partialfirst":
+        staging_dir = self.get_staging_dir(self.path)
+        # A resumable clone continues with the data of an interrupted clone
+        resumable = self.config.get("Clone", "CloneStyle").lower() == "resumable"
+        if not resumable:
+            move_to_trash(staging_dir)
+
+        git_dir, git_lfs_dir = self.git_dir, self.git_lfs_dir
+        self.git_dir = os.path.join(staging_dir, "git")
+        self.git_lfs_dir = os.path.join(staging_dir, "lfs")
+        try:
+            success = self._clone_into_staging_dir(ref)
+        finally:
+            self.git_dir, self.git_lfs_dir = git_dir, git_lfs_dir
+
+        if success and self.database.get(self.path) is not None:
+            # Never replace a published mirror, as it might be in use by other processes
+            LOG.error("Can't publish the mirror %s as it was already created.", self.path)
+            success = False
+        elif success:
+            try:
+                move_to_trash(self.path)
+                os.rename(staging_dir, self.path)
+            except OSError as exception:
+                LOG.error("Can't publish the mirror %s: %s", self.path, exception)
+                success = False
+
+        if not success:
+            if not resumable:
+                move_to_trash(staging_dir)
+            return False
+
+        self.database.add(self.normalized_url, self.path)
+        return True
+
+    def _clone_into_staging_dir(self, ref=None):
+        """Clone the mirror into the staging directory.
+
+        The attributes :code:`git_dir` and :code:`git_lfs_dir` point into the
+        staging directory while this method is executed.
+
+        Args:
+            ref (str): The ref to use for the fetch of the lfs data. If None,
+                       the default branch is determined and used.
+
+        Return:
+            Returns True on success.
+        """
+        clone_style = self.config.get("Clone", "CloneStyle").lower()
+        if clone_style == "resumable":
+            return_code = 0 if self._clone_resumable() else 1
+
+        elif clone_style == "partialfirst":
             command = [self.config.get("System", "RealGit"), "clone", "--progress", "--depth=1", self.url, self.git_dir]
             return_code, _, _ = pretty_call_command_retry(
                 f"Partial clone of {self.masked_url} into {self.path}",
@@ -474,6 +1004,7 @@ class GitMirror:
                 num_retries=self.config.get("Clone", "Retries"),
                 command_timeout=self.config.get("Clone", "CommandTimeout"),
                 output_timeout=self.config.get("Clone", "OutputTimeout"),
+                max_output_size=self.config.get("Command", "MaxCapturedOutput"),
                 remove_dir=self.git_dir,
             )
             if return_code != 0:
@@ -487,10 +1018,8 @@ class GitMirror:
                 num_retries=self.config.get("Clone", "Retries"),
                 command_timeout=self.config.get("Clone", "CommandTimeout"),
                 output_timeout=self.config.get("Clone", "OutputTimeout"),
-                # remove_dir=self.git_dir,
+                max_output_size=self.config.get("Command", "MaxCapturedOutput"),
             )
-            if return_code != 0:
-                rmtree(self.git_dir, ignore_errors=True)
 
         else:
             command = [self.config.get("System", "RealGit"), "clone", "--progress", "--mirror", self.url, self.git_dir]
@@ -502,19 +1031,107 @@ class GitMirror:
                 num_retries=self.config.get("Clone", "Retries"),
                 command_timeout=self.config.get("Clone", "CommandTimeout"),
                 output_timeout=self.config.get("Clone", "OutputTimeout"),
+                max_output_size=self.config.get("Command", "MaxCapturedOutput"),
                 remove_dir=self.git_dir,
             )
 
-        if return_code == 0:
-            self.database.add(self.normalized_url, self.path)
-        else:
+        if return_code != 0:
             return False
 
+        os.makedirs(self.git_lfs_dir, exist_ok=True)
         if not self._fetch_lfs(ref):
             return False
 
         return self._remove_credentials_from_remote()
 
+    def _clone_resumable(self):
+        """Clone the mirror in several steps that are kept on disk.
+
+        The bare repository is initialized and configured like a mirror clone
+        first. Then the tips of all refs are fetched followed by the history
+        in steps of :code:`Clone/DeepenStep` commits, doubling the step size
+        each time. Every completed fetch is kept, so that a retry or the next
+        clone of an interrupted clone continues from the last completed step.
+
+        Return:
+            Returns True on success.
+        """
+        real_git = self.config.get("System", "RealGit")
+        if os.path.isdir(self.git_dir):
+            LOG.info("Resuming the clone of %s from %s.", self.masked_url, self.git_dir)
+
+        commands = [
+            [real_git, "init", "--bare", "--quiet", self.git_dir],
+            [real_git, "-C", self.git_dir, "config", "remote.origin.url", self.strip_credentials(self.url)],
+            [real_git, "-C", self.git_dir, "config", "remote.origin.fetch", "+refs/*:refs/*"],
+            [real_git, "-C", self.git_dir, "config", "remote.origin.mirror", "true"],
+        ]
+        for command in commands:
+            return_code, _ = getstatusoutput(command)
+            if return_code != 0:
+                LOG.error("Command '%s' gave return code of %d!", command, return_code)
+                return False
+
+        if not self._add_credentials_to_remote():
+            return False
+        try:
+            return self._fetch_resumable()
+        finally:
+            self._remove_credentials_from_remote()
+
+    def _fetch_resumable(self):
+        """Fetch the history of the mirror in steps.
+
+        Return:
+            Returns True on success.
+        """
+        real_git = self.config.get("System", "RealGit")
+        return_code, head = getstatusoutput([real_git, "ls-remote", "--symref", "origin", "HEAD"], cwd=self.git_dir)
+        for line in head.splitlines() if return_code == 0 else []:
+            if line.startswith("ref: ") and line.endswith("\tHEAD"):
+                getstatusoutput([real_git, "symbolic-ref", "HEAD", line[5:-5]], cwd=self.git_dir)
+
+        shallow_file = os.path.join(self.git_dir, "shallow")
+        _, refs = getstatusoutput([real_git, "for-each-ref", "--count=1"], cwd=self.git_dir)
+        if not refs.strip() and not self._fetch_step("Fetch of the latest commits", ["--depth=1"]):
+            return False
+
+        deepen = self.config.get("Clone", "DeepenStep")
+        while deepen > 0 and os.path.exists(shallow_file):
+            shallow_mtime = os.stat(shallow_file).st_mtime_ns
+            if not self._fetch_step(f"Fetch of the next {deepen} commits", [f"--deepen={deepen}"]):
+                return False
+            if os.path.exists(shallow_file) and os.stat(shallow_file).st_mtime_ns == shallow_mtime:
+                break
+            deepen *= 2
+
+        if os.path.exists(shallow_file):
+            return self._fetch_step("Fetch of the remaining history", ["--unshallow"])
+        return True
+
+    def _fetch_step(self, description, options):
+        """Execute a single fetch of a resumable clone.
+
+        Args:
+            description (str): The description of the fetch.
+            options (list):    The options of the fetch command.
+
+        Return:
+            Returns True on success.
+        """
+        command = [self.config.get("System", "RealGit"), "fetch", "--progress"] + options + ["origin"]
+        return_code, _, _ = pretty_call_command_retry(
+            f"{description} of {self.masked_url} into {self.path}",
+            "",
+            command,
+            num_retries=self.config.get("Clone", "Retries"),
+            cwd=self.git_dir,
+            command_timeout=self.config.get("Clone", "CommandTimeout"),
+            output_timeout=self.config.get("Clone", "OutputTimeout"),
+            max_output_size=self.config.get("Command", "MaxCapturedOutput"),
+        )
+        return return_code == 0
+
     def _remove_credentials_from_remote(self):
         """Remove any credentials from the mirror remote URLs."""
         safe_url = self.strip_credentials(self.url)
@@ -572,7 +1189,7 @@ class GitMirror:
         if not self._add_credentials_to_remote():
             return False
 
-        command = [self.config.get("System", "RealGit"), "remote", "update", "--prune"]
+        command = [self.config.get("System", "RealGit")] + self._auto_gc_options() + ["remote", "update", "--prune"]
         return_code, stdout_buffer, stderr_buffer = pretty_call_command_retry(
             f"Update of {self.path}",
             "garbage collection error",
@@ -581,6 +1198,7 @@ class GitMirror:
             cwd=self.git_dir,
             command_timeout=self.config.get("Update", "CommandTimeout"),
             output_timeout=self.config.get("Update", "OutputTimeout"),
+            max_output_size=self.config.get("Command", "MaxCapturedOutput"),
             abort_on_pattern=b"remove gc.log" if handle_gc_error else None,
         )
 
@@ -618,6 +1236,7 @@ class GitMirror:
             cwd=self.git_dir,
             command_timeout=self.config.get("GC", "CommandTimeout"),
             output_timeout=self.config.get("GC", "OutputTimeout"),
+            max_output_size=self.config.get("Command", "MaxCapturedOutput"),
         )
 
         if return_code == 0:
@@ -627,6 +1246,143 @@ class GitMirror:
 
         return return_code == 0
 
+    def _auto_gc_options(self) -> List[str]:
+        """Get the git options disabling the automatic garbage collection.
+
+        Return:
+            Returns the options if the mirror is maintained by gitcache,
+            otherwise an empty list.
+        """
+        if self.config.get("Maintenance", "Interval") < 0:
+            return []
+        return ["-c", "gc.auto=0", "-c", "maintenance.auto=false"]
+
+    def _schedule_maintenance(self) -> None:
+        """Maintain the mirrors in the background after new data was fetched.
+
+        The maintenance state of a mirror without one is initialized with the
+        current time, so that the mirror is maintained after its next change.
+        """
+        if self.config.get("Maintenance", "Interval") >= 0:
+            if not os.path.exists(self.maintenance_state):
+                now = time.time()
+                self._write_maintenance_state({"last-run": now, "last-full-run": now})
+            maintain_in_background()
+
+    def _read_maintenance_state(self) -> Dict[str, float]:
+        """Read the maintenance state saved by the last maintenance run.
+
+        Return:
+            Returns a map with the start time of the last maintenance under the
+            key 'last-run' and of the last full maintenance under the key
+            'last-full-run'. An empty map is returned if no state is saved.
+        """
+        try:
+            with open(self.maintenance_state, "r", encoding="utf-8") as handle:
+                state = json.load(handle)
+        except (OSError, ValueError):
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def _write_maintenance_state(self, state: Dict[str, float]) -> None:
+        """Write the maintenance state.
+
+        Args:
+            state (dict): The map with the keys 'last-run' and 'last-full-run'.
+        """
+        tmp_filename = self.maintenance_state + ".new"
+        try:
+            with open(tmp_filename, "w", encoding="utf-8") as handle:
+                json.dump(state, handle)
+            os.replace(tmp_filename, self.maintenance_state)
+        except OSError as exception:
+            LOG.warning("Can't write maintenance state %s: %s", self.maintenance_state, exception)
+
+    def is_maintenance_due(self) -> bool:
+        """Check if the mirror should be maintained.
+
+        A mirror is maintained if it fetched new data since the last
+        maintenance and the last maintenance is at least Maintenance/Interval
+        seconds ago. Mirrors without a maintenance state are not maintained
+        until their state is initialized by an update fetching new data.
+
+        Return:
+            Returns True if the mirror should be maintained.
+        """
+        interval = self.config.get("Maintenance", "Interval")
+        entry = self.database.get(self.path)
+        if interval < 0 or entry is None or not os.path.isdir(self.git_dir):
+            return False
+
+        state = self._read_maintenance_state()
+        if "last-run" not in state:
+            return False
+        return entry.get("last-change-time", 0.0) >= state["last-run"] and time.time() - state["last-run"] >= interval
+
+    def maintain(self) -> bool:
+        """Maintain the mirror to keep the clones and fetches from the mirror fast.
+
+        The incremental maintenance combines the packs geometrically, so that
+        each pack is at least twice as large as the next smaller one, and
+        writes the multi-pack-index with its reachability bitmap, the
+        commit-graph and the packed refs. Every Maintenance/FullInterval
+        seconds, a garbage collection removing the unreachable objects is run
+        before while holding the mirror lock.
+
+        The incremental maintenance does not take the mirror lock, as git
+        supports these operations while the repository is used. Afterwards, the
+        disk usage of the mirror is determined.
+
+        Return:
+            Returns True on success.
+        """
+        start_time = time.time()
+        state = self._read_maintenance_state()
+        full_interval = self.config.get("Maintenance", "FullInterval")
+        full = "last-full-run" in state and 0 <= full_interval <= start_time - state["last-full-run"]
+
+        LOG.info("Starting %s maintenance of mirror %s.", "full" if full else "incremental", self.path)
+        success = True
+        if full:
+            try:
+                with Locker(f"Mirror {self.path}", self.lockfile, self.config):
+                    success = self._run_gc()
+            except portalocker.exceptions.LockException:
+                LOG.error("Garbage collection timed out due to locked mirror.")
+                success = False
+        real_git = self.config.get("System", "RealGit")
+        for description, command in [
+            ("Repack", [real_git, "repack", "-d", "--geometric=2", "--write-midx", "--write-bitmap-index"]),
+            ("Commit-graph update", [real_git, "commit-graph", "write", "--reachable", "--split"]),
+            ("Packing of the refs", [real_git, "pack-refs", "--all"]),
+        ]:
+            if not success:
+                break
+            return_code, _, _ = pretty_call_command_retry(
+                f"{description} of {self.path}",
+                "",
+                command,
+                num_retries=self.config.get("GC", "Retries"),
+                cwd=self.git_dir,
+                command_timeout=self.config.get("GC", "CommandTimeout"),
+                output_timeout=self.config.get("GC", "OutputTimeout"),
+                max_output_size=self.config.get("Command", "MaxCapturedOutput"),
+            )
+            success = return_code == 0
+
+        if not success:
+            LOG.error("Maintenance of mirror %s failed.", self.path)
+            return False
+
+        state["last-run"] = start_time
+        if full or "last-full-run" not in state:
+            state["last-full-run"] = start_time
+        self._write_maintenance_state(state)
+        if os.path.isdir(self.git_dir):
+            self.update_disk_usage()
+        LOG.info("Maintenance of mirror %s finished within %.1f seconds.", self.path, time.time() - start_time)
+        return True
+
     def _fetch(self, command_args: List[str]) -> bool:
         """Execute a fetch command with custom arguments in the mirror.
 
@@ -640,7 +1396,7 @@ class GitMirror:
         if not self._add_credentials_to_remote():
             return False
 
-        command = [self.config.get("System", "RealGit"), "fetch"] + command_args
+        command = [self.config.get("System", "RealGit")] + self._auto_gc_options() + ["fetch"] + command_args
         return_code, _, _ = pretty_call_command_retry(
             f"Explicit fetch on {self.path} with arguments {command_args}",
             "",
@@ -649,6 +1405,7 @@ class GitMirror:
             cwd=self.git_dir,
             command_timeout=self.config.get("Update", "CommandTimeout"),
             output_timeout=self.config.get("Update", "OutputTimeout"),
+            max_output_size=self.config.get("Command", "MaxCapturedOutput"),
         )
         self._remove_credentials_from_remote()
         return return_code == 0
@@ -703,6 +1460,7 @@ class GitMirror:
             cwd=self.git_dir,
             command_timeout=self.config.get("LFS", "CommandTimeout"),
             output_timeout=self.config.get("LFS", "OutputTimeout"),
+            max_output_size=self.config.get("Command", "MaxCapturedOutput"),
         )
         self._remove_credentials_from_remote()
 
@@ -774,6 +1532,33 @@ class GitMirror:
         """
         return strip_credentials(url, mask=mask)
 
+    @staticmethod
+    def get_staging_dir(path: str) -> str:
+        """Get the staging directory a mirror is cloned into.
+
+        Args:
+            path (str): The path of the mirror.
+
+        Return:
+            Returns the path of the staging directory.
+        """
+        return os.path.join(os.path.dirname(path), STAGING_DIR_NAME, os.path.basename(path))
+
+    @staticmethod
+    def get_lockfile(path: str) -> str:
+        """Get the lockfile of a mirror.
+
+        The lockfile is stored outside of the mirror directory, so that the
+        mirror directory can be deleted while the lock is held.
+
+        Args:
+            path (str): The path of the mirror.
+
+        Return:
+            Returns the path of the lockfile.
+        """
+        return os.path.join(os.path.dirname(path), ".lock", os.path.basename(path))
+
     @staticmethod
     # pylint: disable=too-many-branches,too-many-return-statements
     def get_mirror_path(url) -> Optional[str]:
@@ -14,17 +14,9 @@ Copyright:
 # -----------------------------------------------------------------------------
 # Module Import
 # -----------------------------------------------------------------------------
-import logging
 import os
 from typing import Dict, List, Optional, Tuple
 
-from .config import Config
-
-# -----------------------------------------------------------------------------
-# Logger
-# -----------------------------------------------------------------------------
-LOG = logging.getLogger(__name__)
-
 
 # -----------------------------------------------------------------------------
 # Option Definitions
@@ -110,6 +102,10 @@ class Option:
 #  bail_out    If any of these options is given, we can stop parsing right away
 #              and call the real git command.
 #  run_path    Required to reconstruct the target path for 'git clone' commands.
+#  git_dir     The git directory given explicitly. The value None stands for the
+#              current directory (option '--bare').
+#  config      Configuration parameters given on the command line.
+#  config_env  Configuration parameters taken from environment variables.
 #
 GLOBAL_OPTIONS = [
     Option(group="bail_out", short_name="h", long_name="help", has_arg=False),
@@ -119,13 +115,14 @@ GLOBAL_OPTIONS = [
     Option(group="bail_out", long_name="man-path", has_arg=False),
     Option(group="bail_out", long_name="info-path", has_arg=False),
     Option(group="run_path", short_name="C", has_stuck=False),
-    Option(short_name="c", has_stuck=False),
+    Option(group="config", short_name="c", has_stuck=False),
     Option(long_name="exec-path", has_separate=False),
-    Option(long_name="git-dir"),
+    Option(group="git_dir", long_name="git-dir"),
+    Option(group="git_dir", long_name="bare", has_arg=False),
     Option(long_name="namespace"),
     Option(long_name="work-tree"),
     Option(long_name="super-prefix"),
-    Option(long_name="config-env"),
+    Option(group="config_env", long_name="config-env"),
     Option(long_name="shallow-file", has_stuck=False),
     Option(group="bail_out", long_name="list-cmds", has_separate=False),
 ]
@@ -244,7 +241,7 @@ SUBMODULE_UPDATE_OPTIONS = [
     Option(group="remote", long_name="remote", has_arg=False),
     Option(long_name="reference"),
     Option(long_name="depth"),
-    Option(short_name="j", long_name="jobs"),
+    Option(group="jobs", short_name="j", long_name="jobs"),
 ]
 
 REMOTE_ADD_OPTIONS = [
@@ -276,6 +273,24 @@ COMMAND_OPTIONS = {
 }
 
 
+# -----------------------------------------------------------------------------
+# Function Definitions
+# -----------------------------------------------------------------------------
+def get_real_git() -> str:
+    """Get the real git command.
+
+    The configuration is imported only when needed to keep this module
+    light-weight for the fast path of :mod:`git_cache.passthrough`.
+
+    Return:
+        Returns the real git command.
+    """
+    # pylint: disable=import-outside-toplevel
+    from .config import get_config
+
+    return get_config().get("System", "RealGit")
+
+
 # -----------------------------------------------------------------------------
 # Main Parser Class
 # -----------------------------------------------------------------------------
@@ -322,8 +337,7 @@ class GitOptions:
         Return:
             Returns a list of the real git command and all global options.
         """
-        config = Config()
-        real_git = config.get("System", "RealGit")
+        real_git = get_real_git()
         return [real_git] + self.global_options
 
     def get_real_git_all_args(self) -> List[str]:
@@ -333,8 +347,7 @@ class GitOptions:
             Returns a list of command line arguments to call the real git
             command with all the arguments given to the wrapper.
         """
-        config = Config()
-        real_git = config.get("System", "RealGit")
+        real_git = get_real_git()
         return [real_git] + self.all_args
 
     def get_run_path(self) -> str:
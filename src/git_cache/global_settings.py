@@ -15,6 +15,26 @@ Attributes:
 
     GITCACHE_DB_LOCK (str): The database lock file.
 
+    GITCACHE_DB_BACKEND (str): The storage backend of the database, either 'json' or 'sqlite'.
+
+        The value is retrieved from the environment variable :code:`GITCACHE_DB_BACKEND`. If this
+        variable does not exist, the default value :code:`json` is used.
+
+    GITCACHE_DB_SQLITE (str): The database file of the SQLite backend.
+
+    GITCACHE_DB_JOURNAL (str): The directory of the counter journal files.
+
+    GITCACHE_TOOL_CACHE (str): The file caching the located git and git-lfs commands.
+
+    GITCACHE_TRASH_DIR (str): The directory deleted mirrors are moved to before they are removed.
+
+    GITCACHE_MAINTENANCE_LOCK (str): The lock file held by the process maintaining the mirrors.
+
+    GITCACHE_DAEMON_SOCKET (str): The unix socket of the gitcache daemon.
+
+        The value is retrieved from the environment variable :code:`GITCACHE_DAEMON_SOCKET`. If this
+        variable does not exist, the file :code:`daemon.sock` in :code:`GITCACHE_DIR` is used.
+
     GITCACHE_LOGLEVEL (str): The log level of gitcache, e.g., 'INFO' or 'DEBUG'.
 
         The value is retrieved from the environment variable :code:`GITCACHE_LOGLEVEL`. If this
@@ -55,6 +75,13 @@ import os
 GITCACHE_DIR = os.path.normpath(os.getenv("GITCACHE_DIR", os.path.join(os.getenv("HOME", "/"), ".gitcache")))
 GITCACHE_DB = os.path.join(GITCACHE_DIR, "db")
 GITCACHE_DB_LOCK = os.path.join(GITCACHE_DIR, "db.lock")
+GITCACHE_DB_BACKEND = os.getenv("GITCACHE_DB_BACKEND", "json").lower()
+GITCACHE_DB_SQLITE = os.path.join(GITCACHE_DIR, "db.sqlite")
+GITCACHE_DB_JOURNAL = os.path.join(GITCACHE_DIR, "journal")
+GITCACHE_TOOL_CACHE = os.path.join(GITCACHE_DIR, "tools.json")
+GITCACHE_TRASH_DIR = os.path.join(GITCACHE_DIR, "trash")
+GITCACHE_MAINTENANCE_LOCK = os.path.join(GITCACHE_DIR, "maintenance.lock")
+GITCACHE_DAEMON_SOCKET = os.getenv("GITCACHE_DAEMON_SOCKET", os.path.join(GITCACHE_DIR, "daemon.sock"))
 GITCACHE_LOGLEVEL = os.getenv("GITCACHE_LOGLEVEL", "INFO")
 GITCACHE_LOGFORMAT = os.getenv("GITCACHE_LOGFORMAT", "%(asctime)s %(message)s")
 GITCACHE_DETAIL_LOG = os.getenv("GITCACHE_DETAIL_LOG")
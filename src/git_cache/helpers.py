@@ -18,6 +18,9 @@ import logging
 import os
 import re
 import shutil
+import subprocess
+import sys
+from typing import Any, Dict, List
 
 # Pattern to match ssh, git, http[s] and ftp[s]:
 #                                  <proto>      [user@]  <host>  [:port]   <path>
@@ -154,3 +157,92 @@ def subprocess_env() -> dict:
     for key in ("GITCACHE_DETAIL_LOG", "GITCACHE_SUMMARY_LOG", "GITCACHE_DETAIL_LOG_LEVEL"):
         env.pop(key, None)
     return env
+
+
+def get_gitcache_command() -> List[str]:
+    """Get the command to start gitcache.
+
+    Return:
+        Returns the command line of the running gitcache executable.
+    """
+    if getattr(sys, "frozen", False):
+        # Resolve a symlink named git to the gitcache executable
+        return [os.path.realpath(sys.executable)]
+    return [sys.executable, "-c", "from git_cache.cli import main_cli; main_cli()"]
+
+
+def start_detached_gitcache(args: List[str]) -> None:
+    """Start gitcache in a detached background process.
+
+    The process is not waited for and keeps running after this process exits.
+
+    Args:
+        args (list): The command line arguments of gitcache.
+    """
+    env = subprocess_env()
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join([package_root] + [path for path in [env.get("PYTHONPATH")] if path])
+    kwargs: Dict[str, Any] = {}
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+
+    try:
+        # pylint: disable=consider-using-with
+        subprocess.Popen(
+            get_gitcache_command() + args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=env,
+            **kwargs,
+        )
+    except OSError as exception:
+        LOG.debug("Can't start detached gitcache process %s: %s", args, exception)
+
+
+def get_disk_usage(path: str) -> int:
+    """Get the disk space used by the files of a directory tree.
+
+    Files with several hard links within the tree are counted once.
+
+    Args:
+        path (str): The path of the directory.
+
+    Return:
+        Returns the used disk space in bytes.
+    """
+    total = 0
+    inodes = set()
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                stat_result = os.lstat(os.path.join(dirpath, filename))
+            except OSError:
+                # Removed concurrently
+                continue
+            if stat_result.st_nlink > 1:
+                if (stat_result.st_dev, stat_result.st_ino) in inodes:
+                    continue
+                inodes.add((stat_result.st_dev, stat_result.st_ino))
+            # st_blocks is not available on Windows
+            blocks = getattr(stat_result, "st_blocks", None)
+            total += blocks * 512 if blocks is not None else stat_result.st_size
+    return total
+
+
+def format_size(size: float) -> str:
+    """Format a number of bytes for humans.
+
+    Args:
+        size (float): The number of bytes.
+
+    Return:
+        Returns the size using the units B, KiB, MiB, GiB or TiB.
+    """
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
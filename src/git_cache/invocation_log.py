@@ -20,6 +20,7 @@ import os
 import re
 import shlex
 import sys
+import threading
 import time
 from contextlib import contextmanager
 from datetime import datetime, timezone
@@ -39,6 +40,9 @@ _CACHE_PRIORITY = {
     "lock_timeout": 4,
     "miss_create": 3,
     "hit_update": 2,
+    "hit_coalesced": 2,
+    "hit_unchanged": 2,
+    "hit_stale": 1,
     "hit_skip": 1,
 }
 _SKIP_MIRROR_LOGGER_PREFIXES = ("git_cache.command_execution",)
@@ -50,7 +54,9 @@ _DETAIL_INDENT = "  "
 # pylint: disable=invalid-name
 _current_context: Optional["InvocationContext"] = None
 _write_error_reported = False
+_nested_calls = 0
 # pylint: enable=invalid-name
+_NESTED_LOCK = threading.Lock()
 
 
 # -----------------------------------------------------------------------------
@@ -388,9 +394,27 @@ def invocation_context():
         _current_context = None
 
 
+@contextmanager
+def nested_invocation():
+    """Context manager for a git command executed within the current invocation.
+
+    The routing mode of the invocation is kept while nested commands are
+    executed, their cache events are recorded.
+    """
+    global _nested_calls  # pylint: disable=global-statement
+
+    with _NESTED_LOCK:
+        _nested_calls += 1
+    try:
+        yield
+    finally:
+        with _NESTED_LOCK:
+            _nested_calls -= 1
+
+
 def set_mode(mode: str, reason: Optional[str] = None) -> None:
     """Set routing mode on the active invocation context."""
-    if _current_context:
+    if _current_context and not _nested_calls:
         _current_context.set_mode(mode, reason)
 
 
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Scheduling of the mirror maintenance.
+
+The automatic garbage collection of git is disabled for the mirror updates, so
+that it does not block an update while the mirror lock is held. Instead, a
+mirror that fetched new data is maintained by a detached
+:code:`gitcache --maintain` process started at the end of the current process,
+see :func:`git_cache.commands.maintain.git_maintain_mirrors`. The gitcache
+daemon starts this process right away, as it does not exit after the update.
+
+The incremental maintenance runs without the mirror locks, as git allows to
+repack a repository and to write its commit-graph while it is read or fetched
+into. Only the garbage collection of the full maintenance takes the mirror lock.
+Only one maintenance process runs at a time, guarded by the lock file
+:code:`GITCACHE_MAINTENANCE_LOCK`.
+
+Copyright:
+    2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of gitcache (https://github.com/seeraven/gitcache)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import atexit
+import threading
+
+from .daemon_client import is_serving
+from .helpers import start_detached_gitcache
+
+# -----------------------------------------------------------------------------
+# Module Variables
+# -----------------------------------------------------------------------------
+_BACKGROUND_LOCK = threading.Lock()
+_BACKGROUND_SCHEDULED = False
+
+
+# -----------------------------------------------------------------------------
+# Function Definitions
+# -----------------------------------------------------------------------------
+def start_maintenance_process() -> None:
+    """Start a detached process maintaining the mirrors."""
+    start_detached_gitcache(["--maintain"])
+
+
+def maintain_in_background() -> None:
+    """Maintain the mirrors in a detached process when this process exits.
+
+    The process is started at most once per invocation, even if several
+    mirrors are updated. Within the gitcache daemon, the process is started
+    immediately.
+    """
+    if is_serving():
+        start_maintenance_process()
+        return
+
+    global _BACKGROUND_SCHEDULED  # pylint: disable=global-statement
+    with _BACKGROUND_LOCK:
+        if not _BACKGROUND_SCHEDULED:
+            _BACKGROUND_SCHEDULED = True
+            atexit.register(start_maintenance_process)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Bounded capture of the output of executed commands.
+
+The output of long running git commands (e.g., the progress output of the
+clone of a huge repository) can be quite large. The :class:`OutputCapture`
+collects the output in a :code:`bytearray` and keeps, if a maximum size is
+given, only the tail of the output. Lines containing one of the given keep
+patterns are retained even if they are dropped from the tail, so that callers
+can still search the captured output for error messages.
+
+Copyright:
+    2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of gitcache (https://github.com/seeraven/gitcache)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import re
+from typing import List, Optional, Union
+
+# -----------------------------------------------------------------------------
+# Constants
+# -----------------------------------------------------------------------------
+# Maximum length of a retained line
+MAX_LINE_LENGTH = 1024
+
+# Line endings including the carriage return of progress outputs
+_LINE_END = re.compile(rb"[\r\n]")
+
+
+# -----------------------------------------------------------------------------
+# Class Definitions
+# -----------------------------------------------------------------------------
+class OutputCapture:
+    """Capture of a command output stream.
+
+    Attributes:
+        max_size (int):      The maximum number of bytes of the tail to keep or
+                             None to keep the whole output.
+        keep_patterns (list): Lines containing one of these byte patterns are
+                             retained even if they are dropped from the tail.
+        omitted (int):       The number of bytes dropped from the output.
+    """
+
+    def __init__(self, max_size: Optional[int] = None, keep_patterns: Optional[List[bytes]] = None) -> None:
+        """Construct a new output capture.
+
+        Args:
+            max_size (int):       The maximum number of bytes to keep. If None or 0,
+                                  the whole output is kept.
+            keep_patterns (list): The byte patterns of lines to retain.
+        """
+        self.max_size = max_size or None
+        self.keep_patterns = [pattern for pattern in keep_patterns or [] if pattern]
+        self.omitted = 0
+        self._tail = bytearray()
+        self._kept = bytearray()
+        self._scanned = 0
+
+    def append(self, data: Union[bytes, bytearray, memoryview]) -> None:
+        """Append data to the captured output.
+
+        Args:
+            data (bytes): The data to append.
+        """
+        self._tail += data
+        if self.max_size is not None and len(self._tail) > self.max_size:
+            self._drop(len(self._tail) - self.max_size)
+
+    def getvalue(self) -> bytes:
+        """Get the captured output.
+
+        Return:
+            Returns the whole output or, if parts of it were dropped, the
+            retained lines followed by a marker and the tail of the output.
+        """
+        if not self.omitted:
+            return bytes(self._tail)
+        marker = f"\n[... {self.omitted} bytes of output omitted ...]\n".encode()
+        return bytes(self._kept) + marker + bytes(self._tail)
+
+    def _drop(self, size: int) -> None:
+        """Drop data from the beginning of the tail.
+
+        The lines that are at least partially dropped are searched for the keep
+        patterns before and the matching lines are retained. To bound the
+        memory, at most :code:`max_size` bytes of lines are retained.
+
+        Args:
+            size (int): The number of bytes to drop.
+        """
+        line_end = _LINE_END.search(self._tail, size, size + MAX_LINE_LENGTH)
+        scan_end = line_end.end() if line_end else min(len(self._tail), size + MAX_LINE_LENGTH)
+        for pattern in self.keep_patterns:
+            position = self._tail.find(pattern, self._scanned, scan_end)
+            while position >= 0 and len(self._kept) < self.max_size:  # type: ignore
+                self._keep_line(position)
+                position = self._tail.find(pattern, position + len(pattern), scan_end)
+
+        # A pattern might be continued by the next output if the line is incomplete
+        overlap = 0 if line_end else max((len(pattern) for pattern in self.keep_patterns), default=1) - 1
+        self._scanned = max(0, scan_end - overlap - size)
+
+        # Deleting from the start of a bytearray does not move the remaining data
+        del self._tail[:size]
+        self.omitted += size
+
+    def _keep_line(self, position: int) -> None:
+        """Retain the line containing the given position of the tail.
+
+        Args:
+            position (int): The position within the tail.
+        """
+        line_start = max(
+            self._tail.rfind(b"\n", max(0, position - MAX_LINE_LENGTH), position),
+            self._tail.rfind(b"\r", max(0, position - MAX_LINE_LENGTH), position),
+        )
+        line_start = max(line_start + 1, position - MAX_LINE_LENGTH)
+        line_end = _LINE_END.search(self._tail, position, position + MAX_LINE_LENGTH)
+        self._kept += self._tail[line_start : line_end.start() if line_end else position + MAX_LINE_LENGTH]
+        self._kept += b"\n"
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""
+Multiplexing of the output of commands executed in parallel threads.
+
+While :func:`multiplexed_output` is active, :code:`sys.stdout` and
+:code:`sys.stderr` are replaced by wrappers that collect the output of each
+thread line by line. Threads that have set an output prefix using
+:func:`output_prefix` get each complete line written with the prefix. Progress
+updates terminated by a carriage return are dropped, only the final state of a
+line is written. As the console log handler writes to the current
+:code:`sys.stderr`, log messages of such a thread are prefixed as well.
+
+The function :func:`run_in_order` executes tasks in parallel threads, collects
+the output of each task and writes it in the order of the tasks, so that the
+output is the same regardless of the order in which the tasks finish.
+
+Copyright:
+    2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of gitcache (https://github.com/seeraven/gitcache)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import contextvars
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Tuple, TypeVar
+
+# -----------------------------------------------------------------------------
+# Module Variables
+# -----------------------------------------------------------------------------
+_THREAD_STATE = threading.local()
+_WRITE_LOCK = threading.Lock()
+
+
+# -----------------------------------------------------------------------------
+# Type Definitions
+# -----------------------------------------------------------------------------
+ResultT = TypeVar("ResultT")
+
+
+# -----------------------------------------------------------------------------
+# Functions
+# -----------------------------------------------------------------------------
+def get_output_prefix() -> Optional[str]:
+    """Get the output prefix of the current thread.
+
+    Return:
+        Returns the output prefix or None if the output is not prefixed.
+    """
+    return getattr(_THREAD_STATE, "prefix", None)
+
+
+def is_output_multiplexed() -> bool:
+    """Check if the output is multiplexed by :func:`multiplexed_output`.
+
+    Return:
+        Returns True if stdout or stderr are replaced to support output prefixes.
+    """
+    return isinstance(sys.stdout, PrefixedStream) or isinstance(sys.stderr, PrefixedStream)
+
+
+def get_output_capture() -> Optional[List[Tuple["PrefixedBuffer", bytes]]]:
+    """Get the list collecting the output of the current thread.
+
+    Return:
+        Returns the list of buffers and the data written to them or None if
+        the output is not collected.
+    """
+    return getattr(_THREAD_STATE, "capture", None)
+
+
+def _last_segment(line: bytes) -> bytes:
+    """Get the final state of a line that might contain carriage returns.
+
+    Args:
+        line (bytes): The line without the line feed.
+
+    Return:
+        Returns the last non-empty segment of the line.
+    """
+    segments = [segment for segment in line.split(b"\r") if segment]
+    return segments[-1] if segments else b""
+
+
+@contextmanager
+def output_prefix(prefix: str) -> Iterator[None]:
+    """Prefix all output of the current thread.
+
+    Args:
+        prefix (str): The prefix of each line.
+
+    Return:
+        Returns a context manager. On exit, any incomplete line of the thread
+        is written.
+    """
+    _THREAD_STATE.prefix = prefix
+    try:
+        yield
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            if isinstance(stream, PrefixedStream):
+                stream.buffer.flush_thread()
+        _THREAD_STATE.prefix = None
+
+
+@contextmanager
+def captured_output(
+    capture: Optional[List[Tuple["PrefixedBuffer", bytes]]] = None,
+) -> Iterator[List[Tuple["PrefixedBuffer", bytes]]]:
+    """Collect all output of the current thread instead of writing it.
+
+    Args:
+        capture (list): The list to append the complete lines to. A subclass
+                        of list can override :code:`append` to forward each
+                        line immediately. If not given, a new list is used.
+
+    Return:
+        Returns a context manager providing the list of buffers and the data
+        written to them. On exit, any incomplete line of the thread is added.
+    """
+    if capture is None:
+        capture = []
+    _THREAD_STATE.capture = capture
+    try:
+        yield capture
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            if isinstance(stream, PrefixedStream):
+                stream.buffer.flush_thread()
+        _THREAD_STATE.capture = None
+
+
+def write_captured(capture: List[Tuple["PrefixedBuffer", bytes]]) -> None:
+    """Write collected output to the original streams.
+
+    Args:
+        capture (list): The list of buffers and the data written to them.
+    """
+    with _WRITE_LOCK:
+        for buffer, data in capture:
+            buffer.stream.buffer.write(data)
+        for stream_buffer in {buffer for buffer, _ in capture}:
+            stream_buffer.stream.buffer.flush()
+
+
+def run_in_order(tasks: List[Callable[[], ResultT]], jobs: int) -> List[ResultT]:
+    """Execute tasks in parallel threads and write their output in order.
+
+    The output of each task is collected and written as soon as the task
+    and all tasks before it are finished.
+    The tasks see the context variables, e.g., the environment overrides of
+    the configuration, of the calling thread.
+
+    Args:
+        tasks (list): The functions to execute. Exceptions must be handled by
+                      the functions.
+        jobs (int):   The number of worker threads.
+
+    Return:
+        Returns the results of the tasks in the order of the tasks.
+    """
+    results: List[Any] = [None] * len(tasks)
+    captures: List[Optional[List[Tuple[PrefixedBuffer, bytes]]]] = [None] * len(tasks)
+    state = {"next_task": 0, "next_output": 0}
+    lock = threading.Lock()
+
+    def worker() -> None:
+        while True:
+            with lock:
+                index = state["next_task"]
+                if index >= len(tasks):
+                    return
+                state["next_task"] += 1
+            with captured_output() as capture:
+                results[index] = tasks[index]()
+            with lock:
+                captures[index] = capture
+                while state["next_output"] < len(tasks) and captures[state["next_output"]] is not None:
+                    write_captured(captures[state["next_output"]])  # type: ignore
+                    captures[state["next_output"]] = []
+                    state["next_output"] += 1
+
+    threads = [
+        threading.Thread(target=contextvars.copy_context().run, args=(worker,), name=f"task-{index}")
+        for index in range(max(1, min(jobs, len(tasks))))
+    ]
+    with multiplexed_output():
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return results
+
+
+@contextmanager
+def multiplexed_output() -> Iterator[None]:
+    """Replace stdout and stderr to support output prefixes.
+
+    If the streams are already replaced, e.g., by the gitcache daemon, they
+    are kept as they are.
+
+    Return:
+        Returns a context manager restoring the original streams on exit.
+    """
+    if isinstance(sys.stdout, PrefixedStream):
+        yield
+        return
+
+    original_stdout = sys.stdout
+    original_stderr = sys.stderr
+    sys.stdout = PrefixedStream(original_stdout)  # type: ignore
+    sys.stderr = PrefixedStream(original_stderr)  # type: ignore
+    try:
+        yield
+    finally:
+        sys.stdout = original_stdout
+        sys.stderr = original_stderr
+
+
+# -----------------------------------------------------------------------------
+# Class Definitions
+# -----------------------------------------------------------------------------
+class PrefixedBuffer:
+    """Binary buffer writing complete lines prefixed by the output prefix of the writing thread."""
+
+    def __init__(self, stream: Any) -> None:
+        """Construct a new buffer.
+
+        Args:
+            stream (obj): The original text stream.
+        """
+        self.stream = stream
+        self._pending = threading.local()
+
+    def write(self, data: bytes) -> int:
+        """Write data.
+
+        Args:
+            data (bytes): The data to write.
+
+        Return:
+            Returns the number of bytes written.
+        """
+        prefix = get_output_prefix()
+        if not prefix and get_output_capture() is None:
+            with _WRITE_LOCK:
+                self.stream.buffer.write(data)
+            return len(data)
+
+        lines = (getattr(self._pending, "data", b"") + bytes(data)).split(b"\n")
+        pending = lines.pop()
+        if b"\r" in pending:
+            # Keep only the final state of progress updates
+            pending = b"\r" + _last_segment(pending) + (b"\r" if pending.endswith(b"\r") else b"")
+        self._pending.data = pending
+        self._write_lines(prefix, lines)
+        return len(data)
+
+    def flush(self) -> None:
+        """Flush the original stream."""
+        with _WRITE_LOCK:
+            self.stream.buffer.flush()
+
+    def flush_thread(self) -> None:
+        """Write the incomplete line of the current thread."""
+        prefix = get_output_prefix()
+        pending = getattr(self._pending, "data", b"")
+        self._pending.data = b""
+        if (prefix or get_output_capture() is not None) and pending:
+            self._write_lines(prefix, [pending])
+
+    def _write_lines(self, prefix: Optional[str], lines: List[bytes]) -> None:
+        """Write complete lines with the given prefix.
+
+        Args:
+            prefix (str):  The prefix of each line or None.
+            lines (list):  The lines without line feeds.
+        """
+        encoded_prefix = f"[{prefix}] ".encode("utf-8") if prefix else b""
+        output = b"".join(encoded_prefix + segment + b"\n" for segment in map(_last_segment, lines) if segment)
+        capture = get_output_capture()
+        if capture is not None:
+            if output:
+                capture.append((self, output))
+        elif output:
+            with _WRITE_LOCK:
+                self.stream.buffer.write(output)
+                self.stream.buffer.flush()
+
+
+class PrefixedStream:
+    """Text stream wrapper providing a :class:`PrefixedBuffer` as its buffer."""
+
+    def __init__(self, stream: Any) -> None:
+        """Construct a new stream wrapper.
+
+        Args:
+            stream (obj): The original text stream.
+        """
+        self.stream = stream
+        self.buffer = PrefixedBuffer(stream)
+
+    def write(self, text: str) -> int:
+        """Write text.
+
+        Args:
+            text (str): The text to write.
+
+        Return:
+            Returns the number of characters written.
+        """
+        self.buffer.write(text.encode(self.stream.encoding or "utf-8", errors="replace"))
+        return len(text)
+
+    def flush(self) -> None:
+        """Flush the stream."""
+        self.buffer.flush()
+
+    def __getattr__(self, name: str) -> Any:
+        """Forward all other attributes to the original stream."""
+        return getattr(self.stream, name)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
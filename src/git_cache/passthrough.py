@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Fast path for git commands that are not handled by gitcache.
+
+Most git commands (e.g., :code:`git status` or :code:`git log`) are simply
+forwarded to the real git command. To avoid the overhead of loading all
+gitcache modules and of spawning a child process, the command line is checked
+right at the start using only light-weight modules. If the command is not
+handled by gitcache, the process is replaced by the real git command.
+
+The fast path is not taken if the real git command can't be determined from
+the environment or the configuration file, if invocation logging is enabled,
+if debug logging is enabled or on Windows. In these cases, the command is
+forwarded by :func:`git_cache.git_command.handle_git_command` as before.
+
+Copyright:
+    2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of gitcache (https://github.com/seeraven/gitcache)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import configparser
+import os
+import sys
+from typing import List, Optional
+
+from .git_options import COMMAND_OPTIONS, GitOptions
+from .global_settings import GITCACHE_DETAIL_LOG, GITCACHE_DIR, GITCACHE_LOGLEVEL, GITCACHE_SUMMARY_LOG
+
+# -----------------------------------------------------------------------------
+# Constants
+# -----------------------------------------------------------------------------
+# The commands that only consist of the prefix of a handled subcommand
+_COMMAND_PREFIXES = ["lfs", "submodule", "remote"]
+
+
+# -----------------------------------------------------------------------------
+# Function Definitions
+# -----------------------------------------------------------------------------
+def is_handled_command(args: List[str]) -> bool:
+    """Check whether the given git command is handled by gitcache.
+
+    Args:
+        args (list): The arguments to git.
+
+    Return:
+        Returns True if the command is handled by gitcache.
+    """
+    git_options = GitOptions(args)
+    if git_options.has_bail_out():
+        return False
+    command = git_options.get_command()
+    return command in COMMAND_OPTIONS and command not in _COMMAND_PREFIXES
+
+
+def get_system_option(option: str, env_key: str) -> Optional[str]:
+    """Get an option of the System section without loading the configuration.
+
+    Args:
+        option (str):  The option name in the configuration file.
+        env_key (str): The environment variable overwriting the option.
+
+    Return:
+        Returns the value or None if it is not set.
+    """
+    value = os.getenv(env_key)
+    if value is not None:
+        return value
+
+    config = configparser.ConfigParser()
+    try:
+        with open(os.path.join(GITCACHE_DIR, "config"), "r", encoding="utf-8") as file_handle:
+            config.read_file(file_handle)
+    except (OSError, configparser.Error):
+        return None
+    return config.get("System", option, fallback=None)
+
+
+def get_passthrough_git(args: List[str]) -> Optional[str]:
+    """Get the real git command if the given command can be passed through directly.
+
+    Args:
+        args (list): The arguments to git.
+
+    Return:
+        Returns the path of the real git command or None if the command must
+        be handled by the normal code path.
+    """
+    if sys.platform.startswith("win"):
+        return None
+
+    if GITCACHE_DETAIL_LOG or GITCACHE_SUMMARY_LOG or GITCACHE_LOGLEVEL.upper() == "DEBUG":
+        return None
+
+    real_git = get_system_option("RealGit", "GITCACHE_REAL_GIT")
+    if not real_git or not os.path.isabs(real_git):
+        return None
+
+    disabled = get_system_option("Disable", "GITCACHE_DISABLE") or ""
+    if disabled.upper() not in ["1", "ON", "TRUE", "YES"] and is_handled_command(args):
+        return None
+
+    return real_git
+
+
+def exec_real_git(args: List[str]) -> None:
+    """Replace this process by the real git command if the command is not handled by gitcache.
+
+    Args:
+        args (list): The arguments to git.
+
+    Return:
+        Returns only if the fast path is not possible.
+    """
+    real_git = get_passthrough_git(args)
+    if real_git is not None:
+        try:
+            os.execv(real_git, [real_git] + args)
+        except OSError:
+            # Let the normal code path report the error
+            pass
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Deletion of directories via the trash directory.
+
+Deleting a mirror can take a long time for large repositories. To keep the time
+the mirror lock is held short, the mirror directory is only renamed into the
+trash directory :code:`GITCACHE_TRASH_DIR` under the lock. The renamed
+directories are removed later by a detached :code:`gitcache --empty-trash`
+process started at the end of the current process, or by the next
+:code:`gitcache --cleanup`. The gitcache daemon starts this process right away,
+as it does not exit after the update.
+
+As each directory is moved into the trash with a single rename, a directory is
+either in its original place or in the trash. If the removal of the trash is
+interrupted, the remaining directories are removed the next time the trash is
+emptied.
+
+Copyright:
+    2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of gitcache (https://github.com/seeraven/gitcache)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import atexit
+import logging
+import os
+import threading
+import uuid
+from typing import List, Set
+
+import portalocker
+
+from .daemon_client import is_serving
+from .global_settings import GITCACHE_TRASH_DIR
+from .helpers import rmtree, start_detached_gitcache
+
+# -----------------------------------------------------------------------------
+# Logger
+# -----------------------------------------------------------------------------
+LOG = logging.getLogger(__name__)
+
+
+# -----------------------------------------------------------------------------
+# Module Variables
+# -----------------------------------------------------------------------------
+_BACKGROUND_LOCK = threading.Lock()
+_BACKGROUND_SCHEDULED = False
+
+
+# -----------------------------------------------------------------------------
+# Function Definitions
+# -----------------------------------------------------------------------------
+def move_to_trash(path: str) -> bool:
+    """Move a directory into the trash.
+
+    If the directory can't be renamed, e.g., because the trash is on another
+    file system, it is deleted directly.
+
+    Args:
+        path (str): The directory to delete.
+
+    Return:
+        Returns True if the directory was moved into the trash, False if it
+        was deleted directly or did not exist.
+    """
+    if not os.path.exists(path):
+        return False
+
+    target = os.path.join(GITCACHE_TRASH_DIR, f"{os.path.basename(path)}-{uuid.uuid4().hex}")
+    try:
+        os.makedirs(GITCACHE_TRASH_DIR, exist_ok=True)
+        os.rename(path, target)
+    except OSError as exception:
+        LOG.debug("Can't move %s into the trash (%s). Deleting it directly.", path, exception)
+        rmtree(path, ignore_errors=True)
+        return False
+
+    LOG.debug("Moved %s into the trash as %s.", path, target)
+    reclaim_in_background()
+    return True
+
+
+def get_trash_entries() -> List[str]:
+    """Get the directories in the trash.
+
+    Return:
+        Returns the paths of the directories in the trash.
+    """
+    try:
+        return sorted(entry.path for entry in os.scandir(GITCACHE_TRASH_DIR) if entry.name != ".lock")
+    except OSError:
+        return []
+
+
+def empty_trash() -> int:
+    """Remove all directories in the trash.
+
+    Only one process empties the trash at a time. If the trash is already
+    emptied by another process, this function returns immediately.
+
+    Return:
+        Returns the number of removed directories.
+    """
+    if not os.path.isdir(GITCACHE_TRASH_DIR):
+        return 0
+
+    num_removed = 0
+    try:
+        with portalocker.Lock(os.path.join(GITCACHE_TRASH_DIR, ".lock"), timeout=0, fail_when_locked=True):
+            # Directories moved into the trash in the meantime are removed as well
+            seen: Set[str] = set()
+            entries = get_trash_entries()
+            while entries:
+                for entry in entries:
+                    rmtree(entry, ignore_errors=True)
+                    num_removed += 1
+                seen.update(entries)
+                entries = [entry for entry in get_trash_entries() if entry not in seen]
+    except portalocker.exceptions.LockException:
+        LOG.debug("Trash is emptied by another process.")
+    return num_removed
+
+
+def start_reclaim_process() -> None:
+    """Start a detached process emptying the trash."""
+    start_detached_gitcache(["--empty-trash"])
+
+
+def reclaim_in_background() -> None:
+    """Empty the trash in a detached process when this process exits.
+
+    The process is started at most once per invocation, even if several
+    directories are moved into the trash. Within the gitcache daemon, the
+    process is started immediately.
+    """
+    if is_serving():
+        start_reclaim_process()
+        return
+
+    global _BACKGROUND_SCHEDULED  # pylint: disable=global-statement
+    with _BACKGROUND_LOCK:
+        if not _BACKGROUND_SCHEDULED:
+            _BACKGROUND_SCHEDULED = True
+            atexit.register(start_reclaim_process)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
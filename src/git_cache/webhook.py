@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Receiver of the push events of the upstream repositories.
+
+The receiver is a small HTTP server started by the gitcache daemon if the
+configuration option :code:`Webhook/Port` is set. It accepts the push
+payloads of GitHub, GitLab and Gitea webhooks, maps the repository URLs of the
+payload to the mirrors in the cache and sets the push marker of these mirrors.
+Once a mirror received a push event, it is no longer updated after the update
+interval but only if a push was reported since its last update, see
+:meth:`git_cache.git_mirror.GitMirror.mark_pushed`.
+
+If the configuration option :code:`Webhook/Secret` is set, the requests must be
+authenticated by the secret token of GitLab (:code:`X-Gitlab-Token`) or the
+HMAC-SHA256 signature of GitHub (:code:`X-Hub-Signature-256`) or Gitea
+(:code:`X-Gitea-Signature`).
+
+Copyright:
+    2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of gitcache (https://github.com/seeraven/gitcache)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import hashlib
+import hmac
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import get_config
+from .database import Database
+from .git_mirror import GitMirror
+
+# -----------------------------------------------------------------------------
+# Logger
+# -----------------------------------------------------------------------------
+LOG = logging.getLogger(__name__)
+
+
+# -----------------------------------------------------------------------------
+# Constants
+# -----------------------------------------------------------------------------
+# GitHub does not send payloads larger than 25 MiB
+MAX_PAYLOAD_SIZE = 25 * 1024 * 1024
+
+# The keys of the repository URLs in the 'repository' and 'project' objects of the payloads
+URL_KEYS = ("clone_url", "ssh_url", "git_url", "git_http_url", "git_ssh_url", "url", "html_url", "web_url")
+
+# The event headers of GitHub, GitLab and Gitea
+EVENT_HEADERS = ("X-GitHub-Event", "X-Gitlab-Event", "X-Gitea-Event")
+
+# Events that do not report a change of the repository
+IGNORED_EVENTS = ("ping",)
+
+
+# -----------------------------------------------------------------------------
+# Function Definitions
+# -----------------------------------------------------------------------------
+def get_repository_urls(payload: Dict[str, Any]) -> List[str]:
+    """Get the repository URLs of a push payload.
+
+    Args:
+        payload (dict): The payload of the webhook.
+
+    Return:
+        Returns the list of repository URLs found in the payload.
+    """
+    urls: List[str] = []
+    for section in (payload.get("repository"), payload.get("project")):
+        if not isinstance(section, dict):
+            continue
+        for key in URL_KEYS:
+            url = section.get(key)
+            if isinstance(url, str) and url and url not in urls:
+                urls.append(url)
+    return urls
+
+
+def verify_request(headers: Any, body: bytes, secret: str) -> bool:
+    """Check the authentication of a webhook request.
+
+    Args:
+        headers (obj): The headers of the request.
+        body (bytes):  The body of the request.
+        secret (str):  The configured secret or an empty string if no authentication is required.
+
+    Return:
+        Returns True if the request is authenticated.
+    """
+    if not secret:
+        return True
+
+    token = headers.get("X-Gitlab-Token")
+    if token is not None:
+        return hmac.compare_digest(token.encode("utf-8"), secret.encode("utf-8"))
+
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    signature = headers.get("X-Hub-Signature-256")
+    if signature is not None:
+        return hmac.compare_digest(signature.encode("utf-8"), f"sha256={digest}".encode("utf-8"))
+
+    signature = headers.get("X-Gitea-Signature")
+    if signature is not None:
+        return hmac.compare_digest(signature.encode("utf-8"), digest.encode("utf-8"))
+    return False
+
+
+def start_webhook_server(refresh: Optional[Callable[[str], None]] = None) -> Optional["WebhookServer"]:
+    """Start the webhook receiver in a background thread if it is enabled.
+
+    Args:
+        refresh (func): The function called with the path of each mirror a push was reported for.
+
+    Return:
+        Returns the started server or None if the receiver is disabled or can't be started.
+    """
+    config = get_config()
+    address = (config.get("Webhook", "Address"), config.get("Webhook", "Port"))
+    if address[1] <= 0:
+        return None
+
+    try:
+        server = WebhookServer(address, config.get("Webhook", "Secret"), refresh)
+    except OSError as exception:
+        LOG.error("Can't start the webhook receiver on %s:%d: %s", address[0], address[1], exception)
+        return None
+
+    threading.Thread(target=server.serve_forever, name="webhook", daemon=True).start()
+    LOG.info("Webhook receiver listening on %s:%d.", address[0], address[1])
+    return server
+
+
+# -----------------------------------------------------------------------------
+# Class Definitions
+# -----------------------------------------------------------------------------
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Handler of a single webhook request."""
+
+    server: "WebhookServer"
+
+    def do_POST(self) -> None:  # noqa: N802 pylint: disable=invalid-name
+        """Handle a webhook request."""
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            self._respond(411, {"error": "Content-Length required"})
+            return
+        if length < 0 or length > MAX_PAYLOAD_SIZE:
+            self._respond(413, {"error": "Payload too large"})
+            return
+
+        body = self.rfile.read(length)
+        if not verify_request(self.headers, body, self.server.secret):
+            LOG.warning("Rejecting unauthenticated webhook request from %s.", self.client_address[0])
+            self._respond(403, {"error": "Invalid signature"})
+            return
+
+        event = next((self.headers[header] for header in EVENT_HEADERS if header in self.headers), None)
+        if event is not None and event.lower() in IGNORED_EVENTS:
+            self._respond(200, {"mirrors": []})
+            return
+
+        try:
+            payload = json.loads(body)
+            if not isinstance(payload, dict):
+                raise ValueError("Payload is not an object")
+        except ValueError as exception:
+            self._respond(400, {"error": f"Invalid payload: {exception}"})
+            return
+
+        paths = self.server.handle_push(get_repository_urls(payload))
+        self._respond(202 if paths else 200, {"mirrors": paths})
+
+    def _respond(self, code: int, response: Dict[str, Any]) -> None:
+        """Send the response.
+
+        Args:
+            code (int):      The HTTP status code.
+            response (dict): The response sent as JSON.
+        """
+        body = json.dumps(response).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+        """Log the requests on the debug level instead of writing them to stderr."""
+        LOG.debug("Webhook request from %s: " + format, self.client_address[0], *args)
+
+
+class WebhookServer(ThreadingMixIn, HTTPServer):
+    """The HTTP server receiving the webhook requests.
+
+    Attributes:
+        secret (str):   The secret authenticating the requests or an empty string.
+        refresh (func): The function called with the path of each mirror a push was reported for.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self, address: Tuple[str, int], secret: str = "", refresh: Optional[Callable[[str], None]] = None
+    ) -> None:
+        """Construct a new WebhookServer object listening on the given address.
+
+        Args:
+            address (tuple): The address and the port to listen on.
+            secret (str):    The secret authenticating the requests or an empty string.
+            refresh (func):  The function called with the path of each mirror a push was reported for.
+        """
+        self.secret = secret
+        self.refresh = refresh
+        super().__init__(address, WebhookHandler)
+
+    def handle_push(self, urls: List[str]) -> List[str]:
+        """Mark the mirrors of the given repository URLs as pushed.
+
+        Args:
+            urls (list): The repository URLs of the push event.
+
+        Return:
+            Returns the paths of the mirrors marked as pushed.
+        """
+        database = Database()
+        paths: List[str] = []
+        for url in urls:
+            path = GitMirror.get_mirror_path(url)
+            if path is None or path in paths or database.get(path) is None:
+                continue
+            LOG.info(
+                "Push to %s reported. Marking mirror %s as outdated.", GitMirror.strip_credentials(url, True), path
+            )
+            GitMirror(url=url, path=path, database=database).mark_pushed()
+            paths.append(path)
+
+        if self.refresh is not None:
+            for path in paths:
+                self.refresh(path)
+        return paths
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Microbenchmark of the per-call overhead of git_cache.command_execution.call_command().
+
+Usage:
+    PYTHONPATH=src python test/benchmarks/benchmark_call_command.py [-n NUM_CALLS]
+
+Each scenario is executed once using :code:`subprocess.run` as the reference
+and once using :code:`call_command`. The difference of the mean durations is
+the overhead of :code:`call_command`.
+"""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from git_cache.command_execution import call_command
+
+# -----------------------------------------------------------------------------
+# Constants
+# -----------------------------------------------------------------------------
+SCENARIOS = [
+    ("silent command", ["true"]),
+    ("short output", ["echo", "hello"]),
+    ("silent git command", ["git", "--version"]),
+    ("background child keeping the output open", "sleep 0.3 & echo started", True),
+    ("large output (2 MB)", ["seq", "1", "300000"]),
+]
+
+
+# -----------------------------------------------------------------------------
+# Function Definitions
+# -----------------------------------------------------------------------------
+def measure(function, num_calls):
+    """Measure the mean and maximum duration of the given function in milliseconds."""
+    durations = []
+    for _ in range(num_calls):
+        start_time = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start_time) * 1000.0)
+    return statistics.mean(durations), max(durations)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--num-calls", type=int, default=20, help="Number of calls per scenario.")
+    parser.add_argument("--pty", action="store_true", help="Use PTYs even if the output is not a terminal.")
+    args = parser.parse_args()
+
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        print(f"{'Scenario':45s} {'subprocess.run':>16s} {'call_command':>16s} {'overhead':>10s}")
+        for scenario in SCENARIOS:
+            name, command = scenario[:2]
+            shell = len(scenario) > 2
+            ref_mean, _ = measure(
+                lambda cmd=command, sh=shell: subprocess.run(cmd, shell=sh, stdout=devnull, check=False),
+                args.num_calls,
+            )
+            stdout = sys.stdout
+            sys.stdout = devnull
+            try:
+                mean, maximum = measure(
+                    lambda cmd=command, sh=shell: call_command(cmd, shell=sh, use_pty=args.pty or None),
+                    args.num_calls,
+                )
+            finally:
+                sys.stdout = stdout
+            print(f"{name:45s} {ref_mean:13.1f} ms {mean:10.1f} ms (max {maximum:6.1f} ms) {mean - ref_mean:+7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -14,6 +14,7 @@ Copyright:
 # -----------------------------------------------------------------------------
 # Module Import
 # -----------------------------------------------------------------------------
+import json
 import os
 import platform
 import signal
@@ -120,9 +121,24 @@ class GitcacheIfc:
                 if field == "mirror-dir":
                     return mirror_dir
                 if field in database[mirror_dir]:
-                    return database[mirror_dir][field]
+                    return database[mirror_dir][field] + self.journal_increments(field, mirror_dir)
         return None
 
+    def journal_increments(self, counter: str, mirror_dir: str) -> int:
+        """Get the sum of the counter increments in the journals not folded into the database yet."""
+        journal_path = os.path.join(self.workspace.gitcache_dir_path, "journal")
+        if counter not in ("mirror-updates", "lfs-updates", "clones", "updates") or not os.path.isdir(journal_path):
+            return 0
+
+        amount = 0
+        for filename in os.listdir(journal_path):
+            with open(os.path.join(journal_path, filename), "r", encoding="utf-8") as file_handle:
+                for line in file_handle:
+                    record = json.loads(line)
+                    if record["path"] == mirror_dir and record["counter"] == counter:
+                        amount += record["amount"]
+        return amount
+
     def get_remote(self, checkout_dir: str) -> str:
         """Get the remote of the given checkout directory."""
         command = ["git", "-C", checkout_dir, "remote", "get-url", "origin"]
@@ -13,9 +13,13 @@
 # -----------------------------------------------------------------------------
 import io
 import platform
+import signal
 import sys
+import threading
+import time
 from unittest import TestCase
 
+import mock
 import pytest
 
 from git_cache.command_execution import call_command
@@ -140,9 +144,90 @@ class GitCacheCallCommandTest(TestCase):
         self.assertEqual(-2000, return_code)
         # On Windows we seem to not receive the partial output
         if not self.on_windows:
-            self.assertEqual(b"a\r\nb\r\n", stdout_buffer)
+            # Line endings depend on whether a PTY is used
+            self.assertEqual(b"a\nb\n", stdout_buffer.replace(b"\r\n", b"\n"))
         self.assertEqual(b"", stderr_buffer)
 
+    @pytest.mark.skipif(platform.system() in ["Windows"], reason="Test of the unix implementation")
+    def test_pty_and_pipe_output(self):
+        """git_cache.command_execution.call_command(): Output using PTYs and pipes."""
+        cmd = "echo a; echo b >&2"
+        return_code, stdout_buffer, stderr_buffer = call_command(cmd, shell=True, use_pty=True)
+        self.assertEqual(0, return_code)
+        self.assertEqual(b"a\r\n", stdout_buffer)
+        self.assertEqual(b"b\r\n", stderr_buffer)
+
+        return_code, stdout_buffer, stderr_buffer = call_command(cmd, shell=True, use_pty=False)
+        self.assertEqual(0, return_code)
+        self.assertEqual(b"a\n", stdout_buffer)
+        self.assertEqual(b"b\n", stderr_buffer)
+
+    @pytest.mark.skipif(platform.system() in ["Windows"], reason="Test of the unix implementation")
+    def test_automatic_pty_selection(self):
+        """git_cache.command_execution.call_command(): Use PTYs only for terminals and the output timeout."""
+        cmd = "test -t 1 && echo stdout-tty; test -t 2 && echo stderr-tty; true"
+        with mock.patch("git_cache.command_execution_unix.is_terminal", return_value=False):
+            _, stdout_buffer, _ = call_command(cmd, shell=True)
+            self.assertEqual(b"", stdout_buffer)
+            _, stdout_buffer, _ = call_command(cmd, shell=True, output_timeout=10)
+            self.assertEqual(b"stderr-tty\n", stdout_buffer)
+        with mock.patch("git_cache.command_execution_unix.is_terminal", return_value=True):
+            _, stdout_buffer, _ = call_command(cmd, shell=True)
+            self.assertEqual(b"stdout-tty\r\nstderr-tty\r\n", stdout_buffer)
+
+    @pytest.mark.skipif(platform.system() in ["Windows"], reason="Test of the unix implementation")
+    def test_throttled_flush(self):
+        """git_cache.command_execution.call_command(): Flush non-interactive output throttled."""
+        stdout = mock.MagicMock()
+        stdout.isatty.return_value = False
+        cmd = "for i in 1 2 3 4 5; do echo $i; sleep 0.01; done"
+        with mock.patch("git_cache.command_execution_unix.sys.stdout", stdout):
+            return_code, stdout_buffer, _ = call_command(cmd, shell=True)
+        self.assertEqual(0, return_code)
+        self.assertEqual(b"1\n2\n3\n4\n5\n", stdout_buffer)
+        self.assertEqual(b"1\n2\n3\n4\n5\n", b"".join(call.args[0] for call in stdout.buffer.write.call_args_list))
+        self.assertLess(stdout.buffer.flush.call_count, 3)
+
+    @pytest.mark.skipif(platform.system() in ["Windows"], reason="Test of the unix implementation")
+    def test_background_process_keeping_output_open(self):
+        """git_cache.command_execution.call_command(): Return on exit even if the output is still open."""
+        start_time = time.monotonic()
+        return_code, stdout_buffer, stderr_buffer = call_command("sleep 3 & echo started", shell=True, use_pty=True)
+        self.assertLess(time.monotonic() - start_time, 2.0)
+        self.assertEqual(0, return_code)
+        self.assertEqual(b"started\r\n", stdout_buffer)
+        self.assertEqual(b"", stderr_buffer)
+
+        start_time = time.monotonic()
+        return_code, stdout_buffer, stderr_buffer = call_command("sleep 3 & echo started", shell=True, use_pty=False)
+        self.assertLess(time.monotonic() - start_time, 2.0)
+        self.assertEqual(0, return_code)
+        self.assertEqual(b"started\n", stdout_buffer)
+
+    @pytest.mark.skipif(platform.system() in ["Windows"], reason="Test of the unix implementation")
+    def test_exit_notification_without_pidfd(self):
+        """git_cache.command_execution.call_command(): Exit notification using SIGCHLD."""
+        previous_handler = signal.getsignal(signal.SIGCHLD)
+        with mock.patch("git_cache.command_execution_unix.os.pidfd_open", side_effect=OSError, create=True):
+            start_time = time.monotonic()
+            return_code, stdout_buffer, _ = call_command(
+                "sleep 3 & echo started", shell=True, output_timeout=10, use_pty=True
+            )
+        self.assertLess(time.monotonic() - start_time, 2.0)
+        self.assertEqual(0, return_code)
+        self.assertEqual(b"started\r\n", stdout_buffer)
+        self.assertEqual(previous_handler, signal.getsignal(signal.SIGCHLD))
+
+    @pytest.mark.skipif(platform.system() in ["Windows"], reason="Test of the unix implementation")
+    def test_exit_polling_in_thread(self):
+        """git_cache.command_execution.call_command(): Poll the exit status in threads without pidfd."""
+        results = []
+        with mock.patch("git_cache.command_execution_unix.os.pidfd_open", side_effect=OSError, create=True):
+            thread = threading.Thread(target=lambda: results.append(call_command(["sleep", "2"], command_timeout=1)))
+            thread.start()
+            thread.join()
+        self.assertEqual([(-1000, b"", b"")], results)
+
 
 # -----------------------------------------------------------------------------
 # EOF
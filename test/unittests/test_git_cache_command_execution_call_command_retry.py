@@ -141,7 +141,8 @@ class GitCacheCallCommandRetryTest(TestCase):
         self.assertEqual(-2000, return_code)
         # On Windows we seem to not receive the partial output
         if not self.on_windows:
-            self.assertEqual(b"a\r\nb\r\n", stdout_buffer)
+            # Line endings depend on whether a PTY is used
+            self.assertEqual(b"a\nb\n", stdout_buffer.replace(b"\r\n", b"\n"))
         self.assertEqual(b"", stderr_buffer)
 
     def test_remove_dir(self):
@@ -201,6 +202,19 @@ class GitCacheCallCommandRetryTest(TestCase):
         self.assertEqual(1, return_code)
         self.assertIn(b"abort_marker", stdout_buffer)
 
+    def test_abort_pattern_with_bounded_output(self):
+        """git_cache.command_execution.call_command_retry(): Abort on pattern with bounded output."""
+        if self.on_windows:
+            cmd = "echo remove gc.log & for /L %i in (1,1,5000) do @echo %i & exit 1"
+        else:
+            cmd = "echo remove gc.log; seq 1 50000; exit 1"
+        return_code, stdout_buffer, _ = call_command_retry(
+            cmd, 3, shell=True, abort_on_pattern=b"remove gc.log", max_output_size=4096
+        )
+        self.assertEqual(-3000, return_code)
+        self.assertIn(b"remove gc.log", stdout_buffer)
+        self.assertLess(len(stdout_buffer), 3 * 4096)
+
 
 # -----------------------------------------------------------------------------
 # EOF
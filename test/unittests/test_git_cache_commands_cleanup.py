@@ -0,0 +1,167 @@
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.commands.cleanup module."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+
+from git_cache import trash
+from git_cache.commands import cleanup
+from git_cache.git_mirror import GitMirror
+from git_cache.helpers import get_disk_usage
+
+MIB = 1024 * 1024
+
+
+# -----------------------------------------------------------------------------
+# Helpers
+# -----------------------------------------------------------------------------
+def mockenv(**envvars):
+    """Set up a temporary new environment."""
+    return mock.patch.dict(os.environ, envvars)
+
+
+def entry(url, last_access, size):
+    """Create a database entry."""
+    return {"url": url, "last-update-time": 0.0, "last-access-time": last_access, "disk-usage": size}
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class GitCacheCleanupTest(TestCase):
+    """Test the cleanup of mirrors."""
+
+    def test_plan_eviction(self):
+        """git_cache.commands.cleanup.plan_eviction(): Select the least recently used mirrors."""
+        candidates = {
+            "/a": entry("a", 30.0, 10),
+            "/b": entry("b", 10.0, 20),
+            "/c": entry("c", 20.0, 30),
+            "/d": {"url": "d", "last-update-time": 5.0},
+        }
+        self.assertEqual([], cleanup.plan_eviction(candidates, 60, 0, 0, 100))
+        self.assertEqual([], cleanup.plan_eviction(candidates, 60, 60, 0, 100))
+        self.assertEqual(["/d", "/b"], cleanup.plan_eviction(candidates, 60, 59, 0, 100))
+        self.assertEqual(["/d", "/b", "/c"], cleanup.plan_eviction(candidates, 60, 20, 0, 100))
+        self.assertEqual(["/d", "/b", "/c"], cleanup.plan_eviction(candidates, 60, 0, 140, 100))
+        self.assertEqual(["/d", "/b", "/c", "/a"], cleanup.plan_eviction(candidates, 60, 5, 0, 100))
+
+    @mockenv(GITCACHE_MAX_CACHE_SIZE="50 MiB", GITCACHE_MIN_FREE_SPACE="", GITCACHE_MIRRORHANDLING_PINNED_REGEX="pin")
+    def test_cleanup(self):
+        """git_cache.commands.cleanup.git_cleanup(): Remove outdated and evict least recently used mirrors."""
+        entries = {
+            "/old": entry("old", 1.0, 10 * MIB),
+            "/pinned": entry("pinned", 2.0, 40 * MIB),
+            "/lru": entry("lru", 3.0, 20 * MIB),
+            "/recent": entry("recent", 4.0, 10 * MIB),
+        }
+        mirrors = {}
+
+        def get_mirror(url, path, database):
+            mirror = mock.Mock(url=url, path=path, database=database)
+            mirror.cleanup.side_effect = lambda dry_run: path == "/old"
+            mirror.delete.return_value = True
+            mirrors.setdefault(path, []).append(mirror)
+            return mirror
+
+        database = mock.MagicMock()
+        database.get_all.return_value = entries
+        with mock.patch.object(cleanup, "Database", return_value=database), mock.patch.object(
+            cleanup, "GitMirror", side_effect=get_mirror
+        ), mock.patch.object(cleanup.shutil, "disk_usage", return_value=mock.Mock(free=1000 * MIB)), mock.patch.object(
+            cleanup, "reconcile", return_value=(0, 0)
+        ), mock.patch.object(
+            cleanup, "get_trash_entries", return_value=[]
+        ), mock.patch.object(
+            cleanup, "empty_trash", return_value=0
+        ) as empty_trash:
+            with self.assertLogs(cleanup.LOG, "INFO") as logs:
+                self.assertEqual(0, cleanup.git_cleanup(dry_run=True))
+            self.assertIn("Would evict mirror /lru (20.0 MiB", "\n".join(logs.output))
+            self.assertIn("Would remove 2 mirrors reclaiming 30.0 MiB.", logs.output[-1])
+            self.assertNotIn("/pinned", mirrors)
+            empty_trash.assert_not_called()
+            for mirror_list in mirrors.values():
+                for mirror in mirror_list:
+                    mirror.delete.assert_not_called()
+
+            mirrors.clear()
+            self.assertEqual(0, cleanup.git_cleanup())
+            mirrors["/old"][0].cleanup.assert_called_once_with(False)
+            mirrors["/lru"][-1].delete.assert_called_once_with()
+            mirrors["/recent"][-1].delete.assert_not_called()
+            self.assertEqual(2, empty_trash.call_count)
+        database.save_disk_usages.assert_called_with({})
+
+    def test_reconcile(self):
+        """git_cache.commands.cleanup.reconcile(): Remove orphaned directories and missing mirrors."""
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            mirrors_dir = os.path.join(tmp_dir, "mirrors")
+            known = os.path.join(mirrors_dir, "host", "org", "known")
+            missing = os.path.join(mirrors_dir, "host", "org", "missing")
+            orphan = os.path.join(mirrors_dir, "host", "orphan")
+            busy = os.path.join(mirrors_dir, "other", "busy")
+            staging = os.path.join(mirrors_dir, "host", "org", ".staging", "new")
+            for directory in [known, orphan, busy, staging]:
+                os.makedirs(os.path.join(directory, "git"))
+            os.makedirs(os.path.join(mirrors_dir, "host", ".lock"))
+            os.makedirs(os.path.join(mirrors_dir, "host", "plain", "dir"))
+            self.assertEqual([staging, orphan, busy], cleanup.find_orphans(mirrors_dir, [known, missing]))
+
+            entries = {known: {"url": "known"}, missing: {"url": "missing"}}
+            database = mock.Mock()
+            database.get.return_value = None
+            with mock.patch.object(cleanup, "GITCACHE_DIR", tmp_dir), mock.patch.object(
+                trash, "GITCACHE_TRASH_DIR", os.path.join(tmp_dir, "trash")
+            ), mock.patch.object(trash, "reclaim_in_background"), mock.patch.object(cleanup, "GitMirror") as mirror:
+                mirror.get_lockfile.side_effect = GitMirror.get_lockfile
+                self.assertEqual(3, cleanup.reconcile(dict(entries), database, True)[0])
+                self.assertTrue(os.path.exists(orphan))
+                mirror.return_value.delete.assert_not_called()
+
+                os.makedirs(os.path.join(mirrors_dir, "other", ".lock"))
+                with cleanup.portalocker.Lock(GitMirror.get_lockfile(busy)):
+                    self.assertEqual(2, cleanup.reconcile(entries, database, False)[0])
+                self.assertFalse(os.path.exists(orphan))
+                self.assertFalse(os.path.exists(staging))
+                self.assertEqual(2, len(trash.get_trash_entries()))
+                self.assertTrue(os.path.exists(busy))
+                self.assertEqual([known], list(entries))
+                mirror.assert_called_once_with(url="missing", path=missing, database=database)
+                mirror.return_value.delete.assert_called_once_with()
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_get_disk_usage(self):
+        """git_cache.helpers.get_disk_usage(): Count hard linked files once."""
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(tmp_dir, "sub"))
+            with open(os.path.join(tmp_dir, "sub", "file"), "wb") as handle:
+                handle.write(b"x" * 100000)
+            single = get_disk_usage(tmp_dir)
+            self.assertGreaterEqual(single, 100000)
+            os.link(os.path.join(tmp_dir, "sub", "file"), os.path.join(tmp_dir, "link"))
+            self.assertEqual(single, get_disk_usage(tmp_dir))
+            self.assertEqual(0, get_disk_usage(os.path.join(tmp_dir, "missing")))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
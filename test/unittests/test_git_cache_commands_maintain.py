@@ -0,0 +1,73 @@
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.commands.maintain module."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+import portalocker
+
+from git_cache.commands import maintain
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class GitCacheMaintainMirrorsTest(TestCase):
+    """Test the maintenance of all mirrors."""
+
+    def setUp(self):
+        """Set up mirrors that become due during the maintenance."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.lockfile = os.path.join(self.tmp_dir, "maintenance.lock")
+        self.due = {"/mirrors/a": [True, True], "/mirrors/b": [False, True]}
+        self.maintained = []
+
+        def create_mirror(path, database):  # pylint: disable=unused-argument
+            mirror = mock.MagicMock()
+            mirror.is_maintenance_due.side_effect = lambda: self.due[path].pop(0) if self.due[path] else False
+            mirror.maintain.side_effect = lambda: self.maintained.append(path) or path != "/mirrors/b"
+            return mirror
+
+        database = mock.MagicMock()
+        database.get_all.return_value = dict.fromkeys(self.due, {})
+        self.patches = [
+            mock.patch.object(maintain, "GITCACHE_MAINTENANCE_LOCK", self.lockfile),
+            mock.patch.object(maintain, "Database", return_value=database),
+            mock.patch.object(maintain, "GitMirror", side_effect=create_mirror),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        """Tear down the test case."""
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_maintain_mirrors(self):
+        """git_cache.commands.maintain.git_maintain_mirrors(): Maintain each due mirror once."""
+        self.assertEqual(1, maintain.git_maintain_mirrors())
+        self.assertEqual(["/mirrors/a", "/mirrors/b"], self.maintained)
+
+    def test_maintain_mirrors_locked(self):
+        """git_cache.commands.maintain.git_maintain_mirrors(): Skip the maintenance if another process runs it."""
+        with portalocker.Lock(self.lockfile):
+            self.assertEqual(0, maintain.git_maintain_mirrors())
+        self.assertEqual([], self.maintained)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,77 @@
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.commands.submodule_update module."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import time
+from unittest import TestCase
+
+import mock
+
+from git_cache.commands import submodule_update
+from git_cache.config import get_config
+from git_cache.git_options import GitOptions
+from git_cache.parallel_output import run_in_order
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class GitCacheSubmoduleUpdateTest(TestCase):
+    """Test the parallel update of submodules."""
+
+    def test_jobs(self):
+        """git_cache.commands.submodule_update.get_submodule_jobs(): Test the number of jobs."""
+        with mock.patch.object(submodule_update, "get_config_value", return_value=None):
+            self.assertEqual(1, submodule_update.get_submodule_jobs(GitOptions(["submodule", "update"])))
+            self.assertEqual(4, submodule_update.get_submodule_jobs(GitOptions(["submodule", "update", "-j", "4"])))
+            self.assertEqual(
+                2, submodule_update.get_submodule_jobs(GitOptions(["submodule", "update", "-j4", "--jobs=2"]))
+            )
+            self.assertEqual(
+                os.cpu_count(), submodule_update.get_submodule_jobs(GitOptions(["submodule", "update", "--jobs", "0"]))
+            )
+            self.assertEqual(1, submodule_update.get_submodule_jobs(GitOptions(["submodule", "update", "-j", "x"])))
+
+        with mock.patch.object(submodule_update, "get_config_value", return_value="3") as mock_value:
+            self.assertEqual(3, submodule_update.get_submodule_jobs(GitOptions(["submodule", "update"])))
+            mock_value.assert_called_once_with(mock.ANY, "submodule.fetchJobs")
+            self.assertEqual(5, submodule_update.get_submodule_jobs(GitOptions(["submodule", "update", "-j", "5"])))
+
+    def test_fresh_mirrors(self):
+        """git_cache.commands.submodule_update.fresh_mirrors(): Extend the update interval temporarily."""
+
+        def update_interval():
+            return get_config().get("MirrorHandling", "UpdateInterval")
+
+        with mock.patch.dict(os.environ, {"GITCACHE_UPDATE_INTERVAL": "2"}):
+            with submodule_update.fresh_mirrors(time.time() - 10):
+                self.assertEqual(11, update_interval())
+                self.assertEqual([11, 11], run_in_order([update_interval, update_interval], 2))
+                self.assertEqual("2", os.environ["GITCACHE_UPDATE_INTERVAL"])
+            self.assertEqual(2, update_interval())
+
+            with submodule_update.fresh_mirrors(time.time()):
+                self.assertEqual(2, update_interval())
+
+            os.environ["GITCACHE_UPDATE_INTERVAL"] = "-1"
+            with submodule_update.fresh_mirrors(time.time() - 10):
+                self.assertEqual(-1, update_interval())
+
+            del os.environ["GITCACHE_UPDATE_INTERVAL"]
+            with submodule_update.fresh_mirrors(time.time() - 10):
+                self.assertNotIn("GITCACHE_UPDATE_INTERVAL", os.environ)
+                self.assertGreaterEqual(update_interval(), 11)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
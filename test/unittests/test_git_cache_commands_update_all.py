@@ -0,0 +1,112 @@
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.commands.update_all module."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import threading
+import time
+from unittest import TestCase
+
+import mock
+
+from git_cache.commands import update_all
+from git_cache.global_settings import GITCACHE_DIR
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class GitCacheUpdateAllTest(TestCase):
+    """Test the parallel update of all mirrors."""
+
+    @staticmethod
+    def _mirror_path(name):
+        """Get the path of a mirror."""
+        return os.path.join(GITCACHE_DIR, "mirrors", *name.split("/"))
+
+    def test_host(self):
+        """git_cache.commands.update_all.get_host(): Test host extraction."""
+        self.assertEqual("github.com", update_all.get_host(self._mirror_path("github.com/seeraven/gitcache")))
+        self.assertEqual("server_8080", update_all.get_host(self._mirror_path("server_8080/repo")))
+        self.assertEqual(
+            "github.com/seeraven/gitcache",
+            update_all.get_display_name(self._mirror_path("github.com/seeraven/gitcache")),
+        )
+
+    def test_scheduler(self):
+        """git_cache.commands.update_all.UpdateScheduler: Test the per-host limit."""
+        paths = [self._mirror_path(name) for name in ["a/1", "a/2", "a/3", "b/1"]]
+        scheduler = update_all.UpdateScheduler(paths, 2)
+        self.assertEqual(paths[0], scheduler.next())
+        self.assertEqual(paths[1], scheduler.next())
+        # Host 'a' is at its limit, so the mirror of host 'b' is handed out first
+        self.assertEqual(paths[3], scheduler.next())
+
+        threading.Timer(0.1, scheduler.done, [paths[0]]).start()
+        self.assertEqual(paths[2], scheduler.next())
+        for path in paths[1:]:
+            scheduler.done(path)
+        self.assertIsNone(scheduler.next())
+
+    def test_parallel_update(self):
+        """git_cache.commands.update_all.update_mirrors_parallel(): Test the concurrency limits."""
+        paths = [self._mirror_path(f"{host}/{index}") for host in ["a", "b"] for index in range(4)]
+        lock = threading.Lock()
+        active = {"a": 0, "b": 0, "total": 0}
+        maximum = {"a": 0, "b": 0, "total": 0}
+
+        def fake_update(path, _database):
+            host = update_all.get_host(path)
+            with lock:
+                for key in [host, "total"]:
+                    active[key] += 1
+                    maximum[key] = max(maximum[key], active[key])
+            time.sleep(0.05)
+            with lock:
+                for key in [host, "total"]:
+                    active[key] -= 1
+            return update_all.UpdateResult(path, not path.endswith("3"), 0.05)
+
+        with mock.patch.object(update_all, "update_mirror", side_effect=fake_update):
+            with mock.patch.object(update_all, "Database"):
+                results = update_all.update_mirrors_parallel(paths, 3, 2)
+
+        self.assertEqual(sorted(paths), sorted(result.path for result in results))
+        self.assertEqual(2, len([result for result in results if not result.success]))
+        self.assertEqual(2, maximum["a"])
+        self.assertEqual(2, maximum["b"])
+        self.assertEqual(3, maximum["total"])
+
+    def test_probe_mirrors(self):
+        """git_cache.commands.update_all.probe_mirrors(): Test the probe of the upstream repositories."""
+        paths = [self._mirror_path(name) for name in ["b/1", "a/1", "a/2"]]
+        probed = []
+
+        def fake_mirror(path, database):
+            probed.append(path)
+            mirror = mock.MagicMock()
+            mirror.probe_upstream.return_value = None if path.endswith("2") else f"digest-{len(probed)}"
+            return mirror
+
+        with mock.patch.object(update_all, "GitMirror", side_effect=fake_mirror):
+            with mock.patch.object(update_all, "Database"):
+                digests = update_all.probe_mirrors(paths, 1, 2)
+                self.assertEqual(paths, probed)
+                self.assertEqual({paths[0]: "digest-1", paths[1]: "digest-2", paths[2]: None}, digests)
+
+                parallel_digests = update_all.probe_mirrors(paths, 3, 2)
+                self.assertEqual(sorted(paths), sorted(parallel_digests))
+                self.assertIsNone(parallel_digests[paths[2]])
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
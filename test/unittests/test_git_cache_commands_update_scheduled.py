@@ -0,0 +1,109 @@
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.commands.update_scheduled module."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+from unittest import TestCase
+
+import mock
+
+from git_cache.commands import update_scheduled
+from git_cache.commands.update_all import UpdateResult
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class GitCacheUpdateScheduledTest(TestCase):
+    """Test the scheduled update of the mirrors."""
+
+    NOW = 1000 * DAY
+
+    def _entry(self, accessed, access_interval, updated, change_interval=None, fetch_size=0.0):
+        """Get a database entry with the given history relative to NOW."""
+        entry = {
+            "last-access-time": self.NOW - accessed,
+            "access-interval": access_interval,
+            "last-update-time": self.NOW - updated,
+            "fetch-size": fetch_size,
+        }
+        if change_interval is not None:
+            entry["change-interval"] = change_interval
+        return entry
+
+    def test_priority(self):
+        """git_cache.commands.update_scheduled.plan_updates(): Order the mirrors by their priority."""
+        entries = {
+            # Used every 10 minutes and changing every hour
+            "hot": self._entry(60.0, 600.0, HOUR, HOUR),
+            # Used once a day and changing every hour
+            "daily": self._entry(HOUR, DAY, HOUR, HOUR),
+            # Used every 10 minutes, but updated recently and changing once a week
+            "fresh": self._entry(60.0, 600.0, HOUR, 7 * DAY),
+            # Not used for longer than IdleAfter
+            "idle": self._entry(8 * DAY, HOUR, 9 * DAY, HOUR),
+            # Used once a day, but not within the last three days
+            "cooling": self._entry(3 * DAY, DAY, 3 * DAY, DAY),
+            # Without any history
+            "new": {"last-update-time": self.NOW - HOUR},
+        }
+        self.assertEqual(["hot", "daily", "cooling", "new"], update_scheduled.plan_updates(entries, self.NOW, 7 * DAY))
+        self.assertEqual(0.0, update_scheduled.get_priority(entries["fresh"], self.NOW, 7 * DAY))
+        self.assertEqual(0.0, update_scheduled.get_priority(entries["idle"], self.NOW, 7 * DAY))
+
+    def test_budget(self):
+        """git_cache.commands.update_scheduled.UpdateBudget: Limit the time and the bandwidth."""
+        budget = update_scheduled.UpdateBudget(60.0, 1000)
+        self.assertTrue(budget.reserve(600.0))
+        self.assertFalse(budget.reserve(600.0))
+        self.assertTrue(budget.reserve(400.0))
+
+        self.assertTrue(update_scheduled.UpdateBudget(60.0, 0).reserve(1e12))
+        budget.start_time -= 60.0
+        self.assertFalse(budget.reserve(0.0))
+
+    def test_update_scheduled(self):
+        """git_cache.commands.update_scheduled.git_update_scheduled(): Update the mirrors within the budget."""
+        entries = {
+            "hot": self._entry(60.0, 600.0, HOUR, HOUR, fetch_size=800.0),
+            "daily": self._entry(HOUR, DAY, HOUR, HOUR, fetch_size=800.0),
+            "small": self._entry(3 * DAY, DAY, 3 * DAY, DAY, fetch_size=100.0),
+            "idle": self._entry(8 * DAY, HOUR, 9 * DAY, HOUR),
+        }
+        options = {
+            ("Update", "Jobs"): 1,
+            ("Scheduler", "IdleAfter"): 7 * DAY,
+            ("Scheduler", "TimeBudget"): HOUR,
+            ("Scheduler", "BandwidthBudget"): 1000,
+        }
+        config = mock.MagicMock()
+        config.get.side_effect = lambda section, option: options[(section, option)]
+        update_function = mock.MagicMock(side_effect=lambda path, _database: UpdateResult(path, True, 1.0))
+
+        with mock.patch.object(update_scheduled, "get_config", return_value=config), mock.patch.object(
+            update_scheduled, "Database"
+        ) as database, mock.patch.object(update_scheduled.time, "time", return_value=self.NOW):
+            database.return_value.get_all.return_value = entries
+            self.assertEqual(0, update_scheduled.git_update_scheduled(dry_run=True, update_function=update_function))
+            update_function.assert_not_called()
+
+            self.assertEqual(0, update_scheduled.git_update_scheduled(update_function=update_function))
+            self.assertEqual(["hot", "small"], [call[0][0] for call in update_function.call_args_list])
+
+            update_function.side_effect = lambda path, _database: UpdateResult(path, False, 1.0)
+            self.assertEqual(1, update_scheduled.git_update_scheduled(update_function=update_function))
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -37,16 +37,18 @@ class GitCacheConfigTest(TestCase):
 
     def setUp(self):
         """Set up the test case."""
-        if os.path.exists("/tmp/config"):
-            os.unlink("/tmp/config")
+        for filename in ["/tmp/config", "/tmp/tools.json", "/tmp/mirror.config"]:
+            if os.path.exists(filename):
+                os.unlink(filename)
 
     def tearDown(self):
         """Tear down the test case."""
         importlib.reload(git_cache.global_settings)
         importlib.reload(git_cache.config)
 
-        if os.path.exists("/tmp/config"):
-            os.unlink("/tmp/config")
+        for filename in ["/tmp/config", "/tmp/tools.json", "/tmp/mirror.config"]:
+            if os.path.exists(filename):
+                os.unlink(filename)
 
     @mockenv(GITCACHE_DIR="/tmp")
     def test_defaults(self):
@@ -64,6 +66,7 @@ class GitCacheConfigTest(TestCase):
         self.assertEqual(config.get("LFS", "OutputTimeout"), 5 * 60)
         self.assertEqual(config.get("LFS", "PerMirrorStorage"), True)
         self.assertEqual(config.get("Clone", "CloneStyle"), "Full")
+        self.assertEqual(config.get("Command", "MaxCapturedOutput"), 1024 * 1024)
 
     @mockenv(GITCACHE_DIR="/tmp", GITCACHE_CLONE_COMMAND_TIMEOUT="a")
     def test_timeparse_error(self):
@@ -73,6 +76,16 @@ class GitCacheConfigTest(TestCase):
         config = git_cache.config.Config()
         self.assertEqual(config.get("Clone", "CommandTimeout"), 0)
 
+    def test_str_to_bytes(self):
+        """git_cache.config.str_to_bytes(): Convert sizes."""
+        self.assertEqual(git_cache.config.str_to_bytes("1000"), 1000)
+        self.assertEqual(git_cache.config.str_to_bytes("12 B"), 12)
+        self.assertEqual(git_cache.config.str_to_bytes("512k"), 512 * 1024)
+        self.assertEqual(git_cache.config.str_to_bytes("1.5 MiB"), 1536 * 1024)
+        self.assertEqual(git_cache.config.str_to_bytes("2 GB"), 2 * 1024**3)
+        self.assertEqual(git_cache.config.str_to_bytes("1 t"), 1024**4)
+        self.assertEqual(git_cache.config.str_to_bytes("a lot"), 0)
+
     @mockenv(
         GITCACHE_DIR="/tmp", GITCACHE_UPDATE_INTERVAL="-1", GITCACHE_LFS_PER_MIRROR_STORAGE="0", GITCACHE_DISABLE="1"
     )
@@ -106,6 +119,118 @@ Disable = true
         self.assertEqual(config.get("LFS", "PerMirrorStorage"), False)
         self.assertEqual(config.get("System", "Disable"), True)
 
+    @mockenv(GITCACHE_DIR="/tmp")
+    def test_get_config(self):
+        """git_cache.config.get_config(): Share the configuration until the file is modified."""
+        importlib.reload(git_cache.global_settings)
+        importlib.reload(git_cache.config)
+        config = git_cache.config.get_config()
+        self.assertTrue(os.path.exists("/tmp/config"))
+        self.assertIs(config, git_cache.config.get_config())
+
+        with open("/tmp/config", "w", encoding="utf-8") as file_handle:
+            file_handle.write("[Clone]\nretries = 5\n")
+        mtime = os.stat("/tmp/config").st_mtime_ns + 1000000
+        os.utime("/tmp/config", ns=(mtime, mtime))
+        reloaded_config = git_cache.config.get_config()
+        self.assertIsNot(config, reloaded_config)
+        self.assertEqual(reloaded_config.get("Clone", "Retries"), 5)
+        self.assertIs(reloaded_config, git_cache.config.get_config())
+
+    @mockenv(GITCACHE_DIR="/tmp", GITCACHE_UPDATE_RETRIES="9")
+    def test_overlay(self):
+        """git_cache.config.Config.overlay(): Layer a per-mirror configuration."""
+        importlib.reload(git_cache.global_settings)
+        importlib.reload(git_cache.config)
+        with open("/tmp/mirror.config", "w", encoding="utf-8") as file_handle:
+            file_handle.write("[Clone]\nretries = 7\n\n[Update]\nretries = 8\n")
+        config = git_cache.config.get_config()
+        mirror_config = config.overlay("/tmp/mirror.config")
+
+        self.assertEqual(mirror_config.get("Clone", "Retries"), 7)
+        self.assertEqual(mirror_config.get("Update", "Retries"), 9)
+        self.assertEqual(mirror_config.get("GC", "Retries"), 3)
+        self.assertEqual(config.get("Clone", "Retries"), 3)
+        self.assertEqual(config.overlay("/tmp/does-not-exist").get("Clone", "Retries"), 3)
+
+    @mockenv(GITCACHE_DIR="/tmp", GITCACHE_UPDATE_RETRIES="9")
+    def test_environment_overrides(self):
+        """git_cache.config.environment_overrides(): Override the environment of the configuration items."""
+        importlib.reload(git_cache.global_settings)
+        importlib.reload(git_cache.config)
+        with open("/tmp/mirror.config", "w", encoding="utf-8") as file_handle:
+            file_handle.write("[Clone]\nretries = 7\n")
+        with git_cache.config.environment_overrides({"GITCACHE_CLONE_RETRIES": "5"}):
+            config = git_cache.config.get_config()
+            mirror_config = config.overlay("/tmp/mirror.config")
+            self.assertEqual(mirror_config.get("Clone", "Retries"), 5)
+            self.assertEqual(mirror_config.get("Update", "Retries"), 9)
+            self.assertEqual(
+                {"GITCACHE_CLONE_RETRIES": "5", "GITCACHE_UPDATE_RETRIES": "9"},
+                {key: value for key, value in config.get_environment().items() if key.endswith("_RETRIES")},
+            )
+            self.assertNotIn("GITCACHE_CLONE_RETRIES", os.environ)
+        self.assertEqual(git_cache.config.get_config().get("Clone", "Retries"), 3)
+
+    @mockenv(GITCACHE_DIR="/tmp")
+    def test_tool_cache(self):
+        """git_cache.config.find_git(): Persist the located git command."""
+        importlib.reload(git_cache.global_settings)
+        importlib.reload(git_cache.config)
+        real_git = git_cache.config.find_git()
+        self.assertTrue(os.path.exists("/tmp/tools.json"))
+
+        # A new process uses the cache file without searching the PATH
+        importlib.reload(git_cache.config)
+        with mock.patch("os.access", return_value=False):
+            self.assertEqual(git_cache.config.find_git(), real_git)
+
+            # Modifying the PATH invalidates the cache
+            importlib.reload(git_cache.config)
+            with mockenv(PATH=os.getenv("PATH", "") + os.pathsep + "/tmp"):
+                self.assertEqual(git_cache.config.find_git(), "/usr/bin/git")
+
+        # Modifying the configuration file invalidates the cache
+        importlib.reload(git_cache.config)
+        git_cache.config.find_git()
+        with open("/tmp/config", "w", encoding="utf-8") as file_handle:
+            file_handle.write("[Clone]\nretries = 5\n")
+        importlib.reload(git_cache.config)
+        self.assertEqual(git_cache.config.get_tool_cache(), {})
+
+    @mockenv(GITCACHE_DIR="/tmp")
+    def test_tool_cache_git_lfs(self):
+        """git_cache.config.has_git_lfs_cmd(): Persist the availability of git-lfs."""
+        importlib.reload(git_cache.global_settings)
+        importlib.reload(git_cache.config)
+        git_lfs = "/tmp/git-lfs"
+        with open(git_lfs, "w", encoding="utf-8"):
+            pass
+
+        # A missing git-lfs is not cached, so that it is found once installed
+        with mock.patch("git_cache.config.shutil.which", return_value=None), mock.patch(
+            "git_cache.config.getstatusoutput", return_value=(1, "")
+        ):
+            self.assertFalse(git_cache.config.has_git_lfs_cmd())
+        importlib.reload(git_cache.config)
+        self.assertNotIn("git-lfs", git_cache.config.get_tool_cache())
+
+        # A long running process finds git-lfs once installed
+        with mock.patch("git_cache.config.shutil.which", return_value=None):
+            self.assertFalse(git_cache.config.has_git_lfs_cmd())
+        with mock.patch("git_cache.config.shutil.which", return_value=git_lfs), mock.patch(
+            "git_cache.config.getstatusoutput", return_value=(0, "git-lfs/3.0")
+        ) as mock_call:
+            self.assertTrue(git_cache.config.has_git_lfs_cmd())
+            self.assertTrue(git_cache.config.has_git_lfs_cmd())
+            self.assertEqual(mock_call.call_count, 1)
+
+        importlib.reload(git_cache.config)
+        with mock.patch("git_cache.config.getstatusoutput", return_value=(1, "")) as mock_call:
+            self.assertTrue(git_cache.config.has_git_lfs_cmd())
+            mock_call.assert_not_called()
+        os.unlink(git_lfs)
+
     @mockenv(GITCACHE_DIR="/tmp")
     def test_str_rep(self):
         """git_cache.config.Config: String representation."""
@@ -117,12 +242,14 @@ Disable = true
         expected_config_str = f"""Clone:
  clonestyle           = Full                 (GITCACHE_CLONE_STYLE)
  commandtimeout       = 1 hour               (GITCACHE_CLONE_COMMAND_TIMEOUT)
+ deepenstep           = 1000                 (GITCACHE_CLONE_DEEPEN_STEP)
  outputtimeout        = 5 minutes            (GITCACHE_CLONE_OUTPUT_TIMEOUT)
  retries              = 3                    (GITCACHE_CLONE_RETRIES)
 
 Command:
  checkinterval        = 2 seconds            (GITCACHE_COMMAND_CHECK_INTERVAL)
  locktimeout          = 1 hour               (GITCACHE_COMMAND_LOCK_TIMEOUT)
+ maxcapturedoutput    = 1 MiB                (GITCACHE_COMMAND_MAX_CAPTURED_OUTPUT)
  warniflockedfor      = 10 seconds           (GITCACHE_COMMAND_WARN_IF_LOCKED_FOR)
 
 GC:
@@ -136,22 +263,44 @@ LFS:
  permirrorstorage     = True                 (GITCACHE_LFS_PER_MIRROR_STORAGE)
  retries              = 3                    (GITCACHE_LFS_RETRIES)
 
+Maintenance:
+ fullinterval         = 1 week               (GITCACHE_MAINTENANCE_FULL_INTERVAL)
+ interval             = 1 hour               (GITCACHE_MAINTENANCE_INTERVAL)
+
 MirrorHandling:
  cleanupafter         = 14 days              (GITCACHE_CLEANUP_AFTER)
+ maxcachesize         = 0                    (GITCACHE_MAX_CACHE_SIZE)
+ maxstaleness         = 0 seconds            (GITCACHE_MAX_STALENESS)
+ minfreespace         = 0                    (GITCACHE_MIN_FREE_SPACE)
+ pinnedregex          =                      (GITCACHE_MIRRORHANDLING_PINNED_REGEX)
  updateinterval       = 0 seconds            (GITCACHE_UPDATE_INTERVAL)
 
+Scheduler:
+ bandwidthbudget      = 0                    (GITCACHE_SCHEDULER_BANDWIDTH_BUDGET)
+ cycleinterval        = 0 seconds            (GITCACHE_SCHEDULER_CYCLE_INTERVAL)
+ idleafter            = 7 days               (GITCACHE_SCHEDULER_IDLE_AFTER)
+ timebudget           = 10 minutes           (GITCACHE_SCHEDULER_TIME_BUDGET)
+
 System:
  disable              = False                (GITCACHE_DISABLE)
  realgit              = {expected_git_cmd : <20} (GITCACHE_REAL_GIT)
 
 Update:
  commandtimeout       = 1 hour               (GITCACHE_UPDATE_COMMAND_TIMEOUT)
+ jobs                 = 1                    (GITCACHE_UPDATE_JOBS)
+ maxjobsperhost       = 4                    (GITCACHE_UPDATE_MAX_JOBS_PER_HOST)
  outputtimeout        = 5 minutes            (GITCACHE_UPDATE_OUTPUT_TIMEOUT)
  retries              = 3                    (GITCACHE_UPDATE_RETRIES)
+ upstreamprobe        = All                  (GITCACHE_UPDATE_UPSTREAM_PROBE)
 
 UrlPatterns:
  excluderegex         =                      (GITCACHE_URLPATTERNS_EXCLUDE_REGEX)
  includeregex         = .*                   (GITCACHE_URLPATTERNS_INCLUDE_REGEX)
+
+Webhook:
+ address              = 127.0.0.1            (GITCACHE_WEBHOOK_ADDRESS)
+ port                 = 0                    (GITCACHE_WEBHOOK_PORT)
+ secret               =                      (GITCACHE_WEBHOOK_SECRET)
 """
         print(str(config))
         self.assertEqual(str(config), expected_config_str)
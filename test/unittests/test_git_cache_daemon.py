@@ -0,0 +1,173 @@
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.daemon and git_cache.daemon_client modules."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+import mock
+import portalocker
+
+from git_cache import daemon, daemon_client
+from git_cache.config import environment_overrides
+from git_cache.git_mirror import Locker
+from git_cache.parallel_output import multiplexed_output
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class GitCacheDaemonTest(TestCase):
+    """Test the gitcache daemon serving mirror updates."""
+
+    def setUp(self):
+        """Start the daemon on a temporary socket."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmp_dir, "daemon.sock")
+        self.updates = []
+        self.max_staleness = []
+
+        def fake_update(mirror, ref=None, **_kwargs):
+            self.updates.append(ref)
+            self.max_staleness.append(mirror.config.get("MirrorHandling", "MaxStaleness"))
+            print(f"Updating {ref}")
+            time.sleep(0.2)
+            mirror._record_cache("hit_update")  # pylint: disable=protected-access
+            return True
+
+        self.patches = [
+            mock.patch.object(daemon_client, "GITCACHE_DAEMON_SOCKET", self.socket_path),
+            mock.patch.object(daemon, "Database"),
+            mock.patch.object(daemon.GitMirror, "update", autospec=True, side_effect=fake_update),
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.server = daemon.GitcacheDaemon(self.socket_path)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        """Stop the daemon."""
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_execute(self):
+        """git_cache.daemon.GitcacheDaemon.execute(): Return the result and send the output of an update."""
+        messages = []
+        with multiplexed_output():
+            response = self.server.execute(
+                {"command": "update", "url": "https://example.com/repo", "ref": "main"}, messages.append
+            )
+        self.assertEqual({"success": True, "event": "hit_update"}, response)
+        self.assertEqual([{"output": ["stdout", "Updating main\n"]}], messages)
+        self.assertFalse(self.server.execute({"command": "unknown"}, messages.append)["success"])
+
+    def test_request_update(self):
+        """git_cache.daemon_client.request_update(): Send the update with the environment of the client."""
+        stdout = io.StringIO()
+        with mock.patch.object(daemon_client.sys, "stdout", stdout):
+            self.assertEqual((True, "hit_update"), daemon_client.request_update("https://example.com/repo"))
+            with environment_overrides({"GITCACHE_MAX_STALENESS": "42"}):
+                self.assertEqual((True, "hit_update"), daemon_client.request_update("https://example.com/repo"))
+        self.assertEqual([None, None], self.updates)
+        self.assertEqual(42, self.max_staleness[1])
+        self.assertNotEqual(42, self.max_staleness[0])
+        self.assertEqual("Updating None\nUpdating None\n", stdout.getvalue())
+
+    def test_read_timeout(self):
+        """git_cache.daemon_client.send_request(): Give up if the daemon does not answer in time."""
+        with self.assertLogs(daemon_client.LOG, "WARNING"):
+            self.assertIsNone(
+                daemon_client.send_request({"command": "update", "url": "https://example.com/repo"}, read_timeout=0.05)
+            )
+
+    def test_blocking_lock(self):
+        """git_cache.git_mirror.Locker: Wait for a lock held by another process in a blocking call."""
+        lockfile = os.path.join(self.tmp_dir, "mirror.lock")
+        config = mock.MagicMock()
+        config.get.return_value = 0
+        other = portalocker.Lock(lockfile)
+        other.acquire()
+        threading.Timer(0.2, other.release).start()
+        daemon_client.set_serving(True)
+        try:
+            start_time = time.time()
+            with Locker("Mirror", lockfile, config):
+                self.assertGreaterEqual(time.time() - start_time, 0.15)
+        finally:
+            daemon_client.set_serving(False)
+
+    def test_deduplication(self):
+        """git_cache.daemon.GitcacheDaemon.update(): Reuse the result of an update started after the request."""
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(daemon_client.request_update("https://example.com/repo")))
+            for _ in range(3)
+        ]
+        with mock.patch.object(daemon_client.sys, "stdout", io.StringIO()):
+            threads[0].start()
+            time.sleep(0.1)
+            for thread in threads[1:]:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        # The second update is required as the first one started before the other requests
+        self.assertEqual(2, len(self.updates))
+        self.assertEqual(
+            [(True, "hit_coalesced"), (True, "hit_update"), (True, "hit_update")], sorted(results, key=str)
+        )
+
+    def test_scheduler(self):
+        """git_cache.daemon.run_scheduler(): Run the scheduled updates through the mirror queues."""
+        stop = threading.Event()
+        database = mock.MagicMock()
+        database.get_url_for_path.return_value = "https://example.com/repo"
+        results = []
+
+        def fake_update_scheduled(update_function):
+            try:
+                results.append(update_function(os.path.join(self.tmp_dir, "mirror"), database))
+            finally:
+                stop.set()
+
+        with mock.patch.object(daemon, "git_update_scheduled", side_effect=fake_update_scheduled):
+            daemon.run_scheduler(self.server, 0.01, stop)
+
+        self.assertEqual([None], self.updates)
+        self.assertEqual([True], [result.success for result in results])
+        self.assertGreater(self.server.get_queue(os.path.join(self.tmp_dir, "mirror")).last_start, 0.0)
+
+    def test_fallback(self):
+        """git_cache.daemon_client.request_update(): Return None if the daemon is not available."""
+        with mock.patch.object(daemon_client, "GITCACHE_DAEMON_SOCKET", os.path.join(self.tmp_dir, "missing")):
+            self.assertIsNone(daemon_client.request_update("https://example.com/repo"))
+
+        daemon_client.set_serving(True)
+        try:
+            self.assertIsNone(daemon_client.request_update("https://example.com/repo"))
+        finally:
+            daemon_client.set_serving(False)
+        self.assertEqual([], self.updates)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
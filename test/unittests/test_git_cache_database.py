@@ -11,15 +11,21 @@
 # -----------------------------------------------------------------------------
 # Module Import
 # -----------------------------------------------------------------------------
+import glob
 import importlib
 import json
 import os
+import shutil
+import sqlite3
 import time
 from unittest import TestCase
 
 import mock
 
 import git_cache.database
+import git_cache.database_journal
+import git_cache.database_sqlite
+import git_cache.database_storage
 import git_cache.global_settings
 
 
@@ -39,24 +45,34 @@ class GitCacheDatabaseTest(TestCase):
 
     def setUp(self):
         """Set up the test case."""
-        if os.path.exists("/tmp/db"):
-            os.unlink("/tmp/db")
-            os.unlink("/tmp/db.lock")
+        self._remove_database_files()
 
     def tearDown(self):
         """Tear down the test case."""
+        self._reload_modules()
+        self._remove_database_files()
+
+    @staticmethod
+    def _reload_modules():
+        """Reload the modules to apply changed environment variables."""
         importlib.reload(git_cache.global_settings)
+        importlib.reload(git_cache.database_storage)
+        importlib.reload(git_cache.database_journal)
+        importlib.reload(git_cache.database_sqlite)
         importlib.reload(git_cache.database)
 
-        if os.path.exists("/tmp/db"):
-            os.unlink("/tmp/db")
-            os.unlink("/tmp/db.lock")
+    @staticmethod
+    def _remove_database_files():
+        """Remove all database files of the JSON and SQLite backends and the journals."""
+        for filename in ["/tmp/db", "/tmp/db.lock"] + glob.glob("/tmp/db.sqlite*"):
+            if os.path.exists(filename):
+                os.unlink(filename)
+        shutil.rmtree("/tmp/journal", ignore_errors=True)
 
     @mockenv(GITCACHE_DIR="/tmp")
     def test_database(self):
         """git_cache.database.Database: Test database."""
-        importlib.reload(git_cache.global_settings)
-        importlib.reload(git_cache.database)
+        self._reload_modules()
 
         database = git_cache.database.Database()
         self.assertFalse(database.database)
@@ -111,6 +127,321 @@ class GitCacheDatabaseTest(TestCase):
 
         self.assertEqual(None, database.get_url_for_path(repo_abs_path))
 
+    @mockenv(GITCACHE_DIR="/tmp")
+    def test_access_time_and_disk_usage(self):
+        """git_cache.database.Database: Test the last-access-time and the disk usage."""
+        for backend in ["json", "sqlite"]:
+            self._reload_modules()
+            database = git_cache.database.Database(backend)
+            other_database = git_cache.database.Database(backend)
+            repo_abs_path = os.path.normpath(os.path.join("/tmp", "dummy-dir"))
+            database.add("http://dummy/git", repo_abs_path)
+            added_time = database.get(repo_abs_path)["last-access-time"]
+            self.assertNotIn("disk-usage", database.get(repo_abs_path))
+
+            # The access time is written only once within the resolution
+            with mock.patch.object(database.storage, "apply") as apply_mock:
+                database.save_access_time(repo_abs_path)
+                apply_mock.assert_not_called()
+
+            with mock.patch("time.time", return_value=added_time + git_cache.database.ACCESS_TIME_RESOLUTION):
+                database.save_access_time(repo_abs_path)
+            self.assertEqual(
+                added_time + git_cache.database.ACCESS_TIME_RESOLUTION,
+                other_database.get(repo_abs_path)["last-access-time"],
+                backend,
+            )
+
+            database.save_disk_usage(repo_abs_path, 12345)
+            self.assertEqual(12345, other_database.get(repo_abs_path)["disk-usage"], backend)
+            database.remove(repo_abs_path)
+            self._remove_database_files()
+
+    @mockenv(GITCACHE_DIR="/tmp")
+    def test_history(self):
+        """git_cache.database.Database: Test the access and change history of a mirror."""
+        weight = git_cache.database.HISTORY_WEIGHT
+        for backend in ["json", "sqlite"]:
+            self._reload_modules()
+            database = git_cache.database.Database(backend)
+            repo_abs_path = os.path.normpath(os.path.join("/tmp", "dummy-dir"))
+            database.add("http://dummy/git", repo_abs_path)
+            start = database.get(repo_abs_path)["last-access-time"]
+
+            with mock.patch("time.time", return_value=start + 1000.0):
+                database.save_access_time(repo_abs_path)
+            with mock.patch("time.time", return_value=start + 3000.0):
+                database.save_access_time(repo_abs_path)
+            entry = database.get(repo_abs_path)
+            self.assertAlmostEqual(1000.0 + weight * 1000.0, entry["access-interval"], msg=backend)
+
+            with mock.patch("time.time", return_value=start):
+                database.save_fetch_result(repo_abs_path, True, 100)
+            self.assertNotIn("change-interval", database.get(repo_abs_path), backend)
+
+            with mock.patch("time.time", return_value=start + 100.0):
+                database.save_fetch_result(repo_abs_path, True, 200)
+            with mock.patch("time.time", return_value=start + 150.0):
+                database.save_fetch_result(repo_abs_path, False, 0)
+            entry = database.get(repo_abs_path)
+            self.assertAlmostEqual(100.0, entry["change-interval"], msg=backend)
+            self.assertAlmostEqual(start + 100.0, entry["last-change-time"], msg=backend)
+
+            # An upstream repository not changing for longer increases the interval
+            with mock.patch("time.time", return_value=start + 400.0):
+                database.save_fetch_result(repo_abs_path, False, 0)
+            entry = database.get(repo_abs_path)
+            self.assertAlmostEqual(100.0 + weight * 200.0, entry["change-interval"], msg=backend)
+            self.assertAlmostEqual(start + 100.0, entry["last-change-time"], msg=backend)
+            self.assertLess(entry["fetch-size"], 100.0, backend)
+
+            database.remove(repo_abs_path)
+            self._remove_database_files()
+
+    @mockenv(GITCACHE_DIR="/tmp")
+    def test_snapshot(self):
+        """git_cache.database.Database: Test reuse of the database snapshot."""
+        self._reload_modules()
+        storage_class = git_cache.database_storage.JsonStorage
+
+        repo_abs_path = os.path.normpath(os.path.join("/tmp", "dummy-dir"))
+        database = git_cache.database.Database()
+        database.add("http://dummy/git", repo_abs_path)
+
+        # The saved database is reused without parsing the file again
+        num_loads = storage_class.num_loads
+        num_reuses = storage_class.num_reuses
+        self.assertEqual("http://dummy/git", database.get_url_for_path(repo_abs_path))
+        self.assertEqual(0, database.get(repo_abs_path)["clones"])
+        self.assertEqual(num_loads, storage_class.num_loads)
+        self.assertEqual(num_reuses + 2, storage_class.num_reuses)
+
+        # Modifications by another process are detected by the changed file
+        with open("/tmp/db", "r", encoding="utf-8") as handle:
+            raw_database = json.load(handle)
+        raw_database["dummy-dir"]["clones"] = 42
+        with open("/tmp/db.new", "w", encoding="utf-8") as handle:
+            json.dump(raw_database, handle)
+        os.replace("/tmp/db.new", "/tmp/db")
+        self.assertEqual(42, database.get(repo_abs_path)["clones"])
+        self.assertEqual(num_loads + 1, storage_class.num_loads)
+
+        # Modifications never change a snapshot returned earlier
+        snapshot = database.get_all()
+        database.increment_counter(repo_abs_path, "clones")
+        self.assertEqual(42, snapshot[repo_abs_path]["clones"])
+        self.assertEqual(43, database.get(repo_abs_path)["clones"])
+        database.remove(repo_abs_path)
+        self.assertIn(repo_abs_path, snapshot)
+        self.assertEqual(None, database.get(repo_abs_path))
+
+    @mockenv(GITCACHE_DIR="/tmp")
+    def test_transaction(self):
+        """git_cache.database.Database: Test batching of modifications in a transaction."""
+        self._reload_modules()
+
+        repo_abs_path = os.path.normpath(os.path.join("/tmp", "dummy-dir"))
+        database = git_cache.database.Database()
+        database.add("http://dummy/git", repo_abs_path)
+        other_database = git_cache.database.Database()
+
+        with mock.patch.object(database.storage, "apply", wraps=database.storage.apply) as apply_mock:
+            with database.transaction():
+                database.save_update_time(repo_abs_path)
+                with database.transaction():
+                    database.save_update_time(repo_abs_path)
+                database.increment_counter(repo_abs_path, "clones")
+
+                # The update time is written immediately, the counters are
+                # visible to the database object, but not written yet
+                self.assertEqual(2, apply_mock.call_count)
+                self.assertEqual(
+                    database.get(repo_abs_path)["last-update-time"],
+                    other_database.get(repo_abs_path)["last-update-time"],
+                )
+                self.assertEqual(1, database.get(repo_abs_path)["clones"])
+                self.assertEqual(2, database.get(repo_abs_path)["mirror-updates"])
+                self.assertEqual(0, other_database.get(repo_abs_path)["mirror-updates"])
+
+            self.assertEqual(3, apply_mock.call_count)
+
+        self.assertEqual(2, other_database.get(repo_abs_path)["mirror-updates"])
+
+        # Pending modifications are committed on exceptions as well
+        with self.assertRaises(RuntimeError):
+            with database.transaction():
+                database.clear_counters(repo_abs_path)
+                raise RuntimeError("failure")
+        self.assertEqual(0, other_database.get(repo_abs_path)["mirror-updates"])
+        self.assertEqual(0, other_database.get(repo_abs_path)["clones"])
+
+    @mockenv(GITCACHE_DIR="/tmp")
+    def test_journal(self):
+        """git_cache.database.Database: Test the counter journal."""
+        self._reload_modules()
+
+        repo_abs_path = os.path.normpath(os.path.join("/tmp", "dummy-dir"))
+        database = git_cache.database.Database()
+        database.add("http://dummy/git", repo_abs_path)
+
+        # Counters are journaled without writing the database
+        with mock.patch.object(database.storage, "apply") as apply_mock:
+            database.increment_counter(repo_abs_path, "clones")
+            database.increment_counter(repo_abs_path, "clones")
+            apply_mock.assert_not_called()
+        self.assertEqual(2, database.get(repo_abs_path)["clones"])
+        self.assertEqual(1, len(glob.glob("/tmp/journal/*.journal")))
+
+        # The journal of this running process is not folded
+        database.compact()
+        self.assertEqual(1, len(glob.glob("/tmp/journal/*.journal")))
+
+        # The journal of a finished process is folded, invalid records are ignored
+        with open("/tmp/journal/1-finished.journal", "w", encoding="utf-8") as handle:
+            handle.write('{"path": "dummy-dir", "counter": "updates", "amount": 3}\n')
+            handle.write('{"path": "unknown-dir", "counter": "updates", "amount": 1}\n')
+            handle.write('{"path": "dummy-dir", "coun')
+        self.assertEqual(0, database.get(repo_abs_path)["updates"])
+        self.assertEqual(3, database.get_statistics()[repo_abs_path]["updates"])
+        self.assertFalse(os.path.exists("/tmp/journal/1-finished.journal"))
+        self.assertEqual(3, database.get(repo_abs_path)["updates"])
+        self.assertEqual(2, database.get(repo_abs_path)["clones"])
+
+        # Clearing the counters reverts the increments of this process
+        database.clear_counters(repo_abs_path)
+        self.assertEqual(0, database.get(repo_abs_path)["clones"])
+        self.assertEqual(0, database.get(repo_abs_path)["updates"])
+        self.assertEqual({repo_abs_path: {"clones": 0}}, git_cache.database_journal.CounterJournal.counts)
+        self.assertEqual({}, git_cache.database_journal.CounterJournal.read_active())
+
+    def _check_interrupted_fold(self):
+        """Check that the journals of an interrupted fold are counted exactly once."""
+        self._reload_modules()
+
+        repo_abs_path = os.path.normpath(os.path.join("/tmp", "dummy-dir"))
+        database = git_cache.database.Database()
+        database.add("http://dummy/git", repo_abs_path)
+        os.makedirs("/tmp/journal")
+
+        # The fold is interrupted after writing the database
+        with open("/tmp/journal/1-finished.journal", "w", encoding="utf-8") as handle:
+            handle.write('{"path": "dummy-dir", "counter": "updates", "amount": 3}\n')
+        with mock.patch.object(git_cache.database_journal.os, "unlink", side_effect=OSError("killed")):
+            with self.assertRaises(OSError):
+                database.compact()
+        self.assertEqual(3, database.get(repo_abs_path)["updates"])
+        self.assertEqual(1, len(glob.glob("/tmp/journal/*.folding")))
+        database.compact()
+        self.assertEqual(3, database.get(repo_abs_path)["updates"])
+        self.assertEqual([], os.listdir("/tmp/journal"))
+
+        # The fold is interrupted before writing the database
+        with open("/tmp/journal/2-finished.journal", "w", encoding="utf-8") as handle:
+            handle.write('{"path": "dummy-dir", "counter": "updates", "amount": 2}\n')
+        with mock.patch.object(database.storage, "apply", side_effect=OSError("killed")):
+            with self.assertRaises(OSError):
+                database.compact()
+        self.assertEqual(3, database.get(repo_abs_path)["updates"])
+        database.compact()
+        self.assertEqual(5, database.get(repo_abs_path)["updates"])
+        self.assertEqual([], os.listdir("/tmp/journal"))
+
+        # Only the IDs of folds with existing journal files are kept
+        self.assertEqual(1, len(database.get(repo_abs_path)["journal-folds"].split()))
+
+    @mockenv(GITCACHE_DIR="/tmp")
+    def test_interrupted_fold(self):
+        """git_cache.database.Database.compact(): Count the journals of an interrupted fold once."""
+        self._check_interrupted_fold()
+
+    @mockenv(GITCACHE_DIR="/tmp", GITCACHE_DB_BACKEND="sqlite")
+    def test_interrupted_fold_sqlite(self):
+        """git_cache.database.Database.compact(): Count the journals of an interrupted fold once using SQLite."""
+        self._check_interrupted_fold()
+
+    @mockenv(GITCACHE_DIR="/tmp", GITCACHE_DB_BACKEND="sqlite")
+    def test_sqlite_database(self):
+        """git_cache.database.Database: Test database with the SQLite backend."""
+        self._reload_modules()
+
+        database = git_cache.database.Database()
+        self.assertFalse(database.get_all())
+
+        repo_abs_path = os.path.normpath(os.path.join("/tmp", "dummy-dir"))
+        database.add("http://dummy/git", repo_abs_path)
+        self.assertTrue(os.path.exists("/tmp/db.sqlite"))
+        self.assertFalse(os.path.exists("/tmp/db"))
+
+        # A second database object sees the modifications of the first one
+        other_database = git_cache.database.Database()
+        self.assertEqual("http://dummy/git", other_database.get(repo_abs_path)["url"])
+        self.assertEqual(0, other_database.get(repo_abs_path)["clones"])
+
+        database.increment_counter(repo_abs_path, "clones")
+        other_database.increment_counter(repo_abs_path, "clones")
+        self.assertEqual(2, database.get(repo_abs_path)["clones"])
+        self.assertEqual(0, database.get(repo_abs_path)["mirror-updates"])
+
+        database.save_update_time(repo_abs_path)
+        self.assertEqual(1, other_database.get(repo_abs_path)["mirror-updates"])
+        self.assertTrue(other_database.get_time_since_last_update(repo_abs_path) < 10.0)
+
+        database.clear_counters(repo_abs_path)
+        self.assertEqual(0, other_database.get(repo_abs_path)["clones"])
+        self.assertEqual(0, other_database.get(repo_abs_path)["mirror-updates"])
+
+        # Modifications of unknown paths are ignored
+        database.increment_counter("/tmp/unknown", "clones")
+        self.assertEqual(None, database.get("/tmp/unknown"))
+
+        other_database.remove(repo_abs_path)
+        self.assertEqual(None, database.get(repo_abs_path))
+        self.assertEqual(None, database.get_url_for_path(repo_abs_path))
+
+    @mockenv(GITCACHE_DIR="/tmp", GITCACHE_DB_BACKEND="sqlite")
+    def test_sqlite_new_columns(self):
+        """git_cache.database_sqlite.SqliteStorage: Add the columns of new fields."""
+        self._reload_modules()
+
+        repo_abs_path = os.path.normpath(os.path.join("/tmp", "dummy-dir"))
+        database = git_cache.database.Database()
+        other_database = git_cache.database.Database()
+        database.add("http://dummy/git", repo_abs_path)
+        other_database.get_all()
+
+        # A column added concurrently by another process is used
+        database.storage.apply([git_cache.database_storage.Operation("set", repo_abs_path, {"new-field": 1})])
+        other_database.storage.apply([git_cache.database_storage.Operation("set", repo_abs_path, {"new-field": 2})])
+        self.assertEqual(2, database.get(repo_abs_path)["new-field"])
+
+        # Other errors are not ignored
+        connection = mock.MagicMock()
+        connection.execute.side_effect = sqlite3.OperationalError("database is locked")
+        with self.assertRaises(sqlite3.OperationalError):
+            database.storage._ensure_columns(connection, {"other-field": 1})  # pylint: disable=protected-access
+        self.assertNotIn("other-field", database.storage._columns)  # pylint: disable=protected-access
+
+    @mockenv(GITCACHE_DIR="/tmp")
+    def test_sqlite_migration(self):
+        """git_cache.database.Database: Test migration of a JSON database to the SQLite backend."""
+        self._reload_modules()
+
+        repo_abs_path = os.path.normpath(os.path.join("/tmp", "dummy-dir"))
+        json_database = git_cache.database.Database(backend="json")
+        json_database.add("http://dummy/git", repo_abs_path)
+        json_database.save_update_time(repo_abs_path)
+
+        sqlite_database = git_cache.database.Database(backend="sqlite")
+        self.assertEqual("http://dummy/git", sqlite_database.get(repo_abs_path)["url"])
+        self.assertEqual(1, sqlite_database.get(repo_abs_path)["mirror-updates"])
+
+        # The migration happens only once
+        json_database.save_update_time(repo_abs_path)
+        sqlite_database.storage.close()
+        sqlite_database = git_cache.database.Database(backend="sqlite")
+        self.assertEqual(1, sqlite_database.get(repo_abs_path)["mirror-updates"])
+        self.assertEqual(2, json_database.get(repo_abs_path)["mirror-updates"])
+
 
 # -----------------------------------------------------------------------------
 # EOF
@@ -15,6 +15,7 @@ import os
 from unittest import TestCase, mock
 
 import git_cache.git_command
+from git_cache.git_options import GitOptions
 
 
 # -----------------------------------------------------------------------------
@@ -56,11 +57,28 @@ class GitCacheGitCommandTest(TestCase):
     def test_handle_git_command_disabled_calls_real_git(self, call_real_git_mock):
         """git_cache.git_command: Disabled mode always forwards to real git."""
         with self.assertRaises(SystemExit) as cm:
-            git_cache.git_command.handle_git_command(["git"], ["clone", "repo"])
+            git_cache.git_command.handle_git_command(["clone", "repo"])
 
         self.assertEqual(23, cm.exception.code)
         call_real_git_mock.assert_called_once_with(["clone", "repo"])
 
+    @mock.patch("git_cache.git_command.git_fetch", return_value=5)
+    def test_call_git_command(self, git_fetch_mock):
+        """git_cache.git_command.call_git_command(): Execute a command within the current process."""
+        options = GitOptions(["-c", "a=b", "fetch", "origin"])
+        with mock.patch("git_cache.invocation_log._current_context") as context_mock:
+            self.assertEqual(5, git_cache.git_command.call_git_command(options, cwd="sub/dir"))
+        # The routing mode of the invocation is kept
+        context_mock.set_mode.assert_not_called()
+        called_options = git_fetch_mock.call_args[0][0]
+        self.assertEqual(["-C", "sub/dir", "-c", "a=b"], called_options.global_options)
+        self.assertEqual(os.path.abspath("sub/dir"), called_options.get_run_path())
+        self.assertEqual(["origin"], called_options.command_args)
+
+        git_fetch_mock.side_effect = RuntimeError("failure")
+        self.assertEqual(1, git_cache.git_command.call_git_command(options))
+        self.assertIs(options, git_fetch_mock.call_args[0][0])
+
 
 # -----------------------------------------------------------------------------
 # EOF
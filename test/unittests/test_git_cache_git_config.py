@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.git_config module."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+from unittest import TestCase, mock
+
+import pytest
+
+import git_cache.git_config
+from git_cache.git_config import GitConfig, GitConfigError, get_repository_config, parse_config
+from git_cache.git_options import GitOptions
+
+
+# -----------------------------------------------------------------------------
+# Helpers
+# -----------------------------------------------------------------------------
+def mockenv(**envvars):
+    """Set up a temporary new environment."""
+    return mock.patch.dict(os.environ, envvars)
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+@pytest.mark.skipif(platform.system() in ["Windows"], reason="No native reader on Windows")
+class GitCacheGitConfigTest(TestCase):
+    """Test the :mod:`git_cache.git_config` module."""
+
+    def setUp(self):
+        """Set up the test case."""
+        self.tmp_dir = os.path.realpath(tempfile.mkdtemp())
+        self.global_config = os.path.join(self.tmp_dir, "gitconfig")
+        self.repo = os.path.join(self.tmp_dir, "repo")
+        self.git("init", "-q", self.repo)
+        patcher = mockenv(GIT_CONFIG_NOSYSTEM="1", GIT_CONFIG_GLOBAL=self.global_config, HOME=self.tmp_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for key in ["GIT_DIR", "GIT_CONFIG_COUNT", "GIT_CONFIG_PARAMETERS", "GIT_CEILING_DIRECTORIES"]:
+            os.environ.pop(key, None)
+
+    def tearDown(self):
+        """Tear down the test case."""
+        shutil.rmtree(self.tmp_dir)
+
+    def git(self, *args, cwd=None):
+        """Call git and return its output."""
+        env = dict(os.environ, GIT_CONFIG_NOSYSTEM="1", GIT_CONFIG_GLOBAL=self.global_config, HOME=self.tmp_dir)
+        result = subprocess.run(["git"] + list(args), cwd=cwd, env=env, stdout=subprocess.PIPE, check=False)
+        return result.stdout.decode().strip() if result.returncode == 0 else None
+
+    def write(self, filename, content):
+        """Write a file."""
+        with open(filename, "w", encoding="utf-8") as file_handle:
+            file_handle.write(content)
+
+    def assert_remote_url(self, args, remote="origin", cwd=None):
+        """Compare the native reader with git remote get-url."""
+        old_cwd = os.getcwd()
+        os.chdir(cwd or self.repo)
+        try:
+            for push in [False, True]:
+                expected = self.git(*args, "remote", "get-url", *(["--push"] if push else []), remote)
+                config = get_repository_config(GitOptions(list(args) + ["fetch"]))
+                self.assertEqual(config.get_remote_url(remote, push) if config else None, expected, (args, push))
+        finally:
+            os.chdir(old_cwd)
+
+    def test_parse_config(self):
+        """git_cache.git_config.parse_config(): Parse the syntax of configuration files."""
+        entries = parse_config(
+            """﻿# Comment
+[Core]
+\tBare = false ; comment
+\tflag
+[remote "Origin \\"1\\""] url = "quoted # value"  trailing   spaces  # comment
+[Section.Sub]
+\tvalue = first \\
+continued\\tescaped\\n
+""",
+            "config",
+        )
+        self.assertEqual(
+            entries,
+            [
+                ("core.bare", "false"),
+                ("core.flag", None),
+                ('remote.Origin "1".url', "quoted # value  trailing   spaces"),
+                ("section.sub.value", "first continued\tescaped\n"),
+            ],
+        )
+        for text in ["key = value", "[core]\nvalue = \\x", '[core]\nvalue = "open\n', "[core\n", "[core]\n1key = 0"]:
+            with self.assertRaises(GitConfigError, msg=text):
+                parse_config(text, "config")
+
+    def test_remote_url(self):
+        """git_cache.git_config.GitConfig.get_remote_url(): Match git remote get-url."""
+        self.assert_remote_url([])
+        self.git("-C", self.repo, "remote", "add", "origin", "https://example.com/repo.git")
+        self.assert_remote_url([])
+        self.assert_remote_url([], remote="upstream")
+        self.git("-C", self.repo, "remote", "set-url", "--push", "origin", "git@example.com:repo.git")
+        self.assert_remote_url([])
+        self.assert_remote_url(["-C", "sub"], cwd=self.tmp_dir)
+        os.makedirs(os.path.join(self.repo, "sub", "dir"))
+        self.assert_remote_url([], cwd=os.path.join(self.repo, "sub", "dir"))
+        self.assert_remote_url(["-C", "repo"], cwd=self.tmp_dir)
+        self.assert_remote_url(["--git-dir", "repo/.git"], cwd=self.tmp_dir)
+        self.assert_remote_url(["-c", "remote.origin.pushurl=ssh://other/repo.git"])
+
+    def test_url_rewrites(self):
+        """git_cache.git_config.GitConfig.get_remote_url(): Apply insteadOf and pushInsteadOf."""
+        self.git("-C", self.repo, "remote", "add", "origin", "gh:org/repo.git")
+        self.write(
+            self.global_config,
+            """[url "https://github.com/"]
+    insteadOf = gh:
+[url "https://mirror.example.com/org/"]
+    insteadOf = gh:org/
+[url "ssh://git@github.com/"]
+    pushInsteadOf = https://github.com/
+    pushInsteadOf = gh:
+""",
+        )
+        self.assert_remote_url([])
+        self.git("-C", self.repo, "remote", "set-url", "--push", "origin", "gh:org/push.git")
+        self.assert_remote_url([])
+
+    def test_includes(self):
+        """git_cache.git_config.GitConfig.read_file(): Follow includes like git."""
+        self.write(os.path.join(self.tmp_dir, "included"), '[remote "origin"]\n    url = /included/url\n')
+        self.write(os.path.join(self.tmp_dir, "work"), '[remote "origin"]\n    url = /work/url\n')
+        self.write(os.path.join(self.tmp_dir, "branch"), '[remote "origin"]\n    pushurl = /branch/url\n')
+        self.write(
+            self.global_config,
+            f"""[include]
+    path = included
+[includeIf "gitdir:{self.tmp_dir}/other/"]
+    path = {self.tmp_dir}/work
+[includeIf "onbranch:feature/**"]
+    path = ~/branch
+""",
+        )
+        self.assert_remote_url([])
+        self.write(os.path.join(self.tmp_dir, "included"), "[include]\n    path = missing\n")
+        self.write(os.path.join(self.repo, ".git", "config.inc"), '[remote "origin"]\n    url = /local/url\n')
+        self.git("-C", self.repo, "config", "include.path", "config.inc")
+        self.assert_remote_url([])
+
+        self.git("-C", self.repo, "checkout", "-q", "-b", "feature/x")
+        self.assert_remote_url([])
+
+        other = os.path.join(self.tmp_dir, "other")
+        self.git("init", "-q", other)
+        self.assert_remote_url([], cwd=other)
+        self.git("-C", other, "config", "remote.origin.url", "/other/url")
+        self.assert_remote_url([], cwd=other)
+
+        self.write(self.global_config, '[includeIf "hasconfig:remote.*.url:https://**"]\n    path = work\n')
+        with self.assertRaises(GitConfigError):
+            get_repository_config(GitOptions(["-C", self.repo, "fetch"]))
+
+    def test_worktree(self):
+        """git_cache.git_config.get_repository_config(): Read the configuration of worktrees."""
+        self.git("-C", self.repo, "remote", "add", "origin", "https://example.com/repo.git")
+        self.git(
+            "-C",
+            self.repo,
+            "-c",
+            "user.name=test",
+            "-c",
+            "user.email=test@example.com",
+            "commit",
+            "-q",
+            "--allow-empty",
+            "-m",
+            "Initial",
+        )
+        worktree = os.path.join(self.tmp_dir, "worktree")
+        self.git("-C", self.repo, "worktree", "add", "-q", worktree)
+        self.assert_remote_url([], cwd=worktree)
+
+        self.git("-C", self.repo, "config", "extensions.worktreeConfig", "true")
+        self.git("-C", worktree, "config", "--worktree", "remote.origin.pushurl", "/worktree/push")
+        self.assert_remote_url([], cwd=worktree)
+        self.assert_remote_url([])
+
+    @mockenv(GIT_CONFIG_PARAMETERS="'remote.origin.url'='/other'")
+    def test_unsupported_environment(self):
+        """git_cache.git_config.get_repository_config(): Fall back on unsupported environment."""
+        with self.assertRaises(GitConfigError):
+            get_repository_config(GitOptions(["-C", self.repo, "fetch"]))
+
+    def test_submodules(self):
+        """git_cache.git_config.GitConfig.get_submodules(): Read the .gitmodules file."""
+        filename = os.path.join(self.repo, ".gitmodules")
+        self.write(
+            filename,
+            """[submodule "lib"]
+    path = libs/lib
+    url = ../lib.git
+[submodule "Name.With.Url"]
+    url = https://example.com/other.git
+""",
+        )
+        config = GitConfig()
+        self.assertTrue(config.read_file(filename, includes=False))
+        self.assertEqual(
+            config.get_submodules(),
+            [("lib", "../lib.git", "libs/lib"), ("Name.With.Url", "https://example.com/other.git", None)],
+        )
+        self.assertFalse(GitConfig().read_file(os.path.join(self.tmp_dir, "missing")))
+
+    def test_system_config_file(self):
+        """git_cache.git_config.get_system_config_file(): Determine the file once."""
+        with mockenv(GIT_CONFIG_NOSYSTEM="", GITCACHE_DIR=self.tmp_dir):
+            with mock.patch("git_cache.git_config.get_tool_cache", return_value={}), mock.patch(
+                "git_cache.git_config.set_tool_cache"
+            ) as mock_set, mock.patch(
+                "git_cache.git_config.getstatusoutput", return_value=(0, "/opt/etc/gitconfig")
+            ) as mock_call:
+                self.assertEqual(git_cache.git_config.get_system_config_file("/opt/bin/git"), "/opt/etc/gitconfig")
+                mock_call.assert_called_once()
+                mock_set.assert_called_once_with("git-system-config", "/opt/bin/git", True, "/opt/etc/gitconfig")
+
+            entry = {"path": "/opt/bin/git", "value": "/cached/gitconfig"}
+            with mock.patch("git_cache.git_config.get_tool_cache", return_value={"git-system-config": entry}):
+                self.assertEqual(git_cache.git_config.get_system_config_file("/opt/bin/git"), "/cached/gitconfig")
+
+            with mockenv(GIT_CONFIG_SYSTEM="/env/gitconfig"):
+                self.assertEqual(git_cache.git_config.get_system_config_file("/opt/bin/git"), "/env/gitconfig")
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,158 @@
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.git_mirror module testing the clone of new mirrors."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+
+from git_cache import git_mirror
+from git_cache.git_mirror import GitMirror
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class GitCacheCloneTest(TestCase):
+    """Test the clone of new mirrors by :class:`git_cache.git_mirror.GitMirror`."""
+
+    def setUp(self):
+        """Set up the test case."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.database = mock.MagicMock()
+        self.database.get.return_value = None
+        self.mirror = GitMirror(url="https://example.com/repo", path=os.path.join(self.tmp_dir, "repo"))
+        self.mirror.database = self.database
+        self.mirror.config = mock.MagicMock()
+        self.mirror.config.get.return_value = "full"
+        self.staging_dir = GitMirror.get_staging_dir(self.mirror.path)
+        self.mirror._fetch_lfs = mock.MagicMock(return_value=True)  # pylint: disable=protected-access
+        self.patches = [
+            mock.patch.object(git_mirror, "move_to_trash", side_effect=lambda path: shutil.rmtree(path, True)),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        """Tear down the test case."""
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def _clone(self, return_code):
+        """Clone the mirror using a fake clone command."""
+        seen_dirs = []
+
+        def fake_clone(*args, **_kwargs):
+            target = args[2][-1]
+            seen_dirs.append(target)
+            os.makedirs(os.path.join(target, "objects"))
+            return return_code, b"", b""
+
+        with mock.patch.object(git_mirror, "pretty_call_command_retry", side_effect=fake_clone):
+            result = self.mirror._clone()  # pylint: disable=protected-access
+        return result, seen_dirs
+
+    def test_clone(self):
+        """git_cache.git_mirror.GitMirror._clone(): Publish the staging directory."""
+        result, seen_dirs = self._clone(0)
+        self.assertTrue(result)
+        self.assertEqual([os.path.join(self.staging_dir, "git")], seen_dirs)
+        self.assertTrue(os.path.isdir(os.path.join(self.mirror.git_dir, "objects")))
+        self.assertTrue(os.path.isdir(self.mirror.git_lfs_dir))
+        self.assertFalse(os.path.exists(self.staging_dir))
+        self.assertEqual(os.path.join(self.tmp_dir, "repo", "git"), self.mirror.git_dir)
+        self.database.add.assert_called_once_with("https://example.com/repo", self.mirror.path)
+
+    def test_failed_clone(self):
+        """git_cache.git_mirror.GitMirror._clone(): Leave no partial mirror behind."""
+        result, _ = self._clone(1)
+        self.assertFalse(result)
+        self.assertFalse(os.path.exists(self.staging_dir))
+        self.assertFalse(os.path.exists(self.mirror.path))
+        self.database.add.assert_not_called()
+
+    def test_failed_lfs_fetch(self):
+        """git_cache.git_mirror.GitMirror._clone(): Do not publish a mirror without LFS data."""
+        self.mirror._fetch_lfs.return_value = False  # pylint: disable=protected-access
+        result, _ = self._clone(0)
+        self.assertFalse(result)
+        self.assertFalse(os.path.exists(self.mirror.path))
+        self.database.add.assert_not_called()
+
+    def test_published_mirror(self):
+        """git_cache.git_mirror.GitMirror._clone(): Never replace a mirror in the database."""
+        os.makedirs(self.mirror.git_dir)
+        self.database.get.return_value = {"url": self.mirror.url}
+        self.assertFalse(self._clone(0)[0])
+        self.assertTrue(os.path.isdir(self.mirror.git_dir))
+        self.assertFalse(os.path.exists(self.staging_dir))
+        self.database.add.assert_not_called()
+
+    def test_stale_directories(self):
+        """git_cache.git_mirror.GitMirror._clone(): Replace directories of interrupted clones."""
+        os.makedirs(os.path.join(self.staging_dir, "git", "stale"))
+        os.makedirs(os.path.join(self.mirror.path, "git", "stale"))
+        result, _ = self._clone(0)
+        self.assertTrue(result)
+        self.assertEqual(["objects"], os.listdir(self.mirror.git_dir))
+
+    def test_resumable_clone(self):
+        """git_cache.git_mirror.GitMirror._clone(): Keep the fetched data of a failed resumable clone."""
+        options = {("Clone", "CloneStyle"): "Resumable", ("Clone", "DeepenStep"): 2}
+        self.mirror.config.get.side_effect = lambda section, option: options.get((section, option), 0)
+        shallow_file = os.path.join(self.staging_dir, "git", "shallow")
+        fetches = []
+
+        def getstatusoutput(command, cwd=None):
+            if "init" in command:
+                os.makedirs(command[-1], exist_ok=True)
+            if "ls-remote" in command:
+                return 0, "ref: refs/heads/main\tHEAD\n0123\tHEAD"
+            if "for-each-ref" in command:
+                return 0, "0123 commit refs/heads/main" if fetches else ""
+            return 0, ""
+
+        def fetch_step(_description, options):
+            fetches.append(options)
+            if len(fetches) == 2:
+                return False
+            if len(fetches) < 4:
+                with open(shallow_file, "w", encoding="utf-8") as handle:
+                    handle.write(str(len(fetches)))
+                os.utime(shallow_file, ns=(len(fetches), len(fetches)))
+            else:
+                os.unlink(shallow_file)
+            return True
+
+        self.mirror._fetch_step = mock.MagicMock(side_effect=fetch_step)  # pylint: disable=protected-access
+        with mock.patch.object(git_mirror, "getstatusoutput", side_effect=getstatusoutput) as status:
+            self.assertFalse(self.mirror._clone())  # pylint: disable=protected-access
+            self.assertTrue(os.path.exists(shallow_file))
+            self.database.add.assert_not_called()
+
+            self.assertTrue(self.mirror._clone())  # pylint: disable=protected-access
+            self.assertIn(
+                mock.call([0, "symbolic-ref", "HEAD", "refs/heads/main"], cwd=mock.ANY), status.call_args_list
+            )
+
+        self.assertEqual([["--depth=1"], ["--deepen=2"], ["--deepen=2"], ["--deepen=4"]], fetches)
+        self.assertFalse(os.path.exists(self.staging_dir))
+        self.assertTrue(os.path.isdir(self.mirror.git_dir))
+        self.database.add.assert_called_once_with("https://example.com/repo", self.mirror.path)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
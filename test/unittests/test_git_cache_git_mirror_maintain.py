@@ -0,0 +1,162 @@
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.git_mirror module testing the maintenance of mirrors."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import glob
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from unittest import TestCase
+
+import mock
+import portalocker
+
+from git_cache.git_mirror import GitMirror
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class GitCacheMaintainTest(TestCase):
+    """Test the maintenance of mirrors by :class:`git_cache.git_mirror.GitMirror`."""
+
+    def setUp(self):
+        """Set up a mirror with two packs."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.entry = {"url": "https://github.com/seeraven/gitcache"}
+        self.database = mock.MagicMock()
+        self.database.get.return_value = self.entry
+        self.mirror = GitMirror(
+            url="https://github.com/seeraven/gitcache", path=os.path.join(self.tmp_dir, "repo"), database=self.database
+        )
+        self.options = {
+            ("System", "RealGit"): "git",
+            ("Maintenance", "Interval"): 3600,
+            ("Maintenance", "FullInterval"): 7 * 86400,
+            ("GC", "Retries"): 1,
+            ("GC", "CommandTimeout"): 60,
+            ("GC", "OutputTimeout"): 60,
+            ("Command", "MaxCapturedOutput"): 1024 * 1024,
+            ("Command", "WarnIfLockedFor"): 0,
+            ("Command", "CheckInterval"): 0.01,
+            ("Command", "LockTimeout"): 0.05,
+        }
+        self.mirror.config = mock.MagicMock()
+        self.mirror.config.get.side_effect = lambda section, option: self.options[(section, option)]
+
+        work_dir = os.path.join(self.tmp_dir, "work")
+        subprocess.run(["git", "init", "-q", work_dir], check=True)
+        for index in range(2):
+            self._git(
+                work_dir,
+                "-c",
+                "user.name=test",
+                "-c",
+                "user.email=test@test",
+                "commit",
+                "-q",
+                "--allow-empty",
+                "-m",
+                f"{index}",
+            )
+            self._git(work_dir, "repack", "-q")
+        shutil.copytree(os.path.join(work_dir, ".git"), self.mirror.git_dir)
+        shutil.rmtree(work_dir)
+
+    def tearDown(self):
+        """Tear down the test case."""
+        shutil.rmtree(self.tmp_dir)
+
+    @staticmethod
+    def _git(cwd, *args):
+        """Execute a git command."""
+        subprocess.run(["git"] + list(args), cwd=cwd, check=True)
+
+    def _files(self, pattern):
+        """Get the files matching the pattern in the objects directory of the mirror."""
+        return glob.glob(os.path.join(self.mirror.git_dir, "objects", pattern))
+
+    def test_maintain(self):
+        """git_cache.git_mirror.GitMirror.maintain(): Write the multi-pack-index, the bitmap and the commit-graph."""
+        self.assertEqual(2, len(self._files("pack/*.pack")))
+        self.assertFalse(self.mirror.is_maintenance_due())
+
+        # The first update fetching new data initializes the maintenance state
+        with mock.patch("git_cache.git_mirror.maintain_in_background") as mock_background:
+            self.mirror._schedule_maintenance()  # pylint: disable=protected-access
+        mock_background.assert_called_once_with()
+        self.assertFalse(self.mirror.is_maintenance_due())
+        self.entry["last-change-time"] = time.time()
+        self.options[("Maintenance", "Interval")] = 0
+        self.assertTrue(self.mirror.is_maintenance_due())
+        self.options[("Maintenance", "Interval")] = 3600
+
+        self.mirror._run_gc = mock.MagicMock(return_value=True)  # pylint: disable=protected-access
+        self.assertTrue(self.mirror.maintain())
+        self.mirror._run_gc.assert_not_called()  # pylint: disable=protected-access
+        self.assertEqual(1, len(self._files("pack/multi-pack-index")))
+        self.assertEqual(1, len(self._files("pack/multi-pack-index-*.bitmap")))
+        self.assertTrue(self._files("info/commit-graphs/commit-graph-chain"))
+        self.mirror.database.save_disk_usage.assert_called_once()
+
+        # The mirror is maintained again only if it fetched new data and the interval elapsed
+        state = self.mirror._read_maintenance_state()  # pylint: disable=protected-access
+        self.assertFalse(self.mirror.is_maintenance_due())
+        self.entry["last-change-time"] = time.time()
+        self.assertFalse(self.mirror.is_maintenance_due())
+        self.options[("Maintenance", "Interval")] = 0
+        self.assertTrue(self.mirror.is_maintenance_due())
+        self.options[("Maintenance", "Interval")] = -1
+        self.assertFalse(self.mirror.is_maintenance_due())
+
+        # A full maintenance runs the garbage collection before
+        self.options[("Maintenance", "FullInterval")] = 0
+        self.assertTrue(self.mirror.maintain())
+        self.mirror._run_gc.assert_called_once_with()  # pylint: disable=protected-access
+        new_state = self.mirror._read_maintenance_state()  # pylint: disable=protected-access
+        self.assertGreater(new_state["last-full-run"], state["last-full-run"])
+
+    def test_full_maintenance_lock(self):
+        """git_cache.git_mirror.GitMirror.maintain(): Run the garbage collection with the mirror locked."""
+        self.options[("Maintenance", "FullInterval")] = 0
+        with open(self.mirror.maintenance_state, "w", encoding="utf-8") as handle:
+            handle.write('{"last-run": 0, "last-full-run": 0}')
+
+        def run_gc():
+            other = portalocker.Lock(self.mirror.lockfile)
+            with self.assertRaises(portalocker.exceptions.LockException):
+                other.acquire(timeout=0, fail_when_locked=True)
+            return True
+
+        self.mirror._run_gc = mock.MagicMock(side_effect=run_gc)  # pylint: disable=protected-access
+        self.assertTrue(self.mirror.maintain())
+        self.mirror._run_gc.assert_called_once_with()  # pylint: disable=protected-access
+
+        # The maintenance fails if the mirror stays locked
+        self.mirror._run_gc.reset_mock()  # pylint: disable=protected-access
+        with portalocker.Lock(self.mirror.lockfile):
+            with self.assertLogs("git_cache.git_mirror", "ERROR"):
+                self.assertFalse(self.mirror.maintain())
+        self.mirror._run_gc.assert_not_called()  # pylint: disable=protected-access
+
+    def test_auto_gc_options(self):
+        """git_cache.git_mirror.GitMirror._auto_gc_options(): Disable the automatic garbage collection."""
+        # pylint: disable=protected-access
+        self.assertEqual(["-c", "gc.auto=0", "-c", "maintenance.auto=false"], self.mirror._auto_gc_options())
+        self.options[("Maintenance", "Interval")] = -1
+        self.assertEqual([], self.mirror._auto_gc_options())
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
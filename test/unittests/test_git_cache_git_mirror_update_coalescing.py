@@ -0,0 +1,126 @@
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.git_mirror module testing the coalescing of concurrent updates."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import functools
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+import mock
+
+from git_cache import git_mirror
+from git_cache.git_mirror import GitMirror
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class GitCacheUpdateCoalescingTest(TestCase):
+    """Test the coalescing of concurrent updates of :class:`git_cache.git_mirror.GitMirror`."""
+
+    def setUp(self):
+        """Set up the test case."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.database = mock.MagicMock()
+        self.database.get.return_value = {"url": "https://github.com/seeraven/gitcache"}
+        self.database.get_time_since_last_update.return_value = 1.0
+        self.mirror = GitMirror(
+            url="https://github.com/seeraven/gitcache", path=os.path.join(self.tmp_dir, "repo"), database=self.database
+        )
+        self.mirror.config = mock.MagicMock()
+        self.mirror.config.get.return_value = 0
+        os.makedirs(self.mirror.git_dir)
+        self.mirror._update = mock.MagicMock(return_value=True)  # pylint: disable=protected-access
+        self.mirror._fetch_lfs = mock.MagicMock(return_value=True)  # pylint: disable=protected-access
+        self.mirror._schedule_maintenance = mock.MagicMock()  # pylint: disable=protected-access
+
+    def tearDown(self):
+        """Tear down the test case."""
+        shutil.rmtree(self.tmp_dir)
+
+    def _update(self, concurrent_update_ref="none"):
+        """Update the mirror while optionally simulating a concurrent update when acquiring the lock."""
+        locker = mock.MagicMock()
+        if concurrent_update_ref != "none":
+            # pylint: disable=protected-access
+            locker.return_value.__enter__.side_effect = lambda: self.mirror._write_update_marker(
+                time.time(), concurrent_update_ref
+            )
+        with mock.patch.object(git_mirror, "Locker", locker):
+            with mock.patch.object(git_mirror, "record_cache") as record_cache:
+                self.assertTrue(self.mirror.update())
+        return record_cache.call_args[0][0]
+
+    def test_update(self):
+        """git_cache.git_mirror.GitMirror.update(): Test an update without concurrent update."""
+        self.assertEqual("hit_update", self._update())
+        self.mirror._update.assert_called_once()  # pylint: disable=protected-access
+        self.assertTrue(os.path.exists(self.mirror.update_marker))
+
+        # The previous update started before this request, so the mirror is updated again
+        self.assertEqual("hit_update", self._update())
+        self.assertEqual(2, self.mirror._update.call_count)  # pylint: disable=protected-access
+
+    def test_coalesced_update(self):
+        """git_cache.git_mirror.GitMirror.update(): Test reuse of a concurrent update."""
+        self.assertEqual("hit_coalesced", self._update(concurrent_update_ref=None))
+        self.mirror._update.assert_not_called()  # pylint: disable=protected-access
+        self.mirror._fetch_lfs.assert_not_called()  # pylint: disable=protected-access
+
+    def _create_concurrently(self, method):
+        """Call the method while simulating a clone of the mirror that finishes while waiting for the lock."""
+        entry = self.database.get.return_value
+        self.database.get.return_value = None
+        self.mirror._clone = mock.MagicMock(return_value=True)  # pylint: disable=protected-access
+        clone_start_time = time.time() - 1.0
+
+        def create():
+            self.mirror._write_update_marker(clone_start_time, None)  # pylint: disable=protected-access
+            self.database.get.return_value = entry
+
+        locker = mock.MagicMock()
+        locker.return_value.__enter__.side_effect = create
+        with mock.patch.object(git_mirror, "Locker", locker):
+            with mock.patch.object(git_mirror, "record_cache") as record_cache:
+                self.assertTrue(method())
+        self.mirror._clone.assert_not_called()  # pylint: disable=protected-access
+        return record_cache.call_args[0][0] if record_cache.called else None
+
+    def test_created_while_waiting(self):
+        """git_cache.git_mirror.GitMirror.update(): Reuse a mirror whose clone started before waiting for the lock."""
+        self.assertEqual("hit_coalesced", self._create_concurrently(self.mirror.update))
+        self.assertEqual("hit_coalesced", self._create_concurrently(self.mirror.ensure_exists))
+        self.mirror._update.assert_not_called()  # pylint: disable=protected-access
+        self.mirror._fetch_lfs.assert_not_called()  # pylint: disable=protected-access
+        self.assertEqual("hit_coalesced", self._create_concurrently(functools.partial(self.mirror.update, "feature")))
+        self.mirror._fetch_lfs.assert_called_once_with("feature")  # pylint: disable=protected-access
+
+        # A mirror existing before is only coalesced with updates started while waiting
+        self.mirror._write_update_marker(time.time() - 1.0, None)  # pylint: disable=protected-access
+        self.assertEqual("hit_update", self._update())
+
+    def test_coalesced_update_other_ref(self):
+        """git_cache.git_mirror.GitMirror.update(): Test reuse of a concurrent update of another ref."""
+        # pylint: disable=protected-access
+        self.mirror._write_update_marker(time.time() + 10.0, "other")
+        self.assertTrue(self.mirror._update_coalesced(time.time(), "feature"))
+        self.mirror._fetch_lfs.assert_called_once_with("feature")
+        self.assertTrue(self.mirror._update_coalesced(time.time(), "other"))
+        self.assertEqual(1, self.mirror._fetch_lfs.call_count)
+        self.assertFalse(self.mirror._update_coalesced(time.time() + 20.0, "other"))
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,84 @@
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.git_mirror module testing the update of mirrors refreshed by push events."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+
+from git_cache import git_mirror
+from git_cache.git_mirror import GitMirror
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class GitCacheUpdatePushedTest(TestCase):
+    """Test the update of mirrors refreshed by webhook events by :class:`git_cache.git_mirror.GitMirror`."""
+
+    def setUp(self):
+        """Set up the test case."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.database = mock.MagicMock()
+        self.database.get.return_value = {"url": "https://github.com/seeraven/gitcache"}
+        self.database.get_time_since_last_update.return_value = 600.0
+        self.mirror = GitMirror(
+            url="https://github.com/seeraven/gitcache", path=os.path.join(self.tmp_dir, "repo"), database=self.database
+        )
+        self.options = {("MirrorHandling", "UpdateInterval"): 60, ("Webhook", "Port"): 8080}
+        self.mirror.config = mock.MagicMock()
+        self.mirror.config.get.side_effect = lambda section, option: self.options.get((section, option), 0)
+        os.makedirs(self.mirror.git_dir)
+        self.mirror.probe_upstream = mock.MagicMock(return_value=None)
+        self.mirror._update = mock.MagicMock(return_value=True)  # pylint: disable=protected-access
+        self.mirror._schedule_maintenance = mock.MagicMock()  # pylint: disable=protected-access
+
+    def tearDown(self):
+        """Tear down the test case."""
+        shutil.rmtree(self.tmp_dir)
+
+    def _update(self):
+        """Update the mirror and return the recorded cache event."""
+        with mock.patch.object(git_mirror, "record_cache") as record_cache:
+            self.assertTrue(self.mirror.update())
+        return record_cache.call_args[0][0]
+
+    def test_update_time_reached(self):
+        """git_cache.git_mirror.GitMirror._update_time_reached(): Use the push marker if it exists."""
+        # pylint: disable=protected-access
+        self.assertTrue(self.mirror._update_time_reached())
+        self.mirror.mark_pushed()
+        self.assertTrue(self.mirror._update_time_reached())
+
+        self.mirror._write_update_marker(os.stat(self.mirror.push_marker).st_mtime + 1.0, None)
+        self.assertFalse(self.mirror._update_time_reached())
+
+        # The update interval is used if the webhook receiver is disabled
+        self.options[("Webhook", "Port")] = 0
+        self.assertTrue(self.mirror._update_time_reached())
+
+    def test_update(self):
+        """git_cache.git_mirror.GitMirror.update(): Update a mirror refreshed by push events only after a push."""
+        self.mirror.mark_pushed()
+        self.assertEqual("hit_update", self._update())
+        self.assertEqual("hit_skip", self._update())
+
+        self.mirror.mark_pushed()
+        self.assertEqual("hit_update", self._update())
+        self.assertEqual(2, self.mirror._update.call_count)  # pylint: disable=protected-access
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
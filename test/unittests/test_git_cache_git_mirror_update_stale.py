@@ -0,0 +1,98 @@
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.git_mirror module testing the use of stale mirrors."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+import portalocker
+
+from git_cache import git_mirror
+from git_cache.git_mirror import GitMirror
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class GitCacheUpdateStaleTest(TestCase):
+    """Test the background refresh of stale mirrors by :class:`git_cache.git_mirror.GitMirror`."""
+
+    def setUp(self):
+        """Set up the test case."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.database = mock.MagicMock()
+        self.database.get.return_value = {"url": "https://github.com/seeraven/gitcache"}
+        self.database.get_time_since_last_update.return_value = 600.0
+        self.mirror = GitMirror(
+            url="https://github.com/seeraven/gitcache", path=os.path.join(self.tmp_dir, "repo"), database=self.database
+        )
+        self.options = {("MirrorHandling", "UpdateInterval"): 60, ("MirrorHandling", "MaxStaleness"): 3600}
+        self.mirror.config = mock.MagicMock()
+        self.mirror.config.get.side_effect = lambda section, option: self.options.get((section, option), 0)
+        os.makedirs(self.mirror.git_dir)
+        self.mirror._update = mock.MagicMock(return_value=True)  # pylint: disable=protected-access
+        self.mirror._schedule_maintenance = mock.MagicMock()  # pylint: disable=protected-access
+
+    def tearDown(self):
+        """Tear down the test case."""
+        shutil.rmtree(self.tmp_dir)
+
+    def _update(self, ref=None, **kwargs):
+        """Update the mirror and return the recorded cache event and the started background processes."""
+        with mock.patch.object(git_mirror, "start_detached_gitcache") as start:
+            with mock.patch.object(git_mirror, "record_cache") as record_cache:
+                self.assertTrue(self.mirror.update(ref, **kwargs))
+        return record_cache.call_args[0][0], [call[0][0] for call in start.call_args_list]
+
+    def test_stale(self):
+        """git_cache.git_mirror.GitMirror.update(): Use a stale mirror and refresh it in the background."""
+        event, started = self._update("main")
+        self.assertEqual("hit_stale", event)
+        self.assertEqual([["--refresh-mirror", self.mirror.path, "--refresh-ref", "main"]], started)
+        self.mirror._update.assert_not_called()  # pylint: disable=protected-access
+
+        # Only one refresh is started
+        with portalocker.Lock(self.mirror.refresh_lockfile):
+            self.assertEqual(("hit_stale", []), self._update())
+
+        # Forced updates and the refresh itself do not use the stale mirror
+        self.assertEqual(("hit_update", []), self._update(force=True))
+        self.assertEqual(("hit_update", []), self._update(allow_stale=False))
+
+    def test_outside_of_window(self):
+        """git_cache.git_mirror.GitMirror.update(): Update a mirror older than the maximum staleness."""
+        self.mirror.database.get_time_since_last_update.return_value = 7200.0
+        self.assertEqual(("hit_update", []), self._update())
+
+        self.mirror.database.get_time_since_last_update.return_value = 30.0
+        self.assertEqual(("hit_skip", []), self._update())
+
+        self.options[("MirrorHandling", "MaxStaleness")] = 0
+        self.mirror.database.get_time_since_last_update.return_value = 600.0
+        self.assertEqual(("hit_update", []), self._update())
+
+    def test_refresh(self):
+        """git_cache.git_mirror.GitMirror.refresh(): Update the mirror only once at a time."""
+        with mock.patch.object(self.mirror, "update", return_value=True) as update:
+            self.assertTrue(self.mirror.refresh("main"))
+            update.assert_called_once_with("main", allow_stale=False)
+
+            with portalocker.Lock(self.mirror.refresh_lockfile):
+                self.assertTrue(self.mirror.refresh("main"))
+            self.assertEqual(1, update.call_count)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -35,6 +35,21 @@ class GitCacheSettingsTest(TestCase):
         self.assertEqual(
             git_cache.global_settings.GITCACHE_DB_LOCK, os.path.join(git_cache.global_settings.GITCACHE_DIR, "db.lock")
         )
+        self.assertEqual(
+            git_cache.global_settings.GITCACHE_DB_BACKEND, os.getenv("GITCACHE_DB_BACKEND", "json").lower()
+        )
+        self.assertEqual(
+            git_cache.global_settings.GITCACHE_DB_SQLITE,
+            os.path.join(git_cache.global_settings.GITCACHE_DIR, "db.sqlite"),
+        )
+        self.assertEqual(
+            git_cache.global_settings.GITCACHE_DB_JOURNAL,
+            os.path.join(git_cache.global_settings.GITCACHE_DIR, "journal"),
+        )
+        self.assertEqual(
+            git_cache.global_settings.GITCACHE_TOOL_CACHE,
+            os.path.join(git_cache.global_settings.GITCACHE_DIR, "tools.json"),
+        )
         self.assertEqual(git_cache.global_settings.GITCACHE_LOGLEVEL, os.getenv("GITCACHE_LOGLEVEL", "INFO"))
         self.assertEqual(
             git_cache.global_settings.GITCACHE_LOGFORMAT, os.getenv("GITCACHE_LOGFORMAT", "%(asctime)s %(message)s")
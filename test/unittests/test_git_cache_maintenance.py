@@ -0,0 +1,53 @@
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.maintenance module."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+from unittest import TestCase
+
+import mock
+
+from git_cache import helpers, maintenance
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class GitCacheMaintenanceTest(TestCase):
+    """Test the scheduling of the mirror maintenance."""
+
+    def test_maintain_in_background(self):
+        """git_cache.maintenance.maintain_in_background(): Start the detached process once."""
+        with mock.patch.object(maintenance, "_BACKGROUND_SCHEDULED", False), mock.patch.object(
+            maintenance, "is_serving", return_value=False
+        ), mock.patch.object(maintenance.atexit, "register") as register:
+            maintenance.maintain_in_background()
+            maintenance.maintain_in_background()
+            register.assert_called_once_with(maintenance.start_maintenance_process)
+
+        with mock.patch.object(helpers.subprocess, "Popen") as popen:
+            maintenance.start_maintenance_process()
+        self.assertEqual(["--maintain"], popen.call_args[0][0][-1:])
+        self.assertTrue(popen.call_args[1]["start_new_session"])
+
+    def test_maintain_in_background_serving(self):
+        """git_cache.maintenance.maintain_in_background(): Start the detached process immediately in the daemon."""
+        with mock.patch.object(maintenance, "is_serving", return_value=True), mock.patch.object(
+            maintenance, "start_maintenance_process"
+        ) as start, mock.patch.object(maintenance.atexit, "register") as register:
+            maintenance.maintain_in_background()
+            maintenance.maintain_in_background()
+        self.assertEqual(2, start.call_count)
+        register.assert_not_called()
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
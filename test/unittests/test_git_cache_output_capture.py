@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.output_capture module."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+from unittest import TestCase
+
+from git_cache.output_capture import OutputCapture
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class GitCacheOutputCaptureTest(TestCase):
+    """Test the :class:`git_cache.output_capture.OutputCapture` class."""
+
+    def test_unbounded(self):
+        """git_cache.output_capture.OutputCapture: Keep the whole output."""
+        capture = OutputCapture()
+        for index in range(1000):
+            capture.append(f"line {index}\n".encode())
+        self.assertEqual(b"".join(f"line {index}\n".encode() for index in range(1000)), capture.getvalue())
+        self.assertEqual(0, capture.omitted)
+
+    def test_tail(self):
+        """git_cache.output_capture.OutputCapture: Keep only the tail."""
+        capture = OutputCapture(max_size=10)
+        capture.append(b"0123456789")
+        self.assertEqual(b"0123456789", capture.getvalue())
+        capture.append(memoryview(b"abcde"))
+        self.assertEqual(5, capture.omitted)
+        self.assertEqual(b"\n[... 5 bytes of output omitted ...]\n56789abcde", capture.getvalue())
+
+    def test_keep_patterns(self):
+        """git_cache.output_capture.OutputCapture: Keep lines matching a pattern."""
+        capture = OutputCapture(max_size=64, keep_patterns=[b"remove gc.log"])
+        capture.append(b"Counting objects\nerror: please remove gc.log\n")
+        for index in range(100):
+            capture.append(f"progress {index}\r".encode())
+        value = capture.getvalue()
+        self.assertTrue(value.startswith(b"error: please remove gc.log\n"))
+        self.assertNotIn(b"Counting objects", value)
+        self.assertTrue(value.endswith(b"progress 99\r"))
+
+    def test_keep_pattern_across_chunks(self):
+        """git_cache.output_capture.OutputCapture: Detect patterns split across chunks."""
+        capture = OutputCapture(max_size=16, keep_patterns=[b"remove gc.log"])
+        for chunk in [b"please rem", b"ove gc.l", b"og\n", b"x" * 100]:
+            capture.append(chunk)
+        value = capture.getvalue()
+        self.assertIn(b"remove gc.log\n", value)
+        self.assertTrue(value.endswith(b"omitted ...]\n" + b"x" * 16))
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,92 @@
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.parallel_output module."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import io
+import sys
+import threading
+import time
+from unittest import TestCase
+
+import mock
+
+from git_cache.parallel_output import multiplexed_output, output_prefix, run_in_order
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class GitCacheParallelOutputTest(TestCase):
+    """Test the multiplexing of parallel outputs."""
+
+    def test_prefixed_lines(self):
+        """git_cache.parallel_output: Test prefixing of complete lines."""
+        stdout = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+        with mock.patch.object(sys, "stdout", stdout):
+            with multiplexed_output():
+
+                def worker(name, chunks):
+                    with output_prefix(name):
+                        for chunk in chunks:
+                            sys.stdout.buffer.write(chunk)
+
+                threads = [
+                    threading.Thread(target=worker, args=["one", [b"Counting: 50%\r", b"Counting: 100%\r\n", b"a"]]),
+                    threading.Thread(target=worker, args=["two", [b"first\nsec", b"ond\r\n"]]),
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                sys.stdout.buffer.write(b"unprefixed\n")
+            self.assertIs(stdout, sys.stdout)
+
+        lines = stdout.buffer.getvalue().decode().splitlines()
+        self.assertEqual(
+            ["[one] Counting: 100%", "[one] a", "[two] first", "[two] second", "unprefixed"], sorted(lines)
+        )
+        self.assertLess(lines.index("[two] first"), lines.index("[two] second"))
+
+    def test_text_output(self):
+        """git_cache.parallel_output: Test prefixing of text output, e.g., by a log handler."""
+        stderr = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+        with mock.patch.object(sys, "stderr", stderr):
+            with multiplexed_output():
+                with output_prefix("host/100%"):
+                    sys.stderr.write("Value 1\n")
+                    sys.stderr.write("Incomplete")
+                sys.stderr.write("Value 2\n")
+                sys.stderr.flush()
+
+        self.assertEqual("[host/100%] Value 1\n[host/100%] Incomplete\nValue 2\n", stderr.buffer.getvalue().decode())
+
+    def test_run_in_order(self):
+        """git_cache.parallel_output.run_in_order(): Write the output in the order of the tasks."""
+        stdout = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+
+        def task(index, delay):
+            with output_prefix(f"task{index}"):
+                sys.stdout.buffer.write(b"start\n")
+                time.sleep(delay)
+                sys.stdout.write("end")
+            return index
+
+        with mock.patch.object(sys, "stdout", stdout):
+            results = run_in_order([lambda i=i, d=d: task(i, d) for i, d in enumerate([0.3, 0.0, 0.2, 0.1])], 3)
+
+        self.assertEqual([0, 1, 2, 3], results)
+        expected = "".join(f"[task{index}] start\n[task{index}] end\n" for index in range(4))
+        self.assertEqual(expected, stdout.buffer.getvalue().decode())
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.passthrough module."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase, mock
+
+import pytest
+
+import git_cache.passthrough
+
+# -----------------------------------------------------------------------------
+# Constants
+# -----------------------------------------------------------------------------
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+# The only gitcache modules that may be loaded before the fast path is taken
+ALLOWED_MODULES = {
+    "git_cache",
+    "git_cache.cli",
+    "git_cache.git_options",
+    "git_cache.global_settings",
+    "git_cache.passthrough",
+}
+
+# Modules that must not be loaded before the fast path is taken
+HEAVY_MODULES = ["coloredlogs", "logging", "portalocker", "pytimeparse", "sqlite3", "subprocess"]
+
+
+# -----------------------------------------------------------------------------
+# Helpers
+# -----------------------------------------------------------------------------
+def mockenv(**envvars):
+    """Set up a temporary new environment."""
+    return mock.patch.dict(os.environ, envvars)
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class GitCachePassthroughTest(TestCase):
+    """Test the :mod:`git_cache.passthrough` module."""
+
+    def setUp(self):
+        """Set up the test case."""
+        self.gitcache_dir = tempfile.mkdtemp()
+        self.real_git = shutil.which("git") or "/usr/bin/git"
+        patcher = mock.patch.object(git_cache.passthrough, "GITCACHE_DIR", self.gitcache_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Tear down the test case."""
+        shutil.rmtree(self.gitcache_dir, ignore_errors=True)
+
+    def test_is_handled_command(self):
+        """git_cache.passthrough.is_handled_command(): Detect handled commands."""
+        for args in [
+            ["clone", "https://example.com/repo.git"],
+            ["-C", "repo", "fetch"],
+            ["-c", "user.name=test", "pull"],
+            ["lfs", "fetch"],
+            ["submodule", "update", "--init"],
+            ["remote", "add", "origin", "https://example.com/repo.git"],
+            ["ls-remote", "origin"],
+            ["checkout", "main"],
+            ["update-mirrors"],
+        ]:
+            self.assertTrue(git_cache.passthrough.is_handled_command(args), args)
+
+        for args in [
+            [],
+            ["status"],
+            ["-C", "clone", "log"],
+            ["--version"],
+            ["--help", "clone"],
+            ["lfs", "ls-files"],
+            ["lfs"],
+            ["submodule", "status"],
+            ["remote", "-v"],
+        ]:
+            self.assertFalse(git_cache.passthrough.is_handled_command(args), args)
+
+    @mockenv(GITCACHE_DISABLE="")
+    def test_get_passthrough_git(self):
+        """git_cache.passthrough.get_passthrough_git(): Get the real git from the config file."""
+        self.assertIsNone(git_cache.passthrough.get_passthrough_git(["status"]))
+
+        with open(os.path.join(self.gitcache_dir, "config"), "w", encoding="utf-8") as file_handle:
+            file_handle.write(f"[System]\nrealgit = {self.real_git}\ndisable = False\n")
+        if platform.system().lower().startswith("win"):
+            self.assertIsNone(git_cache.passthrough.get_passthrough_git(["status"]))
+            return
+        self.assertEqual(self.real_git, git_cache.passthrough.get_passthrough_git(["status"]))
+        self.assertIsNone(git_cache.passthrough.get_passthrough_git(["clone", "repo"]))
+
+        with mock.patch.object(git_cache.passthrough, "GITCACHE_SUMMARY_LOG", "/tmp/summary.log"):
+            self.assertIsNone(git_cache.passthrough.get_passthrough_git(["status"]))
+        with mock.patch.object(git_cache.passthrough, "GITCACHE_LOGLEVEL", "debug"):
+            self.assertIsNone(git_cache.passthrough.get_passthrough_git(["status"]))
+
+    @pytest.mark.skipif(platform.system() in ["Windows"], reason="No fast path on Windows")
+    @mockenv(GITCACHE_REAL_GIT="/opt/git/bin/git", GITCACHE_DISABLE="yes")
+    def test_get_passthrough_git_env(self):
+        """git_cache.passthrough.get_passthrough_git(): Get the real git from the environment."""
+        self.assertEqual("/opt/git/bin/git", git_cache.passthrough.get_passthrough_git(["status"]))
+        # Disabled gitcache passes through all commands
+        self.assertEqual("/opt/git/bin/git", git_cache.passthrough.get_passthrough_git(["clone", "repo"]))
+
+    def test_import_budget(self):
+        """git_cache.passthrough: Only light-weight modules are imported by the entry point."""
+        code = "import sys; import git_cache.cli; print(' '.join(sorted(sys.modules)))"
+        env = dict(os.environ, PYTHONPATH=SRC_DIR)
+        result = subprocess.run([sys.executable, "-c", code], env=env, stdout=subprocess.PIPE, check=True)
+        modules = result.stdout.decode().split()
+        self.assertEqual(ALLOWED_MODULES, {module for module in modules if module.startswith("git_cache")})
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, modules)
+
+    @pytest.mark.skipif(platform.system() in ["Windows"], reason="No fast path on Windows")
+    def test_exec_real_git(self):
+        """git_cache.cli.main_cli(): Replace the process by the real git for unhandled commands."""
+        code = "import sys; sys.argv = ['git', 'version']; from git_cache.cli import main_cli; main_cli()"
+        gitcache_dir = os.path.join(self.gitcache_dir, "cache")
+        env = dict(os.environ, PYTHONPATH=SRC_DIR, GITCACHE_DIR=gitcache_dir, GITCACHE_REAL_GIT=self.real_git)
+        for key in ["GITCACHE_DETAIL_LOG", "GITCACHE_SUMMARY_LOG", "GITCACHE_LOGLEVEL", "GITCACHE_DISABLE"]:
+            env.pop(key, None)
+        result = subprocess.run([sys.executable, "-c", code], env=env, stdout=subprocess.PIPE, check=True)
+        self.assertTrue(result.stdout.startswith(b"git version"))
+        # The normal code path would have created the configuration
+        self.assertFalse(os.path.exists(gitcache_dir))
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
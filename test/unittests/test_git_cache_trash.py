@@ -0,0 +1,119 @@
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.trash module."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+import portalocker
+
+from git_cache import helpers, trash
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class GitCacheTrashTest(TestCase):
+    """Test the deletion of directories via the trash."""
+
+    def setUp(self):
+        """Set up a temporary trash directory."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.trash_dir = os.path.join(self.tmp_dir, "trash")
+        self.patches = [
+            mock.patch.object(trash, "GITCACHE_TRASH_DIR", self.trash_dir),
+            mock.patch.object(trash, "reclaim_in_background"),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def make_dir(self, name):
+        """Create a directory containing a file."""
+        path = os.path.join(self.tmp_dir, name)
+        os.makedirs(os.path.join(path, "git"))
+        with open(os.path.join(path, "git", "file"), "w", encoding="utf-8") as handle:
+            handle.write("content")
+        return path
+
+    def test_move_to_trash(self):
+        """git_cache.trash.move_to_trash(): Rename the directory into the trash."""
+        path = self.make_dir("mirror")
+        self.assertTrue(trash.move_to_trash(path))
+        self.assertFalse(os.path.exists(path))
+        entries = trash.get_trash_entries()
+        self.assertEqual(1, len(entries))
+        self.assertTrue(os.path.basename(entries[0]).startswith("mirror-"))
+        self.assertTrue(os.path.exists(os.path.join(entries[0], "git", "file")))
+        trash.reclaim_in_background.assert_called_once_with()
+
+        self.assertFalse(trash.move_to_trash(path))
+
+    def test_move_to_trash_fallback(self):
+        """git_cache.trash.move_to_trash(): Delete the directory if it can't be renamed."""
+        path = self.make_dir("mirror")
+        with mock.patch.object(trash.os, "rename", side_effect=OSError("cross-device link")):
+            self.assertFalse(trash.move_to_trash(path))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual([], trash.get_trash_entries())
+
+    def test_empty_trash(self):
+        """git_cache.trash.empty_trash(): Remove all directories of the trash."""
+        self.assertEqual(0, trash.empty_trash())
+        trash.move_to_trash(self.make_dir("first"))
+        trash.move_to_trash(self.make_dir("second"))
+
+        with portalocker.Lock(os.path.join(self.trash_dir, ".lock")):
+            self.assertEqual(0, trash.empty_trash())
+        self.assertEqual(2, len(trash.get_trash_entries()))
+
+        self.assertEqual(2, trash.empty_trash())
+        self.assertEqual([], trash.get_trash_entries())
+
+    def test_reclaim_in_background(self):
+        """git_cache.trash.reclaim_in_background(): Start the detached process once."""
+        self.patches[1].stop()
+        try:
+            with mock.patch.object(trash, "_BACKGROUND_SCHEDULED", False), mock.patch.object(
+                trash, "is_serving", return_value=False
+            ), mock.patch.object(trash.atexit, "register") as register:
+                trash.reclaim_in_background()
+                trash.reclaim_in_background()
+                register.assert_called_once_with(trash.start_reclaim_process)
+
+            # The gitcache daemon starts the process immediately
+            with mock.patch.object(trash, "is_serving", return_value=True), mock.patch.object(
+                trash, "start_reclaim_process"
+            ) as start, mock.patch.object(trash.atexit, "register") as register:
+                trash.reclaim_in_background()
+                trash.reclaim_in_background()
+            self.assertEqual(2, start.call_count)
+            register.assert_not_called()
+        finally:
+            self.patches[1].start()
+
+        with mock.patch.object(helpers.subprocess, "Popen") as popen:
+            trash.start_reclaim_process()
+        self.assertEqual(["--empty-trash"], popen.call_args[0][0][-1:])
+        self.assertTrue(popen.call_args[1]["start_new_session"])
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
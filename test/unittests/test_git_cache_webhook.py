@@ -0,0 +1,154 @@
+#
+# Copyright (c) 2026 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of gitcache (https://github.com/seeraven/gitcache)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the git_cache.webhook module."""
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import hashlib
+import hmac
+import json
+import os
+import shutil
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from unittest import TestCase
+
+import mock
+
+from git_cache import git_mirror, webhook
+
+GITHUB_PAYLOAD = {
+    "ref": "refs/heads/main",
+    "repository": {
+        "full_name": "owner/repo",
+        "clone_url": "https://github.com/owner/repo.git",
+        "ssh_url": "git@github.com:owner/repo.git",
+        "html_url": "https://github.com/owner/repo",
+    },
+}
+
+GITLAB_PAYLOAD = {
+    "object_kind": "push",
+    "project": {
+        "git_http_url": "https://gitlab.com/group/project.git",
+        "git_ssh_url": "git@gitlab.com:group/project.git",
+    },
+    "repository": {"url": "git@gitlab.com:group/project.git", "homepage": "https://gitlab.com/group/project"},
+}
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class GitCacheWebhookTest(TestCase):
+    """Test the receiver of the webhook push events."""
+
+    def setUp(self):
+        """Start the webhook receiver on a free port."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.mirrors = {
+            os.path.join(self.tmp_dir, "mirrors", "github.com", "owner", "repo"): {},
+            os.path.join(self.tmp_dir, "mirrors", "gitlab.com", "group", "project"): {},
+        }
+        for path in self.mirrors:
+            os.makedirs(path)
+        database = mock.MagicMock()
+        database.get.side_effect = self.mirrors.get
+        self.patches = [
+            mock.patch.object(git_mirror, "GITCACHE_DIR", self.tmp_dir),
+            mock.patch.object(webhook, "Database", return_value=database),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+        self.refresh = mock.MagicMock()
+        self.server = webhook.WebhookServer(("127.0.0.1", 0), "secret", self.refresh)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        """Stop the webhook receiver."""
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def _post(self, payload, headers):
+        """Send a webhook request and return the status code and the response."""
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{self.server.server_address[1]}/",
+            data=body,
+            headers=dict(headers, **{"Content-Type": "application/json"}),
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as error:
+            return error.code, json.loads(error.read())
+
+    @staticmethod
+    def _signature(payload, prefix=""):
+        """Get the HMAC-SHA256 signature of a payload."""
+        digest = hmac.new(b"secret", json.dumps(payload).encode("utf-8"), hashlib.sha256).hexdigest()
+        return prefix + digest
+
+    def _pushed(self):
+        """Get the mirrors whose push marker exists."""
+        return sorted(path for path in self.mirrors if os.path.exists(os.path.join(path, "pushed")))
+
+    def test_get_repository_urls(self):
+        """git_cache.webhook.get_repository_urls(): Collect the URLs of the repository and the project."""
+        self.assertEqual(
+            ["https://github.com/owner/repo.git", "git@github.com:owner/repo.git", "https://github.com/owner/repo"],
+            webhook.get_repository_urls(GITHUB_PAYLOAD),
+        )
+        self.assertEqual(
+            ["git@gitlab.com:group/project.git", "https://gitlab.com/group/project.git"],
+            webhook.get_repository_urls(GITLAB_PAYLOAD),
+        )
+        self.assertEqual([], webhook.get_repository_urls({"repository": "invalid"}))
+
+    def test_push(self):
+        """git_cache.webhook.WebhookServer: Mark the mirrors of push events as pushed."""
+        github_path, gitlab_path = sorted(self.mirrors)
+        status, response = self._post(
+            GITHUB_PAYLOAD,
+            {"X-GitHub-Event": "push", "X-Hub-Signature-256": self._signature(GITHUB_PAYLOAD, "sha256=")},
+        )
+        self.assertEqual((202, {"mirrors": [github_path]}), (status, response))
+        self.assertEqual([github_path], self._pushed())
+        self.refresh.assert_called_once_with(github_path)
+
+        status, response = self._post(GITLAB_PAYLOAD, {"X-Gitlab-Event": "Push Hook", "X-Gitlab-Token": "secret"})
+        self.assertEqual((202, {"mirrors": [gitlab_path]}), (status, response))
+
+        unknown = {"repository": {"clone_url": "https://gitea.example.com/other/repo.git"}}
+        status, response = self._post(unknown, {"X-Gitea-Event": "push", "X-Gitea-Signature": self._signature(unknown)})
+        self.assertEqual((200, {"mirrors": []}), (status, response))
+        self.assertEqual(2, self.refresh.call_count)
+
+    def test_rejected_requests(self):
+        """git_cache.webhook.WebhookServer: Reject unauthenticated and invalid requests."""
+        self.assertEqual(403, self._post(GITHUB_PAYLOAD, {})[0])
+        self.assertEqual(403, self._post(GITHUB_PAYLOAD, {"X-Hub-Signature-256": "sha256=0123"})[0])
+        self.assertEqual(403, self._post(GITLAB_PAYLOAD, {"X-Gitlab-Token": "wrong"})[0])
+        self.assertEqual(400, self._post(b"no json", {"X-Gitlab-Token": "secret"})[0])
+        self.assertEqual(200, self._post(GITHUB_PAYLOAD, {"X-GitHub-Event": "ping", "X-Gitlab-Token": "secret"})[0])
+        self.assertEqual([], self._pushed())
+        self.refresh.assert_not_called()
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------